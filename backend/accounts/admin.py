@@ -6,10 +6,11 @@ from accounts.models import (
     PasswordResetToken,
     PhoneVerification,
 )
+from shop.admin_search import TrigramSearchMixin
 
 
 @admin.register(CustomerProfile)
-class CustomerProfileAdmin(admin.ModelAdmin):
+class CustomerProfileAdmin(TrigramSearchMixin, admin.ModelAdmin):
     list_display = (
         "id",
         "user",
@@ -21,7 +22,15 @@ class CustomerProfileAdmin(admin.ModelAdmin):
         "email_verified_at",
         "phone_verified_at",
     )
-    search_fields = ("user__username", "user__email", "first_name", "last_name", "phone")
+    search_fields = (
+        "user__username",
+        "user__email",
+        "first_name",
+        "last_name",
+        "phone",
+        "postal_code",
+    )
+    fuzzy_search_fields = ("first_name", "last_name")
     list_select_related = ("user",)
 
 
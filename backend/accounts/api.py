@@ -20,6 +20,7 @@ from accounts.serializers import (
     VerifyPhoneSerializer,
 )
 from notifications.tasks import send_email_verification_email_task
+from shop.identity import identity_for
 
 
 User = get_user_model()
@@ -35,7 +36,7 @@ class RegisterView(APIView):
         user = serializer.save()
 
         login(request, user)
-        profile, _created = CustomerProfile.objects.get_or_create(user=user)
+        profile = identity_for(request).customer_profile
 
         me_data = {"user": UserSerializer(user).data, "profile": CustomerProfileSerializer(profile).data}
         response = MeSerializer(me_data)
@@ -57,7 +58,7 @@ class LoginView(APIView):
             return Response({"detail": "Invalid email or password."}, status=status.HTTP_400_BAD_REQUEST)
 
         login(request, user)
-        profile, _created = CustomerProfile.objects.get_or_create(user=user)
+        profile = identity_for(request).customer_profile
 
         me_data = {"user": UserSerializer(user).data, "profile": CustomerProfileSerializer(profile).data}
         response = MeSerializer(me_data)
@@ -87,7 +88,7 @@ class MeView(APIView):
 
     def get(self, request):
         user = request.user
-        profile, _created = CustomerProfile.objects.get_or_create(user=user)
+        profile = identity_for(request).customer_profile
 
         me_data = {"user": UserSerializer(user).data, "profile": CustomerProfileSerializer(profile).data}
         response = MeSerializer(me_data)
@@ -98,12 +99,12 @@ class ProfileView(APIView):
     permission_classes = [permissions.IsAuthenticated]
 
     def get(self, request):
-        profile, _created = CustomerProfile.objects.get_or_create(user=request.user)
+        profile = identity_for(request).customer_profile
         serializer = CustomerProfileSerializer(profile)
         return Response(serializer.data)
 
     def patch(self, request):
-        profile, _created = CustomerProfile.objects.get_or_create(user=request.user)
+        profile = identity_for(request).customer_profile
         serializer = CustomerProfileSerializer(profile, data=request.data, partial=True)
         serializer.is_valid(raise_exception=True)
         serializer.save()
@@ -0,0 +1,18 @@
+from django.db import migrations
+
+from shop.admin_search import trigram_index_operation
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("accounts", "0005_passwordresettoken"),
+        ("auth", "0012_alter_user_first_name_max_length"),
+    ]
+
+    operations = [
+        trigram_index_operation(
+            "accounts_customerprofile", ["first_name", "last_name", "phone", "postal_code"]
+        ),
+        trigram_index_operation("auth_user", ["username", "email", "first_name", "last_name"]),
+    ]
@@ -11,10 +11,18 @@ from rest_framework.request import Request
 from rest_framework.response import Response
 from rest_framework.views import APIView
 
+from delivery.counters import apply_deltas, count_stop, new_deltas
 from delivery.models import DeliveryRoute, RouteStop
+from delivery.sequencing import apply_stop_order
+from delivery.snapshots import mark_route_snapshots_stale
 from delivery.tasks import generate_delivery_routes, optimize_future_routes
-from delivery.serializers import DeliveryRouteSerializer
+from delivery.serializers import (
+    DeliveryRouteSerializer,
+    RouteStopOrderSerializer,
+    RouteStopSerializer,
+)
 from orders.models import Order, OrderItem
+from shop.fields import FULL, FieldSelection, renders, sparse_queryset
 
 User = get_user_model()
 
@@ -140,23 +148,70 @@ class AdminClientsView(APIView):
         return Response(clients)
 
 
+def _select_region(queryset, selection):
+    return queryset.select_related("region")
+
+
+def _select_driver(queryset, selection):
+    return queryset.select_related("driver", "driver__user")
+
+
+def _select_driver_preferences(queryset, selection):
+    return queryset.select_related("driver", "driver__preferred_region")
+
+
+def _select_proof(queryset, selection):
+    return queryset.select_related("delivery_proof")
+
+
+def _select_order(queryset, selection):
+    queryset = queryset.select_related("order")
+    if renders(RouteStopOrderSerializer, selection, "items"):
+        queryset = queryset.prefetch_related("order__items")
+    return queryset
+
+
+def _prefetch_stops(queryset, selection):
+    stops = sparse_queryset(
+        RouteStop.objects.order_by("sequence", "id"),
+        RouteStopSerializer,
+        selection,
+        loaders={
+            "has_proof": _select_proof,
+            "proof_photo_url": _select_proof,
+            "order": _select_order,
+        },
+        always=("route",),
+    )
+    return queryset.prefetch_related(Prefetch("stops", queryset=stops))
+
+
+def admin_route_queryset(selection: FieldSelection = FULL):
+    """
+    Routes with what DeliveryRouteSerializer renders for `selection` (`?fields=`,
+    `?expand=`) loaded in a fixed number of queries; unrendered relations are skipped.
+    """
+    return sparse_queryset(
+        DeliveryRoute.objects.all(),
+        DeliveryRouteSerializer,
+        selection,
+        loaders={
+            "region_code": _select_region,
+            "region_name": _select_region,
+            "driver_id": _select_driver,
+            "driver_name": _select_driver,
+            "driver_preferences": _select_driver_preferences,
+            "stops": _prefetch_stops,
+        },
+    )
+
+
 class AdminRouteListView(APIView):
     permission_classes = [AdminPermission]
 
     def get(self, request: Request, *args: Any, **kwargs: Any) -> Response:
-        queryset = (
-            DeliveryRoute.objects.select_related(
-                "region", "driver", "driver__user", "driver__preferred_region"
-            )
-            .prefetch_related(
-                Prefetch(
-                    "stops",
-                    queryset=RouteStop.objects.select_related("order").order_by(
-                        "sequence", "id"
-                    ),
-                )
-            )
-            .order_by("-date", "region__code", "id")
+        queryset = admin_route_queryset(FieldSelection.from_request(request)).order_by(
+            "-date", "region__code", "id"
         )
 
         include_merged = request.query_params.get("include_merged", "").lower() in (
@@ -196,18 +251,7 @@ class AdminRouteDetailView(APIView):
 
     def get(self, request: Request, pk: int, *args: Any, **kwargs: Any) -> Response:
         route = get_object_or_404(
-            DeliveryRoute.objects.select_related(
-                "region", "driver", "driver__user", "driver__preferred_region"
-            )
-            .prefetch_related(
-                Prefetch(
-                    "stops",
-                    queryset=RouteStop.objects.select_related("order").order_by(
-                        "sequence", "id"
-                    ),
-                )
-            ),
-            pk=pk,
+            admin_route_queryset(FieldSelection.from_request(request)), pk=pk
         )
         serializer = DeliveryRouteSerializer(route, context={"request": request})
         return Response(serializer.data)
@@ -243,34 +287,11 @@ class AdminRouteReorderView(APIView):
                 status=400,
             )
 
-        max_sequence = route.stops.aggregate(max_seq=Max("sequence")).get("max_seq") or 0
-        temp_offset = max_sequence + 1000
-
         with transaction.atomic():
-            for index, stop_id in enumerate(stop_ids, start=1):
-                RouteStop.objects.filter(pk=stop_id, route=route).update(
-                    sequence=temp_offset + index
-                )
+            apply_stop_order(route.id, stop_ids)
+            mark_route_snapshots_stale([route.id])
 
-            for index, stop_id in enumerate(stop_ids, start=1):
-                RouteStop.objects.filter(pk=stop_id, route=route).update(
-                    sequence=index
-                )
-
-        refreshed_route = (
-            DeliveryRoute.objects.select_related(
-                "region", "driver", "driver__user", "driver__preferred_region"
-            )
-            .prefetch_related(
-                Prefetch(
-                    "stops",
-                    queryset=RouteStop.objects.select_related("order").order_by(
-                        "sequence", "id"
-                    ),
-                )
-            )
-            .get(pk=pk)
-        )
+        refreshed_route = admin_route_queryset().get(pk=pk)
         response_serializer = DeliveryRouteSerializer(
             refreshed_route, context={"request": request}
         )
@@ -332,12 +353,14 @@ class AdminRouteMergeView(APIView):
                 target.stops.aggregate(max_seq=Max("sequence")).get("max_seq") or 0
             )
 
-            for index, stop in enumerate(stops, start=1):
-                stop.route_id = target.id
-                stop.sequence = starting_sequence + index
-
-            if stops:
-                RouteStop.objects.bulk_update(stops, ["route", "sequence"])
+            apply_stop_order(
+                target.id, [stop.id for stop in stops], start=starting_sequence + 1
+            )
+            deltas = new_deltas()
+            for stop in stops:
+                count_stop(deltas, source.id, stop.status, -1)
+                count_stop(deltas, target.id, stop.status, 1)
+            apply_deltas(deltas)
 
             DeliveryRoute.objects.filter(pk=source.id).update(
                 merged_into=target,
@@ -345,21 +368,9 @@ class AdminRouteMergeView(APIView):
                 driver=None,
                 is_completed=True,
             )
+            mark_route_snapshots_stale([source.id])
 
-            refreshed_target = (
-                DeliveryRoute.objects.select_related(
-                    "region", "driver", "driver__user", "driver__preferred_region"
-                )
-                .prefetch_related(
-                    Prefetch(
-                        "stops",
-                        queryset=RouteStop.objects.select_related("order").order_by(
-                            "sequence", "id"
-                        ),
-                    )
-                )
-                .get(pk=target.id)
-            )
+            refreshed_target = admin_route_queryset().get(pk=target.id)
             refreshed_target.refresh_completion_status(save=True)
 
         response_serializer = DeliveryRouteSerializer(
@@ -331,6 +331,38 @@ class AdminRoutesApiTests(AdminApiTestCase):
         self.assertIn("order", stop)
         self.assertIn("full_name", stop["order"])
 
+    def test_routes_list_renders_sparse_fieldsets(self):
+        url = reverse("admin_api:routes-list")
+        # Routes and their stops only: region, driver and orders are never joined.
+        with self.assertNumQueries(2):
+            response = self.admin_client.get(
+                url, {"fields": "id,date,stops_count,stops.id,stops.status"}
+            )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        route = response.json()[0]
+        self.assertEqual(set(route), {"id", "date", "stops_count", "stops"})
+        self.assertEqual(route["stops_count"], 2)
+        self.assertEqual([set(stop) for stop in route["stops"]], [{"id", "status"}] * 2)
+
+        with self.assertNumQueries(1):
+            response = self.admin_client.get(url, {"expand": ""})
+        route = response.json()[0]
+        self.assertNotIn("stops", route)
+        self.assertNotIn("driver_preferences", route)
+        self.assertEqual(route["region_code"], "north")
+        self.assertEqual(route["driver_name"], "driver@example.com")
+
+    def test_route_detail_expands_nested_fields(self):
+        url = reverse("admin_api:routes-detail", args=[self.route_recent.id])
+        response = self.admin_client.get(url, {"fields": "id", "expand": "stops.order"})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        data = response.json()
+        self.assertEqual(set(data), {"id", "stops"})
+        stop = data["stops"][0]
+        self.assertIn("status", stop)
+        self.assertEqual(stop["order"]["full_name"], "Customer 1")
+        self.assertEqual(stop["order"]["items"], [])
+
 
 class AdminRouteReorderApiTests(AdminApiTestCase):
     def setUp(self):
@@ -2,9 +2,19 @@ from django.utils import timezone
 from rest_framework import generics
 from rest_framework.pagination import PageNumberPagination
 
+from shop.conditional import (
+    conditional_get,
+    get_content_version,
+    make_etag,
+    queryset_fingerprint,
+)
+
 from .models import BlogPost
 from .serializers import BlogPostDetailSerializer, BlogPostListSerializer
 
+# shop.conditional content version bumped whenever a post changes (blog.signals).
+BLOG_CONTENT = "blog"
+
 
 class BlogPostPagination(PageNumberPagination):
     page_size = 6
@@ -23,25 +33,40 @@ class BlogPostPagination(PageNumberPagination):
         return super().get_page_size(request)
 
 
+def published_posts():
+    return BlogPost.objects.filter(is_published=True, published_at__lte=timezone.now())
+
+
+def blog_list_etag(request, *args, **kwargs):
+    # published_at covers scheduled posts going live, which involves no write.
+    fingerprint = queryset_fingerprint(published_posts(), "published_at")
+    return make_etag(request, get_content_version(BLOG_CONTENT), *fingerprint)
+
+
+def blog_detail_etag(request, slug, *args, **kwargs):
+    post_id = published_posts().filter(slug=slug).values_list("id", flat=True).first()
+    return make_etag(request, get_content_version(BLOG_CONTENT), post_id)
+
+
 class BlogPostListView(generics.ListAPIView):
     serializer_class = BlogPostListSerializer
     pagination_class = BlogPostPagination
 
+    @conditional_get(etag_func=blog_list_etag)
+    def get(self, request, *args, **kwargs):
+        return super().get(request, *args, **kwargs)
+
     def get_queryset(self):
-        return (
-            BlogPost.objects.filter(is_published=True, published_at__lte=timezone.now())
-            .order_by("-published_at", "-id")
-            .all()
-        )
+        return published_posts().order_by("-published_at", "-id").all()
 
 
 class BlogPostDetailView(generics.RetrieveAPIView):
     serializer_class = BlogPostDetailSerializer
     lookup_field = "slug"
 
+    @conditional_get(etag_func=blog_detail_etag)
+    def get(self, request, *args, **kwargs):
+        return super().get(request, *args, **kwargs)
+
     def get_queryset(self):
-        return (
-            BlogPost.objects.filter(is_published=True, published_at__lte=timezone.now())
-            .order_by("-published_at", "-id")
-            .all()
-        )
+        return published_posts().order_by("-published_at", "-id").all()
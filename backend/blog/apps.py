@@ -4,3 +4,7 @@ from django.apps import AppConfig
 class BlogConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "blog"
+
+    def ready(self):
+        # Import signal handlers so post changes invalidate blog ETags.
+        import blog.signals  # noqa: F401
@@ -0,0 +1,16 @@
+from functools import partial
+
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from blog.api import BLOG_CONTENT
+from blog.models import BlogPost
+from shop.conditional import bump_content_version
+
+
+@receiver(post_save, sender=BlogPost)
+@receiver(post_delete, sender=BlogPost)
+def bump_blog_version_on_post_change(sender, instance, **kwargs):
+    # After commit, so no reader pairs the new version with the old rows.
+    transaction.on_commit(partial(bump_content_version, BLOG_CONTENT))
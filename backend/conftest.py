@@ -11,6 +11,8 @@ os.environ.setdefault("DJANGO_SETTINGS_MODULE", "shop.settings.local")
 os.environ["DATABASE_URL"] = ""
 # Disable Stripe webhook signature enforcement for tests.
 os.environ["STRIPE_WEBHOOK_SECRET"] = ""
+# Use locmem caches and shop.redis.FakeRedis instead of a Redis server.
+os.environ.setdefault("REDIS_FAKE", "1")
 
 
 def pytest_configure():
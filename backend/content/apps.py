@@ -5,3 +5,7 @@ class ContentConfig(AppConfig):
   default_auto_field = "django.db.models.BigAutoField"
   name = "content"
   verbose_name = "Site Content"
+
+  def ready(self):
+    # Import signal handlers so new uploads get responsive variants.
+    import content.signals  # noqa: F401
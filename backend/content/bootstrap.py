@@ -0,0 +1,85 @@
+"""
+Everything the SPA needs on first load, in one response.
+
+Each fragment is rendered once per version of its source and cached, and the response
+ETag combines those versions. An unchanged homepage costs a few cache reads plus two
+aggregate queries (regions and published posts, which have no change signal).
+"""
+import hashlib
+from typing import Any, Callable, Dict
+
+from blog.api import BLOG_CONTENT, BlogPostPagination, published_posts
+from blog.serializers import BlogPostListSerializer
+from orders.models import Region
+from orders.serializers import RegionSerializer
+from products.catalog import (
+    absolute_media_urls,
+    get_catalog_version,
+    render_category_list,
+    render_product_list,
+)
+from shop.cache import app_cache
+from shop.conditional import get_content_version, queryset_fingerprint
+from shop.media import signed_url_cache_seconds
+
+from .models import SiteImage
+from .serializers import SiteImageSerializer
+
+bootstrap_cache = app_cache("bootstrap")
+# shop.conditional content version bumped whenever a site image changes (content.signals).
+SITE_IMAGES_CONTENT = "site_images"
+# Fragments are keyed by version, so this only bounds dead entries.
+FRAGMENT_TIMEOUT = 24 * 60 * 60
+
+
+def fragment_versions() -> Dict[str, str]:
+    posts, latest_post = queryset_fingerprint(published_posts(), "published_at")
+    regions, latest_region = queryset_fingerprint(Region.objects.all())
+    return {
+        "catalog": get_catalog_version(),
+        "site_images": get_content_version(SITE_IMAGES_CONTENT),
+        "regions": f"{regions}:{latest_region}",
+        "blog": f"{get_content_version(BLOG_CONTENT)}:{posts}:{latest_post}",
+    }
+
+
+def site_images_payload() -> Dict[str, Dict[str, Any]]:
+    """Site images by key, as served by the site-images endpoint."""
+    serialized = SiteImageSerializer(SiteImage.objects.all(), many=True).data
+    return {
+        item["key"]: {
+            "url": item["url"],
+            "srcset": item["srcset"],
+            "alt": item["alt_text"],
+            "description": item["description"],
+        }
+        for item in serialized
+    }
+
+
+def regions_payload():
+    return list(RegionSerializer(Region.objects.order_by("code"), many=True).data)
+
+
+def latest_posts_payload() -> Dict[str, Any]:
+    """The first page of the blog list: the total and the newest posts."""
+    posts = published_posts().order_by("-published_at", "-id")
+    results = BlogPostListSerializer(posts[: BlogPostPagination.page_size], many=True).data
+    return {"count": posts.count(), "results": list(results)}
+
+
+def _fragment(name: str, version: str, build: Callable[[], Any]) -> Any:
+    digest = hashlib.sha1(version.encode()).hexdigest()[:16]
+    # Fragments may embed signed media URLs, which must not outlive their signature.
+    timeout = min(FRAGMENT_TIMEOUT, signed_url_cache_seconds() or FRAGMENT_TIMEOUT)
+    return bootstrap_cache.get_or_compute(f"{name}:{digest}", build, timeout=timeout)
+
+
+def bootstrap_payload(versions: Dict[str, str], request) -> Dict[str, Any]:
+    return {
+        "products": absolute_media_urls(render_product_list(), request),
+        "categories": render_category_list(),
+        "site_images": _fragment("site_images", versions["site_images"], site_images_payload),
+        "regions": _fragment("regions", versions["regions"], regions_payload),
+        "blog": _fragment("blog", versions["blog"], latest_posts_payload),
+    }
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-19 04:39
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('content', '0004_ensure_brand_logo'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='siteimage',
+            name='image_variants',
+            field=models.JSONField(blank=True, default=dict, editable=False),
+        ),
+    ]
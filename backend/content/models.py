@@ -4,6 +4,8 @@ from django.db import models
 class SiteImage(models.Model):
     key = models.CharField(max_length=190, unique=True, help_text="Key used by the frontend, e.g. home.hero")
     image = models.ImageField(upload_to="site_images/", null=True, blank=True)
+    # Resized WebP/AVIF copies of `image`, built by Celery (shop.images).
+    image_variants = models.JSONField(default=dict, blank=True, editable=False)
     alt_text = models.CharField(max_length=255, blank=True)
     description = models.TextField(blank=True, help_text="Internal notes for marketing/admins.")
     created_at = models.DateTimeField(auto_now_add=True)
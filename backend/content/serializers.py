@@ -1,23 +1,34 @@
 from rest_framework import serializers
 
+from shop.images import srcset, variant_names
+from shop.media import MediaUrlListSerializer, media_resolver
+
 from .models import SiteImage
 
 
 class SiteImageSerializer(serializers.ModelSerializer):
     url = serializers.SerializerMethodField()
+    srcset = serializers.SerializerMethodField()
 
     class Meta:
         model = SiteImage
-        fields = ("key", "url", "alt_text", "description")
+        fields = ("key", "url", "srcset", "alt_text", "description")
+        list_serializer_class = MediaUrlListSerializer
+
+    def media_names(self, obj: SiteImage):
+        if not obj.image:
+            return []
+        return [obj.image.name, *variant_names(obj.image_variants)]
+
+    def get_srcset(self, obj: SiteImage):
+        # Variant names are content-hashed, so they need no version parameter.
+        return srcset(obj.image, obj.image_variants, media_resolver(self.context).relative_url)
 
     def get_url(self, obj: SiteImage):
         if not obj.image:
             return None
 
-        try:
-            url = obj.image.url
-        except ValueError:
-            return None
+        url = media_resolver(self.context).relative_url(obj.image.name)
 
         # Append a version so browsers/S3/CDN caches fetch the latest upload.
         version = int(obj.updated_at.timestamp()) if obj.updated_at else None
@@ -0,0 +1,25 @@
+from functools import partial
+
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from content.bootstrap import SITE_IMAGES_CONTENT
+from content.models import SiteImage
+from content.tasks import generate_site_image_variants
+from shop.conditional import bump_content_version
+from shop.images import schedule_variants
+
+
+@receiver(post_save, sender=SiteImage)
+def build_site_image_variants(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    schedule_variants(instance, generate_site_image_variants, instance.pk)
+
+
+@receiver(post_save, sender=SiteImage)
+@receiver(post_delete, sender=SiteImage)
+def bump_site_images_version(sender, instance, **kwargs):
+    # After commit, so no reader pairs the new version with the old rows.
+    transaction.on_commit(partial(bump_content_version, SITE_IMAGES_CONTENT))
@@ -0,0 +1,35 @@
+import logging
+
+from celery import shared_task
+from django.utils import timezone
+
+from shop.conditional import bump_content_version
+from shop.images import refresh_variants
+
+from .bootstrap import SITE_IMAGES_CONTENT
+from .models import SiteImage
+
+logger = logging.getLogger(__name__)
+
+
+@shared_task(name="content.generate_site_image_variants", ignore_result=True)
+def generate_site_image_variants(pk: int) -> dict:
+    """
+    Build the WebP/AVIF variants of a site image's upload.
+    """
+    image = SiteImage.objects.filter(pk=pk).first()
+    if image is None:
+        return {"pk": pk, "built": False, "reason": "missing"}
+    try:
+        # updated_at versions the image URLs and the ETags of the site image endpoints.
+        built = refresh_variants(image, updated_at=timezone.now())
+    except OSError:
+        logger.warning(
+            "image_variants_unreadable",
+            extra={"model": "siteimage", "pk": pk, "image": image.image.name},
+            exc_info=True,
+        )
+        return {"pk": pk, "built": False, "reason": "unreadable"}
+    if built:
+        bump_content_version(SITE_IMAGES_CONTENT)
+    return {"pk": pk, "built": built}
@@ -1,10 +1,11 @@
 from django.urls import path
 
-from .views import SiteImageDetailView, SiteImageListView
+from .views import BootstrapView, SiteImageDetailView, SiteImageListView
 
 app_name = "content"
 
 urlpatterns = [
+    path("bootstrap/", BootstrapView.as_view(), name="bootstrap"),
     path("site-images/", SiteImageListView.as_view(), name="site-image-list"),
     path("site-images/<str:key>/", SiteImageDetailView.as_view(), name="site-image-detail"),
 ]
@@ -1,35 +1,37 @@
 from django.utils.decorators import method_decorator
-from django.views.decorators.cache import never_cache
+from django.views.decorators.gzip import gzip_page
 from rest_framework.permissions import AllowAny
 from rest_framework.response import Response
 from rest_framework.views import APIView
 
+from shop.conditional import conditional_get, make_etag, queryset_fingerprint
+
+from .bootstrap import bootstrap_payload, fragment_versions, site_images_payload
 from .models import SiteImage
 from .serializers import SiteImageSerializer
 
 
+def site_images_etag(request, *args, **kwargs):
+    return make_etag(request, *queryset_fingerprint(SiteImage.objects.all()))
+
+
+def site_image_etag(request, key, *args, **kwargs):
+    updated_at = SiteImage.objects.filter(key=key).values_list("updated_at", flat=True).first()
+    return make_etag(request, updated_at) if updated_at else None
+
+
 class SiteImageListView(APIView):
     permission_classes = [AllowAny]
 
-    @method_decorator(never_cache)
+    @conditional_get(etag_func=site_images_etag)
     def get(self, _request):
-        images = SiteImage.objects.all()
-        serialized = SiteImageSerializer(images, many=True).data
-        payload = {
-            item["key"]: {
-                "url": item["url"],
-                "alt": item["alt_text"],
-                "description": item["description"],
-            }
-            for item in serialized
-        }
-        return Response(payload)
+        return Response(site_images_payload())
 
 
 class SiteImageDetailView(APIView):
     permission_classes = [AllowAny]
 
-    @method_decorator(never_cache)
+    @conditional_get(etag_func=site_image_etag)
     def get(self, _request, key: str):
         try:
             image = SiteImage.objects.get(key=key)
@@ -41,7 +43,34 @@ class SiteImageDetailView(APIView):
             {
                 "key": data["key"],
                 "url": data["url"],
+                "srcset": data["srcset"],
                 "alt": data["alt_text"],
                 "description": data["description"],
             }
         )
+
+
+def _versions(request):
+    # Computed once per request: by the ETag check, then reused to build the response.
+    if not hasattr(request, "_bootstrap_versions"):
+        request._bootstrap_versions = fragment_versions()
+    return request._bootstrap_versions
+
+
+def bootstrap_etag(request, *args, **kwargs):
+    versions = _versions(request)
+    return make_etag(request, *(f"{name}={versions[name]}" for name in sorted(versions)))
+
+
+class BootstrapView(APIView):
+    """
+    Products, categories, site images, regions and the latest blog posts in one
+    gzip-compressed response, for the SPA's first load (content.bootstrap).
+    """
+
+    permission_classes = [AllowAny]
+
+    @method_decorator(gzip_page)
+    @conditional_get(etag_func=bootstrap_etag)
+    def get(self, request):
+        return Response(bootstrap_payload(_versions(request), request))
@@ -8,21 +8,28 @@ from django.utils.html import format_html
 
 from .models import DeliveryProof, DeliveryRoute, Driver, RouteStop
 from delivery.tasks import generate_delivery_routes
+from shop.admin_search import TrigramSearchMixin
+
+
+def proof_preview(proof):
+    """Preview a proof from its thumbnail, or from the photo until processing has run."""
+    image = proof and (proof.photo_thumbnail or proof.photo)
+    if not image:
+        return "—"
+    return format_html(
+        '<img src="{}" style="max-height:120px;max-width:200px;" alt="Proof photo" />',
+        image.url,
+    )
 
 
 class DeliveryProofInline(admin.StackedInline):
     model = DeliveryProof
     extra = 0
-    fields = ("photo", "thumbnail", "created_at")
-    readonly_fields = ("thumbnail", "created_at")
+    fields = ("photo", "thumbnail", "processed_at", "created_at")
+    readonly_fields = ("thumbnail", "processed_at", "created_at")
 
     def thumbnail(self, obj):
-        if obj and getattr(obj, "photo", None):
-            return format_html(
-                '<img src="{}" style="max-height:120px;max-width:200px;" alt="Proof photo" />',
-                obj.photo.url,
-            )
-        return "—"
+        return proof_preview(obj)
 
     thumbnail.short_description = "Preview"
 
@@ -54,6 +61,7 @@ class DeliveryRouteAdmin(admin.ModelAdmin):
         "driver",
         "merged_into",
         "stops_count",
+        "pending_count",
         "is_completed",
         "created_at",
     )
@@ -74,13 +82,14 @@ class DeliveryRouteAdmin(admin.ModelAdmin):
         ("stops__status", admin.ChoicesFieldListFilter),
     )
     inlines = [RouteStopInline]
+    readonly_fields = ("pending_count", "delivered_count", "no_pickup_count", "total_count")
 
     def get_queryset(self, request):
         queryset = super().get_queryset(request)
         return queryset.select_related("region", "driver", "driver__user", "driver__preferred_region")
 
     def stops_count(self, obj):
-        return obj.stops.count()
+        return obj.total_count
 
     stops_count.short_description = "Stops"
 
@@ -101,8 +110,10 @@ class DeliveryRouteAdmin(admin.ModelAdmin):
             return False
         return super().has_delete_permission(request, obj)
 
-    def save_model(self, request, obj, form, change):
-        super().save_model(request, obj, form, change)
+    def save_related(self, request, form, formsets, change):
+        # Inline stop edits update the counters, so completion is checked after them.
+        super().save_related(request, form, formsets, change)
+        obj = form.instance
         if not getattr(obj, "is_merged", False):
             obj.refresh_completion_status(save=True)
 
@@ -183,7 +194,7 @@ class DriverAdminForm(forms.ModelForm):
 
 
 @admin.register(Driver)
-class DriverAdmin(admin.ModelAdmin):
+class DriverAdmin(TrigramSearchMixin, admin.ModelAdmin):
     form = DriverAdminForm
     list_display = (
         "user",
@@ -201,6 +212,7 @@ class DriverAdmin(admin.ModelAdmin):
         "user__last_name",
         "phone",
     )
+    fuzzy_search_fields = ("user__first_name", "user__last_name")
     list_filter = ("preferred_region",)
     fieldsets = (
         (
@@ -245,7 +257,7 @@ class DriverAdmin(admin.ModelAdmin):
 
 
 @admin.register(RouteStop)
-class RouteStopAdmin(admin.ModelAdmin):
+class RouteStopAdmin(TrigramSearchMixin, admin.ModelAdmin):
     list_display = (
         "id",
         "route",
@@ -263,12 +275,16 @@ class RouteStopAdmin(admin.ModelAdmin):
         ("route__date", admin.DateFieldListFilter),
     )
     search_fields = (
-        "order__id",
+        "=order__id",
         "order__full_name",
+        "order__email",
+        "order__phone",
+        "order__postal_code",
         "route__region__code",
         "route__region__name",
         "route__driver__user__email",
     )
+    fuzzy_search_fields = ("order__full_name",)
     ordering = ("route__date", "route__region__code", "sequence")
     autocomplete_fields = ("route", "order")
     inlines = [DeliveryProofInline]
@@ -298,7 +314,7 @@ class DeliveryProofAdmin(admin.ModelAdmin):
         "stop__route__region__name",
         "stop__route__driver__user__email",
     )
-    readonly_fields = ("thumbnail", "created_at")
+    readonly_fields = ("thumbnail", "photo_thumbnail", "processed_at", "created_at")
 
     def route(self, obj):
         return obj.stop.route if obj and obj.stop else None
@@ -311,11 +327,6 @@ class DeliveryProofAdmin(admin.ModelAdmin):
     order.short_description = "Order"
 
     def thumbnail(self, obj):
-        if obj and getattr(obj, "photo", None):
-            return format_html(
-                '<img src="{}" style="max-height:120px;max-width:200px;" alt="Proof photo" />',
-                obj.photo.url,
-            )
-        return "—"
+        return proof_preview(obj)
 
     thumbnail.short_description = "Preview"
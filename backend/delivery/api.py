@@ -1,24 +1,42 @@
 import datetime
+import json
 import logging
 
-from django.db.models import Count, Prefetch
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.db import transaction
 from django.shortcuts import get_object_or_404
 from django.utils import timezone
+from django.utils.cache import patch_cache_control
+from django.utils.http import parse_etags
 from rest_framework import permissions, status
-from rest_framework.parsers import FormParser, MultiPartParser
+from rest_framework.parsers import FileUploadParser, FormParser, JSONParser, MultiPartParser
 from rest_framework.response import Response
 from rest_framework.views import APIView
 
-from delivery.models import DeliveryProof, DeliveryRoute, Driver, RouteStop
+from delivery.models import DeliveryProof, DeliveryRoute, RouteStop
 from delivery.permissions import IsDriver as BaseIsDriver
+from delivery.proofs import (
+    ProofUploadError,
+    confirm_proof_upload,
+    create_proof_upload,
+    read_proof_upload,
+)
+from delivery.locations import active_route_id, record_pings
 from delivery.serializers import (
-    DeliveryRouteSerializer,
-    DriverRouteSerializer,
+    DriverLocationBatchSerializer,
     DriverUpcomingRouteSerializer,
+    ProofUploadRequestSerializer,
     RouteStopSerializer,
+    StopSyncSerializer,
 )
+from delivery.snapshots import current_snapshots, render_snapshots, snapshots_etag
+from delivery.sync import apply_stop_transitions
+from delivery.tasks import process_delivery_proof
 from notifications.tasks import send_order_delivered_email_once
 from orders.models import Order
+from shop.conditional import conditional_get, make_etag
+from shop.identity import identity_for
 
 logger = logging.getLogger(__name__)
 
@@ -31,11 +49,31 @@ class IsDriver(BaseIsDriver):
     pass
 
 
+def snapshot_response(
+    request, snapshots, view, many=True, absolute_urls=False, stops_only=False
+):
+    """
+    Respond with route snapshots rendered as `view`, or 304 when the client's ETag matches.
+    """
+    etag = snapshots_etag(snapshots, f"{view}:stops" if stops_only else view)
+    if etag in parse_etags(request.headers.get("If-None-Match", "")):
+        response = Response(status=status.HTTP_304_NOT_MODIFIED, headers={"ETag": etag})
+    else:
+        data = render_snapshots(snapshots, view, request if absolute_urls else None)
+        if stops_only:
+            data = data[0]["stops"]
+        elif not many:
+            data = data[0]
+        response = Response(data, headers={"ETag": etag})
+    patch_cache_control(response, private=True, no_cache=True)
+    return response
+
+
 class MyRoutesView(APIView):
     permission_classes = [permissions.IsAuthenticated]
 
     def get(self, request, *args, **kwargs):
-        driver = Driver.objects.filter(user=request.user).select_related("user").first()
+        driver = identity_for(request).driver
         if not driver:
             return Response(
                 {"detail": "You are not registered as a driver."},
@@ -54,24 +92,12 @@ class MyRoutesView(APIView):
         else:
             date_value = timezone.now().date()
 
-        routes = (
-            DeliveryRoute.objects.filter(
-                driver=driver,
-                date=date_value,
-                merged_into__isnull=True,
-            )
-            .select_related("region", "driver", "driver__user", "driver__preferred_region")
-            .prefetch_related(
-                Prefetch(
-                    "stops",
-                    queryset=RouteStop.objects.select_related("order")
-                    .prefetch_related("order__items")
-                    .order_by("sequence", "id"),
-                )
-            )
-        )
-        serializer = DeliveryRouteSerializer(routes, many=True)
-        return Response(serializer.data)
+        routes = DeliveryRoute.objects.filter(
+            driver=driver,
+            date=date_value,
+            merged_into__isnull=True,
+        ).select_related("snapshot")
+        return snapshot_response(request, current_snapshots(list(routes)), "route")
 
 
 class DriverTodayRoutesView(APIView):
@@ -84,7 +110,7 @@ class DriverTodayRoutesView(APIView):
                 status=status.HTTP_401_UNAUTHORIZED,
             )
 
-        driver = Driver.objects.filter(user=request.user).first()
+        driver = identity_for(request).driver
         if not driver:
             return Response(
                 {"detail": "You are not registered as a driver."},
@@ -96,24 +122,35 @@ class DriverTodayRoutesView(APIView):
             DeliveryRoute.objects.filter(
                 driver=driver, date=today, merged_into__isnull=True
             )
-            .select_related("region", "driver", "driver__user", "driver__preferred_region")
-            .prefetch_related(
-                Prefetch(
-                    "stops",
-                    queryset=RouteStop.objects.select_related("order")
-                    .prefetch_related("order__items")
-                    .order_by("sequence", "id"),
-                )
-            )
+            .select_related("snapshot")
             .order_by("region__code", "id")
         )
-        serializer = DriverRouteSerializer(routes, many=True)
-        return Response(serializer.data)
+        return snapshot_response(
+            request, current_snapshots(list(routes)), "driver", absolute_urls=True
+        )
+
+
+def upcoming_routes(user):
+    return DeliveryRoute.objects.filter(
+        driver__user=user,
+        date__gt=timezone.now().date(),
+        is_completed=False,
+        merged_into__isnull=True,
+    ).order_by("date", "region__code", "id")
+
+
+def upcoming_routes_etag(request, *args, **kwargs):
+    # Every value DriverUpcomingRouteSerializer renders, read without building the response.
+    rows = upcoming_routes(request.user).values_list(
+        "id", "date", "region_id", "region__code", "region__name", "total_count", "pending_count"
+    )
+    return make_etag(request, list(rows))
 
 
 class DriverUpcomingRoutesView(APIView):
     permission_classes = [IsDriver, permissions.IsAuthenticated]
 
+    @conditional_get(etag_func=upcoming_routes_etag, private=True)
     def get(self, request, *args, **kwargs):
         if not request.user or not request.user.is_authenticated:
             return Response(
@@ -121,24 +158,15 @@ class DriverUpcomingRoutesView(APIView):
                 status=status.HTTP_401_UNAUTHORIZED,
             )
 
-        driver = Driver.objects.filter(user=request.user).first()
+        driver = identity_for(request).driver
         if not driver:
             return Response(
                 {"detail": "You are not registered as a driver."},
                 status=status.HTTP_403_FORBIDDEN,
             )
 
-        today = timezone.now().date()
-        routes = (
-            DeliveryRoute.objects.filter(
-                driver=driver,
-                date__gt=today,
-                is_completed=False,
-                merged_into__isnull=True,
-            )
-            .select_related("region", "driver", "driver__preferred_region")
-            .annotate(stops_count=Count("stops"))
-            .order_by("date", "region__code", "id")
+        routes = upcoming_routes(request.user).select_related(
+            "region", "driver", "driver__preferred_region"
         )
         serializer = DriverUpcomingRouteSerializer(routes, many=True)
         return Response(serializer.data)
@@ -149,7 +177,7 @@ class RouteStopsView(APIView):
 
     def get(self, request, route_id, *args, **kwargs):
         route = get_object_or_404(
-            DeliveryRoute.objects.select_related("driver__user"), pk=route_id
+            DeliveryRoute.objects.select_related("driver__user", "snapshot"), pk=route_id
         )
         if route.merged_into_id:
             return Response(
@@ -165,21 +193,97 @@ class RouteStopsView(APIView):
                 status=status.HTTP_403_FORBIDDEN,
             )
 
-        stops = (
-            route.stops.select_related("order")
-            .prefetch_related("order__items")
-            .order_by("sequence", "id")
+        return snapshot_response(request, current_snapshots([route]), "route", stops_only=True)
+
+
+class DriverProofUploadRequestView(APIView):
+    """
+    Reserve a direct-to-storage upload for a stop's proof-of-delivery photo.
+
+    The app uploads the photo to the returned `upload` target, then confirms it with
+    `upload_token` on mark-delivered (or in a sync transition).
+    """
+
+    permission_classes = [permissions.IsAuthenticated, IsDriver]
+
+    def post(self, request, stop_id, *args, **kwargs):
+        driver = identity_for(request).driver
+        if not driver:
+            return Response(
+                {"detail": IsDriver.message},
+                status=status.HTTP_403_FORBIDDEN,
+            )
+
+        stop = get_object_or_404(RouteStop.objects.select_related("route"), pk=stop_id)
+        if not stop.route.driver_id or stop.route.driver_id != driver.id:
+            return Response(
+                {"detail": "You do not have permission to modify this stop."},
+                status=status.HTTP_403_FORBIDDEN,
+            )
+
+        serializer = ProofUploadRequestSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        upload = create_proof_upload(
+            stop.id, serializer.validated_data["content_type"], request=request
         )
-        serializer = RouteStopSerializer(stops, many=True)
-        return Response(serializer.data)
+        return Response(upload, status=status.HTTP_201_CREATED)
+
+
+class DriverProofUploadView(APIView):
+    """
+    Upload target for proof photos when media is not on S3 (local development and tests).
+
+    Stands in for the presigned S3 POST: the signed token in the URL names the storage key.
+    """
+
+    permission_classes = [permissions.IsAuthenticated, IsDriver]
+    parser_classes = [FileUploadParser]
+
+    def get_parser_context(self, http_request):
+        context = super().get_parser_context(http_request)
+        context["kwargs"] = {**context["kwargs"], "filename": "proof"}
+        return context
+
+    def put(self, request, token, *args, **kwargs):
+        try:
+            _stop_id, key = read_proof_upload(token)
+        except ProofUploadError as exc:
+            return Response({"detail": str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+
+        upload = request.data.get("file")
+        if not upload:
+            return Response(
+                {"detail": "Photo file is required."},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        if upload.size > settings.DELIVERY_PROOF_UPLOAD_MAX_BYTES:
+            return Response(
+                {"detail": "Photo is too large."},
+                status=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            )
+        if default_storage.exists(key):
+            return Response(
+                {"detail": "A photo was already uploaded for this token."},
+                status=status.HTTP_409_CONFLICT,
+            )
+        default_storage.save(key, upload)
+        return Response(status=status.HTTP_204_NO_CONTENT)
 
 
 class MarkStopDeliveredView(APIView):
+    """
+    Mark a stop delivered with its proof photo.
+
+    The photo is either confirmed from a direct upload (`upload_token`, JSON) or, for older
+    app versions, sent as a multipart `photo`. Either way it is processed by Celery after
+    the response.
+    """
+
     permission_classes = [permissions.IsAuthenticated, IsDriver]
-    parser_classes = [MultiPartParser, FormParser]
+    parser_classes = [JSONParser, MultiPartParser, FormParser]
 
     def post(self, request, stop_id, *args, **kwargs):
-        driver = Driver.objects.filter(user=request.user).first()
+        driver = identity_for(request).driver
         if not driver:
             return Response(
                 {"detail": IsDriver.message},
@@ -197,33 +301,43 @@ class MarkStopDeliveredView(APIView):
                 status=status.HTTP_403_FORBIDDEN,
             )
 
-        uploaded_photo = request.FILES.get("photo")
-        if not uploaded_photo:
+        upload_token = request.data.get("upload_token")
+        if upload_token:
+            try:
+                photo = confirm_proof_upload(upload_token, stop.id)
+            except ProofUploadError as exc:
+                return Response({"detail": str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+        else:
+            photo = request.FILES.get("photo")
+        if not photo:
             return Response(
                 {"detail": "Photo file is required."},
                 status=status.HTTP_400_BAD_REQUEST,
             )
 
-        DeliveryProof.objects.update_or_create(
-            stop=stop,
-            defaults={"photo": uploaded_photo},
-        )
+        with transaction.atomic():
+            proof, _created = DeliveryProof.objects.update_or_create(
+                stop=stop,
+                defaults={"photo": photo, "photo_thumbnail": "", "processed_at": None},
+            )
+            transaction.on_commit(lambda: process_delivery_proof.delay(proof.id))
 
-        stop.status = RouteStop.Status.DELIVERED
-        stop.delivered_at = timezone.now()
-        stop.no_pickup_reason = ""
-        stop.save(update_fields=["status", "delivered_at", "no_pickup_reason"])
+            # Saving the stop moves the route counters (delivery.signals) in this transaction.
+            stop.status = RouteStop.Status.DELIVERED
+            stop.delivered_at = timezone.now()
+            stop.no_pickup_reason = ""
+            stop.save(update_fields=["status", "delivered_at", "no_pickup_reason"])
 
-        order = stop.order
-        order.status = Order.Status.COMPLETED
-        order.delivered_at = timezone.now()
+            order = stop.order
+            order.status = Order.Status.COMPLETED
+            order.delivered_at = timezone.now()
 
-        order_update_fields = ["status", "delivered_at"]
-        if hasattr(order, "updated_at"):
-            order_update_fields.append("updated_at")
-        order.save(update_fields=order_update_fields)
+            order_update_fields = ["status", "delivered_at"]
+            if hasattr(order, "updated_at"):
+                order_update_fields.append("updated_at")
+            order.save(update_fields=order_update_fields)
 
-        stop.route.refresh_completion_status(save=True)
+            stop.route.refresh_completion_status(save=True)
 
         try:
             send_order_delivered_email_once.delay(order.id)
@@ -242,7 +356,7 @@ class DriverRouteDetailView(APIView):
     permission_classes = [permissions.IsAuthenticated, IsDriver]
 
     def get(self, request, route_id, *args, **kwargs):
-        driver = Driver.objects.filter(user=request.user).first()
+        driver = identity_for(request).driver
         if not driver:
             return Response(
                 {"detail": IsDriver.message},
@@ -250,16 +364,7 @@ class DriverRouteDetailView(APIView):
             )
 
         route = get_object_or_404(
-            DeliveryRoute.objects.filter(merged_into__isnull=True)
-            .select_related("region", "driver", "driver__user", "driver__preferred_region")
-            .prefetch_related(
-                Prefetch(
-                    "stops",
-                    queryset=RouteStop.objects.select_related("order")
-                    .prefetch_related("order__items")
-                    .order_by("sequence", "id"),
-                )
-            ),
+            DeliveryRoute.objects.filter(merged_into__isnull=True).select_related("snapshot"),
             pk=route_id,
         )
 
@@ -269,15 +374,16 @@ class DriverRouteDetailView(APIView):
                 status=status.HTTP_403_FORBIDDEN,
             )
 
-        serializer = DriverRouteSerializer(route, context={"request": request})
-        return Response(serializer.data)
+        return snapshot_response(
+            request, current_snapshots([route]), "driver", many=False, absolute_urls=True
+        )
 
 
 class MarkStopNoPickupView(APIView):
     permission_classes = [permissions.IsAuthenticated, IsDriver]
 
     def post(self, request, stop_id, *args, **kwargs):
-        driver = Driver.objects.filter(user=request.user).first()
+        driver = identity_for(request).driver
         if not driver:
             return Response(
                 {"detail": IsDriver.message},
@@ -302,20 +408,98 @@ class MarkStopNoPickupView(APIView):
         if len(reason) > 255:
             reason = reason[:255]
 
-        stop.status = RouteStop.Status.NO_PICKUP
-        stop.delivered_at = timezone.now()
-        stop.no_pickup_reason = reason
-        stop.save(update_fields=["status", "delivered_at", "no_pickup_reason"])
+        with transaction.atomic():
+            stop.status = RouteStop.Status.NO_PICKUP
+            stop.delivered_at = timezone.now()
+            stop.no_pickup_reason = reason
+            stop.save(update_fields=["status", "delivered_at", "no_pickup_reason"])
 
-        order = stop.order
-        order.status = Order.Status.IN_PROGRESS
+            order = stop.order
+            order.status = Order.Status.IN_PROGRESS
 
-        order_update_fields = ["status"]
-        if hasattr(order, "updated_at"):
-            order_update_fields.append("updated_at")
-        order.save(update_fields=order_update_fields)
+            order_update_fields = ["status"]
+            if hasattr(order, "updated_at"):
+                order_update_fields.append("updated_at")
+            order.save(update_fields=order_update_fields)
 
-        stop.route.refresh_completion_status(save=True)
+            stop.route.refresh_completion_status(save=True)
 
         serializer = RouteStopSerializer(stop, context={"request": request})
         return Response(serializer.data, status=status.HTTP_200_OK)
+
+
+class DriverLocationView(APIView):
+    """
+    Accept a batch of GPS pings `{"pings": [...]}` from the driver app.
+
+    Pings are buffered and written in bulk later, so this stays cheap at high ping rates.
+    They are attributed to the driver's open route for today, if any.
+    """
+
+    permission_classes = [permissions.IsAuthenticated, IsDriver]
+
+    def post(self, request, *args, **kwargs):
+        driver = identity_for(request).driver
+        if not driver:
+            return Response(
+                {"detail": IsDriver.message},
+                status=status.HTTP_403_FORBIDDEN,
+            )
+
+        serializer = DriverLocationBatchSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        pings = serializer.validated_data["pings"]
+        record_pings(driver.id, active_route_id(driver.id), pings)
+        return Response({"accepted": len(pings)}, status=status.HTTP_202_ACCEPTED)
+
+
+class DriverStopSyncView(APIView):
+    """
+    Apply a batch of stop transitions recorded while the driver app was offline.
+
+    Accepts JSON `{"transitions": [...]}`, or multipart with `transitions` as a JSON string
+    and proof photos as `photo_<transition id>` files. A transition can instead carry the
+    `upload_token` of a photo uploaded directly to storage.
+    """
+
+    permission_classes = [permissions.IsAuthenticated, IsDriver]
+    parser_classes = [JSONParser, MultiPartParser, FormParser]
+
+    def post(self, request, *args, **kwargs):
+        driver = identity_for(request).driver
+        if not driver:
+            return Response(
+                {"detail": IsDriver.message},
+                status=status.HTTP_403_FORBIDDEN,
+            )
+
+        transitions = request.data.get("transitions")
+        if isinstance(transitions, str):
+            try:
+                transitions = json.loads(transitions)
+            except ValueError:
+                return Response(
+                    {"transitions": ["Must be a JSON list."]},
+                    status=status.HTTP_400_BAD_REQUEST,
+                )
+        serializer = StopSyncSerializer(data={"transitions": transitions})
+        serializer.is_valid(raise_exception=True)
+
+        photos = {
+            key[len("photo_"):]: upload
+            for key, upload in request.FILES.items()
+            if key.startswith("photo_")
+        }
+        for item in serializer.validated_data["transitions"]:
+            if item["upload_token"] and item["id"] not in photos:
+                try:
+                    photos[item["id"]] = confirm_proof_upload(
+                        item["upload_token"], item["stop_id"]
+                    )
+                except ProofUploadError:
+                    # Left without a photo, so a delivery is rejected as photo_required.
+                    pass
+        result = apply_stop_transitions(
+            driver, serializer.validated_data["transitions"], photos=photos
+        )
+        return Response(result, status=status.HTTP_200_OK)
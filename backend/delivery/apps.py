@@ -4,3 +4,7 @@ from django.apps import AppConfig
 class DeliveryConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "delivery"
+
+    def ready(self):
+        # Import signal handlers so they are registered when the app is loaded.
+        import delivery.signals  # noqa: F401
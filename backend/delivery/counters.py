@@ -0,0 +1,77 @@
+from collections import defaultdict
+from typing import DefaultDict, Dict, Iterable, Optional
+
+from django.db.models import Count, F, Q
+
+from .models import DeliveryRoute, RouteStop
+from .snapshots import mark_route_snapshots_stale
+
+COUNTER_FIELDS = {
+    RouteStop.Status.PENDING: "pending_count",
+    RouteStop.Status.DELIVERED: "delivered_count",
+    RouteStop.Status.NO_PICKUP: "no_pickup_count",
+}
+
+CounterDeltas = DefaultDict[int, DefaultDict[str, int]]
+
+
+def new_deltas() -> CounterDeltas:
+    return defaultdict(lambda: defaultdict(int))
+
+
+def count_stop(deltas: CounterDeltas, route_id: Optional[int], status: str, sign: int) -> None:
+    """Record that a stop with `status` joined (sign=1) or left (sign=-1) `route_id`."""
+    if not route_id:
+        return
+    deltas[route_id]["total_count"] += sign
+    field = COUNTER_FIELDS.get(status)
+    if field:
+        deltas[route_id][field] += sign
+
+
+def apply_deltas(deltas: CounterDeltas) -> None:
+    """
+    Apply counter changes with one F() UPDATE per route, in the caller's transaction.
+
+    Every route in `deltas` had stops change, so its snapshot is marked stale as well.
+    """
+    for route_id, delta in deltas.items():
+        changes = {field: F(field) + amount for field, amount in delta.items() if amount}
+        if changes:
+            DeliveryRoute.objects.filter(pk=route_id).update(**changes)
+    mark_route_snapshots_stale(deltas)
+
+
+def actual_counts(queryset=None):
+    """Routes annotated with counters computed from their stops."""
+    queryset = DeliveryRoute.objects.all() if queryset is None else queryset
+    return queryset.annotate(
+        actual_total_count=Count("stops"),
+        **{
+            f"actual_{field}": Count("stops", filter=Q(stops__status=status))
+            for status, field in COUNTER_FIELDS.items()
+        },
+    )
+
+
+def rebuild_route_counters(route_ids: Optional[Iterable[int]] = None, batch_size: int = 500) -> int:
+    """
+    Recount stops for every route (or just `route_ids`) and fix any drifted counters.
+
+    Returns the number of routes that were repaired.
+    """
+    queryset = DeliveryRoute.objects.all()
+    if route_ids is not None:
+        queryset = queryset.filter(pk__in=list(route_ids))
+
+    fields = ["total_count", *COUNTER_FIELDS.values()]
+    drifted = []
+    for route in actual_counts(queryset).order_by("pk").iterator(chunk_size=batch_size):
+        actual: Dict[str, int] = {field: getattr(route, f"actual_{field}") for field in fields}
+        if any(getattr(route, field) != value for field, value in actual.items()):
+            for field, value in actual.items():
+                setattr(route, field, value)
+            drifted.append(route)
+
+    DeliveryRoute.objects.bulk_update(drifted, fields, batch_size=batch_size)
+    return len(drifted)
@@ -0,0 +1,131 @@
+"""
+Travel-time model for delivery ETAs, and the planned delivery windows built on it.
+
+Without a road network we estimate legs from great-circle distance: stretched by a road
+factor and driven at an average speed. Stops without coordinates count as a default leg.
+"""
+import datetime
+import math
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+from django.conf import settings
+from django.utils import timezone
+
+from orders.models import Order
+from .models import RouteStop
+
+Point = Tuple[float, float]
+
+EARTH_RADIUS_KM = 6371.0
+# Customer-facing windows start on a quarter hour.
+WINDOW_GRANULARITY_MINUTES = 15
+
+
+def haversine_km(origin: Point, destination: Point) -> float:
+    lat1, lng1 = map(math.radians, origin)
+    lat2, lng2 = map(math.radians, destination)
+    a = (
+        math.sin((lat2 - lat1) / 2) ** 2
+        + math.cos(lat1) * math.cos(lat2) * math.sin((lng2 - lng1) / 2) ** 2
+    )
+    return 2 * EARTH_RADIUS_KM * math.asin(math.sqrt(a))
+
+
+def travel_seconds(origin: Optional[Point], destination: Optional[Point]) -> float:
+    if origin is None or destination is None:
+        return settings.DELIVERY_ETA_DEFAULT_LEG_SECONDS
+    road_km = haversine_km(origin, destination) * settings.DELIVERY_ETA_ROAD_FACTOR
+    return road_km / settings.DELIVERY_ETA_AVERAGE_SPEED_KMH * 3600
+
+
+def stop_arrivals(
+    start: Optional[Point],
+    start_time: datetime.datetime,
+    points: Sequence[Optional[Point]],
+) -> List[datetime.datetime]:
+    """
+    Arrival times at `points`, visited in order from `start`, with the service time spent
+    at every stop before driving on.
+    """
+    service = settings.DELIVERY_ETA_SERVICE_SECONDS
+    arrivals: List[datetime.datetime] = []
+    elapsed = 0.0
+    previous = start
+    for point in points:
+        elapsed += travel_seconds(previous, point)
+        arrivals.append(start_time + datetime.timedelta(seconds=round(elapsed)))
+        elapsed += service
+        if point is not None:
+            previous = point
+    return arrivals
+
+
+def order_point(order: Order) -> Optional[Point]:
+    if order.latitude is None or order.longitude is None:
+        return None
+    return order.latitude, order.longitude
+
+
+def depot_point() -> Optional[Point]:
+    # Straight from the environment, so strings (or unset).
+    if not settings.DELIVERY_DEPOT_LAT or not settings.DELIVERY_DEPOT_LNG:
+        return None
+    return float(settings.DELIVERY_DEPOT_LAT), float(settings.DELIVERY_DEPOT_LNG)
+
+
+def route_start(date: datetime.date) -> datetime.datetime:
+    start_time = datetime.time.fromisoformat(settings.DELIVERY_ROUTE_START_TIME)
+    return timezone.make_aware(datetime.datetime.combine(date, start_time))
+
+
+def delivery_window(
+    arrival: datetime.datetime, start: datetime.datetime
+) -> Tuple[datetime.datetime, datetime.datetime]:
+    """
+    A window of DELIVERY_WINDOW_MINUTES around `arrival`, starting on a quarter hour and
+    not before the route leaves the depot.
+    """
+    width = datetime.timedelta(minutes=settings.DELIVERY_WINDOW_MINUTES)
+    window_start = max(arrival - width / 2, start)
+    local = timezone.localtime(window_start)
+    window_start = local.replace(
+        minute=local.minute - local.minute % WINDOW_GRANULARITY_MINUTES, second=0, microsecond=0
+    )
+    return window_start, window_start + width
+
+
+def plan_route_etas(route_ids: Iterable[int]) -> int:
+    """
+    Plan ETAs and delivery windows for the pending stops of `route_ids` in their current
+    sequence, leaving the depot at DELIVERY_ROUTE_START_TIME on the route's date.
+
+    One query reads every stop and one bulk_update writes every order, so all future routes
+    can be replanned at once. Returns the number of orders planned.
+    """
+    stops = (
+        RouteStop.objects.filter(route_id__in=list(route_ids), status=RouteStop.Status.PENDING)
+        .select_related("route", "order")
+        .order_by("route_id", "sequence", "id")
+    )
+    orders_by_route: Dict[int, List[Order]] = {}
+    dates: Dict[int, datetime.date] = {}
+    for stop in stops:
+        orders_by_route.setdefault(stop.route_id, []).append(stop.order)
+        dates[stop.route_id] = stop.route.date
+
+    depot = depot_point()
+    planned: List[Order] = []
+    for route_id, orders in orders_by_route.items():
+        start = route_start(dates[route_id])
+        arrivals = stop_arrivals(depot, start, [order_point(order) for order in orders])
+        for order, arrival in zip(orders, arrivals):
+            order.estimated_delivery_at = arrival
+            order.delivery_window_start, order.delivery_window_end = delivery_window(arrival, start)
+            planned.append(order)
+
+    Order.objects.bulk_update(
+        planned,
+        ["estimated_delivery_at", "delivery_window_start", "delivery_window_end"],
+        batch_size=500,
+    )
+    return len(planned)
@@ -0,0 +1,108 @@
+import json
+import logging
+import time
+from typing import Any, Dict, Iterable, List
+
+import redis
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+
+from shop.redis import get_redis
+
+logger = logging.getLogger(__name__)
+
+ROUTE_CHANNEL = "delivery:routes:{route_id}"
+DATE_CHANNEL = "delivery:routes:date:{date}"
+# Route fields whose change is worth telling clients about besides the stops themselves.
+ROUTE_SUMMARY_FIELDS = (
+    "is_completed",
+    "driver_id",
+    "pending_count",
+    "delivered_count",
+    "no_pickup_count",
+)
+# After a failed publish, skip publishing for this long rather than stall every write.
+PUBLISH_BACKOFF_SECONDS = 30
+
+_publish_paused_until = 0.0
+
+
+def route_channel(route_id: int) -> str:
+    return ROUTE_CHANNEL.format(route_id=route_id)
+
+
+def date_channel(date: str) -> str:
+    return DATE_CHANNEL.format(date=date)
+
+
+def route_changes(old: Dict[str, Any], new: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """
+    Compact changes between two route snapshot payloads ("route" view, see delivery.snapshots).
+
+    Stops that appeared or changed status or sequence, stops that left, a merge, and the
+    route's completion, driver and counters. An empty `old` means the route is new.
+    """
+    old_route = old.get("route") or {}
+    new_route = new["route"]
+    if not old_route:
+        return [{"type": "created"}]
+
+    changes: List[Dict[str, Any]] = []
+    old_stops = {stop["id"]: stop for stop in old_route.get("stops", [])}
+    for stop in new_route["stops"]:
+        before = old_stops.pop(stop["id"], None)
+        if before is None or (before["status"], before["sequence"]) != (
+            stop["status"],
+            stop["sequence"],
+        ):
+            changes.append(
+                {
+                    "type": "stop",
+                    "stop_id": stop["id"],
+                    "status": stop["status"],
+                    "sequence": stop["sequence"],
+                }
+            )
+    changes.extend({"type": "stop_removed", "stop_id": stop_id} for stop_id in old_stops)
+
+    merged_into = new_route.get("merged_into_id")
+    if merged_into and merged_into != old_route.get("merged_into_id"):
+        changes.append({"type": "merged", "into": merged_into})
+
+    if any(old_route.get(field) != new_route.get(field) for field in ROUTE_SUMMARY_FIELDS):
+        summary = {field: new_route.get(field) for field in ROUTE_SUMMARY_FIELDS}
+        changes.append({"type": "route", **summary})
+    return changes
+
+
+def _redis() -> redis.Redis:
+    return get_redis(settings.ROUTE_EVENTS_REDIS_URL, socket_connect_timeout=1, socket_timeout=1)
+
+
+def publish_route_events(messages: Iterable[Dict[str, Any]]) -> int:
+    """
+    Publish route change messages to their route and date channels in one round trip.
+
+    Each message carries `route_id`, `date`, `version` and `changes`. Delivery is best
+    effort: the snapshot version is the source of truth and clients resync from it.
+    """
+    global _publish_paused_until
+    messages = list(messages)
+    if not messages or time.monotonic() < _publish_paused_until:
+        return 0
+    try:
+        pipeline = _redis().pipeline(transaction=False)
+        for message in messages:
+            payload = json.dumps(message, cls=DjangoJSONEncoder)
+            pipeline.publish(route_channel(message["route_id"]), payload)
+            pipeline.publish(date_channel(message["date"]), payload)
+        pipeline.execute()
+    except redis.RedisError:
+        _publish_paused_until = time.monotonic() + PUBLISH_BACKOFF_SECONDS
+        logger.warning(
+            "route_events_publish_failed",
+            extra={"messages": len(messages)},
+            exc_info=True,
+        )
+        return 0
+    return len(messages)
@@ -0,0 +1,78 @@
+import logging
+from typing import Iterable, List, Optional, Tuple
+
+import requests
+from django.conf import settings
+from orders.models import Order
+from shop.cache import app_cache
+
+logger = logging.getLogger(__name__)
+
+GEOCODE_URL = "https://maps.googleapis.com/maps/api/geocode/json"
+# Addresses Google could not resolve are not retried for this long.
+GEOCODE_FAILURE_CACHE_KEY = "geocode_failed:order:{order_id}"
+delivery_cache = app_cache("delivery")
+GEOCODE_FAILURE_TTL_SECONDS = 24 * 60 * 60
+
+
+def order_address(order: Order) -> str:
+    parts = [order.address_line1, order.address_line2, order.city, order.postal_code]
+    return ", ".join(part for part in parts if part)
+
+
+def geocode_address(address: str, api_key: str) -> Optional[Tuple[float, float]]:
+    try:
+        response = requests.get(
+            GEOCODE_URL, params={"address": address, "key": api_key}, timeout=10
+        )
+        response.raise_for_status()
+        data = response.json()
+    except Exception:
+        logger.exception("Google Geocoding API request failed for %r", address)
+        return None
+
+    if data.get("status") != "OK" or not data.get("results"):
+        logger.warning(
+            "Google Geocoding API returned status %s for %r", data.get("status"), address
+        )
+        return None
+    location = data["results"][0]["geometry"]["location"]
+    return location["lat"], location["lng"]
+
+
+def geocode_orders(orders: Iterable[Order]) -> int:
+    """
+    Fill in latitude/longitude of orders that have none, saving them in one bulk update.
+
+    Does nothing without GOOGLE_MAPS_API_KEY. Returns the number of orders geocoded.
+    """
+    api_key = getattr(settings, "GOOGLE_MAPS_API_KEY", "")
+    if not api_key:
+        return 0
+
+    missing = [
+        order
+        for order in orders
+        if (order.latitude is None or order.longitude is None) and order_address(order)
+    ]
+    if not missing:
+        return 0
+    failed = delivery_cache.get_many(
+        [GEOCODE_FAILURE_CACHE_KEY.format(order_id=order.id) for order in missing]
+    )
+
+    located: List[Order] = []
+    for order in missing:
+        failure_key = GEOCODE_FAILURE_CACHE_KEY.format(order_id=order.id)
+        if failure_key in failed:
+            continue
+        point = geocode_address(order_address(order), api_key)
+        if point is None:
+            delivery_cache.set(failure_key, 1, GEOCODE_FAILURE_TTL_SECONDS)
+            continue
+        order.latitude, order.longitude = point
+        located.append(order)
+
+    # No signals needed: coordinates are not part of the route snapshots.
+    Order.objects.bulk_update(located, ["latitude", "longitude"])
+    return len(located)
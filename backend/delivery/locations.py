@@ -0,0 +1,264 @@
+"""
+Driver GPS ping ingestion and live ETAs.
+
+The ping endpoint only appends to a Redis list; flush_location_buffer moves the list into
+DriverLocation with bulk inserts, so request latency doesn't depend on the table. When
+Redis is unavailable pings are inserted directly instead.
+"""
+import datetime
+import json
+import logging
+import time
+from typing import Any, Dict, List, Mapping, Optional, Sequence, Tuple
+
+import redis
+from django.conf import settings
+from django.db import DatabaseError, IntegrityError, transaction
+from django.db.models import OuterRef, Subquery
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from orders.models import Order
+from shop.redis import get_redis
+from .eta import order_point, stop_arrivals
+from .geocoding import geocode_orders
+from .models import DeliveryRoute, Driver, DriverLocation, RouteStop
+
+logger = logging.getLogger(__name__)
+
+LOCATION_BUFFER_KEY = "delivery:driver_locations"
+# Order of the values in a buffered ping (a JSON list, to keep the buffer small).
+BUFFER_FIELDS = (
+    "driver_id",
+    "route_id",
+    "latitude",
+    "longitude",
+    "accuracy_m",
+    "speed_mps",
+    "heading",
+    "recorded_at",
+    "received_at",
+)
+# Upper bound on batches moved per flush, so one run can't monopolise a worker.
+MAX_FLUSH_BATCHES = 20
+# After a failed push, write pings straight to the database for this long.
+BUFFER_BACKOFF_SECONDS = 30
+# Changes smaller than this are not written back to orders.
+ETA_MIN_CHANGE = datetime.timedelta(minutes=1)
+
+_buffer_paused_until = 0.0
+
+
+def _redis() -> redis.Redis:
+    return get_redis(settings.REDIS_URL, socket_connect_timeout=1, socket_timeout=2)
+
+
+def _location(row: Sequence[Any]) -> DriverLocation:
+    if len(row) != len(BUFFER_FIELDS):
+        raise ValueError(f"expected {len(BUFFER_FIELDS)} values, got {len(row)}")
+    values = dict(zip(BUFFER_FIELDS, row))
+    for field in ("recorded_at", "received_at"):
+        values[field] = parse_datetime(values[field])
+        if values[field] is None:
+            raise ValueError(f"invalid {field}")
+    return DriverLocation(**values)
+
+
+def _discard(item: Any, reason: str, **extra: Any) -> None:
+    logger.warning(
+        "driver_location_discarded",
+        extra={"reason": reason, "ping": str(item)[:200], **extra},
+        exc_info=reason == "insert_failed",
+    )
+
+
+def _storable(raw: Sequence[Any]) -> List[Tuple[Any, DriverLocation]]:
+    """
+    Parse buffered pings, discarding those that can never be stored: malformed ones and
+    those of deleted drivers. Pings of deleted routes are kept without their route.
+    """
+    parsed = []
+    for item in raw:
+        try:
+            parsed.append((item, _location(json.loads(item))))
+        except (TypeError, ValueError):
+            _discard(item, "unparseable")
+    driver_ids = set(
+        Driver.objects.filter(id__in={location.driver_id for _, location in parsed}).values_list(
+            "id", flat=True
+        )
+    )
+    route_ids = set(
+        DeliveryRoute.objects.filter(
+            id__in={location.route_id for _, location in parsed if location.route_id}
+        ).values_list("id", flat=True)
+    )
+    storable = []
+    for item, location in parsed:
+        if location.driver_id not in driver_ids:
+            _discard(item, "missing_driver", driver_id=location.driver_id)
+            continue
+        if location.route_id is not None and location.route_id not in route_ids:
+            location.route_id = None
+        storable.append((item, location))
+    return storable
+
+
+def _insert(storable: List[Tuple[Any, DriverLocation]]) -> int:
+    """
+    Bulk insert the pings of `_storable`. If that fails on their data (a driver deleted
+    since they were checked), insert them one at a time and discard those that still fail.
+    """
+    try:
+        with transaction.atomic():
+            DriverLocation.objects.bulk_create([location for _, location in storable])
+        return len(storable)
+    except IntegrityError:
+        pass
+    inserted = 0
+    for item, location in storable:
+        try:
+            with transaction.atomic():
+                DriverLocation.objects.bulk_create([location])
+            inserted += 1
+        except IntegrityError:
+            _discard(item, "insert_failed")
+    return inserted
+
+
+def record_pings(
+    driver_id: int, route_id: Optional[int], pings: List[Mapping[str, Any]]
+) -> str:
+    """
+    Buffer validated pings of one driver. Returns "buffered", or "stored" if Redis was
+    unavailable and they were inserted directly.
+    """
+    global _buffer_paused_until
+    received_at = timezone.now().isoformat()
+    rows = [
+        [
+            driver_id,
+            route_id,
+            ping["latitude"],
+            ping["longitude"],
+            ping.get("accuracy_m"),
+            ping.get("speed_mps"),
+            ping.get("heading"),
+            ping["recorded_at"].isoformat(),
+            received_at,
+        ]
+        for ping in pings
+    ]
+    if time.monotonic() >= _buffer_paused_until:
+        try:
+            _redis().rpush(LOCATION_BUFFER_KEY, *(json.dumps(row) for row in rows))
+            return "buffered"
+        except redis.RedisError:
+            _buffer_paused_until = time.monotonic() + BUFFER_BACKOFF_SECONDS
+            logger.warning(
+                "driver_location_buffer_failed",
+                extra={"driver_id": driver_id, "pings": len(rows)},
+                exc_info=True,
+            )
+    DriverLocation.objects.bulk_create([_location(row) for row in rows])
+    return "stored"
+
+
+def flush_location_buffer(batch_size: Optional[int] = None) -> int:
+    """
+    Move buffered pings into DriverLocation in bulk inserts. Returns the number inserted.
+
+    Pings that can never be stored are logged and dropped, so one bad ping can't block
+    the buffer. A batch that fails for another reason (the database is unavailable) is
+    pushed back to the head of the buffer and the error re-raised.
+    """
+    batch_size = batch_size or settings.DRIVER_LOCATION_FLUSH_BATCH_SIZE
+    flushed = 0
+    try:
+        client = _redis()
+        for _ in range(MAX_FLUSH_BATCHES):
+            raw = client.lpop(LOCATION_BUFFER_KEY, batch_size)
+            if not raw:
+                break
+            try:
+                storable = _storable(raw)
+                if storable:
+                    flushed += _insert(storable)
+            except DatabaseError:
+                client.lpush(LOCATION_BUFFER_KEY, *reversed(raw))
+                raise
+            if len(raw) < batch_size:
+                break
+    except redis.RedisError:
+        logger.warning("driver_location_flush_failed", extra={"flushed": flushed}, exc_info=True)
+    if flushed:
+        logger.info("driver_locations_flushed", extra={"flushed": flushed})
+    return flushed
+
+
+def active_route_id(driver_id: int) -> Optional[int]:
+    """The driver's open route for today, which new pings are attributed to."""
+    return (
+        DeliveryRoute.objects.filter(
+            driver_id=driver_id,
+            date=timezone.localdate(),
+            is_completed=False,
+            merged_into__isnull=True,
+        )
+        .order_by("id")
+        .values_list("id", flat=True)
+        .first()
+    )
+
+
+def recompute_live_etas(now: Optional[datetime.datetime] = None) -> Dict[str, Any]:
+    """
+    Re-estimate the pending stops of today's active routes from the driver's latest
+    position, following the remaining stop sequence.
+    """
+    now = now or timezone.now()
+    cutoff = now - datetime.timedelta(minutes=settings.DRIVER_LOCATION_MAX_AGE_MINUTES)
+    latest = DriverLocation.objects.filter(
+        route=OuterRef("pk"), recorded_at__gte=cutoff
+    ).order_by("-recorded_at")
+    location_ids = dict(
+        DeliveryRoute.objects.filter(
+            date=timezone.localdate(now), is_completed=False, merged_into__isnull=True
+        )
+        .annotate(location_id=Subquery(latest.values("pk")[:1]))
+        .filter(location_id__isnull=False)
+        .values_list("pk", "location_id")
+    )
+    if not location_ids:
+        return {"routes": 0, "updated_orders": 0}
+    locations = DriverLocation.objects.in_bulk(location_ids.values())
+
+    stops = list(
+        RouteStop.objects.filter(route_id__in=location_ids, status=RouteStop.Status.PENDING)
+        .select_related("order")
+        .order_by("route_id", "sequence", "id")
+    )
+    geocode_orders(stop.order for stop in stops)
+
+    stops_by_route: Dict[int, List[RouteStop]] = {}
+    for stop in stops:
+        stops_by_route.setdefault(stop.route_id, []).append(stop)
+
+    changed = []
+    for route_id, route_stops in stops_by_route.items():
+        location = locations[location_ids[route_id]]
+        orders = [stop.order for stop in route_stops]
+        arrivals = stop_arrivals(
+            (location.latitude, location.longitude),
+            now,
+            [order_point(order) for order in orders],
+        )
+        for order, arrival in zip(orders, arrivals):
+            previous = order.estimated_delivery_at
+            if previous is None or abs(arrival - previous) >= ETA_MIN_CHANGE:
+                order.estimated_delivery_at = arrival
+                changed.append(order)
+
+    # estimated_delivery_at is not part of the route snapshots, so no signals are needed.
+    Order.objects.bulk_update(changed, ["estimated_delivery_at"], batch_size=500)
+    return {"routes": len(stops_by_route), "updated_orders": len(changed)}
@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+
+from delivery.counters import rebuild_route_counters
+
+
+class Command(BaseCommand):
+    help = "Recount stops per delivery route and repair drifted counters."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "route_ids",
+            nargs="*",
+            type=int,
+            help="Only rebuild these routes (default: all routes).",
+        )
+
+    def handle(self, *args, **options):
+        route_ids = options["route_ids"] or None
+        repaired = rebuild_route_counters(route_ids)
+        self.stdout.write(self.style.SUCCESS(f"Repaired counters on {repaired} route(s)"))
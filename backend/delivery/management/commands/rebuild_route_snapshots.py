@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+
+from delivery.snapshots import rebuild_all_route_snapshots
+
+
+class Command(BaseCommand):
+    help = "Rebuild the pre-serialized route snapshots served to drivers."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "route_ids",
+            nargs="*",
+            type=int,
+            help="Only rebuild these routes (default: all routes).",
+        )
+
+    def handle(self, *args, **options):
+        route_ids = options["route_ids"] or None
+        rebuilt = rebuild_all_route_snapshots(route_ids)
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt snapshots for {rebuilt} route(s)"))
@@ -0,0 +1,26 @@
+# Generated by Django 5.2.18 on 2026-10-19 02:49
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('delivery', '0004_routestop_no_pickup_reason'),
+        ('orders', '0014_hot_query_indexes'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='deliveryroute',
+            index=models.Index(condition=models.Q(('merged_into__isnull', True)), fields=['driver', 'date'], name='route_driver_date_active_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='deliveryroute',
+            index=models.Index(condition=models.Q(('is_completed', False)), fields=['date'], name='route_open_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='routestop',
+            index=models.Index(fields=['route', 'status'], name='routestop_route_status_idx'),
+        ),
+    ]
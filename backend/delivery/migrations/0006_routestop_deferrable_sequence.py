@@ -0,0 +1,23 @@
+# Generated by Django 5.2.18 on 2026-10-19 02:53
+
+import django.db.models.constraints
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('delivery', '0005_hot_query_indexes'),
+        ('orders', '0014_hot_query_indexes'),
+    ]
+
+    operations = [
+        migrations.AlterUniqueTogether(
+            name='routestop',
+            unique_together=set(),
+        ),
+        migrations.AddConstraint(
+            model_name='routestop',
+            constraint=models.UniqueConstraint(deferrable=django.db.models.constraints.Deferrable['IMMEDIATE'], fields=('route', 'sequence'), name='routestop_route_sequence_uniq'),
+        ),
+    ]
@@ -0,0 +1,58 @@
+# Generated by Django 5.2.18 on 2026-10-19 02:59
+
+from django.db import migrations, models
+from django.db.models import Count, IntegerField, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+
+
+def backfill_counters(apps, schema_editor):
+    DeliveryRoute = apps.get_model("delivery", "DeliveryRoute")
+    RouteStop = apps.get_model("delivery", "RouteStop")
+
+    def stop_count(**filters):
+        counts = (
+            RouteStop.objects.filter(route=OuterRef("pk"), **filters)
+            .order_by()
+            .values("route")
+            .annotate(count=Count("pk"))
+            .values("count")
+        )
+        return Coalesce(Subquery(counts, output_field=IntegerField()), Value(0))
+
+    DeliveryRoute.objects.update(
+        pending_count=stop_count(status="pending"),
+        delivered_count=stop_count(status="delivered"),
+        no_pickup_count=stop_count(status="no_pickup"),
+        total_count=stop_count(),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('delivery', '0006_routestop_deferrable_sequence'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='deliveryroute',
+            name='delivered_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='deliveryroute',
+            name='no_pickup_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='deliveryroute',
+            name='pending_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='deliveryroute',
+            name='total_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.RunPython(backfill_counters, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 5.2.18 on 2026-10-19 03:09
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('delivery', '0007_deliveryroute_stop_counters'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StopTransition',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('client_id', models.CharField(max_length=64)),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('delivered', 'Delivered'), ('no_pickup', 'No Pickup')], max_length=20)),
+                ('occurred_at', models.DateTimeField()),
+                ('result', models.CharField(choices=[('applied', 'Applied'), ('stale', 'Stale'), ('rejected', 'Rejected')], max_length=20)),
+                ('detail', models.CharField(blank=True, max_length=255)),
+                ('received_at', models.DateTimeField(auto_now_add=True)),
+                ('driver', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='stop_transitions', to='delivery.driver')),
+                ('stop', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='transitions', to='delivery.routestop')),
+            ],
+            options={
+                'ordering': ['-received_at'],
+                'constraints': [models.UniqueConstraint(fields=('driver', 'client_id'), name='stoptransition_driver_client_uniq')],
+            },
+        ),
+    ]
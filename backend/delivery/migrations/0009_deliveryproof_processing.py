@@ -0,0 +1,23 @@
+# Generated by Django 5.2.18 on 2026-10-19 03:14
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('delivery', '0008_stoptransition'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='deliveryproof',
+            name='photo_thumbnail',
+            field=models.ImageField(blank=True, upload_to='delivery_proofs/thumbnails/'),
+        ),
+        migrations.AddField(
+            model_name='deliveryproof',
+            name='processed_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
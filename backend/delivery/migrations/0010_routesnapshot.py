@@ -0,0 +1,25 @@
+# Generated by Django 5.2.18 on 2026-10-19 03:23
+
+import django.core.serializers.json
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('delivery', '0009_deliveryproof_processing'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RouteSnapshot',
+            fields=[
+                ('route', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='snapshot', serialize=False, to='delivery.deliveryroute')),
+                ('version', models.PositiveIntegerField(default=1)),
+                ('payload', models.JSONField(default=dict, encoder=django.core.serializers.json.DjangoJSONEncoder)),
+                ('stale', models.BooleanField(default=False)),
+                ('built_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 5.2.18 on 2026-10-19 03:49
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('delivery', '0010_routesnapshot'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DriverLocation',
+            fields=[
+                ('id', models.BigAutoField(primary_key=True, serialize=False)),
+                ('latitude', models.FloatField()),
+                ('longitude', models.FloatField()),
+                ('accuracy_m', models.FloatField(blank=True, null=True)),
+                ('speed_mps', models.FloatField(blank=True, null=True)),
+                ('heading', models.FloatField(blank=True, null=True)),
+                ('recorded_at', models.DateTimeField()),
+                ('received_at', models.DateTimeField()),
+                ('driver', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='locations', to='delivery.driver')),
+                ('route', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='driver_locations', to='delivery.deliveryroute')),
+            ],
+            options={
+                'ordering': ['-recorded_at'],
+                'indexes': [models.Index(fields=['driver', '-recorded_at'], name='driverloc_driver_recorded_idx'), models.Index(fields=['route', '-recorded_at'], name='driverloc_route_recorded_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,14 @@
+from django.db import migrations
+
+from shop.admin_search import trigram_index_operation
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("delivery", "0011_driverlocation"),
+    ]
+
+    operations = [
+        trigram_index_operation("delivery_driver", ["phone"]),
+    ]
@@ -0,0 +1,63 @@
+from django.db import migrations, models
+
+
+TABLE = "delivery_routestop"
+CONSTRAINT = "routestop_route_sequence_uniq"
+
+
+def make_deferrable(apps, schema_editor):
+    """On PostgreSQL, check (route, sequence) per statement; see delivery.sequencing."""
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    schema_editor.execute(f"ALTER TABLE {TABLE} DROP CONSTRAINT {CONSTRAINT}")
+    schema_editor.execute(
+        f"ALTER TABLE {TABLE} ADD CONSTRAINT {CONSTRAINT} UNIQUE (route_id, sequence) "
+        "DEFERRABLE INITIALLY IMMEDIATE"
+    )
+
+
+def make_immediate(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    schema_editor.execute(f"ALTER TABLE {TABLE} DROP CONSTRAINT {CONSTRAINT}")
+    schema_editor.execute(
+        f"ALTER TABLE {TABLE} ADD CONSTRAINT {CONSTRAINT} UNIQUE (route_id, sequence)"
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('delivery', '0012_driver_trigram_search_indexes'),
+    ]
+
+    # The state (and so the model) declares the constraint plain, because SQLite skips
+    # deferrable unique constraints altogether. On PostgreSQL the database holds it
+    # DEFERRABLE INITIALLY IMMEDIATE instead, which the state can't express. Any later
+    # migration that removes, alters or recreates this constraint (a squash included)
+    # must run make_deferrable again on PostgreSQL, or permuting stops starts failing.
+    operations = [
+        migrations.SeparateDatabaseAndState(
+            state_operations=[
+                migrations.RemoveConstraint(
+                    model_name='routestop',
+                    name='routestop_route_sequence_uniq',
+                ),
+                migrations.AddConstraint(
+                    model_name='routestop',
+                    constraint=models.UniqueConstraint(fields=('route', 'sequence'), name='routestop_route_sequence_uniq'),
+                ),
+            ],
+            database_operations=[
+                migrations.RemoveConstraint(
+                    model_name='routestop',
+                    name='routestop_route_sequence_uniq',
+                ),
+                migrations.AddConstraint(
+                    model_name='routestop',
+                    constraint=models.UniqueConstraint(fields=('route', 'sequence'), name='routestop_route_sequence_uniq'),
+                ),
+                migrations.RunPython(make_deferrable, make_immediate),
+            ],
+        ),
+    ]
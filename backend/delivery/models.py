@@ -1,4 +1,5 @@
 from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
 from django.db import models
 
 from orders.models import Order, Region
@@ -80,11 +81,30 @@ class DeliveryRoute(models.Model):
     is_completed = models.BooleanField(default=False)
     created_at = models.DateTimeField(auto_now_add=True)
 
+    # Denormalized stop counters, kept in step by delivery.counters.
+    pending_count = models.PositiveIntegerField(default=0)
+    delivered_count = models.PositiveIntegerField(default=0)
+    no_pickup_count = models.PositiveIntegerField(default=0)
+    total_count = models.PositiveIntegerField(default=0)
+
     class Meta:
         ordering = ["-date", "region__code", "id"]
         verbose_name = "Delivery Route"
         verbose_name_plural = "Delivery Routes"
         unique_together = ("region", "date", "driver")
+        indexes = [
+            # Driver route lists only ever show routes that were not merged away.
+            models.Index(
+                fields=["driver", "date"],
+                condition=models.Q(merged_into__isnull=True),
+                name="route_driver_date_active_idx",
+            ),
+            models.Index(
+                fields=["date"],
+                condition=models.Q(is_completed=False),
+                name="route_open_date_idx",
+            ),
+        ]
 
     def __str__(self):
         driver_display = "Unassigned"
@@ -108,9 +128,8 @@ class DeliveryRoute(models.Model):
         """
         Mark route as completed if all stops are either delivered or no_pickup.
         """
-        completed = not self.stops.exclude(
-            status__in=[RouteStop.Status.DELIVERED, RouteStop.Status.NO_PICKUP]
-        ).exists()
+        self.refresh_from_db(fields=["pending_count"])
+        completed = self.pending_count == 0
 
         if self.is_completed != completed:
             self.is_completed = completed
@@ -122,7 +141,7 @@ class DeliveryRoute(models.Model):
         annotated_value = getattr(self, "_stops_count", None)
         if annotated_value is not None:
             return annotated_value
-        return self.stops.count()
+        return self.total_count
 
     @stops_count.setter
     def stops_count(self, value):
@@ -156,17 +175,77 @@ class RouteStop(models.Model):
 
     class Meta:
         ordering = ["sequence"]
-        unique_together = ("route", "sequence")
+        constraints = [
+            # Made DEFERRABLE INITIALLY IMMEDIATE on PostgreSQL by migration 0013, so stops
+            # can be permuted in one UPDATE there (see delivery.sequencing). Declared plain
+            # here so backends without deferrable constraints (SQLite) still enforce it;
+            # migrations changing it must restore the deferrability (see 0013).
+            models.UniqueConstraint(
+                fields=["route", "sequence"], name="routestop_route_sequence_uniq"
+            ),
+        ]
+        indexes = [
+            models.Index(fields=["route", "status"], name="routestop_route_status_idx"),
+        ]
 
     def __str__(self):
         return f"Stop #{self.sequence} for order #{self.order_id} on route {self.route_id}"
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # What the route counters currently include this stop as; see delivery.signals.
+        instance._counted_as = (instance.__dict__.get("route_id"), instance.__dict__.get("status"))
+        return instance
+
+
+class StopTransition(models.Model):
+    """
+    A stop status change a driver app synced in bulk, keyed by the client's idempotency id.
+    """
+
+    class Result(models.TextChoices):
+        APPLIED = "applied", "Applied"
+        STALE = "stale", "Stale"
+        REJECTED = "rejected", "Rejected"
+
+    driver = models.ForeignKey(
+        Driver, related_name="stop_transitions", on_delete=models.CASCADE
+    )
+    client_id = models.CharField(max_length=64)
+    stop = models.ForeignKey(
+        RouteStop,
+        null=True,
+        blank=True,
+        related_name="transitions",
+        on_delete=models.SET_NULL,
+    )
+    status = models.CharField(max_length=20, choices=RouteStop.Status.choices)
+    occurred_at = models.DateTimeField()
+    result = models.CharField(max_length=20, choices=Result.choices)
+    detail = models.CharField(max_length=255, blank=True)
+    received_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ["-received_at"]
+        constraints = [
+            models.UniqueConstraint(
+                fields=["driver", "client_id"], name="stoptransition_driver_client_uniq"
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.client_id}: stop {self.stop_id} -> {self.status} ({self.result})"
+
 
 class DeliveryProof(models.Model):
     stop = models.OneToOneField(
         RouteStop, related_name="delivery_proof", on_delete=models.CASCADE
     )
     photo = models.ImageField(upload_to="delivery_proofs/")
+    photo_thumbnail = models.ImageField(upload_to="delivery_proofs/thumbnails/", blank=True)
+    # Set once the photo has been stripped of EXIF, resized and re-encoded (delivery.proofs).
+    processed_at = models.DateTimeField(null=True, blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
 
     class Meta:
@@ -174,3 +253,63 @@ class DeliveryProof(models.Model):
 
     def __str__(self):
         return f"DeliveryProof for stop {self.stop_id}"
+
+
+class RouteSnapshot(models.Model):
+    """
+    Pre-serialized read model of a route with its stops, served by the driver endpoints.
+
+    `version` goes up whenever the payload changes and is the basis of the ETag. Writes
+    mark the snapshot `stale` in their own transaction; it is rebuilt after commit, or on
+    the next read if that has not happened yet (see delivery.snapshots). Changes to the
+    rows a payload renders besides the route's own (orders and their items, proofs, the
+    driver and their user, regions) mark it stale too (delivery.signals).
+    """
+
+    route = models.OneToOneField(
+        DeliveryRoute,
+        primary_key=True,
+        related_name="snapshot",
+        on_delete=models.CASCADE,
+    )
+    version = models.PositiveIntegerField(default=1)
+    payload = models.JSONField(default=dict, encoder=DjangoJSONEncoder)
+    stale = models.BooleanField(default=False)
+    built_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"Snapshot v{self.version} of route {self.route_id}"
+
+
+class DriverLocation(models.Model):
+    """
+    A GPS ping from the driver app. Append-only: pings are buffered in Redis and
+    bulk-inserted by delivery.locations.flush_location_buffer.
+    """
+
+    id = models.BigAutoField(primary_key=True)
+    driver = models.ForeignKey(Driver, related_name="locations", on_delete=models.CASCADE)
+    route = models.ForeignKey(
+        DeliveryRoute,
+        null=True,
+        blank=True,
+        related_name="driver_locations",
+        on_delete=models.SET_NULL,
+    )
+    latitude = models.FloatField()
+    longitude = models.FloatField()
+    accuracy_m = models.FloatField(null=True, blank=True)
+    speed_mps = models.FloatField(null=True, blank=True)
+    heading = models.FloatField(null=True, blank=True)
+    recorded_at = models.DateTimeField()
+    received_at = models.DateTimeField()
+
+    class Meta:
+        ordering = ["-recorded_at"]
+        indexes = [
+            models.Index(fields=["driver", "-recorded_at"], name="driverloc_driver_recorded_idx"),
+            models.Index(fields=["route", "-recorded_at"], name="driverloc_route_recorded_idx"),
+        ]
+
+    def __str__(self):
+        return f"Driver {self.driver_id} at ({self.latitude}, {self.longitude})"
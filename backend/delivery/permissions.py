@@ -1,7 +1,7 @@
 from rest_framework.permissions import BasePermission
 from rest_framework.exceptions import NotAuthenticated
 
-from delivery.models import Driver
+from shop.identity import identity_for
 
 
 class IsDriver(BasePermission):
@@ -12,4 +12,4 @@ class IsDriver(BasePermission):
         if not user or not user.is_authenticated:
             raise NotAuthenticated()
 
-        return Driver.objects.filter(user=user).exists()
+        return identity_for(request).driver is not None
@@ -0,0 +1,160 @@
+import io
+import logging
+import uuid
+from typing import Any, Dict, Optional, Tuple
+
+from django.conf import settings
+from django.core import signing
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.urls import reverse
+from django.utils import timezone
+from PIL import Image, ImageOps, features
+
+from .models import DeliveryProof
+
+logger = logging.getLogger(__name__)
+
+PROOF_UPLOAD_SALT = "delivery.proof-upload"
+PROOF_UPLOAD_PREFIX = "delivery_proofs/uploads"
+# Formats process_delivery_proof can decode to strip metadata and build a thumbnail.
+# (Pillow can't read HEIC; iOS browsers convert camera captures to JPEG for uploads.)
+PROOF_CONTENT_TYPES = {
+    "image/jpeg": "jpg",
+    "image/png": "png",
+    "image/webp": "webp",
+}
+
+
+class ProofUploadError(Exception):
+    """The upload token is invalid, expired, for another stop, or nothing was uploaded."""
+
+
+def _is_s3(storage) -> bool:
+    return getattr(storage, "bucket_name", None) is not None
+
+
+def _presigned_post(storage, key: str, content_type: str) -> Dict[str, Any]:
+    client = storage.bucket.meta.client
+    post = client.generate_presigned_post(
+        Bucket=storage.bucket_name,
+        Key=storage._normalize_name(key),
+        Fields={"Content-Type": content_type},
+        Conditions=[
+            {"Content-Type": content_type},
+            ["content-length-range", 1, settings.DELIVERY_PROOF_UPLOAD_MAX_BYTES],
+        ],
+        ExpiresIn=settings.DELIVERY_PROOF_UPLOAD_TTL_SECONDS,
+    )
+    return {"method": "POST", "url": post["url"], "fields": post["fields"], "file_field": "file"}
+
+
+def create_proof_upload(stop_id: int, content_type: str, request=None) -> Dict[str, Any]:
+    """
+    Reserve a storage key for a stop's proof photo and describe how to upload it.
+
+    With S3 the client gets a presigned POST and sends the photo straight to the bucket;
+    otherwise (local development, tests) it PUTs the raw bytes to `driver-proof-upload`.
+    The returned `upload_token` is what the confirm call sends back.
+    """
+    key = f"{PROOF_UPLOAD_PREFIX}/{stop_id}/{uuid.uuid4().hex}.{PROOF_CONTENT_TYPES[content_type]}"
+    token = signing.dumps({"stop": stop_id, "key": key}, salt=PROOF_UPLOAD_SALT)
+
+    if _is_s3(default_storage):
+        upload = _presigned_post(default_storage, key, content_type)
+    else:
+        url = reverse("delivery:driver-proof-upload", args=[token])
+        upload = {
+            "method": "PUT",
+            "url": request.build_absolute_uri(url) if request else url,
+            "headers": {"Content-Type": content_type},
+        }
+
+    return {
+        "upload_token": token,
+        "key": key,
+        "expires_in": settings.DELIVERY_PROOF_UPLOAD_TTL_SECONDS,
+        "max_bytes": settings.DELIVERY_PROOF_UPLOAD_MAX_BYTES,
+        "upload": upload,
+    }
+
+
+def read_proof_upload(token: str, stop_id: Optional[int] = None) -> Tuple[int, str]:
+    """Return (stop_id, key) for a valid upload token, optionally checking the stop."""
+    try:
+        payload = signing.loads(
+            token, salt=PROOF_UPLOAD_SALT, max_age=settings.DELIVERY_PROOF_UPLOAD_TTL_SECONDS
+        )
+    except signing.BadSignature:
+        raise ProofUploadError("Upload token is invalid or has expired.")
+    if stop_id is not None and payload["stop"] != stop_id:
+        raise ProofUploadError("Upload token belongs to another stop.")
+    return payload["stop"], payload["key"]
+
+
+def confirm_proof_upload(token: str, stop_id: int) -> str:
+    """
+    Return the storage key behind `token` once the photo is actually in storage.
+
+    This is a single existence check (a HEAD request on S3); the photo itself is never
+    read by the web process.
+    """
+    _stop_id, key = read_proof_upload(token, stop_id)
+    if not default_storage.exists(key):
+        raise ProofUploadError("No photo has been uploaded for this token.")
+    return key
+
+
+def _encode(image: Image.Image, max_size: int) -> Tuple[bytes, str]:
+    """Shrink `image` to fit `max_size` and encode it as WebP (JPEG without WebP support)."""
+    image = image.copy()
+    image.thumbnail((max_size, max_size), Image.Resampling.LANCZOS)
+    buffer = io.BytesIO()
+    # No `exif=` argument is passed, so the encoded file carries no EXIF (GPS, device, ...).
+    if features.check("webp"):
+        image.save(buffer, format="WEBP", quality=80, method=4)
+        return buffer.getvalue(), "webp"
+    image.convert("RGB").save(buffer, format="JPEG", quality=82, optimize=True, progressive=True)
+    return buffer.getvalue(), "jpg"
+
+
+def process_proof_photo(proof: DeliveryProof) -> DeliveryProof:
+    """
+    Replace a proof's original upload with a resized, EXIF-free copy plus a thumbnail.
+
+    The photo is rotated upright from its EXIF orientation first. The original file is
+    deleted once the new ones are saved. Raises PIL.UnidentifiedImageError (an OSError)
+    when the upload is not an image.
+    """
+    original_name = proof.photo.name
+    with proof.photo.open("rb") as handle:
+        image = Image.open(handle)
+        image.load()
+    image = ImageOps.exif_transpose(image)
+    if image.mode not in ("RGB", "RGBA"):
+        image = image.convert("RGBA" if "A" in image.getbands() else "RGB")
+
+    stem = f"{proof.stop_id}/{uuid.uuid4().hex}"
+    photo_bytes, extension = _encode(image, settings.DELIVERY_PROOF_MAX_DIMENSION)
+    thumbnail_bytes, _ = _encode(image, settings.DELIVERY_PROOF_THUMBNAIL_SIZE)
+
+    old_thumbnail = proof.photo_thumbnail.name if proof.photo_thumbnail else ""
+    proof.photo.save(f"{stem}.{extension}", ContentFile(photo_bytes), save=False)
+    proof.photo_thumbnail.save(f"{stem}.{extension}", ContentFile(thumbnail_bytes), save=False)
+    proof.processed_at = timezone.now()
+    proof.save(update_fields=["photo", "photo_thumbnail", "processed_at"])
+
+    for name in (original_name, old_thumbnail):
+        if name and name not in (proof.photo.name, proof.photo_thumbnail.name):
+            default_storage.delete(name)
+
+    logger.info(
+        "delivery_proof_processed",
+        extra={
+            "proof_id": proof.id,
+            "stop_id": proof.stop_id,
+            "photo_bytes": len(photo_bytes),
+            "thumbnail_bytes": len(thumbnail_bytes),
+        },
+    )
+    return proof
@@ -0,0 +1,77 @@
+from typing import Iterable, List, Sequence, Tuple
+
+from django.db import connection
+
+from .models import RouteStop
+
+# (stop_id, route_id, sequence)
+Placement = Tuple[int, int, int]
+
+
+def _values_update_sql(table: str, placements: Sequence[Placement]) -> Tuple[str, List[int]]:
+    rows = ", ".join(["(%s, %s, %s)"] * len(placements))
+    sql = (
+        f"UPDATE {table} AS stop SET route_id = placed.route_id, sequence = placed.sequence "
+        f"FROM (VALUES {rows}) AS placed (id, route_id, sequence) "
+        "WHERE stop.id = placed.id"
+    )
+    return sql, [value for placement in placements for value in placement]
+
+
+def _case_update_sql(table: str, placements: Sequence[Placement]) -> Tuple[str, List[int]]:
+    whens = " ".join(["WHEN %s THEN %s"] * len(placements))
+    ids = ", ".join(["%s"] * len(placements))
+    sql = (
+        f"UPDATE {table} SET route_id = CASE id {whens} END, "
+        f"sequence = CASE id {whens} END WHERE id IN ({ids})"
+    )
+    params: List[int] = []
+    for stop_id, route_id, _sequence in placements:
+        params += [stop_id, route_id]
+    for stop_id, _route_id, sequence in placements:
+        params += [stop_id, sequence]
+    params += [stop_id for stop_id, _route_id, _sequence in placements]
+    return sql, params
+
+
+def resequence_stops(placements: Iterable[Placement]) -> int:
+    """
+    Move stops to new (route, sequence) positions with a single UPDATE statement.
+
+    The (route, sequence) constraint is DEFERRABLE INITIALLY IMMEDIATE on PostgreSQL, so it
+    is checked at the end of the statement and any permutation applies without parking stops
+    at temporary sequences first. Other backends check it row by row: there an equivalent
+    CASE-based UPDATE first parks the stops above every sequence in use or targeted, then
+    places them.
+
+    All placements go into one statement (two elsewhere), which is fine for route-sized inputs.
+    """
+    placements = list(placements)
+    if not placements:
+        return 0
+    table = connection.ops.quote_name(RouteStop._meta.db_table)
+    with connection.cursor() as cursor:
+        if connection.vendor == "postgresql":
+            cursor.execute(*_values_update_sql(table, placements))
+            return cursor.rowcount
+        cursor.execute(f"SELECT COALESCE(MAX(sequence), 0) FROM {table}")
+        # Above every sequence in use and every target, so neither pass can collide.
+        parked = max(cursor.fetchone()[0], *(sequence for _, _, sequence in placements)) + 1
+        cursor.execute(
+            *_case_update_sql(
+                table,
+                [
+                    (stop_id, route_id, parked + index)
+                    for index, (stop_id, route_id, _sequence) in enumerate(placements)
+                ],
+            )
+        )
+        cursor.execute(*_case_update_sql(table, placements))
+        return cursor.rowcount
+
+
+def apply_stop_order(route_id: int, stop_ids: Sequence[int], start: int = 1) -> int:
+    """Give `stop_ids` consecutive sequences on `route_id`, starting at `start`."""
+    return resequence_stops(
+        (stop_id, route_id, sequence) for sequence, stop_id in enumerate(stop_ids, start=start)
+    )
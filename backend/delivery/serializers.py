@@ -1,7 +1,11 @@
+from django.conf import settings
 from rest_framework import serializers
 
 from delivery.models import DeliveryRoute, RouteStop
+from delivery.proofs import PROOF_CONTENT_TYPES
 from orders.models import Order, OrderItem
+from shop.fields import SparseFieldsMixin
+from shop.media import MediaUrlListSerializer, media_resolver
 
 
 class RouteStopOrderItemSerializer(serializers.ModelSerializer):
@@ -15,7 +19,7 @@ class RouteStopOrderItemSerializer(serializers.ModelSerializer):
         read_only_fields = fields
 
 
-class RouteStopOrderSerializer(serializers.ModelSerializer):
+class RouteStopOrderSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     items = RouteStopOrderItemSerializer(many=True, read_only=True)
 
     class Meta:
@@ -32,9 +36,10 @@ class RouteStopOrderSerializer(serializers.ModelSerializer):
             "items",
         ]
         read_only_fields = fields
+        expandable_fields = ["items"]
 
 
-class RouteStopSerializer(serializers.ModelSerializer):
+class RouteStopSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     order = RouteStopOrderSerializer(read_only=True)
     has_proof = serializers.SerializerMethodField()
     proof_photo_url = serializers.SerializerMethodField()
@@ -52,6 +57,10 @@ class RouteStopSerializer(serializers.ModelSerializer):
             "order",
         ]
         read_only_fields = fields
+        list_serializer_class = MediaUrlListSerializer
+        expandable_fields = ["order"]
+        # The reverse one-to-one select_related by the views must not be deferred.
+        field_sources = {"has_proof": ["delivery_proof"], "proof_photo_url": ["delivery_proof"]}
 
     def get_has_proof(self, obj):
         return hasattr(obj, "delivery_proof")
@@ -60,12 +69,16 @@ class RouteStopSerializer(serializers.ModelSerializer):
         proof = getattr(obj, "delivery_proof", None)
         if not proof or not proof.photo:
             return ""
-        request = self.context.get("request")
-        url = proof.photo.url
-        return request.build_absolute_uri(url) if request else url
+        return media_resolver(self.context).url(proof.photo.name)
+
+    def media_names(self, obj):
+        if "proof_photo_url" not in self.fields:
+            return []
+        proof = getattr(obj, "delivery_proof", None)
+        return [proof.photo.name] if proof and proof.photo else []
 
 
-class DeliveryRouteSerializer(serializers.ModelSerializer):
+class DeliveryRouteSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     region_code = serializers.CharField(source="region.code", read_only=True)
     region_name = serializers.CharField(source="region.name", read_only=True)
     driver_id = serializers.IntegerField(
@@ -94,8 +107,17 @@ class DeliveryRouteSerializer(serializers.ModelSerializer):
             "driver_preferences",
             "stops",
             "stops_count",
+            "pending_count",
+            "delivered_count",
+            "no_pickup_count",
         ]
         read_only_fields = fields
+        expandable_fields = ["driver_preferences", "stops"]
+        field_sources = {
+            "driver_name": ["driver"],
+            "driver_preferences": ["driver"],
+            "stops_count": ["total_count"],
+        }
 
     def get_driver_name(self, obj):
         if not obj.driver:
@@ -179,9 +201,11 @@ class DriverRouteStopSerializer(serializers.ModelSerializer):
         proof = getattr(obj, "delivery_proof", None)
         if not proof or not proof.photo:
             return ""
-        request = self.context.get("request")
-        url = proof.photo.url
-        return request.build_absolute_uri(url) if request else url
+        return media_resolver(self.context).url(proof.photo.name)
+
+    def media_names(self, obj):
+        proof = getattr(obj, "delivery_proof", None)
+        return [proof.photo.name] if proof and proof.photo else []
 
 
 class DriverRouteSerializer(serializers.ModelSerializer):
@@ -205,6 +229,7 @@ class DriverRouteSerializer(serializers.ModelSerializer):
             "stops",
         ]
         read_only_fields = fields
+        list_serializer_class = MediaUrlListSerializer
 
     def get_driver_name(self, obj):
         if not obj.driver:
@@ -233,5 +258,58 @@ class DriverUpcomingRouteSerializer(serializers.ModelSerializer):
             "region_code",
             "region_name",
             "stops_count",
+            "pending_count",
         ]
         read_only_fields = fields
+
+
+class ProofUploadRequestSerializer(serializers.Serializer):
+    content_type = serializers.ChoiceField(choices=sorted(PROOF_CONTENT_TYPES), default="image/jpeg")
+
+
+class StopTransitionInputSerializer(serializers.Serializer):
+    id = serializers.CharField(max_length=64)
+    stop_id = serializers.IntegerField(min_value=1)
+    status = serializers.ChoiceField(
+        choices=[RouteStop.Status.DELIVERED, RouteStop.Status.NO_PICKUP]
+    )
+    occurred_at = serializers.DateTimeField()
+    reason = serializers.CharField(required=False, allow_blank=True, default="")
+    upload_token = serializers.CharField(required=False, allow_blank=True, default="")
+
+
+class StopSyncSerializer(serializers.Serializer):
+    MAX_TRANSITIONS = 200
+
+    transitions = StopTransitionInputSerializer(many=True, allow_empty=False)
+
+    def validate_transitions(self, transitions):
+        if len(transitions) > self.MAX_TRANSITIONS:
+            raise serializers.ValidationError(
+                f"Send at most {self.MAX_TRANSITIONS} transitions per request."
+            )
+        ids = [item["id"] for item in transitions]
+        if len(ids) != len(set(ids)):
+            raise serializers.ValidationError("Transition ids must be unique.")
+        return transitions
+
+
+class DriverLocationPingSerializer(serializers.Serializer):
+    latitude = serializers.FloatField(min_value=-90, max_value=90)
+    longitude = serializers.FloatField(min_value=-180, max_value=180)
+    accuracy_m = serializers.FloatField(min_value=0, required=False, allow_null=True, default=None)
+    speed_mps = serializers.FloatField(min_value=0, required=False, allow_null=True, default=None)
+    heading = serializers.FloatField(
+        min_value=0, max_value=360, required=False, allow_null=True, default=None
+    )
+    recorded_at = serializers.DateTimeField()
+
+
+class DriverLocationBatchSerializer(serializers.Serializer):
+    pings = DriverLocationPingSerializer(many=True, allow_empty=False)
+
+    def validate_pings(self, pings):
+        limit = settings.DRIVER_LOCATION_MAX_PINGS_PER_REQUEST
+        if len(pings) > limit:
+            raise serializers.ValidationError(f"Send at most {limit} pings per request.")
+        return pings
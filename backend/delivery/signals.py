@@ -0,0 +1,116 @@
+from django.conf import settings
+from django.db.models import Q
+from django.db.models.signals import post_delete, post_save, pre_delete
+from django.dispatch import receiver
+
+from delivery.counters import apply_deltas, count_stop, new_deltas
+from delivery.models import DeliveryProof, DeliveryRoute, Driver, RouteSnapshot, RouteStop
+from delivery.snapshots import mark_route_snapshots_stale
+from orders.models import Order, OrderItem, Region
+
+# The user fields the route serializers render as `driver_name`.
+DRIVER_NAME_FIELDS = {"first_name", "last_name", "email", "username"}
+
+
+def _apply(instance, deltas):
+    apply_deltas(deltas)
+    # Keep an already-loaded route object in step with the row we just updated.
+    if RouteStop.route.is_cached(instance):
+        route = instance.route
+        for field, amount in deltas.get(route.pk, {}).items():
+            setattr(route, field, getattr(route, field) + amount)
+
+
+@receiver(post_save, sender=RouteStop)
+def count_saved_stop(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    previous = None if created else getattr(instance, "_counted_as", None)
+    current = (instance.route_id, instance.status)
+    if previous == current:
+        mark_route_snapshots_stale([instance.route_id])
+        return
+
+    deltas = new_deltas()
+    if previous:
+        count_stop(deltas, previous[0], previous[1], -1)
+    count_stop(deltas, current[0], current[1], 1)
+    _apply(instance, deltas)
+    instance._counted_as = current
+
+
+@receiver(post_delete, sender=RouteStop)
+def uncount_deleted_stop(sender, instance, **kwargs):
+    route_id, status = getattr(instance, "_counted_as", None) or (instance.route_id, instance.status)
+    deltas = new_deltas()
+    count_stop(deltas, route_id, status, -1)
+    _apply(instance, deltas)
+
+
+@receiver(post_save, sender=DeliveryRoute)
+def route_saved(sender, instance, raw=False, **kwargs):
+    if not raw:
+        mark_route_snapshots_stale([instance.pk])
+
+
+@receiver(post_save, sender=DeliveryProof)
+@receiver(post_delete, sender=DeliveryProof)
+def proof_changed(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    route_id = RouteStop.objects.filter(pk=instance.stop_id).values_list("route_id", flat=True)
+    mark_route_snapshots_stale(route_id)
+
+
+@receiver(post_save, sender=Order)
+def order_saved(sender, instance, created, raw=False, **kwargs):
+    # Orders are saved far more often than they are on a route; rebuilt on the next read.
+    if not (raw or created):
+        RouteSnapshot.objects.filter(route__stops__order=instance, stale=False).update(stale=True)
+
+
+@receiver(post_save, sender=Driver)
+def driver_saved(sender, instance, created, raw=False, **kwargs):
+    if not (raw or created):
+        RouteSnapshot.objects.filter(route__driver=instance, stale=False).update(stale=True)
+
+
+@receiver(pre_delete, sender=Driver)
+def driver_deleted(sender, instance, **kwargs):
+    # Before the delete: it sets the routes' driver to NULL without signals.
+    RouteSnapshot.objects.filter(route__driver=instance, stale=False).update(stale=True)
+
+
+@receiver(post_save, sender=settings.AUTH_USER_MODEL)
+def user_saved(sender, instance, created, raw=False, update_fields=None, **kwargs):
+    # Logins save last_login alone; only a change to the driver's name shows in routes.
+    if raw or created or (update_fields is not None and not DRIVER_NAME_FIELDS & set(update_fields)):
+        return
+    RouteSnapshot.objects.filter(route__driver__user=instance, stale=False).update(stale=True)
+
+
+def _region_routes(region):
+    return Q(route__region=region) | Q(route__driver__preferred_region=region)
+
+
+@receiver(post_save, sender=Region)
+def region_saved(sender, instance, created, raw=False, **kwargs):
+    if not (raw or created):
+        RouteSnapshot.objects.filter(_region_routes(instance), stale=False).update(stale=True)
+
+
+@receiver(pre_delete, sender=Region)
+def region_deleted(sender, instance, **kwargs):
+    # The region's own routes go with it; drivers preferring it lose the preference.
+    RouteSnapshot.objects.filter(
+        route__driver__preferred_region=instance, stale=False
+    ).update(stale=True)
+
+
+@receiver(post_save, sender=OrderItem)
+@receiver(post_delete, sender=OrderItem)
+def order_item_changed(sender, instance, raw=False, **kwargs):
+    if not raw:
+        RouteSnapshot.objects.filter(
+            route__stops__order_id=instance.order_id, stale=False
+        ).update(stale=True)
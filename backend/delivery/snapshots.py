@@ -0,0 +1,211 @@
+import hashlib
+import json
+import logging
+from typing import Any, Dict, Iterable, List, Optional, Sequence
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+from django.db.models import Prefetch
+from django.utils import timezone
+
+from shop.media import MediaUrlResolver
+
+from .events import publish_route_events, route_changes
+from .models import DeliveryRoute, RouteSnapshot, RouteStop
+from .serializers import DeliveryRouteSerializer, DriverRouteSerializer
+
+logger = logging.getLogger(__name__)
+
+# Payload keys: "route" is DeliveryRouteSerializer output, "driver" DriverRouteSerializer output.
+SNAPSHOT_VIEWS = ("route", "driver")
+
+
+def snapshot_source_queryset():
+    """Routes with everything the route serializers read, in a fixed number of queries."""
+    return DeliveryRoute.objects.select_related(
+        "region", "driver", "driver__user", "driver__preferred_region"
+    ).prefetch_related(
+        Prefetch(
+            "stops",
+            queryset=RouteStop.objects.select_related("order", "delivery_proof")
+            .prefetch_related("order__items")
+            .order_by("sequence", "id"),
+        )
+    )
+
+
+def build_route_payload(route: DeliveryRoute) -> Dict[str, Any]:
+    """
+    Serialize a route (loaded through `snapshot_source_queryset`) for every snapshot view.
+
+    Proof photos are stored by storage name in `proof_photo_url` and turned into URLs when
+    the snapshot is rendered, because storage URLs may be signed and expire.
+    """
+    proof_names = {}
+    for stop in route.stops.all():
+        proof = getattr(stop, "delivery_proof", None)
+        if proof and proof.photo:
+            proof_names[stop.id] = proof.photo.name
+
+    payload = {
+        "route": DeliveryRouteSerializer(route).data,
+        "driver": DriverRouteSerializer(route).data,
+    }
+    for view in SNAPSHOT_VIEWS:
+        for stop in payload[view]["stops"]:
+            stop["proof_photo_url"] = proof_names.get(stop["id"], "")
+    return json.loads(json.dumps(payload, cls=DjangoJSONEncoder))
+
+
+def refresh_route_snapshots(route_ids: Iterable[int]) -> List[RouteSnapshot]:
+    """
+    Rebuild the snapshots of `route_ids`, bumping the version only where the payload changed.
+
+    Each new version is published as a compact change event (delivery.events) once the
+    surrounding transaction commits.
+    """
+    route_ids = sorted(set(route_ids))
+    if not route_ids:
+        return []
+    now = timezone.now()
+    existing = RouteSnapshot.objects.in_bulk(route_ids)
+    created: List[RouteSnapshot] = []
+    changed: List[RouteSnapshot] = []
+    snapshots: List[RouteSnapshot] = []
+    events: List[Dict[str, Any]] = []
+    for route in snapshot_source_queryset().filter(pk__in=route_ids):
+        payload = build_route_payload(route)
+        snapshot = existing.get(route.pk)
+        previous: Optional[Dict[str, Any]] = None
+        if snapshot is None:
+            snapshot = RouteSnapshot(route=route, payload=payload)
+            created.append(snapshot)
+            previous = {}
+        elif snapshot.stale or snapshot.payload != payload:
+            if snapshot.payload != payload:
+                previous = snapshot.payload
+                snapshot.version += 1
+                snapshot.payload = payload
+            snapshot.stale = False
+            snapshot.built_at = now
+            changed.append(snapshot)
+        if previous is not None:
+            events.append(
+                {
+                    "route_id": route.pk,
+                    "date": route.date,
+                    "version": snapshot.version,
+                    "changes": route_changes(previous, payload),
+                }
+            )
+        snapshots.append(snapshot)
+
+    RouteSnapshot.objects.bulk_create(created, ignore_conflicts=True)
+    RouteSnapshot.objects.bulk_update(changed, ["version", "payload", "stale", "built_at"])
+    if events:
+        transaction.on_commit(lambda: publish_route_events(events))
+    if created or changed:
+        logger.info(
+            "route_snapshots_refreshed",
+            extra={"snapshots_created": len(created), "snapshots_updated": len(changed)},
+        )
+    return snapshots
+
+
+def _refresh_pending(connection) -> None:
+    route_ids = getattr(connection, "stale_route_snapshot_ids", set())
+    connection.stale_route_snapshot_ids = set()
+    refresh_route_snapshots(route_ids)
+
+
+def mark_route_snapshots_stale(route_ids: Iterable[int]) -> None:
+    """
+    Mark route snapshots stale in the current transaction and rebuild them after commit.
+
+    Routes marked several times in one transaction are rebuilt once: the first commit
+    callback takes every pending id and the later ones find nothing left to do.
+    """
+    route_ids = {route_id for route_id in route_ids if route_id}
+    if not route_ids:
+        return
+    RouteSnapshot.objects.filter(route_id__in=route_ids, stale=False).update(stale=True)
+
+    connection = transaction.get_connection()
+    pending = getattr(connection, "stale_route_snapshot_ids", None)
+    if pending is None:
+        pending = connection.stale_route_snapshot_ids = set()
+    pending |= route_ids
+    transaction.on_commit(lambda: _refresh_pending(connection))
+
+
+def current_snapshots(routes: Sequence[DeliveryRoute]) -> List[RouteSnapshot]:
+    """
+    Snapshots for `routes` (loaded with `select_related("snapshot")`), in the same order.
+
+    Missing or stale snapshots are rebuilt inline, so a read never serves a payload older
+    than the last committed write.
+    """
+    snapshots: Dict[int, RouteSnapshot] = {}
+    rebuild = []
+    for route in routes:
+        snapshot = getattr(route, "snapshot", None)
+        if snapshot is None or snapshot.stale:
+            rebuild.append(route.pk)
+        else:
+            snapshots[route.pk] = snapshot
+    if rebuild:
+        snapshots.update(
+            (snapshot.route_id, snapshot) for snapshot in refresh_route_snapshots(rebuild)
+        )
+    return [snapshots[route.pk] for route in routes if route.pk in snapshots]
+
+
+def snapshots_etag(snapshots: Sequence[RouteSnapshot], view: str) -> str:
+    """A strong ETag for a response built from `snapshots` rendered as `view`."""
+    key = ",".join(f"{snapshot.route_id}:{snapshot.version}" for snapshot in snapshots)
+    digest = hashlib.sha1(f"{view}|{key}".encode()).hexdigest()[:32]
+    return f'"routes-{digest}"'
+
+
+def render_snapshot(
+    snapshot: RouteSnapshot, view: str, request=None, resolver: Optional[MediaUrlResolver] = None
+) -> Dict[str, Any]:
+    """
+    The stored payload for `view` with proof photo URLs resolved.
+
+    URLs are made absolute when `request` is given, like the serializers do.
+    """
+    resolver = resolver or MediaUrlResolver(request)
+    data = dict(snapshot.payload[view])
+    stops = []
+    for stop in data["stops"]:
+        name = stop["proof_photo_url"]
+        if name:
+            stop = {**stop, "proof_photo_url": resolver.url(name)}
+        stops.append(stop)
+    data["stops"] = stops
+    return data
+
+
+def render_snapshots(
+    snapshots: Sequence[RouteSnapshot], view: str, request=None
+) -> List[Dict[str, Any]]:
+    """Render `snapshots`, resolving all of their proof photo URLs in one batch."""
+    resolver = MediaUrlResolver(request)
+    resolver.prefetch(
+        stop["proof_photo_url"] for snapshot in snapshots for stop in snapshot.payload[view]["stops"]
+    )
+    return [render_snapshot(snapshot, view, request, resolver) for snapshot in snapshots]
+
+
+def rebuild_all_route_snapshots(
+    route_ids: Optional[Iterable[int]] = None, batch_size: int = 200
+) -> int:
+    """Rebuild snapshots for every route (or just `route_ids`); returns the number of routes."""
+    queryset = DeliveryRoute.objects.order_by("pk").values_list("pk", flat=True)
+    if route_ids is not None:
+        queryset = queryset.filter(pk__in=list(route_ids))
+    ids = list(queryset)
+    for start in range(0, len(ids), batch_size):
+        refresh_route_snapshots(ids[start : start + batch_size])
+    return len(ids)
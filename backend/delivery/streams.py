@@ -0,0 +1,238 @@
+"""
+Server-sent event streams of route changes.
+
+These views are async and must be served by the ASGI application (shop.asgi): an idle
+stream then costs a coroutine and a queue instead of a worker thread. Each process keeps a
+single Redis pub/sub connection and fans messages out to the open streams.
+"""
+import asyncio
+import datetime
+import json
+import logging
+from collections import defaultdict
+from typing import Any, Dict, Iterable, List, Optional, Set
+
+import redis
+import redis.asyncio as aioredis
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.http import JsonResponse, StreamingHttpResponse
+
+from .events import date_channel, route_channel
+from .models import DeliveryRoute
+from .snapshots import current_snapshots
+
+logger = logging.getLogger(__name__)
+
+STREAM_QUEUE_SIZE = 100
+RECONNECT_DELAY_SECONDS = 1.0
+RETRY_MILLISECONDS = 3000
+# Queued instead of a message when a stream fell behind or Redis reconnected.
+RESYNC = {"resync": True}
+
+
+class RouteEventHub:
+    """One Redis subscription per process, shared by every open stream on its event loop."""
+
+    def __init__(self):
+        self._queues: Dict[str, Set[asyncio.Queue]] = defaultdict(set)
+        self._lock = asyncio.Lock()
+        self._client: Optional[aioredis.Redis] = None
+        self._pubsub = None
+        self._reader: Optional[asyncio.Task] = None
+
+    async def listen(self, channels: Iterable[str]) -> asyncio.Queue:
+        queue: asyncio.Queue = asyncio.Queue(maxsize=STREAM_QUEUE_SIZE)
+        async with self._lock:
+            await self._connect()
+            new_channels = [channel for channel in channels if not self._queues[channel]]
+            for channel in channels:
+                self._queues[channel].add(queue)
+            if new_channels:
+                await self._pubsub.subscribe(*new_channels)
+        return queue
+
+    async def unlisten(self, channels: Iterable[str], queue: asyncio.Queue) -> None:
+        async with self._lock:
+            idle = []
+            for channel in channels:
+                self._queues[channel].discard(queue)
+                if not self._queues[channel]:
+                    del self._queues[channel]
+                    idle.append(channel)
+            if idle and self._pubsub is not None:
+                try:
+                    await self._pubsub.unsubscribe(*idle)
+                except redis.RedisError:
+                    logger.warning("route_events_unsubscribe_failed", exc_info=True)
+
+    async def _connect(self) -> None:
+        if self._pubsub is None:
+            self._client = aioredis.Redis.from_url(settings.ROUTE_EVENTS_REDIS_URL)
+            self._pubsub = self._client.pubsub()
+            if self._queues:
+                await self._pubsub.subscribe(*self._queues)
+        if self._reader is None or self._reader.done():
+            self._reader = asyncio.create_task(self._read())
+
+    async def _read(self) -> None:
+        while True:
+            try:
+                if self._pubsub is None or not self._pubsub.subscribed:
+                    await asyncio.sleep(RECONNECT_DELAY_SECONDS / 10)
+                    continue
+                message = await self._pubsub.get_message(
+                    ignore_subscribe_messages=True, timeout=RECONNECT_DELAY_SECONDS
+                )
+            except (redis.RedisError, OSError):
+                logger.warning("route_events_subscription_lost", exc_info=True)
+                await self._reset()
+                await asyncio.sleep(RECONNECT_DELAY_SECONDS)
+                continue
+            if message is None:
+                continue
+            channel = message["channel"]
+            if isinstance(channel, bytes):
+                channel = channel.decode()
+            try:
+                event = json.loads(message["data"])
+            except ValueError:
+                continue
+            for queue in list(self._queues.get(channel, ())):
+                self._offer(queue, event)
+
+    async def _reset(self) -> None:
+        async with self._lock:
+            pubsub, client = self._pubsub, self._client
+            self._pubsub = self._client = None
+            for queues in self._queues.values():
+                for queue in queues:
+                    # Messages published while we were disconnected are lost.
+                    self._offer(queue, RESYNC)
+            try:
+                if pubsub is not None:
+                    await pubsub.aclose()
+                if client is not None:
+                    await client.aclose()
+            except (redis.RedisError, OSError):
+                pass
+            try:
+                # The running reader is this task, so only the subscription is recreated.
+                await self._connect()
+            except (redis.RedisError, OSError):
+                self._pubsub = self._client = None
+
+    @staticmethod
+    def _offer(queue: asyncio.Queue, event: Dict[str, Any]) -> None:
+        try:
+            queue.put_nowait(event)
+        except asyncio.QueueFull:
+            # The client is too slow to keep up: drop the backlog and tell it to refetch.
+            while not queue.empty():
+                queue.get_nowait()
+            queue.put_nowait(RESYNC)
+
+
+_hubs: Dict[asyncio.AbstractEventLoop, RouteEventHub] = {}
+
+
+def route_event_hub() -> RouteEventHub:
+    loop = asyncio.get_running_loop()
+    if loop not in _hubs:
+        _hubs[loop] = RouteEventHub()
+    return _hubs[loop]
+
+
+def format_event(event: Dict[str, Any], with_id: bool = False) -> str:
+    lines = ["event: resync" if event.get("resync") else "event: route"]
+    if with_id and "version" in event:
+        lines.append(f"id: {event['version']}")
+    lines.append(f"data: {json.dumps(event, separators=(',', ':'))}")
+    return "\n".join(lines) + "\n\n"
+
+
+async def event_stream(channels: List[str], initial: List[Dict[str, Any]], with_ids: bool):
+    yield f"retry: {RETRY_MILLISECONDS}\n\n"
+    for event in initial:
+        yield format_event(event, with_ids)
+
+    hub = route_event_hub()
+    try:
+        queue = await hub.listen(channels)
+    except (redis.RedisError, OSError):
+        # Close the stream; EventSource reconnects after the retry delay.
+        logger.warning("route_events_subscribe_failed", exc_info=True)
+        return
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + settings.ROUTE_EVENTS_MAX_STREAM_SECONDS
+    try:
+        while True:
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                break
+            try:
+                event = await asyncio.wait_for(
+                    queue.get(), timeout=min(settings.ROUTE_EVENTS_HEARTBEAT_SECONDS, remaining)
+                )
+            except asyncio.TimeoutError:
+                yield ": keepalive\n\n"
+                continue
+            yield format_event(event, with_ids)
+    finally:
+        await hub.unlisten(channels, queue)
+
+
+def sse_response(channels: List[str], initial: List[Dict[str, Any]], with_ids: bool = False):
+    response = StreamingHttpResponse(
+        event_stream(channels, initial, with_ids), content_type="text/event-stream"
+    )
+    response["Cache-Control"] = "no-cache"
+    # Stop nginx from buffering the stream.
+    response["X-Accel-Buffering"] = "no"
+    return response
+
+
+def _forbidden(detail: str, status: int = 403) -> JsonResponse:
+    return JsonResponse({"detail": detail}, status=status)
+
+
+async def route_events(request, route_id: int):
+    """
+    Stream change events for one route to its driver or to staff.
+
+    Event ids are snapshot versions. A client reconnecting with an older Last-Event-ID gets
+    a resync event first, so it knows to refetch the route (the ETag makes that cheap).
+    """
+    user = await request.auser()
+    if not user.is_authenticated:
+        return _forbidden("Authentication credentials were not provided.")
+
+    route = await DeliveryRoute.objects.select_related("driver", "snapshot").filter(
+        pk=route_id
+    ).afirst()
+    if route is None:
+        return _forbidden("Not found.", status=404)
+    if not (user.is_staff or (route.driver and route.driver.user_id == user.id)):
+        return _forbidden("You do not have permission to view this route.")
+
+    snapshots = await sync_to_async(current_snapshots)([route])
+    version = snapshots[0].version
+    initial = []
+    last_event_id = request.headers.get("Last-Event-ID")
+    if last_event_id and last_event_id != str(version):
+        initial.append({**RESYNC, "route_id": route.id, "version": version})
+    return sse_response([route_channel(route.id)], initial, with_ids=True)
+
+
+async def date_events(request, date: str):
+    """Stream change events for every route on a delivery date (the admin routes page)."""
+    user = await request.auser()
+    if not user.is_authenticated:
+        return _forbidden("Authentication credentials were not provided.")
+    if not user.is_staff:
+        return _forbidden("You do not have permission to perform this action.")
+    try:
+        day = datetime.date.fromisoformat(date)
+    except ValueError:
+        return _forbidden("Invalid date format. Use YYYY-MM-DD.", status=400)
+    return sse_response([date_channel(day.isoformat())], [])
@@ -0,0 +1,194 @@
+import logging
+from functools import partial
+from typing import Any, Dict, List, Mapping, Optional
+
+from django.db import transaction
+from django.utils import timezone
+
+from notifications.tasks import send_order_delivered_emails
+from orders.models import Order
+from .counters import apply_deltas, count_stop, new_deltas
+from .models import DeliveryProof, DeliveryRoute, Driver, RouteStop, StopTransition
+from .tasks import process_delivery_proof
+
+logger = logging.getLogger(__name__)
+
+ORDER_STATUS_FOR_STOP = {
+    RouteStop.Status.DELIVERED: Order.Status.COMPLETED,
+    RouteStop.Status.NO_PICKUP: Order.Status.IN_PROGRESS,
+}
+
+
+def _result(
+    item: Dict[str, Any], result: str, detail: str = "", replayed: bool = False
+) -> Dict[str, Any]:
+    return {
+        "id": item["id"],
+        "stop_id": item["stop_id"],
+        "result": result,
+        "detail": detail,
+        "replayed": replayed,
+    }
+
+
+def _lock_driver(driver: Driver) -> None:
+    Driver.objects.select_for_update().filter(pk=driver.pk).values_list("pk", flat=True).first()
+
+
+def apply_stop_transitions(
+    driver: Driver,
+    transitions: List[Dict[str, Any]],
+    photos: Optional[Mapping[str, Any]] = None,
+) -> Dict[str, Any]:
+    """
+    Apply a batch of offline stop transitions for one driver in a single transaction.
+
+    Each transition carries the client's idempotency `id`; replays return the stored outcome,
+    also when the same batch is being applied concurrently.
+    Transitions are applied in `occurred_at` order and one older than the stop's last change is
+    recorded as stale. Stops and orders are written with bulk updates, route counters and
+    completion are updated once per route, and delivered emails go out as one task.
+    """
+    photos = photos or {}
+    now = timezone.now()
+    results: Dict[str, Dict[str, Any]] = {}
+
+    with transaction.atomic():
+        # Batches of one driver run one at a time, so a retry racing the original (e.g.
+        # after a client timeout) sees its transitions below and replays them.
+        _lock_driver(driver)
+        seen = {
+            transition.client_id: transition
+            for transition in StopTransition.objects.filter(
+                driver=driver, client_id__in=[item["id"] for item in transitions]
+            )
+        }
+        for item in transitions:
+            previous = seen.get(item["id"])
+            if previous:
+                results[item["id"]] = _result(
+                    item, previous.result, previous.detail, replayed=True
+                )
+
+        pending = [item for item in transitions if item["id"] not in results]
+        stops = (
+            RouteStop.objects.select_for_update()
+            .select_related("route", "order")
+            .in_bulk({item["stop_id"] for item in pending})
+        )
+        proof_stop_ids = set(
+            DeliveryProof.objects.filter(stop_id__in=list(stops)).values_list("stop_id", flat=True)
+        )
+
+        deltas = new_deltas()
+        changed_stops: Dict[int, RouteStop] = {}
+        records: List[StopTransition] = []
+        new_proofs: Dict[int, Any] = {}
+
+        for item in sorted(pending, key=lambda entry: entry["occurred_at"]):
+            stop = stops.get(item["stop_id"])
+            result, detail = StopTransition.Result.APPLIED, ""
+            if stop is None or stop.route.driver_id != driver.id:
+                result, detail = StopTransition.Result.REJECTED, "stop_not_on_your_routes"
+            elif stop.route.merged_into_id:
+                result, detail = StopTransition.Result.REJECTED, "route_merged"
+            elif (
+                item["status"] == RouteStop.Status.DELIVERED
+                and stop.id not in proof_stop_ids
+                and stop.id not in new_proofs
+                and item["id"] not in photos
+            ):
+                result, detail = StopTransition.Result.REJECTED, "photo_required"
+            elif stop.status != RouteStop.Status.PENDING and stop.delivered_at and (
+                item["occurred_at"] <= stop.delivered_at
+            ):
+                result, detail = StopTransition.Result.STALE, "newer_change_exists"
+
+            if result == StopTransition.Result.APPLIED:
+                count_stop(deltas, stop.route_id, stop.status, -1)
+                count_stop(deltas, stop.route_id, item["status"], 1)
+                stop.status = item["status"]
+                stop.delivered_at = item["occurred_at"]
+                stop.no_pickup_reason = (
+                    item.get("reason", "")[:255]
+                    if item["status"] == RouteStop.Status.NO_PICKUP
+                    else ""
+                )
+                changed_stops[stop.id] = stop
+                if item["id"] in photos:
+                    new_proofs[stop.id] = photos[item["id"]]
+
+            records.append(
+                StopTransition(
+                    driver=driver,
+                    client_id=item["id"],
+                    stop=stop,
+                    status=item["status"],
+                    occurred_at=item["occurred_at"],
+                    result=result,
+                    detail=detail,
+                )
+            )
+            results[item["id"]] = _result(item, result, detail)
+
+        orders: List[Order] = []
+        delivered_order_ids: List[int] = []
+        for stop in changed_stops.values():
+            order = stop.order
+            order.status = ORDER_STATUS_FOR_STOP[stop.status]
+            order.updated_at = now
+            if stop.status == RouteStop.Status.DELIVERED:
+                order.delivered_at = stop.delivered_at
+                delivered_order_ids.append(order.id)
+            orders.append(order)
+            # bulk_update skips the save signals; counters are applied from `deltas` below.
+            stop._counted_as = (stop.route_id, stop.status)
+
+        RouteStop.objects.bulk_update(
+            list(changed_stops.values()), ["status", "delivered_at", "no_pickup_reason"]
+        )
+        Order.objects.bulk_update(orders, ["status", "delivered_at", "updated_at"])
+        proof_ids = [
+            DeliveryProof.objects.update_or_create(
+                stop_id=stop_id,
+                defaults={"photo": photo, "photo_thumbnail": "", "processed_at": None},
+            )[0].id
+            for stop_id, photo in new_proofs.items()
+        ]
+        apply_deltas(deltas)
+        StopTransition.objects.bulk_create(records)
+
+        routes = list(DeliveryRoute.objects.filter(pk__in=list(deltas)).order_by("pk"))
+        for route in routes:
+            route.refresh_completion_status(save=True)
+
+        for proof_id in proof_ids:
+            transaction.on_commit(partial(process_delivery_proof.delay, proof_id))
+        if delivered_order_ids:
+            transaction.on_commit(
+                lambda: send_order_delivered_emails.delay(sorted(delivered_order_ids))
+            )
+
+    logger.info(
+        "driver_stop_sync_applied",
+        extra={
+            "driver_id": driver.id,
+            "received": len(transitions),
+            "applied": len(changed_stops),
+            "routes": len(routes),
+        },
+    )
+    return {
+        "results": [results[item["id"]] for item in transitions],
+        "routes": [
+            {
+                "id": route.id,
+                "is_completed": route.is_completed,
+                "pending_count": route.pending_count,
+                "delivered_count": route.delivered_count,
+                "no_pickup_count": route.no_pickup_count,
+                "total_count": route.total_count,
+            }
+            for route in routes
+        ],
+    }
@@ -1,15 +1,21 @@
 import datetime
 import logging
-from datetime import date, time
+from datetime import date
 from typing import Dict, List
 
 from celery import shared_task
 from django.db import transaction
-from django.db.models import Max
 from django.utils import timezone
 
 from orders.models import Order, Region
-from delivery.models import DeliveryRoute, Driver, RouteStop
+from delivery.counters import apply_deltas, count_stop, new_deltas
+from delivery.models import DeliveryProof, DeliveryRoute, Driver, RouteStop
+from delivery.eta import plan_route_etas
+from delivery.geocoding import geocode_orders
+from delivery.locations import flush_location_buffer, recompute_live_etas
+from delivery.proofs import process_proof_photo
+from delivery.sequencing import apply_stop_order
+from delivery.snapshots import mark_route_snapshots_stale
 from delivery.google_routes import optimize_route_with_google
 from notifications.tasks import send_delivery_eta_email_task
 
@@ -35,7 +41,6 @@ def generate_delivery_routes() -> dict:
     """
     now = timezone.now()
     today_date = now.date()
-    current_tz = timezone.get_current_timezone()
 
     drivers_by_weekday = _drivers_by_weekday()
 
@@ -77,10 +82,6 @@ def generate_delivery_routes() -> dict:
             continue
 
         delivery_date = _next_delivery_date(region, today=today_date)
-        eta_dt = timezone.make_aware(
-            datetime.datetime.combine(delivery_date, time(12, 0)),
-            timezone=current_tz,
-        )
 
         with transaction.atomic():
             route = (
@@ -109,7 +110,6 @@ def generate_delivery_routes() -> dict:
             next_sequence = (last_stop.sequence if last_stop else 0) + 1
 
             stops: List[RouteStop] = []
-            updated_orders: List[Order] = []
             sequence = next_sequence
             for order in region_orders:
                 stops.append(
@@ -120,12 +120,14 @@ def generate_delivery_routes() -> dict:
                         status=RouteStop.Status.PENDING,
                     )
                 )
-                order.estimated_delivery_at = eta_dt
-                updated_orders.append(order)
                 sequence += 1
 
             RouteStop.objects.bulk_create(stops)
-            Order.objects.bulk_update(updated_orders, ["estimated_delivery_at"])
+            deltas = new_deltas()
+            for stop in stops:
+                count_stop(deltas, route.id, stop.status, 1)
+            apply_deltas(deltas)
+            plan_route_etas([route.id])
 
         created_route_ids.append(route.id)
         attached_order_ids.extend(order.id for order in region_orders)
@@ -197,32 +199,22 @@ def optimize_future_routes() -> dict:
     skipped_routes: Dict[int, str] = {}
 
     for route in routes:
-        stops = list(route.stops.all().order_by("sequence", "id"))
+        # Sorted in Python so the prefetched stops and orders are used.
+        stops = sorted(route.stops.all(), key=lambda stop: (stop.sequence, stop.id))
 
         if len(stops) <= 1:
             skipped_routes[route.id] = "too_few_stops"
             continue
 
+        geocode_orders(stop.order for stop in stops)
         optimized_stops = optimize_route_with_google(stops)
         if [stop.id for stop in optimized_stops] == [stop.id for stop in stops]:
             skipped_routes[route.id] = "no_change"
             continue
 
-        max_sequence = (
-            RouteStop.objects.filter(route=route).aggregate(max_seq=Max("sequence")).get(
-                "max_seq"
-            )
-            or 0
-        )
-        temp_offset = max_sequence + 1000
-
-        for sequence, stop in enumerate(optimized_stops, start=1):
-            stop.sequence = temp_offset + sequence
-        RouteStop.objects.bulk_update(optimized_stops, ["sequence"])
-
-        for sequence, stop in enumerate(optimized_stops, start=1):
-            stop.sequence = sequence
-        RouteStop.objects.bulk_update(optimized_stops, ["sequence"])
+        with transaction.atomic():
+            apply_stop_order(route.id, [stop.id for stop in optimized_stops])
+            mark_route_snapshots_stale([route.id])
         optimized_routes.append(route.id)
         logger.info(
             "Optimized route %s with %s stops",
@@ -230,6 +222,56 @@ def optimize_future_routes() -> dict:
             len(optimized_stops),
         )
 
-    summary = {"optimized_routes": optimized_routes, "skipped_routes": skipped_routes}
+    # Replan every future route, not just the reordered ones: coordinates may be new.
+    planned_orders = plan_route_etas(route.id for route in routes)
+
+    summary = {
+        "optimized_routes": optimized_routes,
+        "skipped_routes": skipped_routes,
+        "planned_orders": planned_orders,
+    }
     logger.info("Optimize future routes summary: %s", summary)
     return summary
+
+
+@shared_task(name="delivery.process_delivery_proof")
+def process_delivery_proof(proof_id: int) -> dict:
+    """
+    Strip EXIF from, resize and re-encode a driver's proof photo, and build its thumbnail.
+    """
+    proof = DeliveryProof.objects.filter(pk=proof_id).first()
+    if proof is None or not proof.photo:
+        return {"proof_id": proof_id, "processed": False, "reason": "missing"}
+    try:
+        process_proof_photo(proof)
+    except OSError:
+        logger.warning(
+            "delivery_proof_unreadable",
+            extra={"proof_id": proof_id, "photo": proof.photo.name},
+            exc_info=True,
+        )
+        return {"proof_id": proof_id, "processed": False, "reason": "unreadable"}
+    return {"proof_id": proof_id, "processed": True}
+
+
+@shared_task(name="delivery.flush_driver_locations", queue="logistics")
+def flush_driver_locations() -> dict:
+    return {"flushed": flush_location_buffer()}
+
+
+@shared_task(name="delivery.recompute_live_etas", queue="logistics")
+def recompute_live_etas_task() -> dict:
+    """
+    Flush buffered GPS pings, then re-estimate pending stops of today's active routes.
+    """
+    try:
+        flushed = flush_location_buffer()
+    except Exception:
+        # ETAs from the pings already stored beat no ETAs at all.
+        logger.exception("Failed to flush driver locations before recomputing ETAs")
+        flushed = 0
+    summary = recompute_live_etas()
+    summary["flushed"] = flushed
+    if summary["updated_orders"]:
+        logger.info("live_etas_recomputed", extra=summary)
+    return summary
@@ -0,0 +1,90 @@
+import datetime
+from unittest.mock import patch
+
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from delivery.eta import plan_route_etas
+from delivery.models import DeliveryRoute, RouteStop
+from delivery.tasks import generate_delivery_routes
+from notifications.tasks import _format_eta_line
+from orders.models import Order, Region
+
+
+@override_settings(
+    DELIVERY_ROUTE_START_TIME="09:00",
+    DELIVERY_DEPOT_LAT="45.0",
+    DELIVERY_DEPOT_LNG="-75.0",
+    DELIVERY_ETA_AVERAGE_SPEED_KMH=36,
+    DELIVERY_ETA_ROAD_FACTOR=1.0,
+    DELIVERY_ETA_SERVICE_SECONDS=300,
+    DELIVERY_ETA_DEFAULT_LEG_SECONDS=600,
+    DELIVERY_WINDOW_MINUTES=60,
+    GOOGLE_MAPS_API_KEY="",
+)
+class DeliveryWindowTests(TestCase):
+    def setUp(self):
+        self.region = Region.objects.create(
+            code="DW",
+            name="Windows",
+            delivery_weekday=timezone.localdate().weekday(),
+            min_orders=1,
+        )
+        self.date = timezone.localdate() + datetime.timedelta(days=2)
+
+    def create_order(self, latitude=None, longitude=None):
+        return Order.objects.create(
+            full_name="Customer",
+            email="windows@example.com",
+            phone="123",
+            address_line1="1 Main St",
+            region=self.region,
+            status=Order.Status.PAID,
+            order_type=Order.OrderType.DELIVERY,
+            latitude=latitude,
+            longitude=longitude,
+        )
+
+    def test_windows_follow_the_sequence_and_are_written_in_one_update(self):
+        route = DeliveryRoute.objects.create(region=self.region, date=self.date)
+        # 0.1 degrees of latitude is about 11.1 km: 1112 s of driving at 36 km/h.
+        points = [(45.1, -75.0), (45.2, -75.0), (None, None), (45.3, -75.0)]
+        orders = [self.create_order(*point) for point in points]
+        for sequence, order in enumerate(orders, start=1):
+            RouteStop.objects.create(route=route, order=order, sequence=sequence)
+
+        with self.assertNumQueries(2):
+            self.assertEqual(plan_route_etas([route.id]), 4)
+
+        start = timezone.make_aware(datetime.datetime.combine(self.date, datetime.time(9, 0)))
+        offsets = []
+        for order in orders:
+            order.refresh_from_db()
+            offsets.append((order.estimated_delivery_at - start).total_seconds())
+            self.assertEqual(
+                order.delivery_window_end - order.delivery_window_start, datetime.timedelta(hours=1)
+            )
+            self.assertEqual(timezone.localtime(order.delivery_window_start).minute % 15, 0)
+            self.assertLessEqual(order.delivery_window_start, order.estimated_delivery_at)
+            self.assertGreaterEqual(order.delivery_window_end, order.estimated_delivery_at)
+        self.assertAlmostEqual(offsets[0], 1112, delta=2)
+        self.assertAlmostEqual(offsets[1] - offsets[0], 300 + 1112, delta=2)
+        self.assertEqual(offsets[2] - offsets[1], 300 + 600)
+        self.assertAlmostEqual(offsets[3] - offsets[2], 300 + 1112, delta=2)
+        # The first window can't open before the van leaves the depot.
+        self.assertEqual(orders[0].delivery_window_start, start)
+
+    @patch("delivery.tasks.send_delivery_eta_email_task.delay")
+    def test_generated_routes_give_each_stop_its_own_window(self, mock_delay):
+        orders = [self.create_order(45.0 + index / 10, -75.0) for index in range(1, 4)]
+        generate_delivery_routes()
+
+        etas = [Order.objects.get(pk=order.pk).estimated_delivery_at for order in orders]
+        self.assertEqual(etas, sorted(etas))
+        self.assertEqual(len(set(etas)), 3)
+        self.assertEqual(mock_delay.call_count, 3)
+
+        order = Order.objects.get(pk=orders[1].pk)
+        start = timezone.localtime(order.delivery_window_start).strftime("%H:%M")
+        end = timezone.localtime(order.delivery_window_end).strftime("%H:%M")
+        self.assertIn(f"between {start} and {end}", _format_eta_line(order))
@@ -0,0 +1,174 @@
+import datetime
+import json
+from unittest import mock
+
+import redis
+from django.contrib.auth import get_user_model
+from django.db import DatabaseError
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from delivery.locations import LOCATION_BUFFER_KEY, flush_location_buffer, recompute_live_etas
+from delivery.models import DeliveryRoute, Driver, DriverLocation, RouteStop
+from delivery.tasks import recompute_live_etas_task
+from orders.models import Order, Region
+from shop.redis import FakeRedis
+
+
+@override_settings(
+    DELIVERY_ETA_AVERAGE_SPEED_KMH=36,
+    DELIVERY_ETA_ROAD_FACTOR=1.0,
+    DELIVERY_ETA_SERVICE_SECONDS=120,
+    DELIVERY_ETA_DEFAULT_LEG_SECONDS=600,
+    GOOGLE_MAPS_API_KEY="",
+)
+class DriverLocationTests(TestCase):
+    def setUp(self):
+        user = get_user_model().objects.create_user(
+            username="gps-driver", email="gps-driver@example.com", password="x"
+        )
+        self.driver = Driver.objects.create(user=user)
+        self.region = Region.objects.create(code="GP", name="GPS", delivery_weekday=1)
+        self.route = DeliveryRoute.objects.create(
+            region=self.region, driver=self.driver, date=timezone.localdate()
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(user=user)
+        self.url = reverse("delivery:driver-locations")
+        self.redis = FakeRedis()
+        patcher = mock.patch("delivery.locations._redis", return_value=self.redis)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        paused = mock.patch("delivery.locations._buffer_paused_until", 0.0)
+        paused.start()
+        self.addCleanup(paused.stop)
+
+    def ping(self, latitude=45.0, longitude=-75.0, **extra):
+        return {
+            "latitude": latitude,
+            "longitude": longitude,
+            "recorded_at": timezone.now().isoformat(),
+            **extra,
+        }
+
+    def add_stop(self, sequence, latitude=None, longitude=None, **extra):
+        order = Order.objects.create(
+            full_name=f"Customer {sequence}",
+            email=f"gps{sequence}@example.com",
+            phone="123",
+            address_line1=f"{sequence} Main St",
+            region=self.region,
+            latitude=latitude,
+            longitude=longitude,
+        )
+        return RouteStop.objects.create(route=self.route, order=order, sequence=sequence, **extra)
+
+    def test_pings_are_buffered_then_flushed_in_bulk(self):
+        response = self.client.post(
+            self.url,
+            {"pings": [self.ping(), self.ping(45.001, -75.0, accuracy_m=5, speed_mps=8.5)]},
+            format="json",
+        )
+        self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
+        self.assertEqual(response.json(), {"accepted": 2})
+        self.assertEqual(self.redis.llen(LOCATION_BUFFER_KEY), 2)
+        self.assertFalse(DriverLocation.objects.exists())
+
+        self.assertEqual(flush_location_buffer(batch_size=1), 2)
+        locations = list(DriverLocation.objects.order_by("id"))
+        self.assertEqual([location.route_id for location in locations], [self.route.id] * 2)
+        self.assertEqual(locations[1].speed_mps, 8.5)
+        self.assertEqual(self.redis.llen(LOCATION_BUFFER_KEY), 0)
+
+    def test_unstorable_pings_are_dropped_instead_of_blocking_the_buffer(self):
+        self.client.post(self.url, {"pings": [self.ping()]}, format="json")
+        good = json.loads(self.redis.lrange(LOCATION_BUFFER_KEY, 0, 0)[0])
+        missing_driver = [self.driver.id + 1000, *good[1:]]
+        missing_route = [good[0], self.route.id + 1000, *good[2:]]
+        self.redis.rpush(
+            LOCATION_BUFFER_KEY, json.dumps(missing_driver), json.dumps(missing_route), "not json"
+        )
+
+        self.assertEqual(flush_location_buffer(), 2)
+        self.assertEqual(self.redis.llen(LOCATION_BUFFER_KEY), 0)
+        self.assertEqual(
+            list(DriverLocation.objects.order_by("id").values_list("route_id", flat=True)),
+            [self.route.id, None],
+        )
+
+    def test_live_etas_are_recomputed_when_the_flush_fails(self):
+        with mock.patch(
+            "delivery.tasks.flush_location_buffer", side_effect=DatabaseError("unavailable")
+        ):
+            summary = recompute_live_etas_task()
+        self.assertEqual(summary["flushed"], 0)
+
+    def test_pings_are_inserted_directly_when_redis_is_down(self):
+        with mock.patch.object(self.redis, "rpush", side_effect=redis.ConnectionError):
+            response = self.client.post(self.url, {"pings": [self.ping()]}, format="json")
+        self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
+        self.assertEqual(DriverLocation.objects.get().driver, self.driver)
+
+    def test_invalid_pings_are_rejected(self):
+        response = self.client.post(self.url, {"pings": [self.ping(latitude=91)]}, format="json")
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        with override_settings(DRIVER_LOCATION_MAX_PINGS_PER_REQUEST=1):
+            response = self.client.post(
+                self.url, {"pings": [self.ping(), self.ping()]}, format="json"
+            )
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(self.redis.llen(LOCATION_BUFFER_KEY), 0)
+
+    def test_etas_follow_the_remaining_sequence_from_the_latest_position(self):
+        now = timezone.now()
+        delivered = self.add_stop(1, 45.0, -75.0, status=RouteStop.Status.DELIVERED)
+        # About 1.1 km north per stop: 111 s of driving at 36 km/h.
+        second = self.add_stop(2, 45.01, -75.0)
+        third = self.add_stop(3, None, None)
+        fourth = self.add_stop(4, 45.02, -75.0)
+        for minutes, latitude in ((10, 44.0), (1, 45.0)):
+            DriverLocation.objects.create(
+                driver=self.driver,
+                route=self.route,
+                latitude=latitude,
+                longitude=-75.0,
+                recorded_at=now - datetime.timedelta(minutes=minutes),
+                received_at=now,
+            )
+
+        self.assertEqual(recompute_live_etas(now), {"routes": 1, "updated_orders": 3})
+        etas = {
+            stop.id: Order.objects.get(route_stop=stop).estimated_delivery_at
+            for stop in (delivered, second, third, fourth)
+        }
+        self.assertIsNone(etas[delivered.id])
+        self.assertAlmostEqual((etas[second.id] - now).total_seconds(), 111, delta=2)
+        # Unknown address: the default leg after the service time at the second stop.
+        self.assertAlmostEqual(
+            (etas[third.id] - etas[second.id]).total_seconds(), 120 + 600, delta=1
+        )
+        # The next leg starts from the last known point, the second stop.
+        self.assertAlmostEqual(
+            (etas[fourth.id] - etas[third.id]).total_seconds(), 120 + 111, delta=2
+        )
+
+        later = now + datetime.timedelta(seconds=20)
+        self.assertEqual(recompute_live_etas(later)["updated_orders"], 0)
+
+    def test_routes_without_a_recent_position_keep_their_eta(self):
+        stop = self.add_stop(1, 45.0, -75.0)
+        now = timezone.now()
+        DriverLocation.objects.create(
+            driver=self.driver,
+            route=self.route,
+            latitude=45.0,
+            longitude=-75.0,
+            recorded_at=now - datetime.timedelta(hours=1),
+            received_at=now,
+        )
+        self.assertEqual(recompute_live_etas(now), {"routes": 0, "updated_orders": 0})
+        stop.order.refresh_from_db()
+        self.assertIsNone(stop.order.estimated_delivery_at)
@@ -0,0 +1,171 @@
+import datetime
+import tempfile
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import override_settings
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from delivery.models import DeliveryProof, DeliveryRoute, Driver, RouteStop, StopTransition
+from orders.models import Order, Region
+
+
+@override_settings(
+    STORAGES={
+        "default": {"BACKEND": "django.core.files.storage.FileSystemStorage"},
+        "staticfiles": {"BACKEND": "django.contrib.staticfiles.storage.StaticFilesStorage"},
+    },
+    MEDIA_ROOT=tempfile.mkdtemp(),
+)
+class DriverStopSyncTests(APITestCase):
+    def setUp(self):
+        user = get_user_model().objects.create_user(
+            username="sync-driver", email="sync-driver@example.com", password="pass12345"
+        )
+        self.driver = Driver.objects.create(user=user)
+        self.client.force_authenticate(user=user)
+        self.region = Region.objects.create(
+            code="sync", name="Sync", delivery_weekday=1, min_orders=0
+        )
+        self.route = DeliveryRoute.objects.create(
+            region=self.region, date=timezone.localdate(), driver=self.driver
+        )
+        self.stops = []
+        for sequence in range(1, 4):
+            order = Order.objects.create(
+                full_name=f"Customer {sequence}",
+                email=f"sync{sequence}@example.com",
+                phone="1",
+                region=self.region,
+                status=Order.Status.PAID,
+            )
+            self.stops.append(
+                RouteStop.objects.create(route=self.route, order=order, sequence=sequence)
+            )
+        self.url = reverse("delivery:driver-stop-sync")
+        self.when = timezone.now() - datetime.timedelta(hours=1)
+
+    def _transition(self, client_id, stop, stop_status, minutes=0, **extra):
+        return {
+            "id": client_id,
+            "stop_id": stop.id,
+            "status": stop_status,
+            "occurred_at": (self.when + datetime.timedelta(minutes=minutes)).isoformat(),
+            **extra,
+        }
+
+    @mock.patch("delivery.sync.process_delivery_proof.delay")
+    @mock.patch("delivery.sync.send_order_delivered_emails.delay")
+    def test_applies_batch_once_and_completes_route(self, mock_emails, mock_process_proof):
+        DeliveryProof.objects.create(
+            stop=self.stops[0], photo=SimpleUploadedFile("a.jpg", b"img", "image/jpeg")
+        )
+        payload = {
+            "transitions": [
+                self._transition("t1", self.stops[0], "delivered"),
+                self._transition("t2", self.stops[1], "no_pickup", 5, reason="Closed"),
+                self._transition("t3", self.stops[2], "delivered", 10),
+            ]
+        }
+
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(self.url, payload, format="json")
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        results = {item["id"]: item["result"] for item in response.json()["results"]}
+        self.assertEqual(results, {"t1": "applied", "t2": "applied", "t3": "rejected"})
+        self.assertEqual(response.json()["routes"][0]["pending_count"], 1)
+        mock_emails.assert_called_once_with([self.stops[0].order_id])
+
+        stop = RouteStop.objects.get(pk=self.stops[1].pk)
+        self.assertEqual(stop.status, RouteStop.Status.NO_PICKUP)
+        self.assertEqual(stop.no_pickup_reason, "Closed")
+        self.assertEqual(
+            Order.objects.get(pk=self.stops[0].order_id).status, Order.Status.COMPLETED
+        )
+
+        # Replaying the same batch changes nothing and reports the stored outcomes.
+        response = self.client.post(self.url, payload, format="json")
+        self.assertTrue(all(item["replayed"] for item in response.json()["results"]))
+        self.assertEqual(StopTransition.objects.count(), 3)
+        self.assertEqual(mock_emails.call_count, 1)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(
+                self.url,
+                {
+                    "transitions": '[{"id": "t4", "stop_id": %d, "status": "delivered", '
+                    '"occurred_at": "%s"}]' % (self.stops[2].id, self.when.isoformat()),
+                    "photo_t4": SimpleUploadedFile("b.jpg", b"img", "image/jpeg"),
+                },
+                format="multipart",
+            )
+        self.assertEqual(response.json()["results"][0]["result"], "applied")
+        route = DeliveryRoute.objects.get(pk=self.route.pk)
+        self.assertTrue(route.is_completed)
+        self.assertEqual((route.delivered_count, route.no_pickup_count), (2, 1))
+        proof = DeliveryProof.objects.get(stop=self.stops[2])
+        mock_process_proof.assert_called_once_with(proof.id)
+
+    @mock.patch("delivery.sync.send_order_delivered_emails.delay")
+    def test_concurrent_duplicate_batch_is_replayed(self, mock_emails):
+        from delivery import sync
+
+        payload = {"transitions": [self._transition("t1", self.stops[1], "no_pickup", reason="Closed")]}
+        lock_driver = sync._lock_driver
+        original = {}
+
+        def original_commits_while_waiting(driver):
+            # The first request applies the batch while the retry waits for the lock.
+            if not original:
+                original["started"] = True
+                original["response"] = self.client.post(self.url, payload, format="json")
+            lock_driver(driver)
+
+        with mock.patch("delivery.sync._lock_driver", side_effect=original_commits_while_waiting):
+            response = self.client.post(self.url, payload, format="json")
+
+        self.assertEqual(original["response"].json()["results"][0]["replayed"], False)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        result = response.json()["results"][0]
+        self.assertEqual((result["result"], result["replayed"]), ("applied", True))
+        self.assertEqual(StopTransition.objects.filter(client_id="t1").count(), 1)
+
+    def test_older_transition_is_stale(self):
+        payload = {
+            "transitions": [
+                self._transition("late", self.stops[1], "no_pickup", 30),
+                self._transition("early", self.stops[1], "no_pickup", 0, reason="old"),
+            ]
+        }
+
+        response = self.client.post(self.url, payload, format="json")
+
+        results = {item["id"]: item["result"] for item in response.json()["results"]}
+        self.assertEqual(results, {"late": "applied", "early": "applied"})
+        response = self.client.post(
+            self.url,
+            {"transitions": [self._transition("older", self.stops[1], "no_pickup", 10)]},
+            format="json",
+        )
+        self.assertEqual(response.json()["results"][0]["result"], "stale")
+
+    def test_rejects_stops_on_other_drivers_routes(self):
+        other_route = DeliveryRoute.objects.create(
+            region=self.region, date=timezone.localdate() + datetime.timedelta(days=1)
+        )
+        order = Order.objects.create(full_name="Other", email="o@example.com", phone="1")
+        stop = RouteStop.objects.create(route=other_route, order=order, sequence=1)
+
+        response = self.client.post(
+            self.url,
+            {"transitions": [self._transition("x", stop, "no_pickup")]},
+            format="json",
+        )
+
+        self.assertEqual(response.json()["results"][0]["detail"], "stop_not_on_your_routes")
+        self.assertEqual(RouteStop.objects.get(pk=stop.pk).status, RouteStop.Status.PENDING)
@@ -0,0 +1,203 @@
+import io
+import tempfile
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from PIL import Image
+from rest_framework import status
+from rest_framework.test import APIClient, APITestCase
+
+from delivery.models import DeliveryProof, DeliveryRoute, Driver, RouteStop
+from delivery.tasks import process_delivery_proof
+from orders.models import Order, Region
+
+LOCAL_MEDIA = override_settings(
+    DEFAULT_FILE_STORAGE="django.core.files.storage.FileSystemStorage",
+    STORAGES={
+        "default": {"BACKEND": "django.core.files.storage.FileSystemStorage"},
+        "staticfiles": {"BACKEND": "django.contrib.staticfiles.storage.StaticFilesStorage"},
+    },
+    MEDIA_ROOT=tempfile.mkdtemp(),
+)
+
+
+def jpeg_with_exif(size=(3000, 2000)):
+    image = Image.new("RGB", size, color=(200, 30, 30))
+    exif = Image.Exif()
+    exif[0x0112] = 6  # Orientation: rotate 90° clockwise to display
+    exif[0x010F] = "PhoneMaker"
+    buffer = io.BytesIO()
+    image.save(buffer, format="JPEG", exif=exif.tobytes())
+    return buffer.getvalue()
+
+
+def create_stop(username="driver"):
+    user = get_user_model().objects.create_user(
+        username=username, email=f"{username}@example.com", password="testpass123"
+    )
+    driver = Driver.objects.create(user=user)
+    region = Region.objects.create(code=f"P{user.id}", name="Region", delivery_weekday=1)
+    route = DeliveryRoute.objects.create(region=region, driver=driver, date=timezone.now().date())
+    order = Order.objects.create(
+        full_name="John Doe",
+        email="john@example.com",
+        phone="123456789",
+        address_line1="123 Main St",
+        city="Townsville",
+        postal_code="12345",
+        region=region,
+        order_type=Order.OrderType.DELIVERY,
+    )
+    return driver, RouteStop.objects.create(route=route, order=order, sequence=1)
+
+
+@LOCAL_MEDIA
+class DirectProofUploadAPITestCase(APITestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.driver, self.stop = create_stop()
+        self.client.force_authenticate(user=self.driver.user)
+
+    def request_upload(self, stop=None):
+        url = reverse("delivery:driver-stop-proof-upload", args=[(stop or self.stop).id])
+        response = self.client.post(url, {"content_type": "image/jpeg"}, format="json")
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        return response.json()
+
+    def put_photo(self, upload, content=b"jpeg-bytes"):
+        self.assertEqual(upload["method"], "PUT")
+        return self.client.put(
+            upload["url"], data=content, content_type=upload["headers"]["Content-Type"]
+        )
+
+    @mock.patch("delivery.api.process_delivery_proof.delay")
+    def test_upload_then_confirm_marks_stop_delivered(self, process_delay):
+        reserved = self.request_upload()
+        self.assertEqual(self.put_photo(reserved["upload"]).status_code, status.HTTP_204_NO_CONTENT)
+        self.assertTrue(default_storage.exists(reserved["key"]))
+
+        url = reverse("delivery:driver-stop-mark-delivered", args=[self.stop.id])
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(
+                url, {"upload_token": reserved["upload_token"]}, format="json"
+            )
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response.json()["has_proof"])
+        proof = DeliveryProof.objects.get(stop=self.stop)
+        self.assertEqual(proof.photo.name, reserved["key"])
+        process_delay.assert_called_once_with(proof.id)
+
+        self.stop.refresh_from_db()
+        self.assertEqual(self.stop.status, RouteStop.Status.DELIVERED)
+
+    def test_confirm_without_uploaded_photo_is_rejected(self):
+        reserved = self.request_upload()
+        url = reverse("delivery:driver-stop-mark-delivered", args=[self.stop.id])
+        response = self.client.post(url, {"upload_token": reserved["upload_token"]}, format="json")
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.stop.refresh_from_db()
+        self.assertEqual(self.stop.status, RouteStop.Status.PENDING)
+
+    def test_token_for_another_stop_is_rejected(self):
+        _other_driver, other_stop = create_stop("other")
+        other_stop.route.driver = self.driver
+        other_stop.route.save(update_fields=["driver"])
+        reserved = self.request_upload(stop=other_stop)
+        self.put_photo(reserved["upload"])
+
+        url = reverse("delivery:driver-stop-mark-delivered", args=[self.stop.id])
+        response = self.client.post(url, {"upload_token": reserved["upload_token"]}, format="json")
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertFalse(DeliveryProof.objects.filter(stop=self.stop).exists())
+
+    def test_token_cannot_be_uploaded_twice(self):
+        reserved = self.request_upload()
+        self.put_photo(reserved["upload"])
+        response = self.put_photo(reserved["upload"], content=b"other")
+        self.assertEqual(response.status_code, status.HTTP_409_CONFLICT)
+
+    def test_cannot_reserve_upload_for_another_drivers_stop(self):
+        _other_driver, other_stop = create_stop("other")
+        url = reverse("delivery:driver-stop-proof-upload", args=[other_stop.id])
+        response = self.client.post(url, {}, format="json")
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_formats_that_cannot_be_processed_are_refused(self):
+        url = reverse("delivery:driver-stop-proof-upload", args=[self.stop.id])
+        response = self.client.post(url, {"content_type": "image/heic"}, format="json")
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    @mock.patch("delivery.sync.process_delivery_proof.delay")
+    @mock.patch("delivery.sync.send_order_delivered_emails.delay")
+    def test_sync_transition_can_confirm_an_upload(self, _emails_delay, process_delay):
+        reserved = self.request_upload()
+        self.put_photo(reserved["upload"])
+
+        transition = {
+            "id": "t-1",
+            "stop_id": self.stop.id,
+            "status": RouteStop.Status.DELIVERED,
+            "occurred_at": timezone.now().isoformat(),
+            "upload_token": reserved["upload_token"],
+        }
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(
+                reverse("delivery:driver-stop-sync"), {"transitions": [transition]}, format="json"
+            )
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.json()["results"][0]["result"], "applied")
+        proof = DeliveryProof.objects.get(stop=self.stop)
+        self.assertEqual(proof.photo.name, reserved["key"])
+        process_delay.assert_called_once_with(proof.id)
+
+
+@LOCAL_MEDIA
+class ProcessDeliveryProofTaskTestCase(TestCase):
+    def test_photo_is_resized_stripped_and_thumbnailed(self):
+        _driver, stop = create_stop()
+        proof = DeliveryProof(stop=stop)
+        proof.photo.save("original.jpg", ContentFile(jpeg_with_exif()), save=False)
+        proof.save()
+        original_name = proof.photo.name
+
+        result = process_delivery_proof(proof.id)
+
+        self.assertTrue(result["processed"])
+        proof.refresh_from_db()
+        self.assertIsNotNone(proof.processed_at)
+        self.assertFalse(default_storage.exists(original_name))
+
+        with proof.photo.open("rb") as handle:
+            photo = Image.open(handle)
+            photo.load()
+        # The EXIF orientation was applied before it was dropped.
+        self.assertEqual(photo.size, (1067, 1600))
+        self.assertEqual(len(photo.getexif()), 0)
+
+        with proof.photo_thumbnail.open("rb") as handle:
+            thumbnail = Image.open(handle)
+            thumbnail.load()
+        self.assertLessEqual(max(thumbnail.size), 320)
+        self.assertEqual(photo.format, thumbnail.format)
+
+    def test_unreadable_upload_is_left_alone(self):
+        _driver, stop = create_stop()
+        proof = DeliveryProof(stop=stop)
+        proof.photo.save("proof.jpg", ContentFile(b"not an image"), save=False)
+        proof.save()
+
+        result = process_delivery_proof(proof.id)
+
+        self.assertFalse(result["processed"])
+        proof.refresh_from_db()
+        self.assertIsNone(proof.processed_at)
+        self.assertTrue(default_storage.exists(proof.photo.name))
@@ -0,0 +1,69 @@
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import TestCase
+from django.utils import timezone
+
+from delivery.models import DeliveryRoute, RouteStop
+from orders.models import Order, Region
+
+
+class RouteCountersTests(TestCase):
+    def setUp(self):
+        self.region = Region.objects.create(
+            code="cnt", name="Counters", delivery_weekday=1, min_orders=0
+        )
+        self.route = DeliveryRoute.objects.create(region=self.region, date=timezone.localdate())
+
+    def _stop(self, sequence):
+        order = Order.objects.create(
+            full_name=f"Customer {sequence}",
+            email=f"c{sequence}@example.com",
+            phone="1",
+            region=self.region,
+        )
+        return RouteStop.objects.create(route=self.route, order=order, sequence=sequence)
+
+    def _counters(self):
+        route = DeliveryRoute.objects.get(pk=self.route.pk)
+        return (
+            route.pending_count,
+            route.delivered_count,
+            route.no_pickup_count,
+            route.total_count,
+            route.is_completed,
+        )
+
+    def test_counters_follow_stop_transitions(self):
+        stops = [self._stop(sequence) for sequence in range(1, 4)]
+        self.assertEqual(self._counters(), (3, 0, 0, 3, False))
+        self.assertEqual(self.route.stops_count, 3)
+
+        stop = RouteStop.objects.get(pk=stops[0].pk)
+        stop.status = RouteStop.Status.DELIVERED
+        stop.save(update_fields=["status"])
+        stop.save(update_fields=["status"])  # saving again must not count twice
+        stop = RouteStop.objects.get(pk=stops[1].pk)
+        stop.status = RouteStop.Status.NO_PICKUP
+        stop.save()
+        self.assertEqual(self._counters(), (1, 1, 1, 3, False))
+
+        RouteStop.objects.get(pk=stops[2].pk).delete()
+        self.assertEqual(self._counters(), (0, 1, 1, 2, False))
+
+        self.route.refresh_completion_status()
+        self.assertTrue(self.route.is_completed)
+
+    def test_rebuild_command_repairs_drift(self):
+        self._stop(1)
+        self._stop(2)
+        RouteStop.objects.filter(route=self.route, sequence=1).update(
+            status=RouteStop.Status.DELIVERED
+        )
+        DeliveryRoute.objects.filter(pk=self.route.pk).update(total_count=9)
+
+        out = StringIO()
+        call_command("rebuild_route_counters", stdout=out)
+
+        self.assertIn("Repaired counters on 1 route(s)", out.getvalue())
+        self.assertEqual(self._counters(), (1, 1, 0, 2, False))
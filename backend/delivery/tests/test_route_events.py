@@ -0,0 +1,158 @@
+import asyncio
+import json
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from delivery.events import route_changes
+from delivery.models import DeliveryRoute, Driver, RouteSnapshot, RouteStop
+from delivery.snapshots import refresh_route_snapshots
+from orders.models import Order, Region
+
+
+class FakeHub:
+    def __init__(self, events):
+        self.events = events
+        self.channels = None
+        self.released = False
+
+    async def listen(self, channels):
+        self.channels = channels
+        queue = asyncio.Queue()
+        for event in self.events:
+            queue.put_nowait(event)
+        return queue
+
+    async def unlisten(self, channels, queue):
+        self.released = True
+
+
+class RouteEventTests(TestCase):
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            username="events-driver", email="events-driver@example.com", password="x"
+        )
+        self.driver = Driver.objects.create(user=self.user)
+        self.region = Region.objects.create(code="EV", name="Events", delivery_weekday=1)
+        self.route = DeliveryRoute.objects.create(
+            region=self.region, driver=self.driver, date=timezone.now().date()
+        )
+        self.stops = []
+        for sequence in (1, 2):
+            order = Order.objects.create(
+                full_name=f"Customer {sequence}",
+                email=f"e{sequence}@example.com",
+                phone="123",
+                address_line1=f"{sequence} Main St",
+                city="Town",
+                postal_code="A1A1A1",
+                region=self.region,
+                order_type=Order.OrderType.DELIVERY,
+            )
+            self.stops.append(
+                RouteStop.objects.create(route=self.route, order=order, sequence=sequence)
+            )
+        self.url = reverse("delivery:route-events", args=[self.route.id])
+
+    def test_route_changes_lists_changed_stops_and_counters(self):
+        old = {
+            "route": {
+                "stops": [
+                    {"id": 1, "status": "pending", "sequence": 1},
+                    {"id": 2, "status": "pending", "sequence": 2},
+                    {"id": 3, "status": "pending", "sequence": 3},
+                ],
+                "pending_count": 3,
+                "delivered_count": 0,
+            }
+        }
+        new = {
+            "route": {
+                "stops": [
+                    {"id": 2, "status": "pending", "sequence": 2},
+                    {"id": 1, "status": "delivered", "sequence": 1},
+                ],
+                "pending_count": 1,
+                "delivered_count": 1,
+                "merged_into_id": 9,
+            }
+        }
+        changes = route_changes(old, new)
+        self.assertEqual(
+            changes[0], {"type": "stop", "stop_id": 1, "status": "delivered", "sequence": 1}
+        )
+        self.assertEqual(changes[1], {"type": "stop_removed", "stop_id": 3})
+        self.assertEqual(changes[2], {"type": "merged", "into": 9})
+        self.assertEqual(changes[3]["type"], "route")
+        self.assertEqual(changes[3]["pending_count"], 1)
+        self.assertEqual(route_changes({}, new), [{"type": "created"}])
+
+    def test_version_bump_is_published_after_commit(self):
+        refresh_route_snapshots([self.route.id])
+        RouteStop.objects.filter(pk=self.stops[0].pk).update(status=RouteStop.Status.DELIVERED)
+
+        with mock.patch("delivery.snapshots.publish_route_events") as publish:
+            with self.captureOnCommitCallbacks(execute=True):
+                refresh_route_snapshots([self.route.id])
+                publish.assert_not_called()
+
+        (events,), _ = publish.call_args
+        self.assertEqual(len(events), 1)
+        self.assertEqual(events[0]["route_id"], self.route.id)
+        self.assertEqual(events[0]["version"], 2)
+        self.assertEqual(events[0]["date"], self.route.date)
+        self.assertIn(
+            {
+                "type": "stop",
+                "stop_id": self.stops[0].id,
+                "status": RouteStop.Status.DELIVERED,
+                "sequence": 1,
+            },
+            events[0]["changes"],
+        )
+
+    def test_unchanged_rebuild_publishes_nothing(self):
+        refresh_route_snapshots([self.route.id])
+        with mock.patch("delivery.snapshots.publish_route_events") as publish:
+            with self.captureOnCommitCallbacks(execute=True):
+                refresh_route_snapshots([self.route.id])
+        publish.assert_not_called()
+
+    def test_stream_requires_the_routes_driver_or_staff(self):
+        self.assertEqual(self.client.get(self.url).status_code, 403)
+
+        other = get_user_model().objects.create_user(
+            username="events-other", email="events-other@example.com", password="x"
+        )
+        self.client.force_login(other)
+        self.assertEqual(self.client.get(self.url).status_code, 403)
+        missing = reverse("delivery:route-events", args=[self.route.id + 100])
+        self.assertEqual(self.client.get(missing).status_code, 404)
+
+        date_url = reverse("delivery:route-date-events", args=[self.route.date.isoformat()])
+        self.assertEqual(self.client.get(date_url).status_code, 403)
+
+    @override_settings(ROUTE_EVENTS_MAX_STREAM_SECONDS=0.2, ROUTE_EVENTS_HEARTBEAT_SECONDS=0.05)
+    async def test_stream_sends_queued_events_then_closes(self):
+        await self.async_client.aforce_login(self.user)
+        event = {"route_id": self.route.id, "version": 2, "changes": [{"type": "created"}]}
+        hub = FakeHub([event])
+        with mock.patch("delivery.streams.route_event_hub", return_value=hub):
+            response = await self.async_client.get(self.url, headers={"Last-Event-ID": "7"})
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(response["Content-Type"], "text/event-stream")
+            body = "".join([chunk.decode() async for chunk in response.streaming_content])
+
+        self.assertTrue(hub.released)
+        self.assertEqual(hub.channels, [f"delivery:routes:{self.route.id}"])
+        blocks = body.strip().split("\n\n")
+        self.assertTrue(blocks[0].startswith("retry: "))
+        # The snapshot is at version 1, so a client that last saw version 7 must refetch.
+        self.assertTrue(blocks[1].startswith("event: resync\nid: 1\n"))
+        self.assertEqual(blocks[2].split("\n")[:2], ["event: route", "id: 2"])
+        self.assertEqual(json.loads(blocks[2].split("data: ")[1]), event)
+        self.assertIn(": keepalive", blocks[3:])
+        self.assertTrue(await RouteSnapshot.objects.filter(route=self.route).aexists())
@@ -0,0 +1,187 @@
+import tempfile
+
+from django.contrib.auth import get_user_model
+from django.core.files.base import ContentFile
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from delivery.models import DeliveryProof, DeliveryRoute, Driver, RouteSnapshot, RouteStop
+from delivery.sequencing import apply_stop_order
+from delivery.snapshots import mark_route_snapshots_stale, refresh_route_snapshots
+from orders.models import Order, OrderItem, Region
+from products.models import Product
+
+
+@override_settings(
+    DEFAULT_FILE_STORAGE="django.core.files.storage.FileSystemStorage",
+    STORAGES={
+        "default": {"BACKEND": "django.core.files.storage.FileSystemStorage"},
+        "staticfiles": {"BACKEND": "django.contrib.staticfiles.storage.StaticFilesStorage"},
+    },
+    MEDIA_ROOT=tempfile.mkdtemp(),
+)
+class RouteSnapshotTests(TestCase):
+    def setUp(self):
+        user = get_user_model().objects.create_user(
+            username="snapshot-driver", email="snapshot-driver@example.com", password="x"
+        )
+        self.driver = Driver.objects.create(user=user)
+        self.region = Region.objects.create(code="SN", name="Snapshots", delivery_weekday=1)
+        self.route = DeliveryRoute.objects.create(
+            region=self.region, driver=self.driver, date=timezone.now().date()
+        )
+        product = Product.objects.create(name="Ribeye", slug="snapshot-ribeye", price_cents=1000)
+        self.stops = []
+        for sequence in (1, 2, 3):
+            order = Order.objects.create(
+                full_name=f"Customer {sequence}",
+                email=f"c{sequence}@example.com",
+                phone="123",
+                address_line1=f"{sequence} Main St",
+                city="Town",
+                postal_code="A1A1A1",
+                region=self.region,
+                order_type=Order.OrderType.DELIVERY,
+            )
+            OrderItem.objects.create(
+                order=order,
+                product=product,
+                product_name="Ribeye",
+                quantity=sequence,
+                unit_price_cents=1000,
+                total_cents=1000 * sequence,
+            )
+            self.stops.append(
+                RouteStop.objects.create(route=self.route, order=order, sequence=sequence)
+            )
+        self.client = APIClient()
+        self.client.force_authenticate(user=user)
+        self.today_url = reverse("delivery:driver-routes-today")
+        self.detail_url = reverse("delivery:driver-route-detail", args=[self.route.id])
+
+    def test_read_is_served_from_snapshot_with_etag(self):
+        first = self.client.get(self.today_url)
+        self.assertEqual(first.status_code, status.HTTP_200_OK)
+        self.assertEqual([stop["sequence"] for stop in first.json()[0]["stops"]], [1, 2, 3])
+        self.assertEqual(first.json()[0]["stops"][2]["items"][0]["quantity"], 3)
+        etag = first["ETag"]
+
+        with CaptureQueriesContext(connection) as queries:
+            second = self.client.get(self.today_url)
+        self.assertEqual(second.json(), first.json())
+        self.assertEqual(second["ETag"], etag)
+        # Driver lookups for the permission and the view, then the routes joined to snapshots.
+        self.assertLessEqual(len(queries), 3)
+
+        not_modified = self.client.get(self.today_url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(not_modified.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(not_modified["ETag"], etag)
+
+    def test_stop_update_bumps_version_and_etag(self):
+        etag = self.client.get(self.detail_url)["ETag"]
+        version = RouteSnapshot.objects.get(route=self.route).version
+
+        url = reverse("delivery:driver-stop-mark-no-pickup", args=[self.stops[0].id])
+        self.assertEqual(self.client.post(url).status_code, status.HTTP_200_OK)
+        self.assertTrue(RouteSnapshot.objects.get(route=self.route).stale)
+
+        response = self.client.get(self.detail_url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(response["ETag"], etag)
+        self.assertEqual(response.json()["stops"][0]["status"], RouteStop.Status.NO_PICKUP)
+        self.assertEqual(RouteSnapshot.objects.get(route=self.route).version, version + 1)
+
+    def test_snapshot_is_rebuilt_after_commit(self):
+        refresh_route_snapshots([self.route.id])
+        with self.captureOnCommitCallbacks(execute=True):
+            apply_stop_order(self.route.id, [stop.id for stop in reversed(self.stops)])
+            mark_route_snapshots_stale([self.route.id])
+
+        snapshot = RouteSnapshot.objects.get(route=self.route)
+        self.assertFalse(snapshot.stale)
+        self.assertEqual(snapshot.version, 2)
+        self.assertEqual(
+            [stop["id"] for stop in snapshot.payload["driver"]["stops"]],
+            [stop.id for stop in reversed(self.stops)],
+        )
+
+    def test_unchanged_rebuild_keeps_version(self):
+        refresh_route_snapshots([self.route.id])
+        self.route.save()
+        snapshot = RouteSnapshot.objects.get(route=self.route)
+        self.assertTrue(snapshot.stale)
+
+        refresh_route_snapshots([self.route.id])
+        snapshot.refresh_from_db()
+        self.assertFalse(snapshot.stale)
+        self.assertEqual(snapshot.version, 1)
+
+    def test_order_and_proof_changes_mark_snapshot_stale(self):
+        refresh_route_snapshots([self.route.id])
+        order = self.stops[1].order
+        order.buzz_code = "42"
+        order.save()
+        self.assertTrue(RouteSnapshot.objects.get(route=self.route).stale)
+
+        refresh_route_snapshots([self.route.id])
+        proof = DeliveryProof(stop=self.stops[1])
+        proof.photo.save("proof.jpg", ContentFile(b"img"), save=True)
+        self.assertTrue(RouteSnapshot.objects.get(route=self.route).stale)
+
+        stop = self.client.get(self.detail_url).json()["stops"][1]
+        self.assertEqual(stop["buzz_code"], "42")
+        self.assertTrue(stop["has_proof"])
+        self.assertTrue(stop["proof_photo_url"].startswith("http://testserver/media/"))
+
+    def test_region_user_and_item_changes_mark_snapshot_stale(self):
+        [snapshot] = refresh_route_snapshots([self.route.id])
+
+        def changed(save):
+            refresh_route_snapshots([self.route.id])
+            save()
+            snapshot.refresh_from_db()
+            return snapshot.stale
+
+        self.region.name = "Renamed"
+        self.assertTrue(changed(self.region.save))
+        user = self.driver.user
+        user.first_name = "Dana"
+        self.assertTrue(changed(user.save))
+        self.assertFalse(changed(lambda: user.save(update_fields=["last_login"])))
+        item = self.stops[0].order.items.get()
+        item.quantity = 9
+        self.assertTrue(changed(item.save))
+        self.assertTrue(changed(item.delete))
+
+        route = self.client.get(self.detail_url).json()
+        self.assertEqual(route["region_name"], "Renamed")
+        self.assertEqual(route["driver_name"], "Dana")
+        self.assertEqual(route["stops"][0]["items"], [])
+
+    def test_deleting_the_driver_or_a_preferred_region_marks_snapshot_stale(self):
+        other = Region.objects.create(code="SO", name="Other", delivery_weekday=2)
+        self.driver.preferred_region = other
+        self.driver.save()
+        refresh_route_snapshots([self.route.id])
+        other.delete()
+        self.assertTrue(RouteSnapshot.objects.get(route=self.route).stale)
+
+        refresh_route_snapshots([self.route.id])
+        self.driver.user.delete()
+        snapshot = RouteSnapshot.objects.get(route=self.route)
+        self.assertTrue(snapshot.stale)
+        [snapshot] = refresh_route_snapshots([self.route.id])
+        self.assertEqual(snapshot.payload["route"]["driver_name"], "Unassigned")
+
+    def test_route_stops_view_reads_snapshot(self):
+        url = reverse("delivery:route-stops", args=[self.route.id])
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([stop["id"] for stop in response.json()], [s.id for s in self.stops])
+        self.assertEqual(response.json()[0]["order"]["items"][0]["product_name"], "Ribeye")
+        self.assertIn("ETag", response)
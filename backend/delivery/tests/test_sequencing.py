@@ -0,0 +1,73 @@
+import random
+
+from django.db import IntegrityError, connection, transaction
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from delivery.models import DeliveryRoute, RouteStop
+from delivery.sequencing import apply_stop_order, resequence_stops
+from orders.models import Order, Region
+
+
+class ResequenceStopsTests(TestCase):
+    def setUp(self):
+        self.region = Region.objects.create(
+            code="seq", name="Seq", delivery_weekday=1, min_orders=0
+        )
+
+    def _route_with_stops(self, count):
+        route = DeliveryRoute.objects.create(region=self.region, date=timezone.localdate())
+        orders = Order.objects.bulk_create(
+            Order(full_name=f"Customer {i}", email=f"c{i}@example.com", phone="1", region=self.region)
+            for i in range(count)
+        )
+        RouteStop.objects.bulk_create(
+            RouteStop(route=route, order=order, sequence=index)
+            for index, order in enumerate(orders, start=1)
+        )
+        return route
+
+    def test_applies_full_permutation_in_one_statement(self):
+        route = self._route_with_stops(200)
+        stop_ids = list(route.stops.order_by("sequence").values_list("id", flat=True))
+        shuffled = stop_ids[:]
+        random.Random(7).shuffle(shuffled)
+
+        with CaptureQueriesContext(connection) as queries:
+            updated = apply_stop_order(route.id, shuffled)
+
+        self.assertEqual(updated, 200)
+        # Elsewhere the constraint is checked per row: find a free range, park, place.
+        self.assertEqual(len(queries), 1 if connection.vendor == "postgresql" else 3)
+        self.assertEqual(
+            list(route.stops.order_by("sequence").values_list("id", flat=True)), shuffled
+        )
+        self.assertEqual(
+            list(route.stops.order_by("sequence").values_list("sequence", flat=True)),
+            list(range(1, 201)),
+        )
+
+    def test_moves_stops_between_routes(self):
+        source = self._route_with_stops(2)
+        target = DeliveryRoute.objects.create(region=self.region, date=source.date)
+        source_ids = list(source.stops.order_by("sequence").values_list("id", flat=True))
+
+        resequence_stops([(source_ids[0], target.id, 5), (source_ids[1], target.id, 6)])
+
+        self.assertEqual(
+            list(target.stops.values_list("id", "sequence")),
+            [(source_ids[0], 5), (source_ids[1], 6)],
+        )
+        self.assertFalse(source.stops.exists())
+        self.assertEqual(resequence_stops([]), 0)
+
+    def test_route_sequences_stay_unique(self):
+        route = self._route_with_stops(2)
+        order = Order.objects.create(full_name="Late", email="late@example.com", phone="1")
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            RouteStop.objects.create(route=route, order=order, sequence=2)
+        stop_ids = list(route.stops.order_by("sequence").values_list("id", flat=True))
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            # Onto a sequence held by a stop that isn't moving.
+            resequence_stops([(stop_ids[0], route.id, 2)])
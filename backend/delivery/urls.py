@@ -4,17 +4,24 @@ from .api import (
     DriverTodayRoutesView,
     DriverUpcomingRoutesView,
     DriverRouteDetailView,
+    DriverProofUploadRequestView,
+    DriverLocationView,
+    DriverProofUploadView,
+    DriverStopSyncView,
     MarkStopDeliveredView,
     MarkStopNoPickupView,
     MyRoutesView,
     RouteStopsView,
 )
+from .streams import date_events, route_events
 
 app_name = "delivery"
 
 urlpatterns = [
     path("my-routes/", MyRoutesView.as_view(), name="my-routes"),
     path("routes/<int:route_id>/stops/", RouteStopsView.as_view(), name="route-stops"),
+    path("routes/<int:route_id>/events/", route_events, name="route-events"),
+    path("routes/by-date/<str:date>/events/", date_events, name="route-date-events"),
     path(
         "driver/routes/today/",
         DriverTodayRoutesView.as_view(),
@@ -30,11 +37,31 @@ urlpatterns = [
         DriverRouteDetailView.as_view(),
         name="driver-route-detail",
     ),
+    path(
+        "driver/locations/",
+        DriverLocationView.as_view(),
+        name="driver-locations",
+    ),
+    path(
+        "driver/stops/sync/",
+        DriverStopSyncView.as_view(),
+        name="driver-stop-sync",
+    ),
     path(
         "driver/stops/<int:stop_id>/mark-delivered/",
         MarkStopDeliveredView.as_view(),
         name="driver-stop-mark-delivered",
     ),
+    path(
+        "driver/stops/<int:stop_id>/proof-upload/",
+        DriverProofUploadRequestView.as_view(),
+        name="driver-stop-proof-upload",
+    ),
+    path(
+        "driver/proof-uploads/<str:token>/",
+        DriverProofUploadView.as_view(),
+        name="driver-proof-upload",
+    ),
     path(
         "driver/stops/<int:stop_id>/mark-no-pickup/",
         MarkStopNoPickupView.as_view(),
@@ -1,7 +1,7 @@
 from __future__ import annotations
 
 import logging
-from typing import Iterable, Optional, Sequence, Tuple
+from typing import Iterable, List, Optional, Sequence, Tuple
 
 from celery import shared_task
 from django.conf import settings
@@ -179,6 +179,13 @@ def send_password_reset_email(user, token: str) -> Optional[EmailNotification]:
 
 
 def _format_eta_line(order: Order) -> str:
+    if order.delivery_window_start and order.delivery_window_end:
+        start = timezone.localtime(order.delivery_window_start)
+        end = timezone.localtime(order.delivery_window_end)
+        return (
+            f"Your order is scheduled for delivery on {start.strftime('%Y-%m-%d')} "
+            f"between {start.strftime('%H:%M')} and {end.strftime('%H:%M')}."
+        )
     if order.estimated_delivery_at:
         local_eta = timezone.localtime(order.estimated_delivery_at)
         return f"Your order is scheduled for delivery on {local_eta.strftime('%Y-%m-%d around %H:%M')}."
@@ -451,3 +458,22 @@ def send_order_delivered_email_once(order_id: int | Order) -> Optional[int]:
 
 send_order_receipt_email_task = send_order_receipt_email_once
 send_order_delivered_email_task = send_order_delivered_email_once
+
+
+@shared_task(name="notifications.send_order_delivered_emails", queue="emails")
+def send_order_delivered_emails(order_ids: List[int]) -> List[Optional[int]]:
+    """
+    Send the delivered email for several orders from one task (used by driver batch sync).
+    """
+    orders = Order.objects.in_bulk(order_ids)
+    results: List[Optional[int]] = []
+    for order_id in order_ids:
+        order = orders.get(order_id)
+        try:
+            results.append(send_order_delivered_email_once(order or order_id))
+        except Exception:
+            logger.error(
+                "order_delivered_email_failed", extra={"order_id": order_id}, exc_info=True
+            )
+            results.append(None)
+    return results
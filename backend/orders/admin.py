@@ -8,6 +8,8 @@ import re
 from django.utils.html import format_html
 
 from notifications.models import EmailNotification
+from shop.admin_search import TrigramSearchMixin
+from payments.tasks import refund_orders_task
 
 from .models import Order, OrderItem, Region
 
@@ -75,7 +77,7 @@ class RegionAdmin(admin.ModelAdmin):
 
 
 @admin.register(Order)
-class OrderAdmin(admin.ModelAdmin):
+class OrderAdmin(TrigramSearchMixin, admin.ModelAdmin):
     list_display = (
         "id",
         "full_name",
@@ -94,7 +96,8 @@ class OrderAdmin(admin.ModelAdmin):
         ("created_at", admin.DateFieldListFilter),
         "region",
     )
-    search_fields = ("full_name", "email", "id")
+    search_fields = ("=id", "full_name", "email", "phone", "postal_code")
+    fuzzy_search_fields = ("full_name", "email")
     readonly_fields = (
         "delivery_state_badge",
         "expected_delivery_display",
@@ -142,6 +145,8 @@ class OrderAdmin(admin.ModelAdmin):
                 "fields": (
                     "region",
                     "estimated_delivery_at",
+                    "delivery_window_start",
+                    "delivery_window_end",
                     "delivered_at",
                 )
             },
@@ -164,6 +169,7 @@ class OrderAdmin(admin.ModelAdmin):
     actions = [
         "mark_delivered",
         "mark_not_delivered",
+        "refund_via_stripe",
     ]
 
     def delivery_state_badge(self, obj):
@@ -268,6 +274,15 @@ class OrderAdmin(admin.ModelAdmin):
         )
         self.message_user(request, f"{updated} order(s) marked Not Delivered.")
 
+    @admin.action(description="Refund via Stripe")
+    def refund_via_stripe(self, request, queryset):
+        order_ids = list(queryset.values_list("id", flat=True))
+        async_result = refund_orders_task.delay(order_ids)
+        self.message_user(
+            request,
+            f"Queued refunds for {len(order_ids)} order(s) (task id={async_result.id}).",
+        )
+
     def _compute_expected_delivery_date(self, obj):
         if not obj.region:
             return None
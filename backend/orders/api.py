@@ -1,24 +1,83 @@
+from django.db.models import Prefetch
 from django.http import Http404
 from django.shortcuts import get_object_or_404
 from rest_framework import permissions, status
+from rest_framework.pagination import CursorPagination
 from rest_framework.response import Response
 from rest_framework.views import APIView
 
-from accounts.models import CustomerProfile
-from .models import Order, Region
-from .serializers import OrderCreateSerializer, OrderDetailSerializer, RegionSerializer
+from shop.conditional import conditional_get, make_etag, queryset_fingerprint
+from shop.fields import FULL, FieldSelection, sparse_queryset
+from shop.identity import identity_for
+from .models import Order, OrderItem, Region
+from .serializers import (
+    OrderCreateSerializer,
+    OrderDetailSerializer,
+    OrderItemSerializer,
+    RegionSerializer,
+)
+
+
+def _select_region(queryset, selection):
+    return queryset.select_related("region")
+
+
+def _select_product(queryset, selection):
+    return queryset.select_related("product")
+
+
+def _prefetch_items(queryset, selection):
+    items = sparse_queryset(
+        OrderItem.objects.all(),
+        OrderItemSerializer,
+        selection,
+        loaders={"product_id": _select_product, "image_url": _select_product},
+        always=("order",),
+    )
+    return queryset.prefetch_related(Prefetch("items", queryset=items))
+
+
+def order_detail_queryset(selection: FieldSelection = FULL, always=()):
+    """
+    Orders with what OrderDetailSerializer renders for `selection` loaded in a fixed
+    number of queries; `always` are columns the caller reads besides.
+    """
+    return sparse_queryset(
+        Order.objects.all(),
+        OrderDetailSerializer,
+        selection,
+        loaders={
+            "region": _select_region,
+            "region_name": _select_region,
+            "expected_delivery_date": _select_region,
+            "items": _prefetch_items,
+        },
+        always=always,
+    )
+
+
+class OrderHistoryPagination(CursorPagination):
+    # Newest first; id breaks ties between orders created in the same instant.
+    ordering = ("-created_at", "-id")
+    page_size = 20
+    page_size_query_param = "page_size"
+    max_page_size = 100
 
 
 class OrderListView(APIView):
     permission_classes = [permissions.IsAuthenticated]
 
     def get(self, request):
-        orders = Order.objects.filter(user=request.user).order_by("-created_at")[:50]
-        serializer = OrderDetailSerializer(orders, many=True)
-        return Response(serializer.data)
+        selection = FieldSelection.from_request(request)
+        # The paginator reads the ordering columns of the page's first and last orders.
+        orders = order_detail_queryset(selection, always=("created_at",)).filter(user=request.user)
+        paginator = OrderHistoryPagination()
+        page = paginator.paginate_queryset(orders, request, view=self)
+        serializer = OrderDetailSerializer(page, many=True, context={"request": request})
+        return paginator.get_paginated_response(serializer.data)
 
     def post(self, request):
-        profile, _ = CustomerProfile.objects.get_or_create(user=request.user)
+        profile = identity_for(request).customer_profile
 
         payload = request.data.copy()
 
@@ -74,16 +133,22 @@ class OrderDetailView(APIView):
     permission_classes = [permissions.IsAuthenticated]
 
     def get(self, request, pk):
-        order = get_object_or_404(Order, pk=pk)
-        if order.user != request.user:
+        selection = FieldSelection.from_request(request)
+        order = get_object_or_404(order_detail_queryset(selection, always=("user",)), pk=pk)
+        if order.user_id != request.user.id:
             raise Http404
-        serializer = OrderDetailSerializer(order)
+        serializer = OrderDetailSerializer(order, context={"request": request})
         return Response(serializer.data)
 
 
+def regions_etag(request, *args, **kwargs):
+    return make_etag(request, *queryset_fingerprint(Region.objects.all()))
+
+
 class RegionListView(APIView):
     permission_classes = [permissions.AllowAny]
 
+    @conditional_get(etag_func=regions_etag)
     def get(self, _request):
         regions = Region.objects.all().order_by("code")
         data = RegionSerializer(regions, many=True).data
@@ -0,0 +1,115 @@
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.db.models import Count, F, Sum
+from django.utils import timezone
+
+from delivery.models import DeliveryRoute, Driver, RouteStop
+from orders.models import Order
+from orders.tasks import STALE_PENDING_ORDER_AGE
+
+
+def hot_queries():
+    """
+    (label, queryset) pairs mirroring the filters of the busiest ORM queries.
+
+    Keep these in step with the code they copy: the point is to see in review when a change
+    to a query (or an index) turns an index scan into a full table scan.
+    """
+    now = timezone.now()
+    today = timezone.localdate()
+    driver_id = Driver.objects.values_list("id", flat=True).first() or 0
+    user_id = Order.objects.exclude(user=None).values_list("user_id", flat=True).first() or 0
+    route_id = DeliveryRoute.objects.values_list("id", flat=True).first() or 0
+    dashboard_statuses = [Order.Status.PAID, Order.Status.COMPLETED, Order.Status.CANCELLED]
+
+    return [
+        (
+            "generate_delivery_routes: eligible orders",
+            Order.objects.select_related("region")
+            .filter(
+                status=Order.Status.PAID,
+                order_type=Order.OrderType.DELIVERY,
+                region__isnull=False,
+                route_stop__isnull=True,
+            )
+            .order_by("created_at", "id"),
+        ),
+        (
+            "expire_stale_pending_orders: next batch",
+            Order.objects.filter(
+                status=Order.Status.PENDING,
+                created_at__lt=now - STALE_PENDING_ORDER_AGE,
+            )
+            .order_by("created_at", "id")
+            .values_list("created_at", "id")[:500],
+        ),
+        (
+            "OrderListView: customer order history page",
+            Order.objects.filter(user_id=user_id).order_by("-created_at", "-id")[:21],
+        ),
+        (
+            "AdminDashboardView: paid sales total",
+            Order.objects.filter(status=Order.Status.PAID).values("status").annotate(
+                total_sales_cents=Sum("total_cents")
+            ),
+        ),
+        (
+            "AdminDashboardView: top regions",
+            Order.objects.filter(status__in=dashboard_statuses, region__isnull=False)
+            .values(code=F("region__code"), name=F("region__name"))
+            .annotate(order_count=Count("id"))
+            .order_by("-order_count", "code")[:5],
+        ),
+        (
+            "Driver routes for a day",
+            DeliveryRoute.objects.filter(
+                driver_id=driver_id, date=today, merged_into__isnull=True
+            ).order_by("region__code", "id"),
+        ),
+        (
+            "Driver upcoming routes",
+            DeliveryRoute.objects.filter(
+                driver_id=driver_id,
+                date__gt=today,
+                is_completed=False,
+                merged_into__isnull=True,
+            ).order_by("date", "id"),
+        ),
+        (
+            "optimize_future_routes: open future routes",
+            DeliveryRoute.objects.filter(date__gt=today, is_completed=False).order_by("date", "id"),
+        ),
+        (
+            "Open stops on a route",
+            RouteStop.objects.filter(route_id=route_id).exclude(
+                status__in=[RouteStop.Status.DELIVERED, RouteStop.Status.NO_PICKUP]
+            ),
+        ),
+        (
+            "Stripe reconciliation: orders by PaymentIntent",
+            Order.objects.filter(stripe_payment_intent_id__in=["pi_sample_1", "pi_sample_2"]),
+        ),
+    ]
+
+
+class Command(BaseCommand):
+    help = "Print the database EXPLAIN plan of each hot ORM query."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--analyze",
+            action="store_true",
+            help="Run the queries and include actual timings (PostgreSQL only).",
+        )
+
+    def handle(self, *args, **options):
+        explain_options = {}
+        if connection.vendor == "postgresql":
+            explain_options = {"analyze": options["analyze"], "buffers": options["analyze"]}
+        elif options["analyze"]:
+            self.stderr.write(f"--analyze is ignored on {connection.vendor}.")
+
+        for label, queryset in hot_queries():
+            self.stdout.write(self.style.MIGRATE_HEADING(f"== {label}"))
+            self.stdout.write(queryset.explain(**explain_options))
+            self.stdout.write("")
@@ -0,0 +1,20 @@
+# Generated by Django 5.2.18 on 2026-10-19 02:36
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orders', '0010_order_subscription'),
+        ('subscriptions', '0001_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(fields=['stripe_payment_intent_id'], name='orders_orde_stripe__d5f9a9_idx'),
+        ),
+    ]
@@ -0,0 +1,20 @@
+# Generated by Django 5.2.18 on 2026-10-19 02:42
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orders', '0011_order_stripe_payment_intent_id_index'),
+        ('subscriptions', '0001_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(condition=models.Q(('status', 'pending')), fields=['status', 'created_at'], name='order_pending_created_idx'),
+        ),
+    ]
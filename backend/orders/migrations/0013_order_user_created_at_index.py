@@ -0,0 +1,20 @@
+# Generated by Django 5.2.18 on 2026-10-19 02:46
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orders', '0012_order_pending_created_idx'),
+        ('subscriptions', '0001_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(fields=['user', 'created_at'], name='orders_orde_user_id_37fed6_idx'),
+        ),
+    ]
@@ -0,0 +1,24 @@
+# Generated by Django 5.2.18 on 2026-10-19 02:49
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orders', '0013_order_user_created_at_index'),
+        ('subscriptions', '0001_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(fields=['status', 'region'], name='order_status_region_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(condition=models.Q(('order_type', 'delivery'), ('status', 'paid')), fields=['region', 'created_at', 'id'], name='order_paid_delivery_idx'),
+        ),
+    ]
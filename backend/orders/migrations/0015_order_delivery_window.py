@@ -0,0 +1,23 @@
+# Generated by Django 5.2.18 on 2026-10-19 03:54
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orders', '0014_hot_query_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='order',
+            name='delivery_window_end',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='order',
+            name='delivery_window_start',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
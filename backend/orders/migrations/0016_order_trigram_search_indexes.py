@@ -0,0 +1,14 @@
+from django.db import migrations
+
+from shop.admin_search import trigram_index_operation
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("orders", "0015_order_delivery_window"),
+    ]
+
+    operations = [
+        trigram_index_operation("orders_order", ["full_name", "email", "phone", "postal_code"]),
+    ]
@@ -74,6 +74,13 @@ class Order(models.Model):
         related_name="orders",
         on_delete=models.SET_NULL,
     )
+    subscription = models.ForeignKey(
+        "subscriptions.Subscription",
+        null=True,
+        blank=True,
+        related_name="orders",
+        on_delete=models.SET_NULL,
+    )
 
     subtotal_cents = models.PositiveIntegerField(default=0)
     tax_cents = models.PositiveIntegerField(default=0)
@@ -85,10 +92,29 @@ class Order(models.Model):
     pickup_instructions = models.TextField(blank=True)
     stripe_payment_intent_id = models.CharField(max_length=255, blank=True)
     estimated_delivery_at = models.DateTimeField(null=True, blank=True)
+    # Window promised to the customer, planned from the route sequence (delivery.eta).
+    delivery_window_start = models.DateTimeField(null=True, blank=True)
+    delivery_window_end = models.DateTimeField(null=True, blank=True)
     delivered_at = models.DateTimeField(null=True, blank=True)
 
     class Meta:
         ordering = ["-created_at"]
+        indexes = [
+            models.Index(fields=["stripe_payment_intent_id"]),
+            models.Index(fields=["user", "created_at"]),
+            models.Index(fields=["status", "region"], name="order_status_region_idx"),
+            # Route generation: paid delivery orders per region, oldest first.
+            models.Index(
+                fields=["region", "created_at", "id"],
+                condition=models.Q(status="paid", order_type="delivery"),
+                name="order_paid_delivery_idx",
+            ),
+            models.Index(
+                fields=["status", "created_at"],
+                condition=models.Q(status="pending"),
+                name="order_pending_created_idx",
+            ),
+        ]
 
     def __str__(self):
         return f"Order #{self.id} - {self.full_name}"
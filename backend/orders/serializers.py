@@ -1,6 +1,8 @@
 from rest_framework import serializers
 
 from products.models import Product
+from shop.fields import SparseFieldsMixin
+from shop.media import MediaUrlListSerializer, media_resolver
 from .models import Order, OrderItem, Region
 
 
@@ -26,7 +28,7 @@ class AddressSerializer(serializers.Serializer):
     notes = serializers.CharField(required=False, allow_blank=True)
 
 
-class OrderItemSerializer(serializers.ModelSerializer):
+class OrderItemSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     product_id = serializers.IntegerField(source="product.id", read_only=True)
     image_url = serializers.SerializerMethodField()
 
@@ -42,6 +44,8 @@ class OrderItemSerializer(serializers.ModelSerializer):
             "image_url",
         ]
         read_only_fields = fields
+        list_serializer_class = MediaUrlListSerializer
+        field_sources = {"image_url": ["product"]}
 
     def get_image_url(self, obj):
         product = getattr(obj, "product", None)
@@ -49,11 +53,17 @@ class OrderItemSerializer(serializers.ModelSerializer):
             return ""
         if product.image:
             try:
-                return product.image.url
+                return media_resolver(self.context).relative_url(product.image.name)
             except Exception:
                 return ""
         return product.main_image_url or ""
 
+    def media_names(self, obj):
+        if "image_url" not in self.fields:
+            return []
+        product = getattr(obj, "product", None)
+        return [product.image.name] if product and product.image else []
+
 
 class OrderCreateSerializer(serializers.ModelSerializer):
     items = OrderItemInputSerializer(many=True)
@@ -84,8 +94,9 @@ class OrderCreateSerializer(serializers.ModelSerializer):
             raise serializers.ValidationError("At least one item is required.")
 
         product_ids = [item["product_id"] for item in items]
-        products = Product.objects.filter(id__in=product_ids)
-        if products.count() != len(set(product_ids)):
+        # Keep the loaded products so create() does not query the catalog a second time.
+        self._products_map = Product.objects.in_bulk(product_ids)
+        if len(self._products_map) != len(set(product_ids)):
             raise serializers.ValidationError("One or more products are unavailable.")
         return items
 
@@ -111,9 +122,10 @@ class OrderCreateSerializer(serializers.ModelSerializer):
         delivery_notes = validated_data.pop("delivery_notes", "")
         region_code = validated_data.pop("region_code", "").strip()
 
-        product_ids = [item["product_id"] for item in items_data]
-        products = Product.objects.filter(id__in=product_ids)
-        product_map = {product.id: product for product in products}
+        product_map = getattr(self, "_products_map", None)
+        if product_map is None:
+            product_ids = [item["product_id"] for item in items_data]
+            product_map = Product.objects.in_bulk(product_ids)
 
         subtotal = 0
         for item in items_data:
@@ -159,7 +171,7 @@ class OrderCreateSerializer(serializers.ModelSerializer):
         return order
 
 
-class OrderDetailSerializer(serializers.ModelSerializer):
+class OrderDetailSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     items = OrderItemSerializer(many=True, read_only=True)
     region = serializers.CharField(source="region.code", read_only=True)
     region_name = serializers.CharField(source="region.name", read_only=True)
@@ -188,6 +200,8 @@ class OrderDetailSerializer(serializers.ModelSerializer):
             "pickup_instructions",
             "stripe_payment_intent_id",
             "estimated_delivery_at",
+            "delivery_window_start",
+            "delivery_window_end",
             "delivered_at",
             "expected_delivery_date",
             "region",
@@ -196,6 +210,8 @@ class OrderDetailSerializer(serializers.ModelSerializer):
             "created_at",
         ]
         read_only_fields = fields
+        expandable_fields = ["items"]
+        field_sources = {"expected_delivery_date": ["region", "created_at", "estimated_delivery_at"]}
 
     def get_expected_delivery_date(self, obj):
         if not obj.region:
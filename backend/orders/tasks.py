@@ -1,31 +1,128 @@
 import logging
+import time
 from datetime import timedelta
+from typing import Dict, List, Optional
 
 from celery import shared_task
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Q
 from django.utils import timezone
 
 from orders.models import Order
+from payments.charges import cancel_payment_intents
+from payments.models import Payment
 
 logger = logging.getLogger(__name__)
 
+STALE_PENDING_ORDER_AGE = timedelta(hours=48)
+EXPIRE_BATCH_SIZE = 500
+# CHARGE payments in these states can still move money, so they are cancelled with their order.
+OPEN_PAYMENT_STATUSES = (
+    Payment.Status.REQUIRES_PAYMENT_METHOD,
+    Payment.Status.REQUIRES_CONFIRMATION,
+    Payment.Status.REQUIRES_ACTION,
+    Payment.Status.REQUIRES_CAPTURE,
+)
+
+
+def _expire_batch(batch_ids: List[int], now) -> Dict[str, str]:
+    """
+    Cancel one batch of orders in its own short transaction and return {order_id: intent_id}.
+
+    Rows are re-checked under lock and rows another transaction holds are skipped, so a
+    customer paying for an order right now is never blocked or overwritten.
+    """
+    with transaction.atomic():
+        locked = dict(
+            Order.objects.select_for_update(skip_locked=True)
+            .filter(id__in=batch_ids, status=Order.Status.PENDING)
+            .values_list("id", "stripe_payment_intent_id")
+        )
+        Order.objects.filter(id__in=list(locked)).update(
+            status=Order.Status.CANCELLED, updated_at=now
+        )
+    return locked
+
+
+def _record_cancelled_intents(outcomes: List[dict], now) -> int:
+    cancelled = [
+        outcome["payment_intent_id"]
+        for outcome in outcomes
+        if (outcome["intent"] or {}).get("status") == Payment.Status.CANCELED
+    ]
+    for outcome in outcomes:
+        if outcome["error"]:
+            logger.warning(
+                "stale_payment_intent_cancel_failed",
+                extra={"payment_intent_id": outcome["payment_intent_id"], "error": outcome["error"]},
+            )
+    if cancelled:
+        Payment.objects.filter(
+            kind=Payment.Kind.CHARGE,
+            stripe_payment_intent_id__in=cancelled,
+            status__in=OPEN_PAYMENT_STATUSES,
+        ).update(status=Payment.Status.CANCELED, updated_at=now)
+    return len(cancelled)
+
 
 @shared_task
-def expire_stale_pending_orders() -> dict:
+def expire_stale_pending_orders(
+    batch_size: int = EXPIRE_BATCH_SIZE,
+    cancel_payment_intents_too: Optional[bool] = None,
+) -> dict:
+    """
+    Cancel PENDING orders older than 48 h in keyset-paginated batches.
+
+    Each batch commits on its own, so no long lock is held on the orders table. The Stripe
+    PaymentIntents behind the cancelled orders are cancelled as well (when a Stripe key is
+    configured, or when asked to explicitly) and their open Payment rows marked canceled.
+    """
+    started = time.monotonic()
     now = timezone.now()
-    cutoff = now - timedelta(hours=48)
+    cutoff = now - STALE_PENDING_ORDER_AGE
+    if cancel_payment_intents_too is None:
+        cancel_payment_intents_too = bool(settings.STRIPE_SECRET_KEY)
 
-    stale_orders = Order.objects.filter(
-        status=Order.Status.PENDING,
-        created_at__lt=cutoff,
-    )
-    cancelled_count = stale_orders.update(
-        status=Order.Status.CANCELLED,
-        updated_at=now,
-    )
+    summary = {
+        "cancelled_orders": 0,
+        "batches": 0,
+        "cancelled_payment_intents": 0,
+        "failed_payment_intents": 0,
+    }
+    stale = Order.objects.filter(status=Order.Status.PENDING, created_at__lt=cutoff)
+    last_seen = None
+    while True:
+        page = stale
+        if last_seen is not None:
+            last_created_at, last_id = last_seen
+            page = page.filter(
+                Q(created_at__gt=last_created_at) | Q(created_at=last_created_at, id__gt=last_id)
+            )
+        keys = list(page.order_by("created_at", "id").values_list("created_at", "id")[:batch_size])
+        if not keys:
+            break
+        last_seen = keys[-1]
+
+        intents_by_order = _expire_batch([order_id for _, order_id in keys], now)
+        summary["batches"] += 1
+        summary["cancelled_orders"] += len(intents_by_order)
+
+        intent_ids = sorted({intent_id for intent_id in intents_by_order.values() if intent_id})
+        if cancel_payment_intents_too and intent_ids:
+            outcomes = cancel_payment_intents(intent_ids)
+            cancelled = _record_cancelled_intents(outcomes, now)
+            summary["cancelled_payment_intents"] += cancelled
+            summary["failed_payment_intents"] += len(intent_ids) - cancelled
+
+        logger.info(
+            "expire_stale_pending_orders_progress",
+            extra={**summary, "elapsed_seconds": round(time.monotonic() - started, 3)},
+        )
 
-    summary = {"cancelled_orders": cancelled_count}
+    summary["elapsed_seconds"] = round(time.monotonic() - started, 3)
     logger.info(
         "expired_stale_pending_orders",
-        extra={"cancelled_orders": cancelled_count, "cutoff": cutoff.isoformat()},
+        extra={**summary, "cutoff": cutoff.isoformat()},
     )
     return summary
@@ -0,0 +1,79 @@
+from datetime import timedelta
+from unittest.mock import patch
+
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from orders.models import Order, Region
+from orders.tasks import expire_stale_pending_orders
+from payments.models import Payment
+from payments.tests.stripe_stub import FakeStripe
+
+
+@override_settings(STRIPE_MAX_REQUESTS_PER_SECOND=0, STRIPE_BULK_MAX_WORKERS=4)
+class ExpireStalePendingOrdersTests(TestCase):
+    def setUp(self):
+        self.region = Region.objects.create(
+            code="expire-west", name="Expire West", delivery_weekday=1, min_orders=0
+        )
+        self.fake_stripe = FakeStripe()
+
+    def _order(self, suffix, hours_old, status=Order.Status.PENDING, with_intent=False):
+        order = Order.objects.create(
+            full_name=f"Customer {suffix}",
+            email=f"expire-{suffix}@example.com",
+            phone="555-0101",
+            region=self.region,
+            status=status,
+            total_cents=1000,
+        )
+        if with_intent:
+            intent = self.fake_stripe.PaymentIntent.create(amount=1000, currency="cad")
+            order.stripe_payment_intent_id = intent["id"]
+            order.save(update_fields=["stripe_payment_intent_id"])
+            Payment.objects.create(
+                order=order,
+                amount_cents=1000,
+                stripe_payment_intent_id=intent["id"],
+            )
+        Order.objects.filter(pk=order.pk).update(
+            created_at=timezone.now() - timedelta(hours=hours_old)
+        )
+        return order
+
+    def test_cancels_stale_orders_in_batches(self):
+        stale = [self._order(f"stale-{i}", 49 + i) for i in range(5)]
+        fresh = self._order("fresh", 2)
+        paid = self._order("paid", 72, status=Order.Status.PAID)
+
+        summary = expire_stale_pending_orders(batch_size=2, cancel_payment_intents_too=False)
+
+        self.assertEqual(summary["cancelled_orders"], 5)
+        self.assertEqual(summary["batches"], 3)
+        self.assertEqual(
+            set(Order.objects.filter(status=Order.Status.CANCELLED).values_list("id", flat=True)),
+            {order.id for order in stale},
+        )
+        fresh.refresh_from_db()
+        paid.refresh_from_db()
+        self.assertEqual(fresh.status, Order.Status.PENDING)
+        self.assertEqual(paid.status, Order.Status.PAID)
+
+    def test_cancels_orphaned_payment_intents(self):
+        order = self._order("intent", 60, with_intent=True)
+        settled = self._order("settled", 60, with_intent=True)
+        self.fake_stripe.payment_intents[settled.stripe_payment_intent_id]["status"] = "succeeded"
+
+        with patch("payments.charges.stripe", self.fake_stripe):
+            summary = expire_stale_pending_orders(cancel_payment_intents_too=True)
+
+        self.assertEqual(summary["cancelled_orders"], 2)
+        self.assertEqual(summary["cancelled_payment_intents"], 1)
+        self.assertEqual(summary["failed_payment_intents"], 1)
+        self.assertEqual(
+            self.fake_stripe.payment_intents[order.stripe_payment_intent_id]["status"], "canceled"
+        )
+        self.assertEqual(order.payments.get().status, Payment.Status.CANCELED)
+        self.assertEqual(
+            settled.payments.get().status, Payment.Status.REQUIRES_PAYMENT_METHOD
+        )
@@ -0,0 +1,18 @@
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import TestCase
+
+from orders.management.commands.explain_hot_queries import hot_queries
+
+
+class ExplainHotQueriesCommandTests(TestCase):
+    def test_prints_a_plan_for_every_hot_query(self):
+        out = StringIO()
+
+        call_command("explain_hot_queries", stdout=out)
+
+        output = out.getvalue()
+        for label, _queryset in hot_queries():
+            self.assertIn(f"== {label}", output)
+        self.assertIn("order_pending_created_idx", output)
@@ -0,0 +1,89 @@
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from orders.models import Order, OrderItem, Region
+from products.models import Product
+
+
+class OrderHistoryPaginationTests(TestCase):
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            username="history@example.com", email="history@example.com", password="password123"
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+        region = Region.objects.create(
+            code="history-west", name="History West", delivery_weekday=2, min_orders=0
+        )
+        products = [
+            Product.objects.create(
+                name=f"Product {index}", slug=f"history-product-{index}", price_cents=500
+            )
+            for index in range(3)
+        ]
+        self.orders = []
+        for index in range(12):
+            order = Order.objects.create(
+                user=self.user,
+                full_name="History Customer",
+                email="history@example.com",
+                phone="555-0101",
+                region=region,
+                total_cents=1000,
+            )
+            for product in products:
+                OrderItem.objects.create(
+                    order=order,
+                    product=product,
+                    product_name=product.name,
+                    quantity=1,
+                    unit_price_cents=product.price_cents,
+                    total_cents=product.price_cents,
+                )
+            self.orders.append(order)
+        Order.objects.create(full_name="Someone else", email="other@example.com", phone="1")
+
+    def _count_queries(self, page_size):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse("order-list"), {"page_size": page_size})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.json()["results"]), page_size)
+        return len(queries)
+
+    def test_query_count_does_not_grow_with_page_size(self):
+        self.assertEqual(self._count_queries(2), self._count_queries(10))
+
+    def test_cursor_walks_every_order_once_newest_first(self):
+        seen = []
+        url = reverse("order-list") + "?page_size=5"
+        while url:
+            payload = self.client.get(url).json()
+            seen.extend(order["id"] for order in payload["results"])
+            url = payload["next"]
+
+        self.assertEqual(seen, [order.id for order in reversed(self.orders)])
+
+    def test_sparse_fields_skip_unrendered_relations(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(
+                reverse("order-list"), {"page_size": 5, "fields": "id,status,total_cents"}
+            )
+        self.assertEqual(response.status_code, 200)
+        results = response.json()["results"]
+        self.assertEqual([set(order) for order in results], [{"id", "status", "total_cents"}] * 5)
+        self.assertIsNotNone(response.json()["next"])
+        sql = " ".join(query["sql"] for query in queries)
+        self.assertNotIn("orders_orderitem", sql)
+        self.assertNotIn("orders_region", sql)
+
+        detail = self.client.get(
+            reverse("order-detail", args=[self.orders[0].id]),
+            {"fields": "id,items.product_name", "expand": "region_name"},
+        ).json()
+        self.assertEqual(set(detail), {"id", "items", "region_name"})
+        self.assertEqual(detail["region_name"], "History West")
+        self.assertEqual([set(item) for item in detail["items"]], [{"product_name"}] * 3)
@@ -1,16 +1,39 @@
-from typing import Dict, List
-
 import stripe
+from django.conf import settings
 from rest_framework import permissions, status
 from rest_framework.response import Response
 from rest_framework.views import APIView
 
-from accounts.models import CustomerProfile
 from orders.models import Order, OrderItem
-from .serializers import CheckoutCreateSerializer
+from shop.identity import identity_for
+from .quotes import sign_quote
+from .serializers import CheckoutCreateSerializer, CheckoutQuoteSerializer
 from .stripe_api import create_payment_intent
 
 
+class CheckoutQuoteView(APIView):
+    """
+    Prices a cart once and returns the line items with a signed quote token.
+
+    Passing the token back to checkout lets it skip re-reading the catalog while the
+    catalog version is unchanged and the token has not expired.
+    """
+
+    permission_classes = [permissions.AllowAny]
+
+    def post(self, request, *args, **kwargs):
+        serializer = CheckoutQuoteSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        quote = serializer.validated_data["quote"]
+        return Response(
+            {
+                **quote,
+                "quote_token": sign_quote(quote),
+                "expires_in": settings.CHECKOUT_QUOTE_TTL_SECONDS,
+            }
+        )
+
+
 class CheckoutView(APIView):
     """
     Accepts cart data, creates an Order and OrderItems, then creates a Stripe PaymentIntent.
@@ -19,7 +42,7 @@ class CheckoutView(APIView):
     permission_classes = [permissions.IsAuthenticated]
 
     def post(self, request, *args, **kwargs):
-        profile, _ = CustomerProfile.objects.get_or_create(user=request.user)
+        profile = identity_for(request).customer_profile
 
         payload = request.data.copy()
 
@@ -45,8 +68,6 @@ class CheckoutView(APIView):
         serializer = CheckoutCreateSerializer(data=payload)
         serializer.is_valid(raise_exception=True)
         data = serializer.validated_data
-        products_map: Dict[int, object] = data["products_map"]
-        items_data: List[Dict] = data["items"]
         region = data.get("region")
 
         raw_allow_unverified = request.data.get("allow_unverified")
@@ -69,27 +90,10 @@ class CheckoutView(APIView):
                 status=status.HTTP_400_BAD_REQUEST,
             )
 
-        subtotal_cents = 0
-        order_items_payload: List[Dict] = []
-
-        for item in items_data:
-            product = products_map[item["product_id"]]
-            quantity = item["quantity"]
-            unit_price_cents = product.price_cents
-            line_total = unit_price_cents * quantity
-            subtotal_cents += line_total
-            order_items_payload.append(
-                {
-                    "product": product,
-                    "product_name": product.name,
-                    "quantity": quantity,
-                    "unit_price_cents": unit_price_cents,
-                    "total_cents": line_total,
-                }
-            )
-
-        tax_cents = int(round(subtotal_cents * 0.05))
-        total_cents = subtotal_cents + tax_cents
+        quote = data["quote"]
+        subtotal_cents = quote["subtotal_cents"]
+        tax_cents = quote["tax_cents"]
+        total_cents = quote["total_cents"]
 
         address = data.get("address") or {}
         email_source = request.user.email or data["email"]
@@ -117,13 +121,13 @@ class CheckoutView(APIView):
         order_items = [
             OrderItem(
                 order=order,
-                product=item_data["product"],
-                product_name=item_data["product_name"],
-                quantity=item_data["quantity"],
-                unit_price_cents=item_data["unit_price_cents"],
-                total_cents=item_data["total_cents"],
+                product_id=line["product_id"],
+                product_name=line["product_name"],
+                quantity=line["quantity"],
+                unit_price_cents=line["unit_price_cents"],
+                total_cents=line["total_cents"],
             )
-            for item_data in order_items_payload
+            for line in quote["items"]
         ]
         OrderItem.objects.bulk_create(order_items)
 
@@ -0,0 +1,194 @@
+import logging
+from typing import Any, Dict, Iterable, List, Optional
+
+import stripe
+from django.db import transaction
+from django.utils import timezone
+
+from orders.models import Order
+from .executor import RateLimiter, call_with_rate_limit, run_rate_limited
+from .models import Payment
+from .webhooks import _to_dict
+
+logger = logging.getLogger(__name__)
+
+
+def charge_idempotency_key(order_id: int) -> str:
+    return f"order-{order_id}-charge"
+
+
+def _charge_order(stripe_client, limiter: RateLimiter, order: Order) -> Dict[str, Any]:
+    subscription = order.subscription
+    outcome: Dict[str, Any] = {"order_id": order.id, "intent": {}, "error": ""}
+    try:
+        intent = call_with_rate_limit(
+            limiter,
+            lambda: stripe_client.PaymentIntent.create(
+                amount=order.total_cents,
+                currency="cad",
+                customer=subscription.stripe_customer_id,
+                payment_method=subscription.stripe_payment_method_id,
+                off_session=True,
+                confirm=True,
+                receipt_email=order.email,
+                metadata={"order_id": str(order.id), "subscription_id": str(subscription.id)},
+                idempotency_key=charge_idempotency_key(order.id),
+            ),
+        )
+        outcome["intent"] = _to_dict(intent)
+    except stripe.error.CardError as exc:
+        outcome["error"] = str(exc)
+        outcome["intent"] = _to_dict(getattr(exc.error, "payment_intent", None))
+    except stripe.error.StripeError as exc:
+        outcome["error"] = str(exc)
+    return outcome
+
+
+def charge_orders_off_session(
+    orders: Iterable[Order],
+    *,
+    stripe_client=None,
+    max_workers: Optional[int] = None,
+    max_per_second: Optional[float] = None,
+) -> List[Dict[str, Any]]:
+    """
+    Confirm one off-session PaymentIntent per order on a thread pool under a shared rate limit.
+
+    Orders must have `subscription` loaded. Workers only talk to Stripe; recording the
+    outcomes in the database is left to `record_charge_outcomes` on the calling thread.
+    """
+    stripe_client = stripe_client or stripe
+    return run_rate_limited(
+        lambda limiter, order: _charge_order(stripe_client, limiter, order),
+        orders,
+        max_workers=max_workers,
+        max_per_second=max_per_second,
+    )
+
+
+def cancel_idempotency_key(payment_intent_id: str) -> str:
+    return f"{payment_intent_id}-cancel"
+
+
+def _cancel_intent(stripe_client, reason: str, limiter: RateLimiter, intent_id: str) -> Dict[str, Any]:
+    outcome: Dict[str, Any] = {"payment_intent_id": intent_id, "intent": {}, "error": ""}
+    try:
+        intent = call_with_rate_limit(
+            limiter,
+            lambda: stripe_client.PaymentIntent.cancel(
+                intent_id,
+                cancellation_reason=reason,
+                idempotency_key=cancel_idempotency_key(intent_id),
+            ),
+        )
+        outcome["intent"] = _to_dict(intent)
+    except stripe.error.StripeError as exc:
+        outcome["error"] = str(exc)
+    return outcome
+
+
+def cancel_payment_intents(
+    payment_intent_ids: Iterable[str],
+    *,
+    reason: str = "abandoned",
+    stripe_client=None,
+    max_workers: Optional[int] = None,
+    max_per_second: Optional[float] = None,
+) -> List[Dict[str, Any]]:
+    """
+    Cancel PaymentIntents concurrently under the shared Stripe rate limit.
+
+    Intents Stripe refuses to cancel (e.g. already succeeded) come back with `error` set and
+    are left for the reconciliation job to settle.
+    """
+    stripe_client = stripe_client or stripe
+    return run_rate_limited(
+        lambda limiter, intent_id: _cancel_intent(stripe_client, reason, limiter, intent_id),
+        payment_intent_ids,
+        max_workers=max_workers,
+        max_per_second=max_per_second,
+    )
+
+
+def record_charge_outcomes(
+    orders: Iterable[Order], outcomes: List[Dict[str, Any]]
+) -> Dict[str, int]:
+    """
+    Store one CHARGE Payment per outcome and mark successfully charged orders as paid.
+
+    Payments are keyed by the charge's idempotency key: an order charged again because an
+    earlier attempt failed before Stripe returned an intent updates that attempt's row.
+    """
+    orders_by_id = {order.id: order for order in orders}
+    now = timezone.now()
+    keys = [charge_idempotency_key(outcome["order_id"]) for outcome in outcomes]
+    existing = {
+        payment.idempotency_key: payment
+        for payment in Payment.objects.filter(kind=Payment.Kind.CHARGE, idempotency_key__in=keys)
+    }
+    created: List[Payment] = []
+    changed: List[Payment] = []
+    updated_orders: List[Order] = []
+    summary = {"succeeded": 0, "failed": 0}
+
+    for outcome, key in zip(outcomes, keys):
+        order = orders_by_id[outcome["order_id"]]
+        intent = outcome["intent"] or {}
+        intent_id = intent.get("id", "") or ""
+        intent_status = intent.get("status") or Payment.Status.REQUIRES_PAYMENT_METHOD
+        succeeded = intent_status == Payment.Status.SUCCEEDED
+
+        payment = existing.get(key)
+        if payment is None:
+            payment = Payment(
+                order=order,
+                provider=Payment.Provider.STRIPE,
+                kind=Payment.Kind.CHARGE,
+                idempotency_key=key,
+            )
+            created.append(payment)
+        else:
+            payment.updated_at = now
+            changed.append(payment)
+        payment.amount_cents = order.total_cents
+        payment.currency = intent.get("currency", "cad") or "cad"
+        payment.status = intent_status
+        payment.stripe_payment_intent_id = intent_id
+        payment.stripe_charge_id = intent.get("latest_charge", "") or ""
+        payment.raw_payload = intent or {"error": outcome["error"]}
+
+        if intent_id:
+            order.stripe_payment_intent_id = intent_id
+            if succeeded:
+                order.status = Order.Status.PAID
+            order.updated_at = now
+            updated_orders.append(order)
+
+        summary["succeeded" if succeeded else "failed"] += 1
+        if not succeeded:
+            logger.warning(
+                "subscription_charge_failed",
+                extra={"order_id": order.id, "payment_intent_id": intent_id, "error": outcome["error"]},
+            )
+
+    with transaction.atomic():
+        Payment.objects.bulk_create(created, batch_size=500)
+        Payment.objects.bulk_update(
+            changed,
+            [
+                "amount_cents",
+                "currency",
+                "status",
+                "stripe_payment_intent_id",
+                "stripe_charge_id",
+                "raw_payload",
+                "updated_at",
+            ],
+            batch_size=500,
+        )
+        Order.objects.bulk_update(
+            updated_orders,
+            ["status", "stripe_payment_intent_id", "updated_at"],
+            batch_size=500,
+        )
+    return summary
@@ -0,0 +1,83 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Iterable, List, Optional, TypeVar
+
+import stripe
+from django.conf import settings
+
+T = TypeVar("T")
+R = TypeVar("R")
+
+RATE_LIMIT_RETRIES = 3
+
+
+class RateLimiter:
+    """
+    Thread-safe limiter that spaces calls evenly so at most `per_second` start each second.
+    """
+
+    def __init__(
+        self,
+        per_second: float,
+        clock: Callable[[], float] = time.monotonic,
+        sleep: Callable[[float], None] = time.sleep,
+    ):
+        self.interval = 1.0 / per_second if per_second and per_second > 0 else 0.0
+        self._clock = clock
+        self._sleep = sleep
+        self._next_slot = 0.0
+        self._lock = threading.Lock()
+
+    def acquire(self) -> None:
+        if not self.interval:
+            return
+        with self._lock:
+            now = self._clock()
+            slot = max(now, self._next_slot)
+            self._next_slot = slot + self.interval
+        delay = slot - now
+        if delay > 0:
+            self._sleep(delay)
+
+
+def call_with_rate_limit(limiter: RateLimiter, call: Callable[[], R]) -> R:
+    """
+    Run a Stripe call once the limiter allows it, retrying Stripe 429s with backoff.
+
+    Callers must pass an idempotency key so a retried request Stripe already processed
+    returns the original result instead of repeating the side effect.
+    """
+    for attempt in range(1, RATE_LIMIT_RETRIES + 1):
+        limiter.acquire()
+        try:
+            return call()
+        except stripe.error.RateLimitError:
+            if attempt >= RATE_LIMIT_RETRIES:
+                raise
+            time.sleep(2 ** attempt * 0.5)
+    raise AssertionError("unreachable")  # pragma: no cover
+
+
+def run_rate_limited(
+    func: Callable[[RateLimiter, T], R],
+    items: Iterable[T],
+    *,
+    max_workers: Optional[int] = None,
+    max_per_second: Optional[float] = None,
+) -> List[R]:
+    """
+    Apply `func(limiter, item)` to every item on a thread pool that shares one RateLimiter.
+
+    Results come back in input order. `func` should only talk to Stripe; database writes
+    belong on the calling thread once all results are in.
+    """
+    items = list(items)
+    if not items:
+        return []
+    workers = max_workers or settings.STRIPE_BULK_MAX_WORKERS
+    limiter = RateLimiter(
+        settings.STRIPE_MAX_REQUESTS_PER_SECOND if max_per_second is None else max_per_second
+    )
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="stripe") as pool:
+        return list(pool.map(lambda item: func(limiter, item), items))
@@ -0,0 +1,22 @@
+# Generated by Django 5.2.18 on 2026-10-19 02:36
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('payments', '0003_alter_payment_status_alter_payment_stripe_charge_id_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StripeSyncCursor',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=64, unique=True)),
+                ('position', models.BigIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+    ]
@@ -36,6 +36,9 @@ class Payment(models.Model):
         max_length=255, blank=True, default=""
     )
     stripe_charge_id = models.CharField(max_length=255, blank=True, default="")
+    # Idempotency key of the Stripe request we made, for payments we initiate; attempts
+    # that fail before Stripe returns an intent have nothing else to be matched on.
+    idempotency_key = models.CharField(max_length=255, blank=True, default="")
     raw_payload = models.JSONField(blank=True, null=True)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
@@ -46,6 +49,26 @@ class Payment(models.Model):
             models.Index(fields=["order", "created_at"]),
             models.Index(fields=["stripe_payment_intent_id"]),
         ]
+        constraints = [
+            models.UniqueConstraint(
+                fields=["idempotency_key"],
+                condition=~models.Q(idempotency_key=""),
+                name="payment_idempotency_key_uniq",
+            ),
+        ]
 
     def __str__(self):
         return f"Payment {self.id} for order {self.order_id} ({self.provider} {self.status})"
+
+
+class StripeSyncCursor(models.Model):
+    """
+    Resume point for an incremental Stripe sync, as the Unix timestamp of the newest object seen.
+    """
+
+    name = models.CharField(max_length=64, unique=True)
+    position = models.BigIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.name} @ {self.position}"
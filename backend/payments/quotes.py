@@ -0,0 +1,95 @@
+from typing import Any, Dict, List, Mapping, Optional
+
+from django.conf import settings
+from django.core import signing
+
+from products.catalog import get_catalog_version
+
+QUOTE_SALT = "payments.quote"
+TAX_RATE = 0.05
+CURRENCY = "cad"
+
+
+def _build_quote(lines: List[Dict[str, Any]]) -> Dict[str, Any]:
+    subtotal_cents = sum(line["total_cents"] for line in lines)
+    tax_cents = int(round(subtotal_cents * TAX_RATE))
+    return {
+        "items": lines,
+        "subtotal_cents": subtotal_cents,
+        "tax_cents": tax_cents,
+        "total_cents": subtotal_cents + tax_cents,
+        "currency": CURRENCY,
+    }
+
+
+def price_items(items: List[Dict], products_map: Mapping[int, Any]) -> Dict[str, Any]:
+    """
+    Price cart items against already-loaded products and return line items plus totals.
+    """
+    lines: List[Dict[str, Any]] = []
+    for item in items:
+        product = products_map[item["product_id"]]
+        quantity = item["quantity"]
+        unit_price_cents = product.price_cents
+        lines.append(
+            {
+                "product_id": product.id,
+                "product_name": product.name,
+                "quantity": quantity,
+                "unit_price_cents": unit_price_cents,
+                "total_cents": unit_price_cents * quantity,
+            }
+        )
+    return _build_quote(lines)
+
+
+def sign_quote(quote: Dict[str, Any]) -> str:
+    """
+    Return an HMAC-signed, timestamped token pinning the quote to the current catalog version.
+    """
+    payload = {
+        "v": get_catalog_version(),
+        "lines": [
+            [line["product_id"], line["quantity"], line["unit_price_cents"], line["product_name"]]
+            for line in quote["items"]
+        ],
+    }
+    return signing.dumps(payload, salt=QUOTE_SALT, compress=True)
+
+
+def load_quote(token: str, items: List[Dict]) -> Optional[Dict[str, Any]]:
+    """
+    Rebuild the quote behind a token without touching the catalog.
+
+    Returns None when the token is tampered with, expired, built against an older
+    catalog version, or does not describe exactly the requested items; callers then
+    fall back to pricing from the database.
+    """
+    if not token:
+        return None
+    try:
+        payload = signing.loads(
+            token, salt=QUOTE_SALT, max_age=settings.CHECKOUT_QUOTE_TTL_SECONDS
+        )
+    except signing.BadSignature:
+        return None
+
+    if not isinstance(payload, dict) or payload.get("v") != get_catalog_version():
+        return None
+
+    raw_lines = payload.get("lines") or []
+    requested = [(item["product_id"], item["quantity"]) for item in items]
+    if [(line[0], line[1]) for line in raw_lines] != requested:
+        return None
+
+    lines = [
+        {
+            "product_id": product_id,
+            "product_name": product_name,
+            "quantity": quantity,
+            "unit_price_cents": unit_price_cents,
+            "total_cents": unit_price_cents * quantity,
+        }
+        for product_id, quantity, unit_price_cents, product_name in raw_lines
+    ]
+    return _build_quote(lines)
@@ -0,0 +1,226 @@
+import logging
+from itertools import islice
+from typing import Any, Dict, Iterable, Iterator, List, Optional
+
+import stripe
+from django.db import transaction
+from django.utils import timezone
+
+from notifications.tasks import send_order_receipt_email_task
+from orders.models import Order
+from .models import Payment, StripeSyncCursor
+from .webhooks import _to_dict
+
+logger = logging.getLogger(__name__)
+
+RECONCILE_CURSOR = "payment_intents"
+RECONCILE_EVENT_TYPES = [
+    "payment_intent.succeeded",
+    "payment_intent.payment_failed",
+    "payment_intent.canceled",
+    "payment_intent.processing",
+]
+RECONCILE_CHUNK_SIZE = 500
+STRIPE_PAGE_SIZE = 100
+# A terminal PaymentIntent status never goes back, so an older event must not overwrite it.
+TERMINAL_STATUSES = (Payment.Status.SUCCEEDED, Payment.Status.CANCELED)
+
+
+def _chunked(iterable: Iterable, size: int) -> Iterator[List]:
+    iterator = iter(iterable)
+    while True:
+        chunk = list(islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def iter_intents_from_events(stripe_client, since: int) -> Iterator[Dict[str, Any]]:
+    """
+    Stream PaymentIntent snapshots from Stripe events created at or after `since`.
+
+    Pages are fetched lazily, so memory stays bounded by one page regardless of volume.
+    """
+    events = stripe_client.Event.list(
+        types=RECONCILE_EVENT_TYPES,
+        created={"gte": since},
+        limit=STRIPE_PAGE_SIZE,
+    )
+    for event in events.auto_paging_iter():
+        event_dict = _to_dict(event)
+        intent = (event_dict.get("data") or {}).get("object") or {}
+        if intent.get("id"):
+            yield {**intent, "_seen_at": event_dict.get("created") or 0}
+
+
+def iter_intents_from_list(stripe_client, since: int) -> Iterator[Dict[str, Any]]:
+    """
+    Stream current PaymentIntents created at or after `since`; used for backfills past
+    Stripe's 30-day event retention.
+    """
+    intents = stripe_client.PaymentIntent.list(created={"gte": since}, limit=STRIPE_PAGE_SIZE)
+    for intent in intents.auto_paging_iter():
+        intent_dict = _to_dict(intent)
+        if intent_dict.get("id"):
+            yield {**intent_dict, "_seen_at": intent_dict.get("created") or 0}
+
+
+def _newest_snapshots(chunk: List[Dict[str, Any]]) -> Dict[str, Dict[str, Any]]:
+    snapshots: Dict[str, Dict[str, Any]] = {}
+    for intent in chunk:
+        current = snapshots.get(intent["id"])
+        if current is None or (
+            current.get("status") not in TERMINAL_STATUSES
+            and (intent.get("status") in TERMINAL_STATUSES or intent["_seen_at"] > current["_seen_at"])
+        ):
+            snapshots[intent["id"]] = intent
+    return snapshots
+
+
+def _match_orders(snapshots: Dict[str, Dict[str, Any]]) -> Dict[str, Order]:
+    orders_by_intent = {
+        order.stripe_payment_intent_id: order
+        for order in Order.objects.filter(stripe_payment_intent_id__in=list(snapshots))
+    }
+    # Intents whose id never made it onto the order (e.g. the checkout response was lost).
+    fallback_ids: Dict[int, str] = {}
+    for intent_id, intent in snapshots.items():
+        if intent_id in orders_by_intent:
+            continue
+        order_id = str((intent.get("metadata") or {}).get("order_id") or "")
+        if order_id.isdigit():
+            fallback_ids[int(order_id)] = intent_id
+    if fallback_ids:
+        for order in Order.objects.filter(id__in=list(fallback_ids), stripe_payment_intent_id=""):
+            orders_by_intent[fallback_ids[order.id]] = order
+    return orders_by_intent
+
+
+def _charge_id(intent: Dict[str, Any]) -> str:
+    latest_charge = intent.get("latest_charge")
+    if isinstance(latest_charge, dict):
+        return latest_charge.get("id", "") or ""
+    if latest_charge:
+        return latest_charge
+    charges = (intent.get("charges") or {}).get("data") or []
+    return (charges[0].get("id", "") if charges and isinstance(charges[0], dict) else "") or ""
+
+
+def _reconcile_chunk(chunk: List[Dict[str, Any]], summary: Dict[str, int]) -> None:
+    snapshots = _newest_snapshots(chunk)
+    orders_by_intent = _match_orders(snapshots)
+    if not orders_by_intent:
+        return
+
+    payments_by_intent = {
+        payment.stripe_payment_intent_id: payment
+        for payment in Payment.objects.filter(
+            kind=Payment.Kind.CHARGE,
+            stripe_payment_intent_id__in=list(orders_by_intent),
+        )
+    }
+
+    now = timezone.now()
+    new_payments: List[Payment] = []
+    changed_payments: List[Payment] = []
+    changed_orders: List[Order] = []
+    newly_paid_order_ids: List[int] = []
+
+    for intent_id, order in orders_by_intent.items():
+        intent = snapshots[intent_id]
+        intent_status = intent.get("status", "") or ""
+        payload = {key: value for key, value in intent.items() if key != "_seen_at"}
+        summary["matched"] += 1
+
+        payment = payments_by_intent.get(intent_id)
+        if payment is None:
+            new_payments.append(
+                Payment(
+                    order=order,
+                    provider=Payment.Provider.STRIPE,
+                    kind=Payment.Kind.CHARGE,
+                    amount_cents=intent.get("amount") or order.total_cents,
+                    currency=intent.get("currency", "cad") or "cad",
+                    status=intent_status,
+                    stripe_payment_intent_id=intent_id,
+                    stripe_charge_id=_charge_id(intent),
+                    raw_payload=payload,
+                )
+            )
+        elif payment.status != intent_status and payment.status not in TERMINAL_STATUSES:
+            payment.status = intent_status
+            payment.stripe_charge_id = _charge_id(intent) or payment.stripe_charge_id
+            payment.raw_payload = payload
+            payment.updated_at = now
+            changed_payments.append(payment)
+
+        order_changed = False
+        if order.stripe_payment_intent_id != intent_id:
+            order.stripe_payment_intent_id = intent_id
+            order_changed = True
+        if intent_status == Payment.Status.SUCCEEDED and order.status in (
+            Order.Status.PENDING,
+            Order.Status.CANCELLED,
+        ):
+            order.status = Order.Status.PAID
+            newly_paid_order_ids.append(order.id)
+            order_changed = True
+        if order_changed:
+            order.updated_at = now
+            changed_orders.append(order)
+
+    with transaction.atomic():
+        Payment.objects.bulk_create(new_payments)
+        Payment.objects.bulk_update(
+            changed_payments, ["status", "stripe_charge_id", "raw_payload", "updated_at"]
+        )
+        Order.objects.bulk_update(
+            changed_orders, ["status", "stripe_payment_intent_id", "updated_at"]
+        )
+        for order_id in newly_paid_order_ids:
+            transaction.on_commit(
+                lambda order_id=order_id: send_order_receipt_email_task.delay(order_id)
+            )
+
+    summary["payments_created"] += len(new_payments)
+    summary["payments_updated"] += len(changed_payments)
+    summary["orders_marked_paid"] += len(newly_paid_order_ids)
+
+
+def reconcile_payment_intents(
+    *, source: str = "events", since: Optional[int] = None, stripe_client=None
+) -> Dict[str, int]:
+    """
+    Bring orders and CHARGE payments in line with Stripe for everything since the saved cursor.
+
+    Intents are streamed from Stripe and applied in fixed-size chunks with bulk writes; the
+    cursor only advances after a complete run, and re-applying a chunk is harmless.
+    """
+    stripe_client = stripe_client or stripe
+    cursor, _ = StripeSyncCursor.objects.get_or_create(name=RECONCILE_CURSOR)
+    start = cursor.position if since is None else since
+    stream = (
+        iter_intents_from_list(stripe_client, start)
+        if source == "intents"
+        else iter_intents_from_events(stripe_client, start)
+    )
+
+    summary = {
+        "scanned": 0,
+        "matched": 0,
+        "payments_created": 0,
+        "payments_updated": 0,
+        "orders_marked_paid": 0,
+    }
+    newest_seen = start
+    for chunk in _chunked(stream, RECONCILE_CHUNK_SIZE):
+        summary["scanned"] += len(chunk)
+        newest_seen = max(newest_seen, max(intent["_seen_at"] for intent in chunk))
+        _reconcile_chunk(chunk, summary)
+
+    if newest_seen > cursor.position:
+        cursor.position = newest_seen
+        cursor.save(update_fields=["position", "updated_at"])
+
+    logger.info("stripe_reconciliation_finished", extra={**summary, "source": source})
+    return summary
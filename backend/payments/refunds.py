@@ -0,0 +1,167 @@
+import logging
+from typing import Any, Dict, Iterable, List, Optional
+
+import stripe
+from django.db.models import Sum
+
+from orders.models import Order
+from .executor import RateLimiter, call_with_rate_limit, run_rate_limited
+from .models import Payment
+from .webhooks import _to_dict
+
+logger = logging.getLogger(__name__)
+
+# Refund statuses that already take money back (or will, without further action).
+REFUNDED_STATUSES = ("succeeded", "pending")
+
+
+def refund_idempotency_key(order_id: int, refunded_before_cents: int) -> str:
+    # Keyed on what was already refunded, so each further partial refund gets its own key.
+    return f"order-{order_id}-refund-{refunded_before_cents}"
+
+
+def _plan_refunds(order_ids: List[int]) -> Dict[str, Any]:
+    charges: Dict[int, Payment] = {}
+    for payment in Payment.objects.filter(
+        order_id__in=order_ids,
+        kind=Payment.Kind.CHARGE,
+        status=Payment.Status.SUCCEEDED,
+    ).order_by("order_id", "-created_at"):
+        charges.setdefault(payment.order_id, payment)
+
+    refunded_cents = dict(
+        Payment.objects.filter(
+            order_id__in=order_ids,
+            kind=Payment.Kind.REFUND,
+            status__in=REFUNDED_STATUSES,
+        )
+        .values_list("order_id")
+        .annotate(total=Sum("amount_cents"))
+    )
+
+    planned: List[Dict[str, Any]] = []
+    skipped: List[Dict[str, Any]] = []
+    for order_id in order_ids:
+        charge = charges.get(order_id)
+        if not charge or not charge.stripe_payment_intent_id:
+            skipped.append({"order_id": order_id, "reason": "no_successful_charge"})
+            continue
+        already_refunded = refunded_cents.get(order_id) or 0
+        remaining = charge.amount_cents - already_refunded
+        if remaining <= 0:
+            skipped.append({"order_id": order_id, "reason": "already_refunded"})
+            continue
+        planned.append(
+            {
+                "order_id": order_id,
+                "payment_intent_id": charge.stripe_payment_intent_id,
+                "amount_cents": remaining,
+                "currency": charge.currency,
+                "idempotency_key": refund_idempotency_key(order_id, already_refunded),
+            }
+        )
+    return {"planned": planned, "skipped": skipped}
+
+
+def _refund_one(stripe_client, reason: str, limiter: RateLimiter, plan: Dict[str, Any]) -> Dict[str, Any]:
+    outcome = {**plan, "refund": {}, "error": ""}
+    try:
+        refund = call_with_rate_limit(
+            limiter,
+            lambda: stripe_client.Refund.create(
+                payment_intent=plan["payment_intent_id"],
+                amount=plan["amount_cents"],
+                reason=reason,
+                metadata={"order_id": str(plan["order_id"])},
+                idempotency_key=plan["idempotency_key"],
+            ),
+        )
+        outcome["refund"] = _to_dict(refund)
+    except stripe.error.StripeError as exc:
+        outcome["error"] = str(exc)
+    return outcome
+
+
+def refund_orders(
+    orders: Iterable[Order],
+    *,
+    reason: str = "requested_by_customer",
+    stripe_client=None,
+    max_workers: Optional[int] = None,
+    max_per_second: Optional[float] = None,
+) -> Dict[str, Any]:
+    """
+    Refund whatever is left of each order's successful charge and return a reconciliation report.
+
+    Refunds are issued concurrently under the shared Stripe rate limit with one idempotency
+    key per order and refund step; the resulting REFUND Payment rows are bulk-created.
+    """
+    stripe_client = stripe_client or stripe
+    order_ids = sorted({order.id if isinstance(order, Order) else int(order) for order in orders})
+    plan = _plan_refunds(order_ids)
+
+    outcomes = run_rate_limited(
+        lambda limiter, item: _refund_one(stripe_client, reason, limiter, item),
+        plan["planned"],
+        max_workers=max_workers,
+        max_per_second=max_per_second,
+    )
+
+    payments: List[Payment] = []
+    refunded: List[Dict[str, Any]] = []
+    failed: List[Dict[str, Any]] = []
+    for outcome in outcomes:
+        refund = outcome["refund"]
+        refund_status = refund.get("status", "") if refund else ""
+        if not refund or refund_status not in REFUNDED_STATUSES:
+            failed.append(
+                {
+                    "order_id": outcome["order_id"],
+                    "error": outcome["error"] or f"Refund status {refund_status or 'unknown'}",
+                }
+            )
+            if not refund:
+                continue
+        else:
+            refunded.append(
+                {
+                    "order_id": outcome["order_id"],
+                    "refund_id": refund.get("id", ""),
+                    "amount_cents": refund.get("amount", outcome["amount_cents"]),
+                    "status": refund_status,
+                }
+            )
+        payments.append(
+            Payment(
+                order_id=outcome["order_id"],
+                provider=Payment.Provider.STRIPE,
+                kind=Payment.Kind.REFUND,
+                amount_cents=refund.get("amount", outcome["amount_cents"]),
+                currency=refund.get("currency", outcome["currency"]) or outcome["currency"],
+                status=refund_status,
+                stripe_payment_intent_id=outcome["payment_intent_id"],
+                stripe_charge_id=refund.get("charge", "") or "",
+                raw_payload=refund,
+            )
+        )
+
+    Payment.objects.bulk_create(payments, batch_size=500)
+
+    report = {
+        "requested": len(order_ids),
+        "refunded": refunded,
+        "refunded_cents": sum(item["amount_cents"] for item in refunded),
+        "skipped": plan["skipped"],
+        "failed": failed,
+    }
+    logger.info(
+        "orders_refunded",
+        extra={
+            "requested": report["requested"],
+            "refunded": len(refunded),
+            "refunded_cents": report["refunded_cents"],
+            "skipped": len(plan["skipped"]),
+            "failed": len(failed),
+        },
+    )
+    return report
@@ -5,6 +5,7 @@ from rest_framework import serializers
 from orders.models import Order, Region
 from products.models import Product
 from .models import Payment
+from .quotes import load_quote, price_items
 
 
 class OrderItemInputSerializer(serializers.Serializer):
@@ -21,6 +22,31 @@ class AddressSerializer(serializers.Serializer):
     notes = serializers.CharField(required=False, allow_blank=True, default="")
 
 
+def price_cart_items(items) -> Dict:
+    product_ids = [item["product_id"] for item in items]
+    products_map = Product.objects.in_bulk(product_ids)
+
+    missing_ids = sorted({pid for pid in product_ids if pid not in products_map})
+    if missing_ids:
+        raise serializers.ValidationError(
+            {"items": f"Products not found: {', '.join(map(str, missing_ids))}."}
+        )
+    return price_items(items, products_map)
+
+
+class CheckoutQuoteSerializer(serializers.Serializer):
+    items = OrderItemInputSerializer(many=True)
+
+    def validate_items(self, items):
+        if not items:
+            raise serializers.ValidationError("At least one item is required.")
+        return items
+
+    def validate(self, attrs: Dict):
+        attrs["quote"] = price_cart_items(attrs["items"])
+        return attrs
+
+
 class CheckoutCreateSerializer(serializers.Serializer):
     items = OrderItemInputSerializer(many=True)
     full_name = serializers.CharField(max_length=255)
@@ -34,6 +60,7 @@ class CheckoutCreateSerializer(serializers.Serializer):
     region_code = serializers.CharField(
         required=False, allow_blank=True, allow_null=True, max_length=32
     )
+    quote_token = serializers.CharField(required=False, allow_blank=True, allow_null=True)
 
     def validate_items(self, items):
         if not items:
@@ -42,14 +69,10 @@ class CheckoutCreateSerializer(serializers.Serializer):
 
     def validate(self, attrs: Dict):
         items = attrs.get("items") or []
-        product_ids = [item["product_id"] for item in items]
-        products_map = Product.objects.in_bulk(product_ids)
-
-        missing_ids = sorted({pid for pid in product_ids if pid not in products_map})
-        if missing_ids:
-            raise serializers.ValidationError(
-                {"items": f"Products not found: {', '.join(map(str, missing_ids))}."}
-            )
+        # A valid quote token already carries the priced lines; only hit the catalog without one.
+        quote = load_quote(attrs.get("quote_token") or "", items)
+        if quote is None:
+            quote = price_cart_items(items)
 
         order_type = attrs.get("order_type")
         address = attrs.get("address") or {}
@@ -78,7 +101,7 @@ class CheckoutCreateSerializer(serializers.Serializer):
         if errors:
             raise serializers.ValidationError(errors)
 
-        attrs["products_map"] = products_map
+        attrs["quote"] = quote
         attrs["region"] = resolved_region
         return attrs
 
@@ -26,10 +26,10 @@ def record_stripe_payment_from_intent(
 
     payment, created = Payment.objects.get_or_create(
         order=order,
+        kind=Payment.Kind.CHARGE,
         stripe_payment_intent_id=intent_id,
         defaults={
             "provider": Payment.Provider.STRIPE,
-            "kind": Payment.Kind.CHARGE,
             "amount_cents": amount_cents,
             "currency": currency,
             "status": status,
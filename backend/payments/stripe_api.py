@@ -7,9 +7,9 @@ from rest_framework.decorators import api_view, permission_classes
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 
-from accounts.models import CustomerProfile
 from orders.models import Order, OrderItem, Region
 from products.models import Product
+from shop.identity import identity_for
 
 stripe.api_key = getattr(
     settings, "STRIPE_SECRET_KEY", os.environ.get("STRIPE_SECRET_KEY", "sk_test_placeholder")
@@ -63,7 +63,7 @@ def create_checkout(request):
             status=status.HTTP_401_UNAUTHORIZED,
         )
 
-    profile, _ = CustomerProfile.objects.get_or_create(user=request.user)
+    profile = identity_for(request).customer_profile
 
     if not isinstance(raw_items, list) or not raw_items:
         return Response(
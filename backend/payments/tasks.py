@@ -0,0 +1,43 @@
+import datetime
+from typing import List, Optional
+
+from celery import shared_task
+from django.utils import timezone
+
+from delivery.models import RouteStop
+from orders.models import Order
+from .reconciliation import reconcile_payment_intents
+from .refunds import refund_orders
+
+
+@shared_task(name="payments.refund_orders")
+def refund_orders_task(order_ids: List[int], reason: str = "requested_by_customer") -> dict:
+    return refund_orders(order_ids, reason=reason)
+
+
+@shared_task(name="payments.refund_no_pickup_orders")
+def refund_no_pickup_orders(delivery_date: Optional[str] = None) -> dict:
+    """
+    Refund every order whose stop was marked NO_PICKUP on the given route date (default today).
+    """
+    route_date = (
+        datetime.date.fromisoformat(delivery_date) if delivery_date else timezone.localdate()
+    )
+    order_ids = list(
+        Order.objects.filter(
+            route_stop__status=RouteStop.Status.NO_PICKUP,
+            route_stop__route__date=route_date,
+        ).values_list("id", flat=True)
+    )
+    report = refund_orders(order_ids, reason="requested_by_customer")
+    report["delivery_date"] = route_date.isoformat()
+    return report
+
+
+@shared_task(name="payments.reconcile_stripe_payments")
+def reconcile_stripe_payments(source: str = "events", since: Optional[int] = None) -> dict:
+    """
+    Catch up on PaymentIntent changes that webhooks missed; `source="intents"` backfills from
+    the PaymentIntent list instead of the (30-day) event log.
+    """
+    return reconcile_payment_intents(source=source, since=since)
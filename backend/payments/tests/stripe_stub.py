@@ -0,0 +1,201 @@
+"""
+In-process stand-in for the parts of the Stripe client used by the payments code.
+
+Tests pass an instance wherever a `stripe_client` is accepted, or patch it over the
+module-level `stripe` import. It honours idempotency keys the way Stripe does:
+replaying a key returns the original response (or re-raises the original error).
+List endpoints page lazily over events loaded with `load_events` (e.g. from the JSON
+fixtures next to this module) and over intents created through the stub.
+"""
+
+import copy
+import itertools
+import json
+import threading
+import time
+from pathlib import Path
+
+import stripe
+
+
+FIXTURES_DIR = Path(__file__).parent / "fixtures"
+
+
+class _ListObject:
+    """Mimics `stripe.ListObject.auto_paging_iter`, fetching one page at a time."""
+
+    def __init__(self, backend: "FakeStripe", operation, source, limit):
+        self._backend = backend
+        self._operation = operation
+        self._source = source
+        self._limit = limit
+
+    def auto_paging_iter(self):
+        offset = 0
+        while True:
+            self._backend.requests.append((self._operation, None, {"offset": offset}))
+            page = list(itertools.islice(self._source(), offset, offset + self._limit))
+            yield from (copy.deepcopy(item) for item in page)
+            if len(page) < self._limit:
+                return
+            offset += self._limit
+
+
+def _created_filter(objects, created):
+    since = (created or {}).get("gte", 0)
+    return (item for item in objects if item.get("created", 0) >= since)
+
+
+class _PaymentIntents:
+    def __init__(self, backend: "FakeStripe"):
+        self._backend = backend
+
+    def create(self, idempotency_key=None, **params):
+        return self._backend._idempotent(
+            "payment_intent.create", idempotency_key, params, self._backend._create_intent
+        )
+
+    def cancel(self, intent_id, idempotency_key=None, **params):
+        return self._backend._idempotent(
+            "payment_intent.cancel",
+            idempotency_key,
+            {"id": intent_id, **params},
+            self._backend._cancel_intent,
+        )
+
+    def list(self, created=None, limit=10, **params):
+        return _ListObject(
+            self._backend,
+            "payment_intent.list",
+            lambda: _created_filter(list(self._backend.payment_intents.values()), created),
+            limit,
+        )
+
+
+class _Events:
+    def __init__(self, backend: "FakeStripe"):
+        self._backend = backend
+
+    def list(self, types=None, created=None, limit=10, **params):
+        def source():
+            events = _created_filter(self._backend.events, created)
+            return (event for event in events if not types or event["type"] in types)
+
+        return _ListObject(self._backend, "event.list", source, limit)
+
+
+class _Refunds:
+    def __init__(self, backend: "FakeStripe"):
+        self._backend = backend
+
+    def create(self, idempotency_key=None, **params):
+        return self._backend._idempotent(
+            "refund.create", idempotency_key, params, self._backend._create_refund
+        )
+
+
+class FakeStripe:
+    error = stripe.error
+
+    def __init__(self, declined_payment_methods=(), unrefundable_payment_intents=()):
+        self.declined_payment_methods = set(declined_payment_methods)
+        self.unrefundable_payment_intents = set(unrefundable_payment_intents)
+        self.payment_intents = {}
+        self.refunds = {}
+        self.events = []
+        self.requests = []
+        self._responses = {}
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+        self.PaymentIntent = _PaymentIntents(self)
+        self.Refund = _Refunds(self)
+        self.Event = _Events(self)
+
+    def load_events(self, fixture_name: str):
+        with open(FIXTURES_DIR / fixture_name) as fixture:
+            self.events.extend(json.load(fixture))
+
+    def _next_id(self, prefix: str) -> str:
+        return f"{prefix}_fake_{next(self._ids)}"
+
+    def _idempotent(self, operation, idempotency_key, params, handler):
+        with self._lock:
+            self.requests.append((operation, idempotency_key, params))
+            if idempotency_key and idempotency_key in self._responses:
+                response = self._responses[idempotency_key]
+            else:
+                try:
+                    response = ("ok", handler(params))
+                except stripe.error.StripeError as exc:
+                    response = ("error", exc)
+                if idempotency_key:
+                    self._responses[idempotency_key] = response
+        kind, value = response
+        if kind == "error":
+            raise value
+        return copy.deepcopy(value)
+
+    def _create_intent(self, params):
+        intent = {
+            "id": self._next_id("pi"),
+            "object": "payment_intent",
+            "amount": params["amount"],
+            "currency": params.get("currency", "cad"),
+            "customer": params.get("customer"),
+            "payment_method": params.get("payment_method"),
+            "metadata": dict(params.get("metadata") or {}),
+            "status": "requires_payment_method",
+            "latest_charge": None,
+            "created": int(time.time()),
+        }
+        self.payment_intents[intent["id"]] = intent
+
+        if params.get("payment_method") in self.declined_payment_methods:
+            raise stripe.error.CardError(
+                "Your card was declined.",
+                "payment_method",
+                "card_declined",
+                json_body={"error": {"payment_intent": copy.deepcopy(intent)}},
+            )
+
+        if params.get("confirm"):
+            intent["status"] = "succeeded"
+            intent["latest_charge"] = self._next_id("ch")
+        return intent
+
+    def _cancel_intent(self, params):
+        intent = self.payment_intents.get(params["id"])
+        if intent is None:
+            raise stripe.error.InvalidRequestError(
+                f"No such payment_intent: '{params['id']}'", "intent"
+            )
+        if intent["status"] in ("succeeded", "canceled"):
+            raise stripe.error.InvalidRequestError(
+                "You cannot cancel this PaymentIntent because it has a status of "
+                f"{intent['status']}.",
+                "intent",
+            )
+        intent["status"] = "canceled"
+        intent["cancellation_reason"] = params.get("cancellation_reason")
+        return intent
+
+    def _create_refund(self, params):
+        intent_id = params["payment_intent"]
+        if intent_id in self.unrefundable_payment_intents:
+            raise stripe.error.InvalidRequestError(
+                f"Charge for PaymentIntent {intent_id} has already been refunded.",
+                "payment_intent",
+            )
+        refund = {
+            "id": self._next_id("re"),
+            "object": "refund",
+            "amount": params["amount"],
+            "currency": "cad",
+            "payment_intent": intent_id,
+            "charge": (self.payment_intents.get(intent_id) or {}).get("latest_charge"),
+            "reason": params.get("reason"),
+            "metadata": dict(params.get("metadata") or {}),
+            "status": "succeeded",
+        }
+        self.refunds[refund["id"]] = refund
+        return refund
@@ -0,0 +1,156 @@
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from accounts.models import CustomerProfile
+from orders.models import Order, OrderItem, Region
+from payments import serializers as payment_serializers
+from products.models import Product
+
+User = get_user_model()
+
+
+class CheckoutQuoteTests(APITestCase):
+    def setUp(self):
+        self.product = Product.objects.create(
+            name="Whole Milk",
+            slug="quote-whole-milk",
+            price_cents=500,
+        )
+        self.other_product = Product.objects.create(
+            name="Butter",
+            slug="quote-butter",
+            price_cents=899,
+        )
+        self.region = Region.objects.create(
+            code="quote-north", name="Quote North", delivery_weekday=1, min_orders=0
+        )
+        self.user = User.objects.create_user(
+            username="quote@example.com",
+            email="quote@example.com",
+            password="password123",
+        )
+        profile = CustomerProfile.objects.get(user=self.user)
+        profile.email_verified_at = timezone.now()
+        profile.phone_verified_at = timezone.now()
+        profile.save(update_fields=["email_verified_at", "phone_verified_at"])
+        self.client.force_authenticate(user=self.user)
+
+    def _items(self):
+        return [
+            {"product_id": self.product.id, "quantity": 2},
+            {"product_id": self.other_product.id, "quantity": 1},
+        ]
+
+    def _quote(self, items=None):
+        response = self.client.post(
+            reverse("payments-quote"), {"items": items or self._items()}, format="json"
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return response.json()
+
+    def _checkout_payload(self, quote_token, items=None):
+        return {
+            "items": items or self._items(),
+            "full_name": "Quote Customer",
+            "email": "quote@example.com",
+            "phone": "555-0000",
+            "order_type": "delivery",
+            "address": {"line1": "1 Main St", "city": "Vancouver", "postal_code": "V1V1V1"},
+            "region_code": self.region.code,
+            "quote_token": quote_token,
+        }
+
+    def test_quote_returns_line_items_totals_and_token(self):
+        data = self._quote()
+
+        self.assertEqual(data["subtotal_cents"], 500 * 2 + 899)
+        self.assertEqual(data["tax_cents"], int(round(1899 * 0.05)))
+        self.assertEqual(data["total_cents"], data["subtotal_cents"] + data["tax_cents"])
+        self.assertEqual(data["currency"], "cad")
+        self.assertEqual(
+            [(line["product_id"], line["quantity"]) for line in data["items"]],
+            [(self.product.id, 2), (self.other_product.id, 1)],
+        )
+        self.assertTrue(data["quote_token"])
+
+    def test_quote_rejects_unknown_products(self):
+        response = self.client.post(
+            reverse("payments-quote"),
+            {"items": [{"product_id": 999999, "quantity": 1}]},
+            format="json",
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn("items", response.json())
+
+    @patch("payments.api.create_payment_intent")
+    def test_checkout_with_valid_quote_skips_catalog_lookup(self, mock_create_intent):
+        mock_create_intent.return_value = {"id": "pi_quote", "client_secret": "cs_quote"}
+        quote = self._quote()
+
+        with patch.object(
+            payment_serializers,
+            "price_cart_items",
+            wraps=payment_serializers.price_cart_items,
+        ) as mock_price:
+            response = self.client.post(
+                reverse("payments-checkout"),
+                self._checkout_payload(quote["quote_token"]),
+                format="json",
+            )
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        mock_price.assert_not_called()
+        order = Order.objects.get(id=response.json()["order_id"])
+        self.assertEqual(order.total_cents, quote["total_cents"])
+        self.assertEqual(
+            list(OrderItem.objects.filter(order=order).values_list("product_id", "quantity")),
+            [(self.product.id, 2), (self.other_product.id, 1)],
+        )
+
+    @patch("payments.api.create_payment_intent")
+    def test_catalog_change_invalidates_quote(self, mock_create_intent):
+        mock_create_intent.return_value = {"id": "pi_stale", "client_secret": "cs_stale"}
+        quote = self._quote()
+
+        self.product.price_cents = 650
+        with patch("products.tasks.warm_catalog_cache.apply_async"):
+            with self.captureOnCommitCallbacks(execute=True):
+                self.product.save(update_fields=["price_cents"])
+
+        response = self.client.post(
+            reverse("payments-checkout"),
+            self._checkout_payload(quote["quote_token"]),
+            format="json",
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        order = Order.objects.get(id=response.json()["order_id"])
+        self.assertEqual(order.subtotal_cents, 650 * 2 + 899)
+
+    @patch("payments.api.create_payment_intent")
+    def test_quote_for_different_items_or_tampered_token_is_ignored(self, mock_create_intent):
+        mock_create_intent.return_value = {"id": "pi_other", "client_secret": "cs_other"}
+        quote = self._quote(items=[{"product_id": self.product.id, "quantity": 1}])
+
+        for token in (quote["quote_token"], quote["quote_token"][:-2] + "xx"):
+            with patch.object(
+                payment_serializers,
+                "price_cart_items",
+                wraps=payment_serializers.price_cart_items,
+            ) as mock_price:
+                response = self.client.post(
+                    reverse("payments-checkout"),
+                    self._checkout_payload(token),
+                    format="json",
+                )
+
+            self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+            mock_price.assert_called_once()
+            order = Order.objects.get(id=response.json()["order_id"])
+            self.assertEqual(order.subtotal_cents, 500 * 2 + 899)
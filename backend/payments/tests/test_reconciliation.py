@@ -0,0 +1,100 @@
+from unittest.mock import patch
+
+from django.test import TestCase
+
+from orders.models import Order, Region
+from payments import reconciliation
+from payments.models import Payment, StripeSyncCursor
+from payments.reconciliation import RECONCILE_CURSOR, reconcile_payment_intents
+from payments.tests.stripe_stub import FakeStripe
+
+
+@patch("payments.reconciliation.send_order_receipt_email_task.delay")
+class ReconcilePaymentIntentsTests(TestCase):
+    def setUp(self):
+        self.region = Region.objects.create(
+            code="recon-west", name="Recon West", delivery_weekday=1, min_orders=0
+        )
+        self.fake_stripe = FakeStripe()
+        self.fake_stripe.load_events("stripe_events.json")
+
+    def _order(self, suffix, intent_id="", order_id=None):
+        return Order.objects.create(
+            id=order_id,
+            full_name=f"Customer {suffix}",
+            email=f"recon-{suffix}@example.com",
+            phone="555-0101",
+            order_type=Order.OrderType.DELIVERY,
+            region=self.region,
+            total_cents=1050,
+            stripe_payment_intent_id=intent_id,
+        )
+
+    def test_applies_missed_events_and_advances_cursor(self, mock_receipt):
+        paid = self._order("paid", "pi_recon_paid")
+        Payment.objects.create(
+            order=paid,
+            amount_cents=1050,
+            status=Payment.Status.PROCESSING,
+            stripe_payment_intent_id="pi_recon_paid",
+        )
+        failed = self._order("failed", "pi_recon_failed")
+        orphan = self._order("orphan", order_id=90001)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            summary = reconcile_payment_intents(stripe_client=self.fake_stripe)
+
+        self.assertEqual(summary["scanned"], 5)
+        self.assertEqual(summary["matched"], 3)
+        self.assertEqual(summary["orders_marked_paid"], 2)
+
+        paid.refresh_from_db()
+        self.assertEqual(paid.status, Order.Status.PAID)
+        payment = paid.payments.get()
+        self.assertEqual(payment.status, Payment.Status.SUCCEEDED)
+        self.assertEqual(payment.stripe_charge_id, "ch_recon_paid")
+
+        failed.refresh_from_db()
+        self.assertEqual(failed.status, Order.Status.PENDING)
+        self.assertEqual(
+            failed.payments.get().status, Payment.Status.REQUIRES_PAYMENT_METHOD
+        )
+
+        orphan.refresh_from_db()
+        self.assertEqual(orphan.status, Order.Status.PAID)
+        self.assertEqual(orphan.stripe_payment_intent_id, "pi_recon_orphan")
+
+        self.assertCountEqual(
+            [call.args[0] for call in mock_receipt.call_args_list], [paid.id, orphan.id]
+        )
+        self.assertEqual(
+            StripeSyncCursor.objects.get(name=RECONCILE_CURSOR).position, 1760000400
+        )
+
+    def test_rerun_is_idempotent_and_resumes_from_cursor(self, mock_receipt):
+        self._order("paid", "pi_recon_paid")
+
+        reconcile_payment_intents(stripe_client=self.fake_stripe)
+        summary = reconcile_payment_intents(stripe_client=self.fake_stripe)
+
+        self.assertEqual(summary["scanned"], 1)  # only the event at the cursor itself
+        self.assertEqual(summary["payments_created"], 0)
+        self.assertEqual(summary["orders_marked_paid"], 0)
+        self.assertEqual(Payment.objects.filter(kind=Payment.Kind.CHARGE).count(), 1)
+
+    def test_streams_in_chunks(self, mock_receipt):
+        self._order("paid", "pi_recon_paid")
+
+        with patch.object(reconciliation, "RECONCILE_CHUNK_SIZE", 2), patch.object(
+            reconciliation, "STRIPE_PAGE_SIZE", 2
+        ), patch.object(
+            reconciliation, "_reconcile_chunk", wraps=reconciliation._reconcile_chunk
+        ) as chunk_spy:
+            summary = reconcile_payment_intents(stripe_client=self.fake_stripe)
+
+        self.assertEqual(chunk_spy.call_count, 3)
+        self.assertEqual(summary["scanned"], 5)
+        self.assertEqual(
+            Order.objects.get(stripe_payment_intent_id="pi_recon_paid").status,
+            Order.Status.PAID,
+        )
@@ -0,0 +1,142 @@
+from unittest.mock import patch
+
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from delivery.models import DeliveryRoute, RouteStop
+from orders.models import Order, Region
+from payments.models import Payment
+from payments.refunds import refund_orders
+from payments.tasks import refund_no_pickup_orders
+from payments.tests.stripe_stub import FakeStripe
+
+
+@override_settings(STRIPE_MAX_REQUESTS_PER_SECOND=0, STRIPE_BULK_MAX_WORKERS=4)
+class RefundOrdersTests(TestCase):
+    def setUp(self):
+        self.region = Region.objects.create(
+            code="refund-west", name="Refund West", delivery_weekday=1, min_orders=0
+        )
+        self.fake_stripe = FakeStripe(unrefundable_payment_intents={"pi_broken"})
+
+    def _paid_order(self, suffix, total_cents=1050, intent_id=None):
+        order = Order.objects.create(
+            full_name=f"Customer {suffix}",
+            email=f"refund-{suffix}@example.com",
+            phone="555-0101",
+            order_type=Order.OrderType.DELIVERY,
+            status=Order.Status.PAID,
+            region=self.region,
+            total_cents=total_cents,
+            stripe_payment_intent_id=intent_id or f"pi_{suffix}",
+        )
+        Payment.objects.create(
+            order=order,
+            kind=Payment.Kind.CHARGE,
+            amount_cents=total_cents,
+            status=Payment.Status.SUCCEEDED,
+            stripe_payment_intent_id=order.stripe_payment_intent_id,
+        )
+        return order
+
+    def test_refunds_remaining_amount_and_reports_each_order(self):
+        full = self._paid_order("full")
+        partial = self._paid_order("partial", total_cents=2000)
+        Payment.objects.create(
+            order=partial,
+            kind=Payment.Kind.REFUND,
+            amount_cents=500,
+            status="succeeded",
+            stripe_payment_intent_id=partial.stripe_payment_intent_id,
+        )
+        unpaid = Order.objects.create(
+            full_name="Unpaid", email="unpaid@example.com", phone="1", region=self.region
+        )
+        broken = self._paid_order("broken", intent_id="pi_broken")
+
+        report = refund_orders(
+            [full, partial, unpaid, broken], stripe_client=self.fake_stripe
+        )
+
+        self.assertEqual(report["requested"], 4)
+        refunded = {item["order_id"]: item["amount_cents"] for item in report["refunded"]}
+        self.assertEqual(refunded, {full.id: 1050, partial.id: 1500})
+        self.assertEqual(report["refunded_cents"], 2550)
+        self.assertEqual(
+            report["skipped"], [{"order_id": unpaid.id, "reason": "no_successful_charge"}]
+        )
+        self.assertEqual([item["order_id"] for item in report["failed"]], [broken.id])
+
+        refund_rows = Payment.objects.filter(kind=Payment.Kind.REFUND, order=full)
+        self.assertEqual(refund_rows.count(), 1)
+        self.assertEqual(refund_rows.get().amount_cents, 1050)
+        self.assertFalse(Payment.objects.filter(kind=Payment.Kind.REFUND, order=broken).exists())
+
+    def test_repeat_run_does_not_refund_twice(self):
+        order = self._paid_order("repeat")
+
+        refund_orders([order], stripe_client=self.fake_stripe)
+        report = refund_orders([order], stripe_client=self.fake_stripe)
+
+        self.assertEqual(report["refunded"], [])
+        self.assertEqual(report["skipped"], [{"order_id": order.id, "reason": "already_refunded"}])
+        self.assertEqual(len(self.fake_stripe.refunds), 1)
+        self.assertEqual(
+            Payment.objects.filter(kind=Payment.Kind.REFUND, order=order).count(), 1
+        )
+
+    def test_webhook_replayed_after_refund_updates_the_charge(self):
+        order = self._paid_order("replay")
+        refund_orders([order], stripe_client=self.fake_stripe)
+        event_payload = {
+            "type": "payment_intent.succeeded",
+            "data": {
+                "object": {
+                    "id": order.stripe_payment_intent_id,
+                    "amount": order.total_cents,
+                    "currency": "cad",
+                    "status": "succeeded",
+                    "metadata": {"order_id": order.id},
+                }
+            },
+        }
+
+        with patch("payments.webhooks.STRIPE_WEBHOOK_SECRET", "whsec_test"), patch(
+            "payments.webhooks.stripe.Webhook.construct_event", return_value=event_payload
+        ), patch("payments.webhooks.send_order_receipt_email_task"):
+            response = self.client.post(
+                reverse("stripe-webhook"),
+                data=event_payload,
+                content_type="application/json",
+                HTTP_STRIPE_SIGNATURE="dummy",
+            )
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            Payment.objects.filter(kind=Payment.Kind.CHARGE, order=order).count(), 1
+        )
+        self.assertEqual(
+            Payment.objects.filter(kind=Payment.Kind.REFUND, order=order).count(), 1
+        )
+
+    def test_task_refunds_no_pickup_stops_for_date(self):
+        today = timezone.localdate()
+        route = DeliveryRoute.objects.create(region=self.region, date=today)
+        no_pickup = self._paid_order("nopickup")
+        delivered = self._paid_order("delivered")
+        RouteStop.objects.create(
+            route=route, order=no_pickup, sequence=1, status=RouteStop.Status.NO_PICKUP
+        )
+        RouteStop.objects.create(
+            route=route, order=delivered, sequence=2, status=RouteStop.Status.DELIVERED
+        )
+
+        with patch("payments.refunds.stripe", self.fake_stripe):
+            report = refund_no_pickup_orders(today.isoformat())
+
+        self.assertEqual(report["delivery_date"], today.isoformat())
+        self.assertEqual([item["order_id"] for item in report["refunded"]], [no_pickup.id])
+        self.assertFalse(
+            Payment.objects.filter(kind=Payment.Kind.REFUND, order=delivered).exists()
+        )
@@ -1,30 +1,87 @@
-from rest_framework import filters, viewsets
-from django.db import models
+from rest_framework import viewsets
+from rest_framework.decorators import action
+from rest_framework.exceptions import NotFound
+from rest_framework.response import Response
 
-from .models import Category, Product
+from shop.conditional import conditional_get, make_etag
+from shop.fields import FieldSelection, sparse_data
+
+from .catalog import (
+    absolute_media_urls,
+    filter_products,
+    get_catalog_version,
+    product_queryset,
+    render_category_list,
+    render_product,
+    render_product_list,
+    render_search,
+)
+from .models import Category
+from .search import DEFAULT_LIMIT, MAX_LIMIT
 from .serializers import CategorySerializer, ProductSerializer
 
 
+def catalog_etag(request, *args, **kwargs):
+    return make_etag(request, get_catalog_version())
+
+
 class ProductViewSet(viewsets.ReadOnlyModelViewSet):
-    queryset = Product.objects.filter(is_active=True)
+    """
+    Products, optionally narrowed by `?category=` (slug or name) and `?search=`
+    (full-text, best match first).
+
+    Responses are rendered once per catalog version and filter (products.catalog), then
+    narrowed to the request's `?fields=`/`?expand=` (shop.fields); `?expand=` alone drops
+    the nested category and images.
+    """
+
     serializer_class = ProductSerializer
-    filter_backends = [filters.SearchFilter]
-    search_fields = ["name", "category__name"]
     lookup_field = "slug"
 
+    def get_filters(self):
+        params = self.request.query_params
+        return params.get("category", "").strip(), params.get("search", "").strip()
+
+    def sparse(self, data):
+        return sparse_data(ProductSerializer(), data, FieldSelection.from_request(self.request))
+
     def get_queryset(self):
-        queryset = super().get_queryset()
-        category = self.request.query_params.get("category")
+        category, search = self.get_filters()
+        return filter_products(product_queryset(), category, search)
+
+    @conditional_get(etag_func=catalog_etag)
+    def list(self, request, *args, **kwargs):
+        category, search = self.get_filters()
+        products = render_product_list(category=category, search=search)
+        return Response(self.sparse(absolute_media_urls(products, request)))
 
-        if category:
-            queryset = queryset.filter(
-                models.Q(category__slug__iexact=category)
-                | models.Q(category__name__iexact=category)
-            )
+    @conditional_get(etag_func=catalog_etag)
+    def retrieve(self, request, *args, **kwargs):
+        product = render_product(kwargs[self.lookup_field])
+        if product is None:
+            raise NotFound()
+        return Response(self.sparse(absolute_media_urls([product], request)[0]))
 
-        return queryset
+    @action(detail=False, methods=["get"], url_path="search")
+    @conditional_get(etag_func=catalog_etag)
+    def search(self, request, *args, **kwargs):
+        """Autocomplete: the top `?limit=` matches of `?q=` with highlighted names."""
+        try:
+            limit = int(request.query_params.get("limit", DEFAULT_LIMIT))
+        except ValueError:
+            limit = DEFAULT_LIMIT
+        limit = max(1, min(limit, MAX_LIMIT))
+        return Response(render_search(request.query_params.get("q", ""), limit))
 
 
 class CategoryViewSet(viewsets.ReadOnlyModelViewSet):
     queryset = Category.objects.all().order_by("name")
     serializer_class = CategorySerializer
+
+    @conditional_get(etag_func=catalog_etag)
+    def list(self, request, *args, **kwargs):
+        return Response(render_category_list())
+
+    @conditional_get(etag_func=catalog_etag)
+    def retrieve(self, request, *args, **kwargs):
+        return super().retrieve(request, *args, **kwargs)
@@ -0,0 +1,171 @@
+import hashlib
+import logging
+import secrets
+from typing import Any, Callable, Dict, List, Optional
+
+from django.db import models
+
+from shop.cache import app_cache
+from shop.images import absolute_srcset
+from shop.media import signed_url_cache_seconds
+from .models import Category, Product
+from .search import ranked_product_ids, search_products, search_terms
+from .serializers import CategorySerializer, ProductSerializer
+
+logger = logging.getLogger(__name__)
+
+products_cache = app_cache("products")
+CATALOG_VERSION_CACHE_KEY = "catalog_version"
+# Rendered payloads are keyed by catalog version, so this only bounds dead entries.
+CATALOG_CACHE_TIMEOUT = 24 * 60 * 60
+# Bumps within this window share one warm-up run.
+CATALOG_WARM_PENDING_KEY = "catalog_warm_pending"
+CATALOG_WARM_DELAY_SECONDS = 5
+
+
+def get_catalog_version() -> str:
+    """
+    Return an opaque token that changes whenever catalog data changes.
+
+    A missing key (cold cache, eviction) yields a fresh random version, so anything
+    pinned to an older version is treated as stale rather than trusted.
+    """
+    version = products_cache.get(CATALOG_VERSION_CACHE_KEY)
+    if version is None:
+        version = secrets.token_hex(8)
+        if not products_cache.add(CATALOG_VERSION_CACHE_KEY, version, timeout=None):
+            version = products_cache.get(CATALOG_VERSION_CACHE_KEY) or version
+    return version
+
+
+def bump_catalog_version() -> str:
+    version = secrets.token_hex(8)
+    products_cache.set(CATALOG_VERSION_CACHE_KEY, version, timeout=None)
+    return version
+
+
+def product_queryset():
+    """Active products with everything ProductSerializer reads, in two queries."""
+    return (
+        Product.objects.filter(is_active=True)
+        .select_related("category")
+        .prefetch_related("images")
+        .order_by("id")
+    )
+
+
+def filter_products(queryset, category: str = "", search: str = ""):
+    """
+    Narrow products to a category (slug or name) and, when searching, to full-text
+    matches of `search` ordered by relevance (products.search).
+    """
+    if category:
+        queryset = queryset.filter(
+            models.Q(category__slug__iexact=category) | models.Q(category__name__iexact=category)
+        )
+    if search_terms(search):
+        ids = ranked_product_ids(search)
+        ranking = models.Case(
+            *[models.When(id=product_id, then=position) for position, product_id in enumerate(ids)],
+            output_field=models.IntegerField(),
+        )
+        queryset = queryset.filter(id__in=ids).order_by(ranking) if ids else queryset.none()
+    return queryset
+
+
+def cached_catalog(kind: str, params: Dict[str, str], build: Callable[[], Any]) -> Any:
+    """
+    The payload `build` renders for `kind` and `params`, cached under the catalog version.
+
+    A bump orphans every entry at once; concurrent misses render only once.
+    """
+    raw = "&".join(f"{name}={value}" for name, value in sorted(params.items()))
+    digest = hashlib.sha1(raw.encode()).hexdigest()[:16]
+    key = f"catalog:{get_catalog_version()}:{kind}:{digest}"
+    # Payloads embed media URLs; signed ones must not outlive their signature.
+    timeout = min(CATALOG_CACHE_TIMEOUT, signed_url_cache_seconds() or CATALOG_CACHE_TIMEOUT)
+    return products_cache.get_or_compute(key, build, timeout=timeout)
+
+
+def render_product_list(category: str = "", search: str = "") -> List[Dict[str, Any]]:
+    def build():
+        products = filter_products(product_queryset(), category, search)
+        return list(ProductSerializer(products, many=True).data)
+
+    return cached_catalog("products", {"category": category, "search": search}, build)
+
+
+def render_product(slug: str) -> Optional[Dict[str, Any]]:
+    """A product's payload, or None when there is no active product with this slug."""
+
+    def build():
+        product = product_queryset().filter(slug=slug).first()
+        return ProductSerializer(product).data if product else None
+
+    return cached_catalog("product", {"slug": slug}, build)
+
+
+def render_search(query: str, limit: int) -> List[Dict[str, Any]]:
+    """Top `limit` matches for autocomplete, with highlighted names."""
+    normalized = " ".join(search_terms(query))
+    return cached_catalog(
+        "search", {"q": normalized, "limit": str(limit)}, lambda: search_products(normalized, limit)
+    )
+
+
+def render_category_list() -> List[Dict[str, Any]]:
+    def build():
+        return list(CategorySerializer(Category.objects.order_by("name"), many=True).data)
+
+    return cached_catalog("categories", {}, build)
+
+
+def absolute_media_urls(products: List[Dict[str, Any]], request) -> List[Dict[str, Any]]:
+    """
+    Cached payloads hold image URLs as the storage returns them; make relative ones
+    absolute for this request, as the serializers do when given one.
+    """
+
+    def absolute(url: str) -> str:
+        return request.build_absolute_uri(url) if url and url.startswith("/") else url
+
+    rendered = []
+    for product in products:
+        product = dict(product)
+        product["image_url"] = absolute(product.get("image_url", ""))
+        product["image_srcset"] = absolute_srcset(product.get("image_srcset"), absolute)
+        product["images"] = [
+            {
+                **image,
+                "image_url": absolute(image.get("image_url", "")),
+                "image_srcset": absolute_srcset(image.get("image_srcset"), absolute),
+            }
+            for image in product.get("images", [])
+        ]
+        rendered.append(product)
+    return rendered
+
+
+def warm_catalog() -> Dict[str, int]:
+    """Render the unfiltered product list, each category's list and the category list."""
+    products_cache.delete(CATALOG_WARM_PENDING_KEY)
+    render_category_list()
+    rendered = len(render_product_list())
+    slugs = list(Category.objects.values_list("slug", flat=True))
+    for slug in slugs:
+        render_product_list(category=slug)
+    return {"products": rendered, "categories": len(slugs)}
+
+
+def schedule_catalog_warm() -> None:
+    """Queue one warm-up shortly after a burst of catalog changes commits."""
+    from .tasks import warm_catalog_cache
+
+    if not products_cache.add(CATALOG_WARM_PENDING_KEY, 1, timeout=60):
+        return
+    try:
+        # Best effort: a broker outage must not stall the request that saved the change.
+        warm_catalog_cache.apply_async(countdown=CATALOG_WARM_DELAY_SECONDS, retry=False)
+    except Exception:
+        products_cache.delete(CATALOG_WARM_PENDING_KEY)
+        logger.exception("Failed to enqueue catalog cache warm-up")
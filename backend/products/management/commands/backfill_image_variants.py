@@ -0,0 +1,75 @@
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from content.bootstrap import SITE_IMAGES_CONTENT
+from content.models import SiteImage
+from products.catalog import bump_catalog_version
+from products.models import Product, ProductImage
+from shop.conditional import bump_content_version
+from shop.images import build_variants, store_variants, variants_are_current
+
+MODELS = {"product": Product, "productimage": ProductImage, "siteimage": SiteImage}
+
+
+class Command(BaseCommand):
+    help = (
+        "Build missing or stale responsive variants of product, gallery and site images. "
+        "Images are encoded in parallel threads; rows are written from the main thread."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--model",
+            action="append",
+            choices=sorted(MODELS),
+            help="Only backfill this model (repeatable; default: all).",
+        )
+        parser.add_argument("--workers", type=int, default=4, help="Images encoded at once.")
+        parser.add_argument(
+            "--force", action="store_true", help="Rebuild variants that are already current."
+        )
+
+    def handle(self, *args, **options):
+        to_build, to_clear = [], []
+        for name in options["model"] or sorted(MODELS):
+            rows = MODELS[name].objects.only("pk", "image", "image_variants").order_by("pk")
+            for instance in rows.iterator(chunk_size=500):
+                stale = not variants_are_current(instance.image, instance.image_variants)
+                if instance.image and (stale or options["force"]):
+                    to_build.append(instance)
+                elif stale:
+                    # The image was removed; only its variants have to go.
+                    to_clear.append(instance)
+
+        built = failed = 0
+        with ThreadPoolExecutor(max_workers=max(1, options["workers"])) as pool:
+            futures = {pool.submit(build_variants, instance.image): instance for instance in to_build}
+            for future in as_completed(futures):
+                instance = futures[future]
+                try:
+                    variants = future.result()
+                except OSError as exc:
+                    failed += 1
+                    self.stderr.write(f"{instance._meta.label} {instance.pk}: {exc}")
+                    continue
+                self._store(instance, variants)
+                built += 1
+        for instance in to_clear:
+            self._store(instance, {})
+
+        changed = to_build + to_clear
+        if any(not isinstance(instance, SiteImage) for instance in changed):
+            bump_catalog_version()
+        if any(isinstance(instance, SiteImage) for instance in changed):
+            bump_content_version(SITE_IMAGES_CONTENT)
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Built variants for {built} image(s), cleared {len(to_clear)}, {failed} unreadable"
+            )
+        )
+
+    def _store(self, instance, variants):
+        extra = {"updated_at": timezone.now()} if isinstance(instance, SiteImage) else {}
+        store_variants(instance, variants, **extra)
@@ -0,0 +1,40 @@
+from django.db import migrations
+
+# Must match products.search.POSTGRES_DOCUMENT for the planner to use the index.
+DOCUMENT = (
+    "setweight(to_tsvector('english', coalesce(name, '')), 'A') || "
+    "setweight(to_tsvector('english', coalesce(description, '')), 'B')"
+)
+
+
+def create_search_indexes(apps, schema_editor):
+    # SQLite gets its FTS5 table from products.search.ensure_sqlite_search_index.
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    schema_editor.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    schema_editor.execute(
+        f"CREATE INDEX IF NOT EXISTS products_product_search_idx "
+        f"ON products_product USING gin (({DOCUMENT}))"
+    )
+    schema_editor.execute(
+        "CREATE INDEX IF NOT EXISTS products_product_name_trgm_idx "
+        "ON products_product USING gin (name gin_trgm_ops)"
+    )
+
+
+def drop_search_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    schema_editor.execute("DROP INDEX IF EXISTS products_product_search_idx")
+    schema_editor.execute("DROP INDEX IF EXISTS products_product_name_trgm_idx")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("products", "0005_merge_20251204_0000"),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_indexes, drop_search_indexes),
+    ]
@@ -24,6 +24,8 @@ class Product(models.Model):
         null=True,
         help_text="Main product image (stored in S3 or local MEDIA_ROOT).",
     )
+    # Resized WebP/AVIF copies of `image`, built by Celery (shop.images).
+    image_variants = models.JSONField(default=dict, blank=True, editable=False)
     main_image_url = models.URLField(blank=True)
     category = models.ForeignKey(
         Category,
@@ -49,6 +51,7 @@ class ProductImage(models.Model):
         blank=True,
         help_text="Gallery image stored in S3 or media.",
     )
+    image_variants = models.JSONField(default=dict, blank=True, editable=False)
     image_url = models.URLField(blank=True, help_text="Optional external image URL (legacy).")
     alt_text = models.CharField(max_length=255, blank=True)
     sort_order = models.PositiveIntegerField(default=0)
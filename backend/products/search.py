@@ -0,0 +1,201 @@
+"""
+Full-text product search over product names, descriptions and category names.
+
+- Postgres: a weighted tsvector expression index on name and description plus a pg_trgm
+  index on name, so misspelled queries still find products (migration 0006). Category
+  names can't live in an index on products_product; the few categories matching any
+  query word are found first and only their products are checked against the document
+  with the category name appended.
+- SQLite (local and tests): an FTS5 table holding name, description and category name,
+  kept in sync by triggers that `ensure_sqlite_search_index` installs after every migrate.
+
+Every query word is matched as a prefix, so the same search serves autocomplete, and
+every word has to match one of the three fields ("dairy milk" finds milk in Dairy).
+"""
+import html
+import re
+from typing import Any, Dict, List, Optional
+
+from django.db import connections
+
+DEFAULT_LIMIT = 10
+MAX_LIMIT = 50
+MAX_TERMS = 8
+# Marks matches in highlights before the rest of the text is escaped.
+MATCH_START = "\x02"
+MATCH_STOP = "\x03"
+
+# Must match the expression indexed by migration 0006 for Postgres to use the index.
+POSTGRES_DOCUMENT = (
+    "setweight(to_tsvector('english', coalesce(p.name, '')), 'A') || "
+    "setweight(to_tsvector('english', coalesce(p.description, '')), 'B')"
+)
+POSTGRES_CATEGORY_DOCUMENT = "setweight(to_tsvector('english', coalesce(c.name, '')), 'C')"
+
+POSTGRES_SEARCH_SQL = f"""
+WITH q AS (SELECT to_tsquery('english', %s) AS query, to_tsquery('english', %s) AS any_term),
+matches AS (
+    SELECT p.id
+    FROM products_product p CROSS JOIN q
+    WHERE ({POSTGRES_DOCUMENT}) @@ q.query OR p.name %% %s
+    UNION
+    SELECT p.id
+    FROM products_category c
+    CROSS JOIN q
+    JOIN products_product p ON p.category_id = c.id
+    WHERE to_tsvector('english', c.name) @@ q.any_term
+      AND ({POSTGRES_DOCUMENT} || {POSTGRES_CATEGORY_DOCUMENT}) @@ q.query
+)
+SELECT p.id, p.slug, p.name, p.price_cents, p.main_image_url, c.name,
+       ts_headline('english', p.name, q.query, %s),
+       ts_rank({POSTGRES_DOCUMENT} || {POSTGRES_CATEGORY_DOCUMENT}, q.query)
+           + similarity(p.name, %s) AS score
+FROM matches m
+JOIN products_product p ON p.id = m.id
+CROSS JOIN q
+LEFT JOIN products_category c ON c.id = p.category_id
+WHERE p.is_active
+ORDER BY score DESC, p.id
+LIMIT %s
+"""
+
+SQLITE_FTS_TABLE = "products_product_fts"
+SQLITE_TRIGGERS = [f"{SQLITE_FTS_TABLE}_{suffix}" for suffix in ("ai", "ad", "au", "cu")]
+
+SQLITE_SEARCH_SQL = f"""
+SELECT p.id, p.slug, p.name, p.price_cents, p.main_image_url, c.name,
+       highlight({SQLITE_FTS_TABLE}, 0, char(2), char(3)),
+       -bm25({SQLITE_FTS_TABLE}, 10.0, 1.0, 2.0) AS score
+FROM {SQLITE_FTS_TABLE}
+JOIN products_product p ON p.id = {SQLITE_FTS_TABLE}.rowid
+LEFT JOIN products_category c ON c.id = p.category_id
+WHERE {SQLITE_FTS_TABLE} MATCH %s AND p.is_active
+ORDER BY score DESC, p.id
+LIMIT %s
+"""
+
+SQLITE_CATEGORY_NAME = (
+    "coalesce((SELECT name FROM products_category WHERE id = new.category_id), '')"
+)
+
+# The table keeps its own copy of the text: the category name isn't a column of
+# products_product, so it can't be an external-content table over it.
+SQLITE_INDEX_SQL = [
+    f"""
+    CREATE VIRTUAL TABLE {SQLITE_FTS_TABLE} USING fts5(
+        name, description, category, tokenize='porter unicode61 remove_diacritics 2'
+    )
+    """,
+    f"""
+    CREATE TRIGGER {SQLITE_FTS_TABLE}_ai AFTER INSERT ON products_product BEGIN
+        INSERT INTO {SQLITE_FTS_TABLE}(rowid, name, description, category)
+        VALUES (new.id, new.name, new.description, {SQLITE_CATEGORY_NAME});
+    END
+    """,
+    f"""
+    CREATE TRIGGER {SQLITE_FTS_TABLE}_ad AFTER DELETE ON products_product BEGIN
+        DELETE FROM {SQLITE_FTS_TABLE} WHERE rowid = old.id;
+    END
+    """,
+    f"""
+    CREATE TRIGGER {SQLITE_FTS_TABLE}_au
+    AFTER UPDATE OF name, description, category_id ON products_product BEGIN
+        DELETE FROM {SQLITE_FTS_TABLE} WHERE rowid = old.id;
+        INSERT INTO {SQLITE_FTS_TABLE}(rowid, name, description, category)
+        VALUES (new.id, new.name, new.description, {SQLITE_CATEGORY_NAME});
+    END
+    """,
+    f"""
+    CREATE TRIGGER {SQLITE_FTS_TABLE}_cu AFTER UPDATE OF name ON products_category BEGIN
+        UPDATE {SQLITE_FTS_TABLE} SET category = new.name
+        WHERE rowid IN (SELECT id FROM products_product WHERE category_id = new.id);
+    END
+    """,
+    f"""
+    INSERT INTO {SQLITE_FTS_TABLE}(rowid, name, description, category)
+    SELECT p.id, p.name, p.description, coalesce(c.name, '')
+    FROM products_product p
+    LEFT JOIN products_category c ON c.id = p.category_id
+    """,
+]
+
+
+def search_terms(query: str) -> List[str]:
+    """The words of `query`, lowercased; punctuation never reaches the query syntax."""
+    return re.findall(r"[^\W_]+", query.lower())[:MAX_TERMS]
+
+
+def _highlight(text: str) -> str:
+    escaped = html.escape(text or "")
+    return escaped.replace(MATCH_START, "<mark>").replace(MATCH_STOP, "</mark>")
+
+
+def search_products(
+    query: str, limit: Optional[int] = DEFAULT_LIMIT, using: str = "default"
+) -> List[Dict[str, Any]]:
+    """
+    Active products matching every word of `query` (as a prefix), best match first.
+
+    One query on either backend; `highlight` is the product name as HTML with the
+    matched words wrapped in <mark>. `limit=None` returns every match.
+    """
+    terms = search_terms(query)
+    if not terms:
+        return []
+    connection = connections[using]
+    if connection.vendor == "postgresql":
+        text = " ".join(terms)
+        prefixes = [f"{term}:*" for term in terms]
+        headline = f'StartSel="{MATCH_START}", StopSel="{MATCH_STOP}", HighlightAll=true'
+        sql = POSTGRES_SEARCH_SQL
+        params = [" & ".join(prefixes), " | ".join(prefixes), text, headline, text, limit]
+    else:
+        match = " ".join(f'"{term}"*' for term in terms)
+        sql = SQLITE_SEARCH_SQL
+        params = [match, -1 if limit is None else limit]
+
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        rows = cursor.fetchall()
+    return [
+        {
+            "id": product_id,
+            "slug": slug,
+            "name": name,
+            "price_cents": price_cents,
+            "main_image_url": main_image_url,
+            "category_name": category_name or "",
+            "highlight": _highlight(highlight),
+            "score": float(score),
+        }
+        for product_id, slug, name, price_cents, main_image_url, category_name, highlight, score in rows
+    ]
+
+
+def ranked_product_ids(query: str, using: str = "default") -> List[int]:
+    return [row["id"] for row in search_products(query, limit=None, using=using)]
+
+
+def ensure_sqlite_search_index(using: str = "default") -> bool:
+    """
+    Create the FTS5 table and its triggers when any is missing, indexing existing rows.
+
+    SQLite drops triggers when a migration rebuilds products_product, so this runs after
+    every migrate rather than once. Whatever is left of an older index is dropped first.
+    Returns whether the index had to be (re)built.
+    """
+    connection = connections[using]
+    if connection.vendor != "sqlite":
+        return False
+    names = [SQLITE_FTS_TABLE] + SQLITE_TRIGGERS
+    placeholders = ", ".join(["%s"] * len(names))
+    with connection.cursor() as cursor:
+        cursor.execute(f"SELECT COUNT(*) FROM sqlite_master WHERE name IN ({placeholders})", names)
+        if cursor.fetchone()[0] == len(names):
+            return False
+        for trigger in SQLITE_TRIGGERS:
+            cursor.execute(f"DROP TRIGGER IF EXISTS {trigger}")
+        cursor.execute(f"DROP TABLE IF EXISTS {SQLITE_FTS_TABLE}")
+        for statement in SQLITE_INDEX_SQL:
+            cursor.execute(statement)
+    return True
@@ -1,23 +1,38 @@
 from rest_framework import serializers
 
+from shop.fields import SparseFieldsMixin
+from shop.images import srcset, variant_names
+from shop.media import MediaUrlListSerializer, media_resolver
+
 from .models import Category, Product, ProductImage
 
 
+def image_media_names(obj):
+    """Storage names of an image and its variants, for MediaUrlListSerializer."""
+    if not obj.image:
+        return []
+    return [obj.image.name, *variant_names(obj.image_variants)]
+
+
 class ProductImageSerializer(serializers.ModelSerializer):
     image_url = serializers.SerializerMethodField()
+    image_srcset = serializers.SerializerMethodField()
 
     class Meta:
         model = ProductImage
-        fields = ["id", "image_url", "alt_text", "sort_order"]
+        fields = ["id", "image_url", "image_srcset", "alt_text", "sort_order"]
+        list_serializer_class = MediaUrlListSerializer
+
+    def media_names(self, obj):
+        return image_media_names(obj)
+
+    def get_image_srcset(self, obj):
+        return srcset(obj.image, obj.image_variants, media_resolver(self.context).url)
 
     def get_image_url(self, obj):
         if obj.image:
             try:
-                url = obj.image.url
-                request = self.context.get("request")
-                if request:
-                    return request.build_absolute_uri(url)
-                return url
+                return media_resolver(self.context).url(obj.image.name)
             except Exception:
                 pass
         return obj.image_url or ""
@@ -29,9 +44,10 @@ class CategorySerializer(serializers.ModelSerializer):
         fields = ["id", "name", "slug", "description"]
 
 
-class ProductSerializer(serializers.ModelSerializer):
+class ProductSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     images = ProductImageSerializer(many=True, read_only=True)
     image_url = serializers.SerializerMethodField()
+    image_srcset = serializers.SerializerMethodField()
     category = CategorySerializer(read_only=True)
     category_name = serializers.CharField(source="category.name", read_only=True)
 
@@ -45,21 +61,29 @@ class ProductSerializer(serializers.ModelSerializer):
             "price_cents",
             "main_image_url",
             "image_url",
+            "image_srcset",
             "category",
             "category_name",
             "is_popular",
             "is_active",
             "images",
         ]
+        list_serializer_class = MediaUrlListSerializer
+        expandable_fields = ["category", "images"]
+        field_sources = {"image_url": ["image"], "image_srcset": ["image", "image_variants"]}
+
+    def media_names(self, obj):
+        names = image_media_names(obj)
+        if "images" not in self.fields:
+            return names
+        for image in obj.images.all():
+            names.extend(image_media_names(image))
+        return names
+
+    def get_image_srcset(self, obj):
+        return srcset(obj.image, obj.image_variants, media_resolver(self.context).url)
 
     def get_image_url(self, obj):
         if not obj.image:
             return ""
-        try:
-            url = obj.image.url
-        except ValueError:
-            return ""
-        request = self.context.get("request")
-        if request:
-            return request.build_absolute_uri(url)
-        return url
+        return media_resolver(self.context).url(obj.image.name)
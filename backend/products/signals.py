@@ -0,0 +1,36 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_migrate, post_save
+from django.dispatch import receiver
+
+from products.catalog import bump_catalog_version, schedule_catalog_warm
+from products.models import Category, Product, ProductImage
+from products.search import ensure_sqlite_search_index
+from products.tasks import generate_image_variants
+from shop.images import schedule_variants
+
+
+@receiver(post_save, sender=Product)
+@receiver(post_delete, sender=Product)
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+@receiver(post_save, sender=ProductImage)
+@receiver(post_delete, sender=ProductImage)
+def bump_catalog_version_on_product_change(sender, instance, **kwargs):
+    # After commit: a bump inside the transaction would let a concurrent request cache
+    # (or sign quotes with) the old rows under the new version.
+    transaction.on_commit(bump_catalog_version)
+    transaction.on_commit(schedule_catalog_warm)
+
+
+@receiver(post_save, sender=Product)
+@receiver(post_save, sender=ProductImage)
+def build_image_variants(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    schedule_variants(instance, generate_image_variants, instance._meta.model_name, instance.pk)
+
+
+@receiver(post_migrate)
+def install_sqlite_search_index(sender, using="default", **kwargs):
+    if sender.name == "products":
+        ensure_sqlite_search_index(using)
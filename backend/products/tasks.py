@@ -0,0 +1,43 @@
+import logging
+
+from celery import shared_task
+
+from shop.images import refresh_variants
+
+from .catalog import bump_catalog_version, warm_catalog
+from .models import Product, ProductImage
+
+logger = logging.getLogger(__name__)
+
+IMAGE_MODELS = {"product": Product, "productimage": ProductImage}
+
+
+@shared_task(name="products.warm_catalog_cache", ignore_result=True)
+def warm_catalog_cache() -> dict:
+    """
+    Render the common catalog payloads under the current version after a change.
+    """
+    return warm_catalog()
+
+
+@shared_task(name="products.generate_image_variants", ignore_result=True)
+def generate_image_variants(model: str, pk: int) -> dict:
+    """
+    Build the WebP/AVIF variants of a product's or gallery image's upload.
+    """
+    instance = IMAGE_MODELS[model].objects.filter(pk=pk).first()
+    if instance is None:
+        return {"model": model, "pk": pk, "built": False, "reason": "missing"}
+    try:
+        built = refresh_variants(instance)
+    except OSError:
+        logger.warning(
+            "image_variants_unreadable",
+            extra={"model": model, "pk": pk, "image": instance.image.name},
+            exc_info=True,
+        )
+        return {"model": model, "pk": pk, "built": False, "reason": "unreadable"}
+    if built:
+        # Serialized products embed the variants.
+        bump_catalog_version()
+    return {"model": model, "pk": pk, "built": built}
@@ -0,0 +1,124 @@
+from contextlib import contextmanager
+from unittest import mock
+
+from django.core.cache import cache
+from django.test import TestCase
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from products.catalog import CATALOG_WARM_PENDING_KEY, products_cache, warm_catalog
+from products.models import Category, Product, ProductImage
+
+
+class CatalogCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        # Start from an empty catalog even if other suites left rows behind.
+        Product.objects.update(is_active=False)
+        Category.objects.all().delete()
+        self.client = APIClient()
+        self.dairy = Category.objects.create(name="Dairy", slug="dairy")
+        self.bakery = Category.objects.create(name="Bakery", slug="bakery")
+        self.milk = Product.objects.create(
+            name="Whole Milk", slug="whole-milk", price_cents=500, category=self.dairy
+        )
+        Product.objects.create(name="Sourdough", slug="sourdough", price_cents=700, category=self.bakery)
+        Product.objects.create(
+            name="Old Cheese", slug="old-cheese", price_cents=900, category=self.dairy, is_active=False
+        )
+        ProductImage.objects.create(product=self.milk, image_url="https://cdn.example.com/milk.jpg")
+        self.url = reverse("product-list")
+
+    @contextmanager
+    def committed(self):
+        """Run the on-commit version bump of the changes made inside."""
+        with mock.patch("products.tasks.warm_catalog_cache.apply_async"):
+            with self.captureOnCommitCallbacks(execute=True):
+                yield
+
+    def test_version_is_bumped_only_once_the_change_commits(self):
+        self.client.get(self.url)
+        with self.committed():
+            self.milk.name = "Skim Milk"
+            self.milk.save()
+            # Until the commit, readers keep the old version and the payload cached under it.
+            self.assertEqual(self.client.get(self.url).json()[0]["name"], "Whole Milk")
+        self.assertEqual(self.client.get(self.url).json()[0]["name"], "Skim Milk")
+
+    def slugs(self, response):
+        return [item["slug"] for item in response.json()]
+
+    def test_repeated_requests_are_served_from_the_cache(self):
+        with self.assertNumQueries(2):
+            first = self.client.get(self.url)
+        self.assertEqual(self.slugs(first), ["whole-milk", "sourdough"])
+        self.assertEqual(first.json()[0]["images"][0]["image_url"], "https://cdn.example.com/milk.jpg")
+        with self.assertNumQueries(0):
+            second = self.client.get(self.url)
+        self.assertEqual(second.json(), first.json())
+
+    def test_query_count_does_not_grow_with_the_catalog(self):
+        for number in range(5):
+            product = Product.objects.create(
+                name=f"Yogurt {number}", slug=f"yogurt-{number}", price_cents=300, category=self.dairy
+            )
+            ProductImage.objects.create(product=product, image_url="https://cdn.example.com/y.jpg")
+        with self.assertNumQueries(2):
+            response = self.client.get(self.url, {"category": "dairy"})
+        self.assertEqual(len(response.json()), 6)
+
+    def test_filters_are_cached_separately(self):
+        self.assertEqual(self.slugs(self.client.get(self.url, {"category": "Bakery"})), ["sourdough"])
+        self.assertEqual(self.slugs(self.client.get(self.url, {"search": "milk"})), ["whole-milk"])
+        self.assertEqual(self.slugs(self.client.get(self.url, {"search": "sour"})), ["sourdough"])
+
+    def test_changes_invalidate_cached_payloads(self):
+        self.client.get(self.url)
+        self.client.get(reverse("product-detail", args=["whole-milk"]))
+        Product.objects.filter(pk=self.milk.pk).update(name="Skim Milk")
+        self.milk.refresh_from_db()
+        with self.committed():
+            self.milk.save()
+        self.assertEqual(self.client.get(self.url).json()[0]["name"], "Skim Milk")
+        detail = self.client.get(reverse("product-detail", args=["whole-milk"]))
+        self.assertEqual(detail.json()["name"], "Skim Milk")
+
+        with self.committed():
+            Category.objects.get(slug="bakery").delete()
+        self.assertIsNone(self.client.get(self.url).json()[1]["category"])
+
+    def test_sparse_fieldsets_share_the_cached_payload(self):
+        self.client.get(self.url)
+        with self.assertNumQueries(0):
+            sparse = self.client.get(self.url, {"fields": "slug,images.image_url"})
+        self.assertEqual(
+            sparse.json(),
+            [
+                {"slug": "whole-milk", "images": [{"image_url": "https://cdn.example.com/milk.jpg"}]},
+                {"slug": "sourdough", "images": []},
+            ],
+        )
+        detail = self.client.get(reverse("product-detail", args=["whole-milk"]), {"expand": ""}).json()
+        self.assertNotIn("images", detail)
+        self.assertNotIn("category", detail)
+        self.assertEqual(detail["category_name"], "Dairy")
+
+    def test_missing_products_are_not_found(self):
+        response = self.client.get(reverse("product-detail", args=["old-cheese"]))
+        self.assertEqual(response.status_code, 404)
+
+    def test_changes_schedule_one_warm_up_after_commit(self):
+        with mock.patch("products.tasks.warm_catalog_cache.apply_async") as apply_async:
+            with self.captureOnCommitCallbacks(execute=True):
+                self.milk.save()
+                ProductImage.objects.create(product=self.milk, image_url="https://cdn.example.com/2.jpg")
+        apply_async.assert_called_once_with(countdown=5, retry=False)
+        self.assertIsNotNone(products_cache.get(CATALOG_WARM_PENDING_KEY))
+
+    def test_warm_up_renders_the_common_payloads(self):
+        self.assertEqual(warm_catalog(), {"products": 2, "categories": 2})
+        self.assertIsNone(products_cache.get(CATALOG_WARM_PENDING_KEY))
+        with self.assertNumQueries(0):
+            self.client.get(self.url)
+            self.client.get(self.url, {"category": "dairy"})
+            self.client.get(reverse("category-list"))
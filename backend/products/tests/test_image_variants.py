@@ -0,0 +1,100 @@
+import io
+import os
+import tempfile
+from unittest import mock
+
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from PIL import Image
+from rest_framework.test import APIClient
+
+from content.models import SiteImage
+from products.models import Product
+from products.tasks import generate_image_variants
+from shop.images import build_variants, variant_names
+
+MEDIA_ROOT = tempfile.mkdtemp()
+
+
+def jpeg(width, height=None):
+    buffer = io.BytesIO()
+    Image.new("RGB", (width, height or width // 2), "teal").save(buffer, format="JPEG")
+    return ContentFile(buffer.getvalue())
+
+
+@override_settings(
+    STORAGES={
+        "default": {"BACKEND": "django.core.files.storage.FileSystemStorage"},
+        "staticfiles": {"BACKEND": "django.contrib.staticfiles.storage.StaticFilesStorage"},
+    },
+    MEDIA_ROOT=MEDIA_ROOT,
+    MEDIA_URL="/media/",
+    IMAGE_VARIANT_WIDTHS=[320, 640, 1280],
+    IMAGE_VARIANT_FORMATS=["webp"],
+)
+class ImageVariantTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        Product.objects.update(is_active=False)
+        self.product = Product.objects.create(name="Honey", slug="honey", price_cents=900)
+        self.product.image.save("honey.jpg", jpeg(1000), save=False)
+        Product.objects.filter(pk=self.product.pk).update(image=self.product.image.name)
+
+    def test_variants_are_never_upscaled_and_named_by_content(self):
+        variants = build_variants(self.product.image)
+        self.assertEqual(variants["source"], self.product.image.name)
+        widths = variants["formats"]["webp"]
+        self.assertEqual(sorted(widths, key=int), ["320", "640", "1000"])
+        for width, name in widths.items():
+            self.assertRegex(name, rf"^products/honey[^/]*-{width}w\.[0-9a-f]{{10}}\.webp$")
+            with Image.open(os.path.join(MEDIA_ROOT, name)) as image:
+                self.assertEqual((image.format, image.width), ("WEBP", int(width)))
+        # Rebuilding the same upload reuses the same files.
+        self.assertEqual(build_variants(self.product.image), variants)
+
+    def test_task_builds_variants_and_the_api_exposes_a_srcset(self):
+        self.assertEqual(self.client.get(reverse("product-list")).json()[0]["image_srcset"], {})
+        self.assertTrue(generate_image_variants("product", self.product.pk)["built"])
+        self.assertFalse(generate_image_variants("product", self.product.pk)["built"])
+
+        item = APIClient().get(reverse("product-list")).json()[0]
+        candidates = item["image_srcset"]["webp"].split(", ")
+        self.assertEqual([candidate.rsplit(" ", 1)[1] for candidate in candidates], ["320w", "640w", "1000w"])
+        self.assertTrue(candidates[0].startswith("http://testserver/media/products/honey"))
+
+    def test_a_new_upload_replaces_the_old_variants(self):
+        generate_image_variants("product", self.product.pk)
+        self.product.refresh_from_db()
+        old = variant_names(self.product.image_variants)
+        self.product.image.save("honey-v2.jpg", jpeg(500), save=False)
+        Product.objects.filter(pk=self.product.pk).update(image=self.product.image.name)
+
+        generate_image_variants("product", self.product.pk)
+        self.product.refresh_from_db()
+        self.assertEqual(list(self.product.image_variants["formats"]["webp"]), ["320", "500"])
+        self.assertFalse(any(os.path.exists(os.path.join(MEDIA_ROOT, name)) for name in old))
+
+    def test_saving_a_new_image_queues_the_task(self):
+        with mock.patch("products.tasks.generate_image_variants.apply_async") as apply_async:
+            with self.captureOnCommitCallbacks(execute=True):
+                self.product.save()
+        apply_async.assert_called_once_with(args=("product", self.product.pk), retry=False)
+
+    def test_backfill_command_covers_site_images(self):
+        site_image = SiteImage.objects.create(key="home.hero")
+        site_image.image.save("hero.jpg", jpeg(2000), save=False)
+        SiteImage.objects.filter(pk=site_image.pk).update(image=site_image.image.name)
+        broken = Product.objects.create(name="Broken", slug="broken", price_cents=1, image="products/missing.jpg")
+
+        out, err = io.StringIO(), io.StringIO()
+        call_command("backfill_image_variants", workers=2, stdout=out, stderr=err)
+        self.assertIn("Built variants for 2 image(s), cleared 0, 1 unreadable", out.getvalue())
+        self.assertIn(f"products.Product {broken.pk}", err.getvalue())
+
+        site_image.refresh_from_db()
+        self.assertEqual(list(site_image.image_variants["formats"]["webp"]), ["320", "640", "1280", "2000"])
+        data = self.client.get(reverse("content:site-image-detail", args=["home.hero"])).json()
+        self.assertTrue(data["srcset"]["webp"].startswith("/media/site_images/hero"))
@@ -0,0 +1,94 @@
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from products.models import Category, Product
+from products.search import ensure_sqlite_search_index, search_products, search_terms
+
+
+class ProductSearchTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        Product.objects.update(is_active=False)
+        self.client = APIClient()
+        self.dairy = dairy = Category.objects.create(name="Dairy", slug="dairy")
+        self.milk = Product.objects.create(
+            name="Whole Milk", slug="whole-milk", price_cents=500, category=dairy
+        )
+        Product.objects.create(
+            name="Chocolate Bar",
+            slug="chocolate-bar",
+            price_cents=300,
+            description="Made with whole milk from local farms.",
+        )
+        Product.objects.create(name="Milkweed Honey", slug="milkweed-honey", price_cents=900)
+        Product.objects.create(name="Old Milk", slug="old-milk", price_cents=100, is_active=False)
+
+    def slugs(self, results):
+        return [result["slug"] for result in results]
+
+    def test_name_matches_rank_above_description_matches(self):
+        results = search_products("whole milk")
+        self.assertEqual(self.slugs(results), ["whole-milk", "chocolate-bar"])
+        self.assertEqual(results[0]["highlight"], "<mark>Whole</mark> <mark>Milk</mark>")
+        self.assertEqual(results[0]["category_name"], "Dairy")
+
+    def test_words_match_as_prefixes(self):
+        self.assertEqual(set(self.slugs(search_products("mil"))), {"whole-milk", "chocolate-bar", "milkweed-honey"})
+        self.assertEqual(self.slugs(search_products("milkw", limit=1)), ["milkweed-honey"])
+
+    def test_index_follows_updates_and_deletes(self):
+        self.milk.name = "Oat Drink"
+        self.milk.save()
+        self.assertEqual(self.slugs(search_products("oat")), ["whole-milk"])
+        self.milk.delete()
+        self.assertEqual(search_products("oat"), [])
+
+    def test_category_names_match(self):
+        cheese = Product.objects.create(
+            name="Aged Cheddar", slug="aged-cheddar", price_cents=700, category=self.dairy
+        )
+        self.assertEqual(set(self.slugs(search_products("dairy"))), {"whole-milk", "aged-cheddar"})
+        self.assertEqual(self.slugs(search_products("dairy cheddar")), ["aged-cheddar"])
+        response = self.client.get(reverse("product-list"), {"search": "dairy"})
+        self.assertEqual(set(self.slugs(response.json())), {"whole-milk", "aged-cheddar"})
+
+        self.dairy.name = "Fromagerie"
+        self.dairy.save()
+        self.assertEqual(search_products("dairy"), [])
+        self.assertEqual(self.slugs(search_products("fromagerie cheddar")), ["aged-cheddar"])
+        cheese.category = None
+        cheese.save()
+        self.assertEqual(self.slugs(search_products("fromagerie")), ["whole-milk"])
+
+    def test_query_syntax_is_never_passed_through(self):
+        self.assertEqual(search_terms('"milk" OR (honey*'), ["milk", "or", "honey"])
+        self.assertEqual(search_products("***"), [])
+        self.assertEqual(self.slugs(search_products("honey*")), ["milkweed-honey"])
+
+    def test_highlights_escape_html(self):
+        Product.objects.create(name="Milk & <Cookies>", slug="milk-cookies", price_cents=400)
+        [result] = search_products("cookies")
+        self.assertEqual(result["highlight"], "Milk &amp; &lt;<mark>Cookies</mark>&gt;")
+
+    def test_search_endpoint_returns_the_top_matches_in_one_query(self):
+        url = reverse("product-search")
+        with self.assertNumQueries(1):
+            response = self.client.get(url, {"q": "milk", "limit": 2})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.json()), 2)
+        self.assertEqual(self.client.get(url, {"q": ""}).json(), [])
+
+    def test_list_search_is_ordered_by_relevance(self):
+        response = self.client.get(reverse("product-list"), {"search": "whole milk"})
+        self.assertEqual(self.slugs(response.json()), ["whole-milk", "chocolate-bar"])
+
+    def test_sqlite_index_is_rebuilt_when_its_triggers_are_missing(self):
+        self.assertFalse(ensure_sqlite_search_index())
+        with connection.cursor() as cursor:
+            cursor.execute("DROP TRIGGER products_product_fts_ai")
+        self.assertTrue(ensure_sqlite_search_index())
+        Product.objects.create(name="Goat Cheese", slug="goat-cheese", price_cents=800)
+        self.assertEqual(self.slugs(search_products("goat")), ["goat-cheese"])
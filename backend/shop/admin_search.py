@@ -0,0 +1,128 @@
+"""
+Indexed admin search.
+
+Django's admin search runs `UPPER(col) LIKE UPPER('%term%')` on every search field, which
+no index can serve. `TrigramSearchMixin` instead matches:
+
+- on Postgres, `col ILIKE '%term%'` and, for `fuzzy_search_fields`, trigram word similarity
+  (`term <% col`), both served by one pg_trgm GIN index per column
+  (`trigram_index_operation` creates them in each app's migrations);
+- on other databases (SQLite locally), `col LIKE 'term%'`, an exact prefix.
+
+Fields prefixed with `=` (e.g. `"=id"`) match exactly on every database; terms that aren't
+valid values for the field are skipped, so typing a name never errors on an id field.
+"""
+from typing import Iterable, List, Optional
+
+from django.contrib.admin.utils import lookup_spawns_duplicates
+from django.core.exceptions import ValidationError
+from django.db import connections, migrations
+from django.db.models import F, Lookup, Q, Value
+from django.db.models.constants import LOOKUP_SEP
+from django.utils.text import smart_split, unescape_string_literal
+
+
+class ILikeContains(Lookup):
+    lookup_name = "ilike_contains"
+    prepare_rhs = False
+
+    def as_sql(self, compiler, connection):
+        lhs, lhs_params = self.process_lhs(compiler, connection)
+        rhs, rhs_params = self.process_rhs(compiler, connection)
+        return f"{lhs} ILIKE {rhs}", [*lhs_params, *rhs_params]
+
+
+class TrigramWordSimilar(Lookup):
+    """`rhs <% lhs`: some extent of `lhs` is similar to `rhs` (pg_trgm word_similarity)."""
+
+    lookup_name = "trigram_word_similar"
+    prepare_rhs = False
+
+    def as_sql(self, compiler, connection):
+        lhs, lhs_params = self.process_lhs(compiler, connection)
+        rhs, rhs_params = self.process_rhs(compiler, connection)
+        return f"{rhs} <%% {lhs}", [*rhs_params, *lhs_params]
+
+
+class TrigramSearchMixin:
+    """ModelAdmin mixin matching `search_fields` through pg_trgm indexes (see module)."""
+
+    fuzzy_search_fields: Iterable[str] = ()
+
+    def get_search_results(self, request, queryset, search_term):
+        search_fields = [str(field) for field in self.get_search_fields(request)]
+        if not search_fields or not search_term:
+            return queryset, False
+
+        postgres = connections[queryset.db].vendor == "postgresql"
+        terms = []
+        for term in smart_split(search_term):
+            if term.startswith(('"', "'")) and term[0] == term[-1]:
+                term = unescape_string_literal(term)
+            if term:
+                terms.append(term)
+
+        for term in terms:
+            queryset = queryset.filter(
+                Q.create(
+                    [self._term_condition(queryset, field, term, postgres) for field in search_fields],
+                    connector=Q.OR,
+                )
+            )
+        paths = [field.lstrip("=") for field in search_fields]
+        return queryset, any(lookup_spawns_duplicates(self.opts, path) for path in paths)
+
+    def _term_condition(self, queryset, field: str, term: str, postgres: bool) -> Q:
+        if field.startswith("="):
+            path = field[1:]
+            value = self._exact_value(queryset.model, path, term)
+            return Q(**{path: value}) if value is not None else Q(pk__in=[])
+        if not postgres:
+            return Q(**{f"{field}__istartswith": term})
+        pattern = f"%{connections[queryset.db].ops.prep_for_like_query(term)}%"
+        condition = Q(ILikeContains(F(field), Value(pattern)))
+        if field in self.fuzzy_search_fields:
+            condition |= Q(TrigramWordSimilar(F(field), Value(term)))
+        return condition
+
+    @staticmethod
+    def _exact_value(model, path: str, term: str) -> Optional[object]:
+        opts = model._meta
+        field = None
+        for part in path.split(LOOKUP_SEP):
+            field = opts.pk if part == "pk" else opts.get_field(part)
+            if field.is_relation:
+                opts = field.related_model._meta
+        try:
+            return field.to_python(term)
+        except (ValidationError, ValueError, TypeError):
+            return None
+
+
+def trigram_index_operation(table: str, columns: List[str]) -> migrations.RunPython:
+    """
+    A migration operation creating a pg_trgm GIN index on each of `columns`.
+
+    Does nothing on other databases, where TrigramSearchMixin falls back to prefixes.
+    """
+
+    def index_name(column: str) -> str:
+        return f"{table}_{column}_trgm"
+
+    def forwards(apps, schema_editor):
+        if schema_editor.connection.vendor != "postgresql":
+            return
+        schema_editor.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+        for column in columns:
+            schema_editor.execute(
+                f"CREATE INDEX IF NOT EXISTS {index_name(column)} "
+                f"ON {table} USING gin ({column} gin_trgm_ops)"
+            )
+
+    def backwards(apps, schema_editor):
+        if schema_editor.connection.vendor != "postgresql":
+            return
+        for column in columns:
+            schema_editor.execute(f"DROP INDEX IF EXISTS {index_name(column)}")
+
+    return migrations.RunPython(forwards, backwards)
@@ -0,0 +1,214 @@
+"""
+Cache helpers shared by the apps.
+
+- `app_cache("catalog")` namespaces keys per app, so apps can't collide and one app's
+  keys can be told apart in Redis.
+- `get_or_compute` is single-flight: on a miss, one process computes the value while the
+  others wait for it instead of all hitting the database at once.
+- Tags: entries stored with `tags=` become stale when `invalidate_tags` bumps any of
+  their tags, without having to know which keys exist.
+- `FailOpenRedisCache` is the Redis backend of the shared cache and sessions: an outage
+  turns into cache misses instead of failed requests.
+"""
+import logging
+import secrets
+import time
+from typing import Any, Callable, Dict, Iterable, Optional
+
+import redis
+from django.core.cache import caches
+from django.core.cache.backends.base import DEFAULT_TIMEOUT
+from django.core.cache.backends.redis import RedisCache
+
+logger = logging.getLogger(__name__)
+
+TAG_KEY = "tag:{tag}"
+LOCK_SUFFIX = ":lock"
+# Marks a miss, as None is a value worth caching.
+MISSING = object()
+
+
+class AppCache:
+    """A view of a cache alias whose keys are prefixed with `namespace:`."""
+
+    def __init__(self, namespace: str, alias: str = "default"):
+        self.namespace = namespace
+        self.alias = alias
+
+    @property
+    def backend(self):
+        return caches[self.alias]
+
+    def key(self, key: str) -> str:
+        return f"{self.namespace}:{key}"
+
+    def get(self, key: str, default: Any = None) -> Any:
+        return self.backend.get(self.key(key), default)
+
+    def set(self, key: str, value: Any, timeout: Optional[float] = DEFAULT_TIMEOUT) -> None:
+        self.backend.set(self.key(key), value, timeout)
+
+    def add(self, key: str, value: Any, timeout: Optional[float] = DEFAULT_TIMEOUT) -> bool:
+        return self.backend.add(self.key(key), value, timeout)
+
+    def delete(self, key: str) -> bool:
+        return self.backend.delete(self.key(key))
+
+    def get_many(self, keys: Iterable[str]) -> Dict[str, Any]:
+        keys = list(keys)
+        found = self.backend.get_many([self.key(key) for key in keys])
+        return {key: found[self.key(key)] for key in keys if self.key(key) in found}
+
+    def set_many(self, data: Dict[str, Any], timeout: Optional[float] = DEFAULT_TIMEOUT) -> None:
+        self.backend.set_many({self.key(key): value for key, value in data.items()}, timeout)
+
+    def delete_many(self, keys: Iterable[str]) -> None:
+        self.backend.delete_many([self.key(key) for key in keys])
+
+    def get_or_compute(
+        self,
+        key: str,
+        compute: Callable[[], Any],
+        timeout: Optional[float] = DEFAULT_TIMEOUT,
+        tags: Iterable[str] = (),
+        lock_timeout: float = 30,
+        wait: float = 5,
+    ) -> Any:
+        """
+        Return the cached value of `key`, computing and storing it on a miss.
+
+        Only the caller that takes the lock computes; the others poll for up to `wait`
+        seconds and then compute anyway, so a crashed lock holder can't stall requests.
+        """
+        tags = list(tags)
+        value = self._load(key, tags)
+        if value is not MISSING:
+            return value
+        if not getattr(self.backend, "available", True):
+            # Nobody can take or release the lock; waiting for it would only add latency.
+            return compute()
+
+        lock = key + LOCK_SUFFIX
+        if self.add(lock, 1, lock_timeout):
+            try:
+                value = compute()
+                if tags:
+                    self.set_tagged(key, value, tags, timeout)
+                else:
+                    self.set(key, value, timeout)
+                return value
+            finally:
+                self.delete(lock)
+
+        deadline = time.monotonic() + wait
+        delay = 0.01
+        while time.monotonic() < deadline:
+            time.sleep(delay)
+            delay = min(delay * 2, 0.2)
+            value = self._load(key, tags)
+            if value is not MISSING:
+                return value
+        return compute()
+
+    def _load(self, key: str, tags) -> Any:
+        return self.get_tagged(key, MISSING) if tags else self.get(key, MISSING)
+
+    def set_tagged(
+        self, key: str, value: Any, tags: Iterable[str], timeout: Optional[float] = DEFAULT_TIMEOUT
+    ) -> None:
+        self.set(key, {"tags": tag_versions(tags, self.alias), "value": value}, timeout)
+
+    def get_tagged(self, key: str, default: Any = None) -> Any:
+        entry = self.get(key)
+        if not entry:
+            return default
+        current = tag_versions(entry["tags"], self.alias)
+        if current != entry["tags"]:
+            return default
+        return entry["value"]
+
+
+def app_cache(namespace: str, alias: str = "default") -> AppCache:
+    return AppCache(namespace, alias)
+
+
+def tag_versions(tags: Iterable[str], alias: str = "default") -> Dict[str, str]:
+    """Current version token of each tag; tags never seen (or evicted) get a fresh one."""
+    cache = caches[alias]
+    keys = {tag: TAG_KEY.format(tag=tag) for tag in tags}
+    found = cache.get_many(keys.values())
+    versions = {}
+    for tag, key in keys.items():
+        version = found.get(key)
+        if version is None:
+            version = secrets.token_hex(8)
+            if not cache.add(key, version, timeout=None):
+                version = cache.get(key) or version
+        versions[tag] = version
+    return versions
+
+
+def invalidate_tags(*tags: str, alias: str = "default") -> None:
+    """Make every entry stored with any of `tags` stale."""
+    caches[alias].set_many(
+        {TAG_KEY.format(tag=tag): secrets.token_hex(8) for tag in tags}, timeout=None
+    )
+
+
+class FailOpenRedisCache(RedisCache):
+    """
+    RedisCache treating Redis errors as misses, so an outage degrades requests to the
+    database (cached_db sessions included) instead of failing them.
+
+    After an error Redis is skipped for RETRY_AFTER_SECONDS, so requests don't each wait
+    for a connection timeout; `available` tells callers it is being skipped.
+    """
+
+    RETRY_AFTER_SECONDS = 30
+    # Per process and server, as Django builds a cache instance per thread.
+    _paused_until: Dict[str, float] = {}
+
+    @property
+    def available(self) -> bool:
+        return time.monotonic() >= self._paused_until.get(str(self._servers), 0.0)
+
+    def _call(self, operation: str, fallback: Any, *args: Any, **kwargs: Any) -> Any:
+        if not self.available:
+            return fallback
+        try:
+            return getattr(RedisCache, operation)(self, *args, **kwargs)
+        except redis.RedisError:
+            self._paused_until[str(self._servers)] = time.monotonic() + self.RETRY_AFTER_SECONDS
+            logger.warning(
+                "cache_unavailable",
+                extra={"operation": operation, "retry_after": self.RETRY_AFTER_SECONDS},
+                exc_info=True,
+            )
+            return fallback
+
+    def get(self, key, default=None, version=None):
+        return self._call("get", default, key, default, version)
+
+    def get_many(self, keys, version=None):
+        return self._call("get_many", {}, keys, version)
+
+    def has_key(self, key, version=None):
+        return self._call("has_key", False, key, version)
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        return self._call("add", False, key, value, timeout, version)
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        return self._call("set", None, key, value, timeout, version)
+
+    def set_many(self, data, timeout=DEFAULT_TIMEOUT, version=None):
+        return self._call("set_many", list(data), data, timeout, version)
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        return self._call("touch", False, key, timeout, version)
+
+    def delete(self, key, version=None):
+        return self._call("delete", False, key, version)
+
+    def delete_many(self, keys, version=None):
+        return self._call("delete_many", None, keys, version)
@@ -0,0 +1,76 @@
+"""
+Conditional GET support for read endpoints.
+
+Each endpoint describes its validator with a cheap function (a version counter or a single
+aggregate query); the response is only serialized when the client's copy is out of date.
+"""
+import hashlib
+import secrets
+from typing import Any, Callable, Optional
+
+from django.core.cache import cache
+from django.db.models import Count, Max
+from django.utils.decorators import method_decorator
+from django.views.decorators.cache import cache_control
+from django.views.decorators.http import condition
+
+CONTENT_VERSION_CACHE_KEY = "content_version:{name}"
+
+
+def get_content_version(name: str) -> str:
+    """
+    Return an opaque token that changes whenever the content called `name` changes.
+
+    Works like products.catalog.get_catalog_version: a missing key yields a fresh random
+    version, so an eviction only costs clients a full response.
+    """
+    key = CONTENT_VERSION_CACHE_KEY.format(name=name)
+    version = cache.get(key)
+    if version is None:
+        version = secrets.token_hex(8)
+        if not cache.add(key, version, timeout=None):
+            version = cache.get(key) or version
+    return version
+
+
+def bump_content_version(name: str) -> str:
+    version = secrets.token_hex(8)
+    cache.set(CONTENT_VERSION_CACHE_KEY.format(name=name), version, timeout=None)
+    return version
+
+
+def make_etag(request, *parts: Any) -> str:
+    """
+    A strong ETag over `parts` and the full request URL.
+
+    The URL covers query parameters and the host, which ends up in absolute media URLs.
+    """
+    raw = "|".join([request.build_absolute_uri(), *(str(part) for part in parts)])
+    return f'"{hashlib.sha1(raw.encode()).hexdigest()[:32]}"'
+
+
+def queryset_fingerprint(queryset, field: str = "updated_at"):
+    """(row count, latest `field`) of a queryset, computed in one aggregate query."""
+    result = queryset.order_by().aggregate(count=Count("pk"), latest=Max(field))
+    return result["count"], result["latest"]
+
+
+def conditional_get(
+    etag_func: Optional[Callable] = None,
+    last_modified_func: Optional[Callable] = None,
+    private: bool = False,
+):
+    """
+    Decorate an APIView/ViewSet handler with ETag/Last-Modified validation.
+
+    The functions receive `(request, *args, **kwargs)` like the handler. When the request's
+    If-None-Match / If-Modified-Since match, a 304 is returned without running the handler.
+    Responses are marked `no-cache` so clients store them but revalidate every time.
+    """
+
+    def decorator(handler):
+        handler = condition(etag_func=etag_func, last_modified_func=last_modified_func)(handler)
+        handler = cache_control(no_cache=True, private=private, public=not private)(handler)
+        return handler
+
+    return method_decorator(decorator)
@@ -0,0 +1,220 @@
+"""
+Sparse fieldsets.
+
+Hot endpoints take `?fields=` and `?expand=`, comma-separated field names where a dot
+reaches into a nested serializer:
+
+    /api/admin/routes/?fields=id,date,region_code,stops.id,stops.status
+    /api/admin/routes/?expand=stops.order
+
+Without either parameter a response is rendered in full, as before. With them it is sparse:
+
+- `fields` keeps only the named fields; naming a nested field keeps it whole, a dotted
+  path narrows it. Unknown names are ignored.
+- `Meta.expandable_fields` (the heavy nested fields) are left out of a sparse response
+  unless `expand` names them, so `?expand=` alone drops every one of them.
+
+`SparseFieldsMixin` applies the selection to a serializer and its nested serializers.
+`sparse_queryset` trims the queryset behind them to match: loaders for relations no
+rendered field reads never run, and `only()` skips the columns nothing reads.
+`sparse_data` applies a selection to an already rendered payload (e.g. a cached one).
+"""
+from typing import Callable, Dict, Iterable, List, Optional, Set
+
+from django.core.exceptions import FieldDoesNotExist
+from rest_framework import serializers
+
+CONTEXT_KEY = "field_selection"
+
+Loader = Callable[..., object]
+
+
+def _paths(value: Optional[str]) -> List[str]:
+    return [path.strip() for path in (value or "").split(",") if path.strip()]
+
+
+class FieldSelection:
+    """
+    The fields requested at one level of a payload.
+
+    A selection that isn't `sparse` renders everything. Otherwise `only` holds the names
+    asked for (None: every field that isn't expandable), `expand` the expandable fields
+    asked for and `children` the selections of nested fields.
+    """
+
+    def __init__(self, sparse: bool = False):
+        self.sparse = sparse
+        self.only: Optional[Set[str]] = None
+        self.expand: Set[str] = set()
+        self.children: Dict[str, "FieldSelection"] = {}
+
+    @classmethod
+    def from_request(cls, request) -> "FieldSelection":
+        params = getattr(request, "query_params", None)
+        if params is None or ("expand" not in params and not _paths(params.get("fields"))):
+            return FULL
+        selection = cls(sparse=True)
+        fields = _paths(params.get("fields"))
+        if fields:
+            selection.only = set()
+        for path in fields:
+            selection._add(path, expand=False)
+        for path in _paths(params.get("expand")):
+            selection._add(path, expand=True)
+        return selection
+
+    def _add(self, path: str, expand: bool) -> None:
+        name, _, rest = path.partition(".")
+        if expand:
+            self.expand.add(name)
+        elif self.only is not None:
+            self.only.add(name)
+        if not rest:
+            # Named as a whole: rendered whole, whatever else asked for parts of it.
+            self.children[name] = FULL
+            return
+        child = self.children.get(name)
+        if child is FULL:
+            return
+        if child is None:
+            child = self.children[name] = FieldSelection(sparse=True)
+            if not expand:
+                child.only = set()
+        child._add(rest, expand)
+
+    def includes(self, name: str, expandable: Iterable[str] = ()) -> bool:
+        if not self.sparse or name in self.expand:
+            return True
+        if self.only is not None:
+            return name in self.only
+        return name not in expandable
+
+    def nested(self, name: str) -> "FieldSelection":
+        return self.children.get(name, FULL)
+
+
+FULL = FieldSelection()
+
+
+def field_selection(context: dict) -> FieldSelection:
+    """The selection of the request being rendered, shared through the serializer context."""
+    selection = context.get(CONTEXT_KEY)
+    if selection is None:
+        selection = FieldSelection.from_request(context.get("request"))
+        if isinstance(context, dict):
+            context[CONTEXT_KEY] = selection
+    return selection
+
+
+def expandable_fields(serializer) -> Set[str]:
+    serializer = getattr(serializer, "child", serializer)
+    return set(getattr(getattr(serializer, "Meta", None), "expandable_fields", ()))
+
+
+def renders(serializer, selection: FieldSelection, name: str) -> bool:
+    """Whether `serializer` (a class or instance) renders field `name` under `selection`."""
+    return selection.includes(name, expandable_fields(serializer))
+
+
+class SparseFieldsMixin:
+    """
+    Serializer mixin rendering only the fields the request selected (see module).
+
+    `Meta.expandable_fields` lists the nested fields sparse responses leave out unless
+    expanded. `Meta.field_sources` maps fields whose columns can't be read off their
+    `source` (method fields, properties) to those columns, for `sparse_queryset`.
+    """
+
+    def get_fields(self):
+        fields = super().get_fields()
+        selection = self.field_selection()
+        if not selection.sparse:
+            return fields
+        expandable = expandable_fields(self)
+        return {name: field for name, field in fields.items() if selection.includes(name, expandable)}
+
+    def field_selection(self) -> FieldSelection:
+        path = []
+        node = self
+        while node.parent is not None:
+            if node.field_name:
+                path.append(node.field_name)
+            node = node.parent
+        selection = field_selection(self.context)
+        for name in reversed(path):
+            selection = selection.nested(name)
+        return selection
+
+
+def _columns(model, serializer, rendered: List[str]) -> Optional[Set[str]]:
+    """The columns of `model` the `rendered` fields read, or None when that's unknown."""
+    sources = getattr(serializer.Meta, "field_sources", {})
+    columns: Set[str] = set()
+    for name in rendered:
+        if name in sources:
+            columns.update(sources[name])
+            continue
+        attr = serializer.fields[name].source.split(".")[0]
+        try:
+            model_field = model._meta.get_field(attr)
+        except FieldDoesNotExist:
+            return None
+        # Reverse and many-to-many relations are loaded by their own queries.
+        if model_field.concrete and not model_field.many_to_many:
+            columns.add(model_field.name)
+    return columns
+
+
+def sparse_queryset(
+    queryset,
+    serializer_class,
+    selection: FieldSelection,
+    loaders: Optional[Dict[str, Loader]] = None,
+    always: Iterable[str] = (),
+):
+    """
+    `queryset` trimmed to what `serializer_class` renders for `selection`.
+
+    `loaders` maps field names to `loader(queryset, nested_selection)` functions adding the
+    select_related/prefetch_related the field reads; each runs once, and only when one of
+    its fields is rendered. A sparse selection also limits the query with `only()` to the
+    columns of the rendered fields plus `always` (what the caller filters, orders or
+    paginates on), unless some rendered field's columns are unknown.
+    """
+    loaders = loaders or {}
+    serializer = serializer_class()
+    expandable = expandable_fields(serializer)
+    rendered = [name for name in serializer.fields if selection.includes(name, expandable)]
+
+    applied: List[Loader] = []
+    for name in rendered:
+        loader = loaders.get(name)
+        if loader is not None and loader not in applied:
+            applied.append(loader)
+            queryset = loader(queryset, selection.nested(name))
+
+    if selection.sparse:
+        columns = _columns(queryset.model, serializer, rendered)
+        if columns is not None:
+            queryset = queryset.only(*always, *sorted(columns))
+    return queryset
+
+
+def sparse_data(serializer, data, selection: FieldSelection):
+    """Apply `selection` to `data`, rendered in full by `serializer` (e.g. a cached payload)."""
+    if not selection.sparse or data is None:
+        return data
+    if isinstance(data, list):
+        return [sparse_data(serializer, item, selection) for item in data]
+    serializer = getattr(serializer, "child", serializer)
+    fields = serializer.fields
+    expandable = expandable_fields(serializer)
+    result = {}
+    for name, value in data.items():
+        if not selection.includes(name, expandable):
+            continue
+        field = fields.get(name)
+        if isinstance(field, serializers.BaseSerializer):
+            value = sparse_data(field, value, selection.nested(name))
+        result[name] = value
+    return result
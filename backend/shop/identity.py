@@ -0,0 +1,73 @@
+"""
+Request-scoped lookups of who the authenticated user is to the shop.
+
+IdentityMiddleware attaches `request.identity`, which resolves the user's Driver and
+CustomerProfile on first use and then reuses them for the rest of the request, so a
+permission check and the view share a single query.
+"""
+from typing import Any, Dict, Optional
+
+from django.utils.deprecation import MiddlewareMixin
+
+from accounts.models import CustomerProfile
+from delivery.models import Driver
+
+
+class RequestIdentity:
+    def __init__(self, request):
+        self._request = request
+        self._cache: Dict[Any, Any] = {}
+
+    @property
+    def user(self):
+        # Read on every access: DRF authenticates after middleware has run and login()
+        # can switch users mid-request. Lookups are cached per user id.
+        user = getattr(self._request, "user", None)
+        if user is None or not user.is_authenticated:
+            return None
+        return user
+
+    def _lookup(self, name: str, loader):
+        user = self.user
+        if user is None:
+            return None
+        key = (name, user.pk)
+        if key not in self._cache:
+            self._cache[key] = loader(user)
+        return self._cache[key]
+
+    @property
+    def driver(self) -> Optional[Driver]:
+        return self._lookup(
+            "driver",
+            lambda user: Driver.objects.select_related("user", "preferred_region")
+            .filter(user=user)
+            .first(),
+        )
+
+    @property
+    def customer_profile(self) -> Optional[CustomerProfile]:
+        """The user's profile, created if missing (as the account endpoints always have)."""
+        return self._lookup(
+            "customer_profile",
+            lambda user: CustomerProfile.objects.select_related("region").get_or_create(
+                user=user
+            )[0],
+        )
+
+
+def identity_for(request) -> RequestIdentity:
+    """
+    `request.identity` for a Django or DRF request, attached on the spot when the
+    middleware did not run (e.g. requests built with RequestFactory).
+    """
+    request = getattr(request, "_request", request)
+    identity = getattr(request, "identity", None)
+    if identity is None:
+        identity = request.identity = RequestIdentity(request)
+    return identity
+
+
+class IdentityMiddleware(MiddlewareMixin):
+    def process_request(self, request):
+        request.identity = RequestIdentity(request)
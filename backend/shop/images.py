@@ -0,0 +1,188 @@
+"""
+Responsive variants of uploaded images.
+
+Each upload is re-encoded at every `IMAGE_VARIANT_WIDTHS` narrower than itself, in every
+`IMAGE_VARIANT_FORMATS` this Pillow build can write, and stored beside the original as
+`<stem>-<width>w.<content hash>.<format>`. The names change whenever the bytes do, so
+browsers and the CDN may cache them forever. A model keeps them in a JSON field:
+
+    {"source": "products/milk.jpg", "formats": {"webp": {"320": "products/milk-320w.1a2b.webp"}}}
+
+`source` is the upload the variants were built from; when it differs from the current
+file the variants are stale and get rebuilt (see `refresh_variants`). Comparing names is
+enough because storages never overwrite an upload (`AWS_S3_FILE_OVERWRITE = False`): a
+re-uploaded photo always gets a new name.
+"""
+import hashlib
+import io
+import logging
+import posixpath
+from typing import Callable, Dict, Optional
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.db import transaction
+from PIL import Image, ImageOps, features
+
+logger = logging.getLogger(__name__)
+
+# Pillow format name and encoder options per variant format.
+ENCODERS = {
+    "avif": ("AVIF", {"quality": 55, "speed": 6}),
+    "webp": ("WEBP", {"quality": 80, "method": 4}),
+}
+
+
+def variant_formats():
+    return [
+        name
+        for name in settings.IMAGE_VARIANT_FORMATS
+        if name in ENCODERS and features.check(name)
+    ]
+
+
+def variants_are_current(fieldfile, variants: Optional[dict]) -> bool:
+    return (fieldfile.name or "") == (variants or {}).get("source", "")
+
+
+def build_variants(fieldfile) -> dict:
+    """
+    Encode every variant of `fieldfile` and save it next to the original.
+
+    Images are never upscaled: an image narrower than the smallest width gets a single
+    variant at its own width. Raises PIL.UnidentifiedImageError (an OSError) when the
+    file is not an image.
+    """
+    with fieldfile.open("rb") as handle:
+        image = Image.open(handle)
+        image.load()
+    image = ImageOps.exif_transpose(image)
+    if image.mode not in ("RGB", "RGBA"):
+        image = image.convert("RGBA" if "A" in image.getbands() else "RGB")
+
+    widths = sorted({width for width in settings.IMAGE_VARIANT_WIDTHS if width < image.width})
+    if not widths or widths[-1] < image.width:
+        widths.append(image.width)
+
+    storage = fieldfile.storage
+    directory, filename = posixpath.split(fieldfile.name)
+    stem = posixpath.splitext(filename)[0]
+    formats: Dict[str, Dict[str, str]] = {}
+    for name in variant_formats():
+        pillow_format, options = ENCODERS[name]
+        for width in widths:
+            resized = image
+            if width < image.width:
+                height = max(1, round(image.height * width / image.width))
+                resized = image.resize((width, height), Image.Resampling.LANCZOS)
+            buffer = io.BytesIO()
+            # No `exif=` argument is passed, so variants carry no EXIF.
+            resized.save(buffer, format=pillow_format, **options)
+            data = buffer.getvalue()
+            digest = hashlib.sha1(data).hexdigest()[:10]
+            key = posixpath.join(directory, f"{stem}-{width}w.{digest}.{name}")
+            # Same name, same bytes: a rebuild never needs to upload it again.
+            if not storage.exists(key):
+                key = storage.save(key, ContentFile(data))
+            formats.setdefault(name, {})[str(width)] = key
+    return {"source": fieldfile.name, "formats": formats}
+
+
+def variant_names(variants: Optional[dict]):
+    return {
+        key
+        for by_width in (variants or {}).get("formats", {}).values()
+        for key in by_width.values()
+    }
+
+
+def store_variants(
+    instance, variants: dict, field: str = "image", variants_field: str = "image_variants", **update_fields
+) -> None:
+    """
+    Save `variants` on `instance` and delete the files of the ones they replace.
+
+    The row is written with a queryset update, so save signals don't fire again;
+    `update_fields` are written alongside (e.g. a timestamp clients version URLs by).
+    """
+    previous = getattr(instance, variants_field) or {}
+    type(instance).objects.filter(pk=instance.pk).update(**{variants_field: variants}, **update_fields)
+    setattr(instance, variants_field, variants)
+    for key, value in update_fields.items():
+        setattr(instance, key, value)
+
+    storage = getattr(instance, field).storage
+    for key in variant_names(previous) - variant_names(variants):
+        storage.delete(key)
+    logger.info(
+        "image_variants_built",
+        extra={
+            "model": instance._meta.label,
+            "pk": instance.pk,
+            "source": variants.get("source", ""),
+            "variants": len(variant_names(variants)),
+        },
+    )
+
+
+def refresh_variants(
+    instance,
+    field: str = "image",
+    variants_field: str = "image_variants",
+    force: bool = False,
+    **update_fields,
+) -> bool:
+    """
+    Rebuild `instance`'s variants when its image changed (or `force`). Returns whether
+    anything changed.
+    """
+    fieldfile = getattr(instance, field)
+    if not force and variants_are_current(fieldfile, getattr(instance, variants_field)):
+        return False
+    variants = build_variants(fieldfile) if fieldfile else {}
+    store_variants(instance, variants, field, variants_field, **update_fields)
+    return True
+
+
+def schedule_variants(instance, task, *args, field: str = "image", variants_field: str = "image_variants"):
+    """After commit, queue `task(*args)` when `instance`'s variants no longer match its image."""
+    if variants_are_current(getattr(instance, field), getattr(instance, variants_field)):
+        return
+
+    def enqueue():
+        try:
+            # Best effort like the catalog warm-up: the backfill command catches up later.
+            task.apply_async(args=args, retry=False)
+        except Exception:
+            logger.exception("Failed to enqueue image variants for %s %s", instance._meta.label, instance.pk)
+
+    transaction.on_commit(enqueue)
+
+
+def srcset(fieldfile, variants: Optional[dict], url: Optional[Callable[[str], str]] = None):
+    """
+    `{format: "url 320w, url 640w"}` for the current variants of `fieldfile`, ready for a
+    `<source type="image/<format>" srcset=...>`; empty while they are missing or stale.
+
+    `url` turns a storage name into a URL (shop.media.MediaUrlResolver.url in serializers).
+    """
+    if not fieldfile or not variants_are_current(fieldfile, variants):
+        return {}
+    url = url or fieldfile.storage.url
+    result = {}
+    for name, by_width in variants.get("formats", {}).items():
+        ordered = sorted(by_width.items(), key=lambda item: int(item[0]))
+        result[name] = ", ".join(f"{url(key)} {width}w" for width, key in ordered)
+    return result
+
+
+def absolute_srcset(value: Dict[str, str], absolute: Callable[[str], str]) -> Dict[str, str]:
+    """Apply `absolute` to every URL of a `srcset()` map."""
+    result = {}
+    for name, candidates in (value or {}).items():
+        rewritten = []
+        for candidate in candidates.split(", "):
+            url, _, descriptor = candidate.rpartition(" ")
+            rewritten.append(f"{absolute(url)} {descriptor}")
+        result[name] = ", ".join(rewritten)
+    return result
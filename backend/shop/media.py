@@ -0,0 +1,156 @@
+"""
+Cached media URLs.
+
+With S3 querystring auth, every `FieldFile.url` is an HMAC signing operation, and the
+serializers call it once per object per response. `MediaUrlResolver` resolves storage
+names instead:
+
+- public objects (storages without querystring auth, or names under
+  `MEDIA_PUBLIC_PREFIXES`) are joined onto `MEDIA_CDN_URL` without calling the storage;
+- signed URLs are cached per (storage, name) for half their lifetime
+  (`AWS_QUERYSTRING_EXPIRE`), so a cached URL never expires in a client's hands;
+- `prefetch` resolves a batch with one cache round trip, and every resolver remembers
+  what it resolved, so a response signs each unique name at most once.
+
+Serializers share one resolver per response through their context (`media_resolver`);
+list serializers built with `MediaUrlListSerializer` prefetch their children's names.
+"""
+import hashlib
+from typing import Dict, Iterable, Optional
+from urllib.parse import quote
+
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.db import models
+from rest_framework import serializers
+
+from shop.cache import app_cache
+
+media_cache = app_cache("media")
+CONTEXT_KEY = "media_urls"
+# Signed URLs are never cached for longer than this, whatever their lifetime.
+MAX_SIGNED_URL_CACHE_SECONDS = 30 * 60
+
+
+def signs_urls(storage) -> bool:
+    # S3Storage serves a custom domain unsigned unless a CloudFront signer is configured.
+    if not getattr(storage, "querystring_auth", False):
+        return False
+    if not getattr(storage, "custom_domain", None):
+        return True
+    return getattr(storage, "cloudfront_signer", None) is not None
+
+
+def signed_url_cache_seconds(storage=None) -> Optional[int]:
+    """How long a URL of `storage` may be cached, or None when its URLs don't expire."""
+    storage = storage or default_storage
+    if not signs_urls(storage):
+        return None
+    expire = getattr(storage, "querystring_expire", 3600)
+    return max(1, min(expire // 2, MAX_SIGNED_URL_CACHE_SECONDS))
+
+
+def _storage_id(storage) -> str:
+    cls = type(storage)
+    return ":".join(
+        [
+            f"{cls.__module__}.{cls.__qualname__}",
+            str(getattr(storage, "bucket_name", "") or ""),
+            str(getattr(storage, "location", "") or ""),
+        ]
+    )
+
+
+def _is_public(storage, name: str) -> bool:
+    prefixes = tuple(getattr(settings, "MEDIA_PUBLIC_PREFIXES", ()))
+    return not signs_urls(storage) or bool(prefixes and name.startswith(prefixes))
+
+
+class MediaUrlResolver:
+    """Storage name -> URL for one response; absolute when built with a request."""
+
+    def __init__(self, request=None, storage=None):
+        self.request = request
+        self.storage = storage or default_storage
+        self.urls: Dict[str, str] = {}
+        storage_id = _storage_id(self.storage)
+        self._key_prefix = hashlib.sha1(storage_id.encode()).hexdigest()[:12]
+
+    def _cache_key(self, name: str) -> str:
+        return f"{self._key_prefix}:{hashlib.sha1(name.encode()).hexdigest()}"
+
+    def _direct(self, name: str) -> Optional[str]:
+        """The URL when it costs nothing to compute, else None."""
+        if not _is_public(self.storage, name):
+            return None
+        cdn = getattr(settings, "MEDIA_CDN_URL", "")
+        if cdn:
+            return f"{cdn.rstrip('/')}/{quote(name)}"
+        if not signs_urls(self.storage):
+            return self.storage.url(name)
+        return None
+
+    def prefetch(self, names: Iterable[str]) -> None:
+        """Resolve `names` with one cache read and one cache write for the misses."""
+        pending = set()
+        for name in names:
+            if not name or name in self.urls:
+                continue
+            direct = self._direct(name)
+            if direct is not None:
+                self.urls[name] = direct
+            else:
+                pending.add(name)
+        if not pending:
+            return
+
+        keys = {self._cache_key(name): name for name in pending}
+        for key, url in media_cache.get_many(keys).items():
+            self.urls[keys[key]] = url
+        missing = {key: name for key, name in keys.items() if keys[key] not in self.urls}
+        if not missing:
+            return
+        signed = {key: self.storage.url(name) for key, name in missing.items()}
+        media_cache.set_many(signed, timeout=signed_url_cache_seconds(self.storage))
+        for key, url in signed.items():
+            self.urls[missing[key]] = url
+
+    def relative_url(self, name: str) -> str:
+        if name not in self.urls:
+            self.prefetch([name])
+        return self.urls.get(name, "")
+
+    def url(self, name: str) -> str:
+        """The URL of `name`, made absolute for the request (like `build_absolute_uri`)."""
+        if not name:
+            return ""
+        url = self.relative_url(name)
+        if self.request is not None and url.startswith("/"):
+            return self.request.build_absolute_uri(url)
+        return url
+
+
+def media_resolver(context: dict) -> MediaUrlResolver:
+    """The resolver shared by every serializer rendering one response."""
+    resolver = context.get(CONTEXT_KEY)
+    if resolver is None:
+        resolver = MediaUrlResolver(context.get("request"))
+        # A serializer's context is shared with its nested and child serializers.
+        if isinstance(context, dict):
+            context[CONTEXT_KEY] = resolver
+    return resolver
+
+
+class MediaUrlListSerializer(serializers.ListSerializer):
+    """
+    Resolves the media URLs of all children in one batch before rendering them.
+
+    Used as `Meta.list_serializer_class` of serializers defining `media_names(instance)`.
+    """
+
+    def to_representation(self, data):
+        items = list(data.all() if isinstance(data, models.manager.BaseManager) else data)
+        media_resolver(self.context).prefetch(
+            name for item in items for name in self.child.media_names(item)
+        )
+        return super().to_representation(items)
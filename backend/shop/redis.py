@@ -0,0 +1,176 @@
+"""
+Shared Redis clients for code that talks to Redis directly (pub/sub, buffers).
+
+With REDIS_FAKE on (the test suite sets it) an in-process FakeRedis is returned instead,
+so those code paths run without a server.
+"""
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+import redis
+from django.conf import settings
+
+_clients: Dict[Tuple[str, Any], Any] = {}
+_clients_lock = threading.Lock()
+
+
+def get_redis(url: Optional[str] = None, **options) -> redis.Redis:
+    """A process-wide client for `url` (default REDIS_URL); `options` go to redis.Redis."""
+    url = url or settings.REDIS_URL
+    key = (url, tuple(sorted(options.items())))
+    with _clients_lock:
+        if key not in _clients:
+            if settings.REDIS_FAKE:
+                _clients[key] = FakeRedis()
+            else:
+                _clients[key] = redis.Redis.from_url(url, **options)
+        return _clients[key]
+
+
+def reset_fake_redis() -> None:
+    """Empty every FakeRedis handed out so far (for test setUp)."""
+    with _clients_lock:
+        for client in _clients.values():
+            if isinstance(client, FakeRedis):
+                client.flushdb()
+
+
+def _encode(value) -> bytes:
+    if isinstance(value, bytes):
+        return value
+    return str(value).encode()
+
+
+class FakeRedis:
+    """
+    The subset of redis.Redis used in this project: strings with expiry, lists, publish
+    (nobody is subscribed) and non-transactional pipelines. Values come back as bytes.
+    """
+
+    def __init__(self):
+        self._data: Dict[str, Any] = {}
+        self._expires: Dict[str, float] = {}
+        self._lock = threading.RLock()
+
+    def _live(self, name: str):
+        expires = self._expires.get(name)
+        if expires is not None and expires <= time.monotonic():
+            self._data.pop(name, None)
+            self._expires.pop(name, None)
+        return self._data.get(name)
+
+    def flushdb(self):
+        with self._lock:
+            self._data.clear()
+            self._expires.clear()
+        return True
+
+    def ping(self):
+        return True
+
+    def get(self, name):
+        with self._lock:
+            return self._live(name)
+
+    def set(self, name, value, ex=None, nx=False):
+        with self._lock:
+            if nx and self._live(name) is not None:
+                return None
+            self._data[name] = _encode(value)
+            self._expires.pop(name, None)
+            if ex:
+                self._expires[name] = time.monotonic() + ex
+            return True
+
+    def delete(self, *names):
+        with self._lock:
+            removed = 0
+            for name in names:
+                if self._live(name) is not None:
+                    removed += 1
+                self._data.pop(name, None)
+                self._expires.pop(name, None)
+            return removed
+
+    def incr(self, name, amount=1):
+        with self._lock:
+            value = int(self._live(name) or 0) + amount
+            self._data[name] = _encode(value)
+            return value
+
+    def expire(self, name, seconds):
+        with self._lock:
+            if self._live(name) is None:
+                return False
+            self._expires[name] = time.monotonic() + seconds
+            return True
+
+    def rpush(self, name, *values):
+        with self._lock:
+            items = self._live(name)
+            if items is None:
+                items = self._data[name] = []
+            items.extend(_encode(value) for value in values)
+            return len(items)
+
+    def lpush(self, name, *values):
+        with self._lock:
+            items = self._live(name)
+            if items is None:
+                items = self._data[name] = []
+            for value in values:
+                items.insert(0, _encode(value))
+            return len(items)
+
+    def lpop(self, name, count=None):
+        with self._lock:
+            items = self._live(name)
+            if not items:
+                return None
+            if count is None:
+                return items.pop(0)
+            popped, items[:] = items[:count], items[count:]
+            return popped
+
+    def llen(self, name):
+        with self._lock:
+            return len(self._live(name) or [])
+
+    def lrange(self, name, start, end):
+        with self._lock:
+            items = self._live(name) or []
+            return items[start:] if end == -1 else items[start:end + 1]
+
+    def publish(self, channel, message):
+        return 0
+
+    def pipeline(self, transaction=True):
+        return FakePipeline(self)
+
+
+class FakePipeline:
+    def __init__(self, client: FakeRedis):
+        self._client = client
+        self._calls: List[Tuple[str, tuple, dict]] = []
+
+    def __getattr__(self, name):
+        method = getattr(self._client, name)
+
+        def queue(*args, **kwargs):
+            self._calls.append((name, args, kwargs))
+            return self
+
+        if not callable(method):
+            raise AttributeError(name)
+        return queue
+
+    def execute(self):
+        calls, self._calls = self._calls, []
+        return [getattr(self._client, name)(*args, **kwargs) for name, args, kwargs in calls]
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self._calls = []
@@ -53,6 +53,7 @@ INSTALLED_APPS = [
     "blog",
     "admin_api",
     "content",
+    "subscriptions",
 ]
 
 MIDDLEWARE = [
@@ -63,6 +64,7 @@ MIDDLEWARE = [
     "django.middleware.common.CommonMiddleware",
     "django.middleware.csrf.CsrfViewMiddleware",
     "django.contrib.auth.middleware.AuthenticationMiddleware",
+    "shop.identity.IdentityMiddleware",
     "django.contrib.messages.middleware.MessageMiddleware",
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
 ]
@@ -142,6 +144,10 @@ ANYMAIL = {
 }
 
 STRIPE_SECRET_KEY = os.environ.get("STRIPE_SECRET_KEY", "")
+CHECKOUT_QUOTE_TTL_SECONDS = int(os.environ.get("CHECKOUT_QUOTE_TTL_SECONDS", 15 * 60))
+# Shared ceiling for bulk Stripe jobs; Stripe's live-mode limit is 100 requests/second.
+STRIPE_MAX_REQUESTS_PER_SECOND = float(os.environ.get("STRIPE_MAX_REQUESTS_PER_SECOND", 25))
+STRIPE_BULK_MAX_WORKERS = int(os.environ.get("STRIPE_BULK_MAX_WORKERS", 8))
 GOOGLE_MAPS_API_KEY = os.environ.get("GOOGLE_MAPS_API_KEY", "")
 DELIVERY_DEPOT_LAT = os.environ.get("DELIVERY_DEPOT_LAT")
 DELIVERY_DEPOT_LNG = os.environ.get("DELIVERY_DEPOT_LNG")
@@ -187,6 +193,37 @@ AWS_MEDIA_LOCATION = os.environ.get("AWS_MEDIA_LOCATION", "media")
 AWS_S3_ENDPOINT_URL = os.environ.get("AWS_S3_ENDPOINT_URL")
 AWS_S3_CONNECT_TIMEOUT = int(os.environ.get("AWS_S3_CONNECT_TIMEOUT", 5))
 AWS_S3_READ_TIMEOUT = int(os.environ.get("AWS_S3_READ_TIMEOUT", 10))
+# Media URLs (shop.media): names under these prefixes are publicly readable and, with a CDN
+# configured, are served from it without signing.
+MEDIA_CDN_URL = os.environ.get("MEDIA_CDN_URL", "")
+MEDIA_PUBLIC_PREFIXES = env_list("MEDIA_PUBLIC_PREFIXES")
+
+# Driver proof-of-delivery photos are uploaded straight to storage, then resized by Celery.
+DELIVERY_PROOF_UPLOAD_MAX_BYTES = int(
+    os.environ.get("DELIVERY_PROOF_UPLOAD_MAX_BYTES", 20 * 1024 * 1024)
+)
+DELIVERY_PROOF_UPLOAD_TTL_SECONDS = int(os.environ.get("DELIVERY_PROOF_UPLOAD_TTL_SECONDS", 15 * 60))
+DELIVERY_PROOF_MAX_DIMENSION = int(os.environ.get("DELIVERY_PROOF_MAX_DIMENSION", 1600))
+DELIVERY_PROOF_THUMBNAIL_SIZE = int(os.environ.get("DELIVERY_PROOF_THUMBNAIL_SIZE", 320))
+
+# Catalog and site images are re-encoded at these widths and formats by Celery (shop.images).
+IMAGE_VARIANT_WIDTHS = [
+    int(width) for width in env_list("IMAGE_VARIANT_WIDTHS", ["320", "640", "960", "1280", "1920"])
+]
+IMAGE_VARIANT_FORMATS = env_list("IMAGE_VARIANT_FORMATS", ["avif", "webp"])
+
+# Driver GPS pings (delivery.locations) and the travel model behind stop ETAs (delivery.eta).
+DRIVER_LOCATION_MAX_PINGS_PER_REQUEST = int(os.environ.get("DRIVER_LOCATION_MAX_PINGS_PER_REQUEST", 500))
+DRIVER_LOCATION_FLUSH_BATCH_SIZE = int(os.environ.get("DRIVER_LOCATION_FLUSH_BATCH_SIZE", 5000))
+# Positions older than this are not used to recompute live ETAs.
+DRIVER_LOCATION_MAX_AGE_MINUTES = int(os.environ.get("DRIVER_LOCATION_MAX_AGE_MINUTES", 15))
+DELIVERY_ETA_AVERAGE_SPEED_KMH = float(os.environ.get("DELIVERY_ETA_AVERAGE_SPEED_KMH", 35))
+DELIVERY_ETA_ROAD_FACTOR = float(os.environ.get("DELIVERY_ETA_ROAD_FACTOR", 1.3))
+DELIVERY_ETA_SERVICE_SECONDS = int(os.environ.get("DELIVERY_ETA_SERVICE_SECONDS", 180))
+DELIVERY_ETA_DEFAULT_LEG_SECONDS = int(os.environ.get("DELIVERY_ETA_DEFAULT_LEG_SECONDS", 600))
+# Planned delivery windows: routes leave the depot at this local time.
+DELIVERY_ROUTE_START_TIME = os.environ.get("DELIVERY_ROUTE_START_TIME", "09:00")
+DELIVERY_WINDOW_MINUTES = int(os.environ.get("DELIVERY_WINDOW_MINUTES", 60))
 
 if USE_S3 and AWS_STORAGE_BUCKET_NAME:
     INSTALLED_APPS.append("storages")
@@ -197,6 +234,9 @@ if USE_S3 and AWS_STORAGE_BUCKET_NAME:
     DEFAULT_FILE_STORAGE = "storages.backends.s3boto3.S3Boto3Storage"
     STORAGES["default"] = {"BACKEND": DEFAULT_FILE_STORAGE}
     MEDIA_URL = f"https://{AWS_S3_CUSTOM_DOMAIN}/{AWS_MEDIA_LOCATION}/"
+    # Every upload gets a new key, like FileSystemStorage: image variants (shop.images),
+    # cached media URLs (shop.media) and CDN copies are tied to the name of the file.
+    AWS_S3_FILE_OVERWRITE = False
     AWS_S3_CONFIG = {
         "connect_timeout": AWS_S3_CONNECT_TIMEOUT,
         "read_timeout": AWS_S3_READ_TIMEOUT,
@@ -249,6 +289,30 @@ DEFAULT_REDIS_URL = "redis://localhost:6379/0"
 REDIS_URL = os.environ.get("CELERY_BROKER_URL") or os.environ.get("REDIS_URL") or DEFAULT_REDIS_URL
 CELERY_BROKER_URL = REDIS_URL
 CELERY_RESULT_BACKEND = os.environ.get("CELERY_RESULT_BACKEND") or REDIS_URL
+# Route change events (delivery.events) go over Redis pub/sub to the ASGI event streams.
+ROUTE_EVENTS_REDIS_URL = os.environ.get("ROUTE_EVENTS_REDIS_URL") or REDIS_URL
+ROUTE_EVENTS_HEARTBEAT_SECONDS = int(os.environ.get("ROUTE_EVENTS_HEARTBEAT_SECONDS", 15))
+# Streams are closed after this long; EventSource reconnects with Last-Event-ID.
+ROUTE_EVENTS_MAX_STREAM_SECONDS = int(os.environ.get("ROUTE_EVENTS_MAX_STREAM_SECONDS", 300))
+# In-process stand-ins for Redis: locmem caches and shop.redis.FakeRedis. The tests set it.
+REDIS_FAKE = env_bool("REDIS_FAKE", False)
+# Shared cache (see shop.cache for namespacing, single-flight and tag helpers) and sessions.
+REDIS_CACHE_URL = os.environ.get("REDIS_CACHE_URL") or REDIS_URL
+if REDIS_FAKE:
+    CACHES = {"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}}
+else:
+    CACHES = {
+        "default": {
+            # Fails open: a Redis outage reads as cache misses, not as server errors.
+            "BACKEND": "shop.cache.FailOpenRedisCache",
+            "LOCATION": REDIS_CACHE_URL,
+            "KEY_PREFIX": "shop",
+            "OPTIONS": {"socket_connect_timeout": 1, "socket_timeout": 1},
+        }
+    }
+# Sessions are read from the cache and written through to the database, so a Redis
+# restart does not log everybody out, and while Redis is down they come from the database.
+SESSION_ENGINE = "django.contrib.sessions.backends.cached_db"
 CELERY_TIMEZONE = TIME_ZONE
 CELERY_ENABLE_UTC = True
 CELERY_TASK_DEFAULT_QUEUE = "default"
@@ -275,6 +339,14 @@ CELERY_BEAT_SCHEDULE = {
         "task": "orders.tasks.expire_stale_pending_orders",
         "schedule": crontab(minute=0),
     },
+    "reconcile_stripe_payments": {
+        "task": "payments.reconcile_stripe_payments",
+        "schedule": crontab(minute="*/15"),
+    },
+    "generate_subscription_orders_weekly": {
+        "task": "subscriptions.generate_subscription_orders",
+        "schedule": crontab(hour=1, minute=0, day_of_week="sun"),  # before route generation
+    },
     "generate_delivery_routes_weekly": {
         "task": "delivery.tasks.generate_delivery_routes",
         "schedule": crontab(hour=2, minute=0, day_of_week="sun"),  # Sunday night
@@ -285,6 +357,16 @@ CELERY_BEAT_SCHEDULE = {
         "schedule": crontab(hour=3, minute=0, day_of_week="sun"),
         "options": {"queue": "logistics"},
     },
+    "flush_driver_locations": {
+        "task": "delivery.flush_driver_locations",
+        "schedule": 10.0,
+        "options": {"queue": "logistics"},
+    },
+    "recompute_live_etas": {
+        "task": "delivery.recompute_live_etas",
+        "schedule": crontab(minute="*"),
+        "options": {"queue": "logistics"},
+    },
     "generate_delivery_routes_nightly": {
         "task": "delivery.tasks.generate_delivery_routes",
         "schedule": crontab(hour=2, minute=0),  # every night at 02:00
@@ -320,6 +402,7 @@ LOGGING = {
         "payments": {"handlers": ["console"], "level": "INFO", "propagate": False},
         "delivery": {"handlers": ["console"], "level": "INFO", "propagate": False},
         "notifications": {"handlers": ["console"], "level": "INFO", "propagate": False},
+        "subscriptions": {"handlers": ["console"], "level": "INFO", "propagate": False},
         "stripe": {"handlers": ["console"], "level": "WARNING", "propagate": False},
         "celery": {"handlers": ["console"], "level": "INFO", "propagate": False},
         "django.request": {"handlers": ["console"], "level": "ERROR", "propagate": False},
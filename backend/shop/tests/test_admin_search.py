@@ -0,0 +1,56 @@
+from django.contrib import admin
+from django.test import RequestFactory, TestCase
+
+from orders.models import Order, Region
+
+
+class TrigramAdminSearchTests(TestCase):
+    def setUp(self):
+        region = Region.objects.create(code="AS", name="Admin Search", delivery_weekday=2)
+        self.alice = Order.objects.create(
+            full_name="Alice Martin",
+            email="alice.martin@example.com",
+            phone="613-555-0101",
+            postal_code="K1A 0B1",
+            region=region,
+        )
+        self.bob = Order.objects.create(
+            full_name="Bob Alison",
+            email="bob@example.org",
+            phone="819-555-0199",
+            postal_code="J8X 2K1",
+            region=region,
+        )
+        self.admin = admin.site._registry[Order]
+        self.request = RequestFactory().get("/admin/orders/order/")
+
+    def search(self, term):
+        queryset, _duplicates = self.admin.get_search_results(
+            self.request, Order.objects.filter(pk__in=[self.alice.pk, self.bob.pk]), term
+        )
+        return set(queryset)
+
+    def test_sqlite_matches_prefixes(self):
+        self.assertEqual(self.search("ali"), {self.alice})
+        self.assertEqual(self.search("bob@"), {self.bob})
+        self.assertEqual(self.search("819"), {self.bob})
+        self.assertEqual(self.search("k1a"), {self.alice})
+        self.assertEqual(self.search("artin"), set())
+
+    def test_every_term_must_match_and_quotes_group_words(self):
+        self.assertEqual(self.search("alice 613"), {self.alice})
+        self.assertEqual(self.search("alice mart"), set())
+        self.assertEqual(self.search('"Alice Mar"'), {self.alice})
+        self.assertEqual(self.search("alice bob"), set())
+
+    def test_ids_match_exactly_and_other_terms_skip_them(self):
+        self.assertEqual(self.search(str(self.bob.pk)), {self.bob})
+        self.assertEqual(self.search("alice"), {self.alice})
+
+    def test_postgres_uses_trigram_operators(self):
+        condition = self.admin._term_condition(Order.objects.all(), "full_name", "50%_off", True)
+        sql = str(Order.objects.filter(condition).query)
+        self.assertIn('"orders_order"."full_name" ILIKE %50\\%\\_off%', sql)
+        self.assertIn('50%_off <% "orders_order"."full_name"', sql)
+        condition = self.admin._term_condition(Order.objects.all(), "phone", "613", True)
+        self.assertNotIn("<%", str(Order.objects.filter(condition).query))
@@ -0,0 +1,113 @@
+import threading
+from unittest import mock
+
+from django.conf import settings
+from django.contrib.sessions.backends.cached_db import SessionStore
+from django.core.cache import cache, caches
+from django.test import SimpleTestCase, TestCase, override_settings
+
+from shop.cache import FailOpenRedisCache, app_cache, invalidate_tags
+from shop.redis import FakeRedis, get_redis
+
+
+class AppCacheTests(SimpleTestCase):
+    def setUp(self):
+        cache.clear()
+        self.cache = app_cache("catalog")
+
+    def test_keys_are_namespaced_per_app(self):
+        self.cache.set("menu", [1, 2])
+        app_cache("blog").set("menu", "other")
+        self.assertEqual(cache.get("catalog:menu"), [1, 2])
+        self.assertEqual(self.cache.get_many(["menu", "missing"]), {"menu": [1, 2]})
+
+    def test_get_or_compute_caches_none(self):
+        compute = mock.Mock(return_value=None)
+        self.assertIsNone(self.cache.get_or_compute("nothing", compute))
+        self.assertIsNone(self.cache.get_or_compute("nothing", compute))
+        compute.assert_called_once()
+
+    def test_waiters_reuse_the_value_of_the_lock_holder(self):
+        # Another process holds the lock and publishes the value shortly.
+        self.cache.add("menu:lock", 1)
+        publisher = threading.Timer(0.05, lambda: self.cache.set("menu", "built elsewhere"))
+        publisher.start()
+        compute = mock.Mock(return_value="built here")
+        self.assertEqual(self.cache.get_or_compute("menu", compute, wait=2), "built elsewhere")
+        publisher.join()
+        compute.assert_not_called()
+
+    def test_waiters_compute_themselves_when_the_lock_holder_never_finishes(self):
+        self.cache.add("menu:lock", 1)
+        value = self.cache.get_or_compute("menu", lambda: "fallback", wait=0.05)
+        self.assertEqual(value, "fallback")
+
+    def test_invalidating_a_tag_makes_tagged_entries_stale(self):
+        compute = mock.Mock(side_effect=["first", "second"])
+        self.assertEqual(self.cache.get_or_compute("menu", compute, tags=["products"]), "first")
+        self.assertEqual(self.cache.get_or_compute("menu", compute, tags=["products"]), "first")
+
+        invalidate_tags("categories")
+        self.assertEqual(self.cache.get_tagged("menu"), "first")
+        invalidate_tags("products")
+        self.assertIsNone(self.cache.get_tagged("menu"))
+        self.assertEqual(self.cache.get_or_compute("menu", compute, tags=["products"]), "second")
+
+
+UNREACHABLE_CACHES = {
+    **settings.CACHES,
+    "unreachable": {
+        "BACKEND": "shop.cache.FailOpenRedisCache",
+        # Nothing listens on port 1.
+        "LOCATION": "redis://127.0.0.1:1/0",
+        "OPTIONS": {"socket_connect_timeout": 0.2, "socket_timeout": 0.2},
+    },
+}
+
+
+@override_settings(CACHES=UNREACHABLE_CACHES, SESSION_CACHE_ALIAS="unreachable")
+class FailOpenRedisCacheTests(TestCase):
+    def setUp(self):
+        FailOpenRedisCache._paused_until.clear()
+        self.addCleanup(FailOpenRedisCache._paused_until.clear)
+        self.cache = caches["unreachable"]
+
+    def test_errors_read_as_misses(self):
+        self.assertEqual(self.cache.get("menu", "default"), "default")
+        self.assertFalse(self.cache.available)
+        self.cache.set("menu", [1, 2])
+        self.assertFalse(self.cache.add("menu", [1, 2]))
+        self.assertEqual(self.cache.get_many(["menu"]), {})
+        self.assertFalse(self.cache.delete("menu"))
+
+    def test_get_or_compute_does_not_wait_for_a_lock(self):
+        compute = mock.Mock(return_value="built")
+        value = app_cache("catalog", alias="unreachable").get_or_compute("menu", compute, wait=5)
+        self.assertEqual(value, "built")
+        compute.assert_called_once()
+
+    def test_sessions_fall_back_to_the_database(self):
+        session = SessionStore()
+        session["cart"] = [1]
+        session.save()
+        self.assertEqual(SessionStore(session.session_key).load(), {"cart": [1]})
+
+
+class FakeRedisTests(SimpleTestCase):
+    def test_tests_get_a_fake_client(self):
+        self.assertTrue(settings.REDIS_FAKE)
+        client = get_redis()
+        self.assertIsInstance(client, FakeRedis)
+        self.assertIs(get_redis(), client)
+
+    def test_lists_strings_and_pipelines(self):
+        client = FakeRedis()
+        pipeline = client.pipeline(transaction=False)
+        pipeline.rpush("queue", "a", "b", "c").set("counter", 1).incr("counter")
+        self.assertEqual(pipeline.execute(), [3, True, 2])
+        self.assertEqual(client.lpop("queue", 2), [b"a", b"b"])
+        client.lpush("queue", "z")
+        self.assertEqual(client.lrange("queue", 0, -1), [b"z", b"c"])
+        self.assertIsNone(client.set("counter", 5, nx=True))
+        self.assertEqual(client.get("counter"), b"2")
+        self.assertEqual(client.publish("channel", "hello"), 0)
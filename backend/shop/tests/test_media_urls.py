@@ -0,0 +1,68 @@
+from django.core.cache import cache
+from django.core.files.storage import FileSystemStorage
+from django.test import RequestFactory, SimpleTestCase, override_settings
+from storages.backends.s3 import S3Storage
+
+from shop.media import MediaUrlResolver, signed_url_cache_seconds
+
+
+class SigningStorage(FileSystemStorage):
+    """Stands in for S3 with querystring auth: every url() is a signing operation."""
+
+    querystring_auth = True
+    querystring_expire = 600
+
+    def __init__(self):
+        super().__init__(location="/tmp/signed", base_url="https://bucket.example.com/")
+        self.signed = []
+
+    def url(self, name):
+        self.signed.append(name)
+        return f"{super().url(name)}?signature={len(self.signed)}"
+
+
+class MediaUrlResolverTests(SimpleTestCase):
+    def setUp(self):
+        cache.clear()
+        self.storage = SigningStorage()
+
+    def test_signed_urls_are_cached_across_responses(self):
+        first = MediaUrlResolver(storage=self.storage)
+        first.prefetch(["a.jpg", "b.jpg", "a.jpg", ""])
+        self.assertRegex(first.url("a.jpg"), r"^https://bucket\.example\.com/a\.jpg\?signature=[12]$")
+        self.assertEqual(sorted(self.storage.signed), ["a.jpg", "b.jpg"])
+
+        second = MediaUrlResolver(storage=self.storage)
+        second.prefetch(["a.jpg", "b.jpg", "c.jpg"])
+        self.assertEqual(second.url("a.jpg"), first.url("a.jpg"))
+        self.assertEqual(second.url("d.jpg").split("?")[0], "https://bucket.example.com/d.jpg")
+        self.assertEqual(sorted(self.storage.signed), ["a.jpg", "b.jpg", "c.jpg", "d.jpg"])
+
+    def test_signed_urls_are_cached_for_half_their_lifetime(self):
+        self.assertEqual(signed_url_cache_seconds(self.storage), 300)
+        self.assertIsNone(signed_url_cache_seconds(FileSystemStorage()))
+
+    def test_custom_domain_urls_are_signed_only_with_a_cloudfront_signer(self):
+        storage = S3Storage(bucket_name="bucket", custom_domain="media.example.com", querystring_expire=600)
+        self.assertIsNone(signed_url_cache_seconds(storage))
+        self.assertEqual(storage.url("a.jpg"), "https://media.example.com/a.jpg")
+        storage.cloudfront_signer = object()
+        self.assertEqual(signed_url_cache_seconds(storage), 300)
+        self.assertEqual(signed_url_cache_seconds(S3Storage(bucket_name="bucket", querystring_expire=600)), 300)
+
+    @override_settings(MEDIA_CDN_URL="https://cdn.example.com/media/", MEDIA_PUBLIC_PREFIXES=["products/"])
+    def test_public_names_use_the_cdn_without_signing(self):
+        resolver = MediaUrlResolver(storage=self.storage)
+        self.assertEqual(
+            resolver.url("products/whole milk.webp"), "https://cdn.example.com/media/products/whole%20milk.webp"
+        )
+        self.assertTrue(resolver.url("delivery_proofs/1.webp").endswith("?signature=1"))
+        self.assertEqual(self.storage.signed, ["delivery_proofs/1.webp"])
+
+    @override_settings(MEDIA_URL="/media/")
+    def test_relative_urls_are_made_absolute_for_the_request(self):
+        request = RequestFactory().get("/", HTTP_HOST="shop.example.com")
+        resolver = MediaUrlResolver(request, storage=FileSystemStorage(base_url="/media/"))
+        self.assertEqual(resolver.url("products/a.jpg"), "http://shop.example.com/media/products/a.jpg")
+        self.assertEqual(resolver.relative_url("products/a.jpg"), "/media/products/a.jpg")
+        self.assertEqual(resolver.url(""), "")
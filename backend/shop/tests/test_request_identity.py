@@ -0,0 +1,74 @@
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import AnonymousUser
+from django.db import connection
+from django.test import RequestFactory, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from accounts.models import CustomerProfile
+from delivery.models import Driver
+from shop.identity import identity_for
+
+
+def queries_on(queries, table):
+    return [query for query in queries.captured_queries if f'FROM "{table}"' in query["sql"]]
+
+
+class RequestIdentityTests(TestCase):
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            username="identity", email="identity@example.com", password="x"
+        )
+
+    def test_lookups_are_cached_per_user_for_the_request(self):
+        driver = Driver.objects.create(user=self.user)
+        request = RequestFactory().get("/")
+        request.user = self.user
+        identity = identity_for(request)
+
+        with self.assertNumQueries(1):
+            self.assertEqual(identity.driver, driver)
+            self.assertEqual(identity.driver.user, self.user)
+        self.assertIs(identity_for(request), identity)
+
+        profile = identity.customer_profile
+        self.assertEqual(profile.user, self.user)
+        with self.assertNumQueries(0):
+            self.assertIs(identity.customer_profile, profile)
+
+        request.user = AnonymousUser()
+        self.assertIsNone(identity.driver)
+        self.assertIsNone(identity.customer_profile)
+
+    def test_non_driver_lookup_is_cached_too(self):
+        request = RequestFactory().get("/")
+        request.user = self.user
+        identity = identity_for(request)
+        with self.assertNumQueries(1):
+            self.assertIsNone(identity.driver)
+            self.assertIsNone(identity.driver)
+
+    def test_driver_endpoint_resolves_the_driver_once(self):
+        Driver.objects.create(user=self.user)
+        client = APIClient()
+        client.force_authenticate(user=self.user)
+        with CaptureQueriesContext(connection) as queries:
+            response = client.get(reverse("delivery:driver-routes-today"))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(queries_on(queries, "delivery_driver")), 1)
+
+    def test_non_driver_is_refused(self):
+        client = APIClient()
+        client.force_authenticate(user=self.user)
+        response = client.get(reverse("delivery:driver-routes-today"))
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_profile_endpoint_uses_the_session_user(self):
+        self.client.force_login(self.user)
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get("/api/auth/profile/")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(queries_on(queries, "accounts_customerprofile")), 1)
+        self.assertTrue(CustomerProfile.objects.filter(user=self.user).exists())
@@ -0,0 +1,91 @@
+from django.test import RequestFactory, SimpleTestCase
+from rest_framework.request import Request
+
+from delivery.models import DeliveryRoute
+from delivery.serializers import DeliveryRouteSerializer
+from products.serializers import ProductSerializer
+from shop.fields import FULL, FieldSelection, sparse_data, sparse_queryset
+
+
+def selection_for(**params):
+    return FieldSelection.from_request(Request(RequestFactory().get("/", params)))
+
+
+class FieldSelectionTests(SimpleTestCase):
+    def test_no_parameters_select_everything(self):
+        self.assertIs(selection_for(), FULL)
+        self.assertIs(selection_for(fields=" , "), FULL)
+        self.assertTrue(FULL.includes("stops", ["stops"]))
+
+    def test_fields_and_nested_paths(self):
+        selection = selection_for(fields="id,stops.id,stops.order.full_name,unknown")
+        self.assertTrue(selection.includes("id"))
+        self.assertFalse(selection.includes("date"))
+        stops = selection.nested("stops")
+        self.assertTrue(stops.includes("id"))
+        self.assertFalse(stops.includes("status"))
+        self.assertEqual(stops.nested("order").only, {"full_name"})
+        self.assertIs(stops.nested("id"), FULL)
+
+    def test_naming_a_nested_field_keeps_it_whole(self):
+        selection = selection_for(fields="stops.id,stops")
+        self.assertIs(selection.nested("stops"), FULL)
+
+    def test_expand_opts_into_expandable_fields(self):
+        expandable = ["stops", "driver_preferences"]
+        selection = selection_for(expand="stops.order")
+        self.assertTrue(selection.includes("date", expandable))
+        self.assertTrue(selection.includes("stops", expandable))
+        self.assertFalse(selection.includes("driver_preferences", expandable))
+        self.assertTrue(selection.nested("stops").includes("order", ["order"]))
+        self.assertFalse(selection_for(expand="").includes("stops", expandable))
+
+
+class SparseDataTests(SimpleTestCase):
+    payload = {
+        "id": 1,
+        "name": "Milk",
+        "category": {"id": 2, "name": "Dairy", "slug": "dairy", "description": ""},
+        "category_name": "Dairy",
+        "images": [{"id": 3, "image_url": "/media/a.jpg", "image_srcset": {}, "alt_text": "", "sort_order": 0}],
+    }
+
+    def test_prunes_rendered_payloads(self):
+        data = sparse_data(ProductSerializer(), [self.payload], selection_for(fields="id,images.image_url"))
+        self.assertEqual(data, [{"id": 1, "images": [{"image_url": "/media/a.jpg"}]}])
+
+        data = sparse_data(ProductSerializer(), self.payload, selection_for(expand="category"))
+        self.assertEqual(set(data), {"id", "name", "category", "category_name"})
+        self.assertIs(sparse_data(ProductSerializer(), self.payload, FULL), self.payload)
+
+
+class SparseQuerysetTests(SimpleTestCase):
+    def loaders(self, calls):
+        def select_region(queryset, selection):
+            calls.append("region")
+            return queryset.select_related("region")
+
+        def prefetch_stops(queryset, selection):
+            calls.append("stops")
+            return queryset.prefetch_related("stops")
+
+        return {"region_code": select_region, "region_name": select_region, "stops": prefetch_stops}
+
+    def test_loads_only_what_is_rendered(self):
+        calls = []
+        queryset = sparse_queryset(
+            DeliveryRoute.objects.all(),
+            DeliveryRouteSerializer,
+            selection_for(fields="date,region_code,region_name,stops_count"),
+            loaders=self.loaders(calls),
+        )
+        self.assertEqual(calls, ["region"])
+        self.assertEqual(queryset.query.deferred_loading, ({"date", "region", "total_count"}, False))
+
+    def test_full_selection_loads_everything_without_only(self):
+        calls = []
+        queryset = sparse_queryset(
+            DeliveryRoute.objects.all(), DeliveryRouteSerializer, FULL, loaders=self.loaders(calls)
+        )
+        self.assertEqual(calls, ["region", "stops"])
+        self.assertEqual(queryset.query.deferred_loading, (frozenset(), True))
@@ -0,0 +1,28 @@
+from django.contrib import admin
+
+from .models import Subscription, SubscriptionItem
+
+
+class SubscriptionItemInline(admin.TabularInline):
+    model = SubscriptionItem
+    extra = 1
+    autocomplete_fields = ("product",)
+
+
+@admin.register(Subscription)
+class SubscriptionAdmin(admin.ModelAdmin):
+    list_display = (
+        "id",
+        "full_name",
+        "email",
+        "region",
+        "status",
+        "last_generated_for",
+        "created_at",
+    )
+    list_filter = ("status", "region")
+    search_fields = ("full_name", "email", "phone", "stripe_customer_id")
+    list_select_related = ("region",)
+    raw_id_fields = ("user",)
+    readonly_fields = ("last_generated_for", "created_at", "updated_at")
+    inlines = [SubscriptionItemInline]
@@ -0,0 +1,58 @@
+# Generated by Django 5.2.18 on 2026-10-19 02:29
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        ('orders', '0009_order_buzz_code'),
+        ('products', '0005_merge_20251204_0000'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Subscription',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('status', models.CharField(choices=[('active', 'Active'), ('paused', 'Paused'), ('cancelled', 'Cancelled')], db_index=True, default='active', max_length=20)),
+                ('full_name', models.CharField(max_length=255)),
+                ('email', models.EmailField(max_length=254)),
+                ('phone', models.CharField(max_length=50)),
+                ('address_line1', models.CharField(max_length=255)),
+                ('address_line2', models.CharField(blank=True, max_length=255)),
+                ('buzz_code', models.CharField(blank=True, max_length=50)),
+                ('city', models.CharField(max_length=100)),
+                ('postal_code', models.CharField(max_length=20)),
+                ('delivery_notes', models.TextField(blank=True)),
+                ('stripe_customer_id', models.CharField(blank=True, max_length=255)),
+                ('stripe_payment_method_id', models.CharField(blank=True, max_length=255)),
+                ('last_generated_for', models.DateField(blank=True, help_text='Delivery date of the most recent order generated for this subscription.', null=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('region', models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='subscriptions', to='orders.region')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='subscriptions', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ['id'],
+            },
+        ),
+        migrations.CreateModel(
+            name='SubscriptionItem',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('quantity', models.PositiveIntegerField(default=1)),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='subscription_items', to='products.product')),
+                ('subscription', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='items', to='subscriptions.subscription')),
+            ],
+            options={
+                'ordering': ['id'],
+                'unique_together': {('subscription', 'product')},
+            },
+        ),
+    ]
@@ -0,0 +1,73 @@
+from django.conf import settings
+from django.db import models
+
+from orders.models import Region
+from products.models import Product
+
+
+class Subscription(models.Model):
+    """
+    A weekly standing order billed off-session against a saved Stripe payment method.
+    """
+
+    class Status(models.TextChoices):
+        ACTIVE = "active", "Active"
+        PAUSED = "paused", "Paused"
+        CANCELLED = "cancelled", "Cancelled"
+
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        related_name="subscriptions",
+        on_delete=models.CASCADE,
+    )
+    status = models.CharField(
+        max_length=20, choices=Status.choices, default=Status.ACTIVE, db_index=True
+    )
+    region = models.ForeignKey(
+        Region,
+        related_name="subscriptions",
+        on_delete=models.PROTECT,
+    )
+
+    full_name = models.CharField(max_length=255)
+    email = models.EmailField()
+    phone = models.CharField(max_length=50)
+    address_line1 = models.CharField(max_length=255)
+    address_line2 = models.CharField(max_length=255, blank=True)
+    buzz_code = models.CharField(max_length=50, blank=True)
+    city = models.CharField(max_length=100)
+    postal_code = models.CharField(max_length=20)
+    delivery_notes = models.TextField(blank=True)
+
+    stripe_customer_id = models.CharField(max_length=255, blank=True)
+    stripe_payment_method_id = models.CharField(max_length=255, blank=True)
+    last_generated_for = models.DateField(
+        null=True,
+        blank=True,
+        help_text="Delivery date of the most recent order generated for this subscription.",
+    )
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ["id"]
+
+    def __str__(self):
+        return f"Subscription #{self.id} - {self.full_name}"
+
+
+class SubscriptionItem(models.Model):
+    subscription = models.ForeignKey(
+        Subscription, related_name="items", on_delete=models.CASCADE
+    )
+    product = models.ForeignKey(
+        Product, related_name="subscription_items", on_delete=models.PROTECT
+    )
+    quantity = models.PositiveIntegerField(default=1)
+
+    class Meta:
+        ordering = ["id"]
+        unique_together = ("subscription", "product")
+
+    def __str__(self):
+        return f"{self.product_id} x {self.quantity}"
@@ -0,0 +1,136 @@
+import logging
+from datetime import date
+from typing import Dict, List
+
+from celery import shared_task
+from django.db import transaction
+from django.utils import timezone
+
+from delivery.tasks import _next_delivery_date
+from orders.models import Order, OrderItem
+from payments.charges import charge_orders_off_session, record_charge_outcomes
+from payments.quotes import price_items
+from subscriptions.models import Subscription, SubscriptionItem
+
+logger = logging.getLogger(__name__)
+
+GENERATION_BATCH_SIZE = 500
+
+
+def _order_for_subscription(subscription: Subscription, quote: Dict) -> Order:
+    return Order(
+        user_id=subscription.user_id,
+        subscription=subscription,
+        full_name=subscription.full_name,
+        email=subscription.email,
+        phone=subscription.phone,
+        order_type=Order.OrderType.DELIVERY,
+        status=Order.Status.PENDING,
+        address_line1=subscription.address_line1,
+        address_line2=subscription.address_line2,
+        buzz_code=subscription.buzz_code,
+        city=subscription.city,
+        postal_code=subscription.postal_code,
+        delivery_notes=subscription.delivery_notes,
+        region_id=subscription.region_id,
+        subtotal_cents=quote["subtotal_cents"],
+        tax_cents=quote["tax_cents"],
+        total_cents=quote["total_cents"],
+    )
+
+
+def _generate_batch(subscriptions: List[Subscription], today: date) -> List[int]:
+    orders: List[Order] = []
+    quotes: List[Dict] = []
+    generated_for: Dict[date, List[int]] = {}
+
+    for subscription in subscriptions:
+        delivery_date = _next_delivery_date(subscription.region, today=today)
+        if subscription.last_generated_for and subscription.last_generated_for >= delivery_date:
+            continue
+
+        sub_items: List[SubscriptionItem] = [
+            item for item in subscription.items.all() if item.product.is_active
+        ]
+        if not sub_items:
+            continue
+
+        quote = price_items(
+            [{"product_id": item.product_id, "quantity": item.quantity} for item in sub_items],
+            {item.product_id: item.product for item in sub_items},
+        )
+        orders.append(_order_for_subscription(subscription, quote))
+        quotes.append(quote)
+        generated_for.setdefault(delivery_date, []).append(subscription.id)
+
+    if not orders:
+        return []
+
+    with transaction.atomic():
+        Order.objects.bulk_create(orders)
+        OrderItem.objects.bulk_create(
+            [
+                OrderItem(
+                    order=order,
+                    product_id=line["product_id"],
+                    product_name=line["product_name"],
+                    quantity=line["quantity"],
+                    unit_price_cents=line["unit_price_cents"],
+                    total_cents=line["total_cents"],
+                )
+                for order, quote in zip(orders, quotes)
+                for line in quote["items"]
+            ]
+        )
+        for delivery_date, subscription_ids in generated_for.items():
+            Subscription.objects.filter(id__in=subscription_ids).update(
+                last_generated_for=delivery_date, updated_at=timezone.now()
+            )
+
+    return [order.id for order in orders]
+
+
+def _orders_awaiting_charge():
+    # Orders that never reached Stripe (including ones left behind by an interrupted run).
+    return Order.objects.filter(
+        subscription__isnull=False,
+        status=Order.Status.PENDING,
+        stripe_payment_intent_id="",
+    ).select_related("subscription")
+
+
+@shared_task(name="subscriptions.generate_subscription_orders")
+def generate_subscription_orders() -> dict:
+    """
+    Create this week's orders for every active subscription, then charge them off-session.
+    """
+    today = timezone.localdate()
+    subscriptions = (
+        Subscription.objects.filter(status=Subscription.Status.ACTIVE)
+        .exclude(stripe_payment_method_id="")
+        .select_related("region")
+        .prefetch_related("items__product")
+        .order_by("id")
+    )
+
+    created_order_ids: List[int] = []
+    batch: List[Subscription] = []
+    for subscription in subscriptions.iterator(chunk_size=GENERATION_BATCH_SIZE):
+        batch.append(subscription)
+        if len(batch) >= GENERATION_BATCH_SIZE:
+            created_order_ids.extend(_generate_batch(batch, today))
+            batch = []
+    if batch:
+        created_order_ids.extend(_generate_batch(batch, today))
+
+    orders = list(_orders_awaiting_charge())
+    outcomes = charge_orders_off_session(orders)
+    charge_summary = record_charge_outcomes(orders, outcomes)
+
+    summary = {
+        "created_orders": len(created_order_ids),
+        "charged_orders": len(orders),
+        **charge_summary,
+    }
+    logger.info("subscription_orders_generated", extra=summary)
+    return summary
@@ -0,0 +1,142 @@
+from unittest.mock import patch
+
+import stripe
+from django.contrib.auth import get_user_model
+from django.test import TestCase, override_settings
+
+from orders.models import Order, OrderItem, Region
+from payments.charges import charge_idempotency_key
+from payments.executor import RateLimiter
+from payments.models import Payment
+from payments.tests.stripe_stub import FakeStripe
+from products.models import Product
+from subscriptions.models import Subscription, SubscriptionItem
+from subscriptions.tasks import generate_subscription_orders
+
+User = get_user_model()
+
+
+@override_settings(STRIPE_MAX_REQUESTS_PER_SECOND=0, STRIPE_BULK_MAX_WORKERS=4)
+class GenerateSubscriptionOrdersTests(TestCase):
+    def setUp(self):
+        self.region = Region.objects.create(
+            code="sub-east", name="Sub East", delivery_weekday=2, min_orders=0
+        )
+        self.milk = Product.objects.create(name="Milk", slug="sub-milk", price_cents=500)
+        self.cream = Product.objects.create(name="Cream", slug="sub-cream", price_cents=350)
+        self.fake_stripe = FakeStripe(declined_payment_methods={"pm_declined"})
+
+    def _subscription(self, suffix, payment_method="pm_ok", status=Subscription.Status.ACTIVE):
+        user = User.objects.create_user(
+            username=f"sub-{suffix}@example.com",
+            email=f"sub-{suffix}@example.com",
+            password="password123",
+        )
+        subscription = Subscription.objects.create(
+            user=user,
+            status=status,
+            region=self.region,
+            full_name=f"Subscriber {suffix}",
+            email=user.email,
+            phone="555-0100",
+            address_line1="1 Dairy Lane",
+            city="Vancouver",
+            postal_code="V5K0A1",
+            stripe_customer_id=f"cus_{suffix}",
+            stripe_payment_method_id=payment_method,
+        )
+        SubscriptionItem.objects.create(subscription=subscription, product=self.milk, quantity=2)
+        SubscriptionItem.objects.create(subscription=subscription, product=self.cream, quantity=1)
+        return subscription
+
+    def _run(self):
+        with patch("payments.charges.stripe", self.fake_stripe):
+            return generate_subscription_orders()
+
+    def test_generates_orders_and_charges_each_once(self):
+        active = [self._subscription(str(index)) for index in range(3)]
+        self._subscription("paused", status=Subscription.Status.PAUSED)
+
+        summary = self._run()
+
+        self.assertEqual(summary["created_orders"], 3)
+        self.assertEqual(summary["succeeded"], 3)
+        orders = Order.objects.filter(subscription__isnull=False)
+        self.assertEqual(orders.count(), 3)
+        for order in orders:
+            self.assertEqual(order.status, Order.Status.PAID)
+            self.assertEqual(order.subtotal_cents, 500 * 2 + 350)
+            self.assertEqual(order.total_cents, order.subtotal_cents + order.tax_cents)
+            self.assertEqual(OrderItem.objects.filter(order=order).count(), 2)
+            payment = Payment.objects.get(order=order)
+            self.assertEqual(payment.kind, Payment.Kind.CHARGE)
+            self.assertEqual(payment.status, Payment.Status.SUCCEEDED)
+            self.assertEqual(payment.stripe_payment_intent_id, order.stripe_payment_intent_id)
+
+        keys = [key for _op, key, _params in self.fake_stripe.requests]
+        self.assertCountEqual(keys, [charge_idempotency_key(order.id) for order in orders])
+        for subscription in active:
+            subscription.refresh_from_db()
+            self.assertIsNotNone(subscription.last_generated_for)
+
+    def test_declined_card_is_recorded_and_order_stays_pending(self):
+        self._subscription("declined", payment_method="pm_declined")
+
+        summary = self._run()
+
+        self.assertEqual(summary["failed"], 1)
+        order = Order.objects.get(subscription__isnull=False)
+        self.assertEqual(order.status, Order.Status.PENDING)
+        self.assertTrue(order.stripe_payment_intent_id)
+        payment = Payment.objects.get(order=order)
+        self.assertEqual(payment.status, Payment.Status.REQUIRES_PAYMENT_METHOD)
+
+    def test_retried_charge_updates_the_failed_attempt(self):
+        self._subscription("retry")
+        create = self.fake_stripe.PaymentIntent.create
+        with patch.object(
+            self.fake_stripe.PaymentIntent,
+            "create",
+            side_effect=stripe.error.APIConnectionError("Stripe is unreachable"),
+        ):
+            self.assertEqual(self._run()["failed"], 1)
+            self.assertEqual(self._run()["failed"], 1)
+
+        order = Order.objects.get(subscription__isnull=False)
+        payment = Payment.objects.get(order=order)
+        self.assertEqual(payment.idempotency_key, charge_idempotency_key(order.id))
+        self.assertEqual(payment.raw_payload, {"error": "Stripe is unreachable"})
+
+        with patch.object(self.fake_stripe.PaymentIntent, "create", create):
+            self.assertEqual(self._run()["succeeded"], 1)
+        payment = Payment.objects.get(order=order)
+        self.assertEqual(payment.status, Payment.Status.SUCCEEDED)
+        order.refresh_from_db()
+        self.assertEqual(payment.stripe_payment_intent_id, order.stripe_payment_intent_id)
+
+    def test_second_run_in_same_week_creates_and_charges_nothing(self):
+        self._subscription("repeat")
+        self._run()
+        request_count = len(self.fake_stripe.requests)
+
+        summary = self._run()
+
+        self.assertEqual(summary["created_orders"], 0)
+        self.assertEqual(summary["charged_orders"], 0)
+        self.assertEqual(Order.objects.filter(subscription__isnull=False).count(), 1)
+        self.assertEqual(len(self.fake_stripe.requests), request_count)
+
+
+class RateLimiterTests(TestCase):
+    def test_spaces_calls_evenly(self):
+        clock = {"now": 100.0}
+        sleeps = []
+
+        def fake_sleep(seconds):
+            sleeps.append(seconds)
+
+        limiter = RateLimiter(4, clock=lambda: clock["now"], sleep=fake_sleep)
+        for _ in range(4):
+            limiter.acquire()
+
+        self.assertEqual(sleeps, [0.25, 0.5, 0.75])
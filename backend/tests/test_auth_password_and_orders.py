@@ -102,6 +102,6 @@ def test_order_list_returns_only_authenticated_user_orders():
     response = client.get(reverse("order-list"))
 
     assert response.status_code == status.HTTP_200_OK
-    data = response.json()
+    data = response.json()["results"]
     assert len(data) == 1
     assert data[0]["id"] == owner_order.id
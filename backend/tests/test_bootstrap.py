@@ -0,0 +1,82 @@
+import gzip
+import json
+from unittest import mock
+
+from django.core.cache import cache
+from django.test import TestCase
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from blog.models import BlogPost
+from content.models import SiteImage
+from orders.models import Region
+from products.models import Category, Product
+
+URL = "/api/bootstrap/"
+
+
+class BootstrapTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        Product.objects.update(is_active=False)
+        self.client = APIClient()
+        dairy = Category.objects.create(name="Bootstrap Dairy", slug="bootstrap-dairy")
+        self.product = Product.objects.create(
+            name="Bootstrap Milk", slug="bootstrap-milk", price_cents=500, category=dairy
+        )
+        self.image = SiteImage.objects.create(key="bootstrap.hero", alt_text="Hero")
+        Region.objects.create(code="BS", name="Bootstrap", delivery_weekday=3)
+        BlogPost.objects.create(
+            title="Hello", slug="hello", content="...", is_published=True, published_at=timezone.now()
+        )
+
+    def test_one_response_carries_every_fragment(self):
+        data = self.client.get(URL).json()
+        self.assertEqual([item["slug"] for item in data["products"]], ["bootstrap-milk"])
+        self.assertIn("bootstrap-dairy", [category["slug"] for category in data["categories"]])
+        self.assertEqual(data["site_images"]["bootstrap.hero"]["alt"], "Hero")
+        self.assertIn("BS", [region["code"] for region in data["regions"]])
+        self.assertEqual(data["blog"]["results"][0]["slug"], "hello")
+        self.assertGreaterEqual(data["blog"]["count"], 1)
+
+    def test_warm_requests_only_fingerprint_regions_and_posts(self):
+        etag = self.client.get(URL)["ETag"]
+        with self.assertNumQueries(2):
+            response = self.client.get(URL)
+        self.assertEqual(response["ETag"], etag)
+        with self.assertNumQueries(2):
+            not_modified = self.client.get(URL, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(not_modified.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_any_source_change_changes_the_etag(self):
+        etags = {self.client.get(URL)["ETag"]}
+        self.image.alt_text = "New hero"
+        with self.captureOnCommitCallbacks(execute=True):
+            self.image.save()
+        response = self.client.get(URL)
+        self.assertEqual(response.json()["site_images"]["bootstrap.hero"]["alt"], "New hero")
+        etags.add(response["ETag"])
+
+        self.product.name = "Bootstrap Oat Milk"
+        # The catalog version is bumped once the change commits.
+        with mock.patch("products.tasks.warm_catalog_cache.apply_async"):
+            with self.captureOnCommitCallbacks(execute=True):
+                self.product.save()
+        response = self.client.get(URL)
+        self.assertEqual(response.json()["products"][0]["name"], "Bootstrap Oat Milk")
+        etags.add(response["ETag"])
+
+        Region.objects.filter(code="BS").update(name="Renamed", updated_at=timezone.now())
+        response = self.client.get(URL)
+        self.assertIn("Renamed", [region["name"] for region in response.json()["regions"]])
+        etags.add(response["ETag"])
+        self.assertEqual(len(etags), 4)
+
+    def test_responses_are_gzipped_for_clients_that_accept_it(self):
+        response = self.client.get(URL, HTTP_ACCEPT_ENCODING="gzip")
+        self.assertEqual(response["Content-Encoding"], "gzip")
+        self.assertIn("Accept-Encoding", response["Vary"])
+        data = json.loads(gzip.decompress(response.content))
+        self.assertEqual(data["products"][0]["slug"], "bootstrap-milk")
+        self.assertNotIn("Content-Encoding", self.client.get(URL))
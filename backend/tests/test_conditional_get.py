@@ -0,0 +1,146 @@
+import datetime
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from blog.models import BlogPost
+from content.models import SiteImage
+from delivery.models import DeliveryRoute, Driver
+from orders.models import Region
+from products.models import Category, Product
+
+
+class ConditionalGetTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+
+    def assert_revalidates(self, url):
+        """Return the ETag after checking that a matching If-None-Match yields a bare 304."""
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        etag = response["ETag"]
+        self.assertIn("no-cache", response["Cache-Control"])
+        self.assertNotIn("no-store", response["Cache-Control"])
+
+        not_modified = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(not_modified.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(not_modified.content, b"")
+        return etag
+
+    def test_site_images_revalidate_until_an_image_changes(self):
+        image = SiteImage.objects.create(key="home.hero", alt_text="Hero")
+        etag = self.assert_revalidates("/api/site-images/")
+        detail_etag = self.assert_revalidates("/api/site-images/home.hero/")
+
+        image.alt_text = "New hero"
+        image.save()
+        self.assertEqual(
+            self.client.get("/api/site-images/", HTTP_IF_NONE_MATCH=etag).status_code,
+            status.HTTP_200_OK,
+        )
+        response = self.client.get("/api/site-images/home.hero/", HTTP_IF_NONE_MATCH=detail_etag)
+        self.assertEqual(response.json()["alt"], "New hero")
+
+    def test_missing_site_image_has_no_validator(self):
+        response = self.client.get("/api/site-images/missing/")
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+        self.assertFalse(response.has_header("ETag"))
+
+    def test_products_and_categories_follow_the_catalog_version(self):
+        category = Category.objects.create(name="Beef", slug="beef")
+        Product.objects.create(name="Ribeye", slug="ribeye", price_cents=2500, category=category)
+        products_etag = self.assert_revalidates("/api/products/")
+        self.assert_revalidates("/api/products/ribeye/")
+        categories_etag = self.assert_revalidates("/api/categories/")
+
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get("/api/products/", HTTP_IF_NONE_MATCH=products_etag)
+        self.assertEqual(len(queries), 0)
+
+        category.name = "Grass-fed beef"
+        # The catalog version is bumped once the change commits.
+        with mock.patch("products.tasks.warm_catalog_cache.apply_async"):
+            with self.captureOnCommitCallbacks(execute=True):
+                category.save()
+        response = self.client.get("/api/products/", HTTP_IF_NONE_MATCH=products_etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        response = self.client.get("/api/categories/", HTTP_IF_NONE_MATCH=categories_etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_query_parameters_get_their_own_validator(self):
+        Product.objects.create(name="Ribeye", slug="ribeye", price_cents=2500)
+        etag = self.client.get("/api/products/")["ETag"]
+        self.assertNotEqual(self.client.get("/api/products/?search=rib")["ETag"], etag)
+
+    def test_regions_revalidate_until_a_region_changes(self):
+        Region.objects.create(code="N", name="North", delivery_weekday=1)
+        etag = self.assert_revalidates("/api/regions/")
+
+        Region.objects.create(code="S", name="South", delivery_weekday=2)
+        response = self.client.get("/api/regions/", HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.json()), Region.objects.count())
+
+    def test_blog_list_changes_when_a_scheduled_post_goes_live(self):
+        BlogPost.objects.create(title="One", slug="one", content="x", is_published=True)
+        scheduled = BlogPost.objects.create(
+            title="Two",
+            slug="two",
+            content="x",
+            is_published=True,
+            published_at=timezone.now() + datetime.timedelta(days=1),
+        )
+        etag = self.assert_revalidates("/api/blog/posts/")
+        self.assert_revalidates("/api/blog/posts/one/")
+
+        # Going live involves no write, so the version counter alone would not notice.
+        BlogPost.objects.filter(pk=scheduled.pk).update(
+            published_at=timezone.now() - datetime.timedelta(minutes=1)
+        )
+        response = self.client.get("/api/blog/posts/", HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_blog_edits_change_the_etag_once_committed(self):
+        post = BlogPost.objects.create(title="One", slug="one", content="old", is_published=True)
+        etag = self.assert_revalidates("/api/blog/posts/one/")
+
+        with self.captureOnCommitCallbacks(execute=True):
+            post.content = "new"
+            post.save()
+            # Inside the saving transaction readers keep the old version and its ETag.
+            response = self.client.get("/api/blog/posts/one/", HTTP_IF_NONE_MATCH=etag)
+            self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        response = self.client.get("/api/blog/posts/one/", HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.json()["content"], "new")
+
+    def test_driver_upcoming_routes_revalidate_until_counters_change(self):
+        user = get_user_model().objects.create_user(
+            username="etag-driver", email="etag-driver@example.com", password="x"
+        )
+        driver = Driver.objects.create(user=user)
+        region = Region.objects.create(code="U", name="Upcoming", delivery_weekday=1)
+        route = DeliveryRoute.objects.create(
+            region=region,
+            driver=driver,
+            date=timezone.now().date() + datetime.timedelta(days=3),
+            total_count=2,
+            pending_count=2,
+        )
+        self.client.force_authenticate(user=user)
+        url = "/api/delivery/driver/routes/upcoming/"
+        etag = self.assert_revalidates(url)
+        self.assertIn("private", self.client.get(url)["Cache-Control"])
+
+        DeliveryRoute.objects.filter(pk=route.pk).update(pending_count=1)
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.json()[0]["pending_count"], 1)
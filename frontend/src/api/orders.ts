@@ -42,8 +42,15 @@ export async function createOrder(payload: OrderPayload): Promise<OrderResponse>
   return response.data;
 }
 
-export async function fetchOrders(): Promise<OrderDetail[]> {
-  const response = await api.get<OrderDetail[]>("/orders/", { withCredentials: true });
+export interface OrderPage {
+  next: string | null;
+  previous: string | null;
+  results: OrderDetail[];
+}
+
+// Pass the `next` URL of a previous page to continue the order history.
+export async function fetchOrders(pageUrl?: string | null): Promise<OrderPage> {
+  const response = await api.get<OrderPage>(pageUrl || "/orders/", { withCredentials: true });
   return response.data;
 }
 
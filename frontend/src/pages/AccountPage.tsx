@@ -63,6 +63,8 @@ function AccountPage() {
   const [orders, setOrders] = useState<OrderDetail[]>([]);
   const [ordersLoading, setOrdersLoading] = useState(false);
   const [ordersError, setOrdersError] = useState<string | null>(null);
+  const [ordersNextPage, setOrdersNextPage] = useState<string | null>(null);
+  const [loadingMoreOrders, setLoadingMoreOrders] = useState(false);
   const [expandedOrderId, setExpandedOrderId] = useState<number | null>(null);
   const [ordersRefreshKey, setOrdersRefreshKey] = useState(0);
 
@@ -237,7 +239,8 @@ function AccountPage() {
       setOrdersError(null);
       try {
         const data = await fetchOrders();
-        setOrders(data);
+        setOrders(data.results);
+        setOrdersNextPage(data.next);
       } catch (err) {
         if (axios.isAxiosError(err) && err.response?.status === 401) {
           setOrdersError("Please sign in to view your orders.");
@@ -260,10 +263,25 @@ function AccountPage() {
   useEffect(() => {
     if (!isAuthenticated) {
       setOrders([]);
+      setOrdersNextPage(null);
       setOrdersRefreshKey(0);
     }
   }, [isAuthenticated]);
 
+  const loadMoreOrders = async () => {
+    if (!ordersNextPage) return;
+    setLoadingMoreOrders(true);
+    try {
+      const data = await fetchOrders(ordersNextPage);
+      setOrders((prev) => [...prev, ...data.results]);
+      setOrdersNextPage(data.next);
+    } catch (err) {
+      setOrdersError((err as Error).message || "Unable to load orders.");
+    } finally {
+      setLoadingMoreOrders(false);
+    }
+  };
+
   const currentStatuses: OrderStatus[] = ["pending", "paid", "in_progress", "ready"];
   const pastStatuses: OrderStatus[] = ["completed", "cancelled"];
 
@@ -937,6 +955,19 @@ function AccountPage() {
                   </div>
                 </div>
               )}
+
+              {ordersNextPage && !ordersLoading && (
+                <div className="flex justify-center">
+                  <Button
+                    type="button"
+                    variant="outline"
+                    onClick={loadMoreOrders}
+                    disabled={loadingMoreOrders}
+                  >
+                    {loadingMoreOrders ? "Loading..." : "Load more orders"}
+                  </Button>
+                </div>
+              )}
             </CardContent>
           </Card>
         </TabsContent>